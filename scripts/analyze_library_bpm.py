@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Detect BPM for the whole Subsonic library into the metadata cache.
+
+Meant to run as a nightly job: tracks that already have a cached BPM are
+skipped, and only the leading bytes of each remaining track are downloaded.
+
+Usage:
+    python scripts/analyze_library_bpm.py --cache-db .swarm/memory.db --workers 8
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(project_root))
+
+from src.ai_playlist.bpm_analyzer import HAS_BPM_ANALYSIS, BpmAnalysisPool  # noqa: E402
+from src.ai_playlist.metadata_enhancer import MetadataEnhancer  # noqa: E402
+from src.replaygain.batch import load_library_snapshot  # noqa: E402
+from src.subsonic.client import SubsonicClient  # noqa: E402
+from src.subsonic.models import SubsonicConfig  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect BPM for the Subsonic library")
+    parser.add_argument(
+        "--cache-db",
+        default=MetadataEnhancer.DEFAULT_CACHE_DB,
+        help=f"Metadata cache database (default: {MetadataEnhancer.DEFAULT_CACHE_DB})",
+    )
+    parser.add_argument(
+        "--snapshot",
+        default="replaygain_library.json",
+        help="Library snapshot file, shared with python -m src.replaygain (default: %(default)s)",
+    )
+    parser.add_argument("--refresh-library", action="store_true", help="Walk the library again")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: CPU count)"
+    )
+    args = parser.parse_args()
+
+    if not HAS_BPM_ANALYSIS:
+        print("NumPy is required for BPM analysis: pip install numpy")
+        sys.exit(1)
+
+    config = SubsonicConfig(
+        url=os.getenv("SUBSONIC_URL"),
+        username=os.getenv("SUBSONIC_USER"),
+        password=os.getenv("SUBSONIC_PASSWORD"),
+        api_key=os.getenv("SUBSONIC_API_KEY"),
+        client_name=os.getenv("SUBSONIC_CLIENT_NAME", "playlistgen"),
+    )
+    enhancer = MetadataEnhancer(cache_db_path=args.cache_db)
+    with SubsonicClient(config) as client, BpmAnalysisPool(args.workers) as pool:
+        tracks = load_library_snapshot(client, args.snapshot, refresh=args.refresh_library)
+        results = enhancer.analyze_library_bpm(tracks, client, pool)
+
+    print(f"Detected BPM for {len(results)} tracks; cache: {enhancer.get_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare the ffmpeg loudnorm and NumPy PCM loudness engines on audio files.
+
+Prints gain/peak from both engines, their differences and the speedup, so the
+PCM engine's sample rate can be tuned before setting REPLAYGAIN_ENGINE=pcm.
+
+Usage:
+    python scripts/compare_loudness_engines.py mix.mp3 album/*.flac --sample-rate 16000
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add project root to path for imports
+project_root = Path(__file__).parent.parent.absolute()
+sys.path.insert(0, str(project_root))
+
+from src.replaygain.pcm import DEFAULT_SAMPLE_RATE, HAS_NUMPY, compare_engines  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ReplayGain loudness engines")
+    parser.add_argument("files", nargs="+", type=Path, help="Audio files to measure")
+    parser.add_argument(
+        "--sample-rate",
+        type=int,
+        default=DEFAULT_SAMPLE_RATE,
+        help=f"PCM engine sample rate (default: {DEFAULT_SAMPLE_RATE})",
+    )
+    args = parser.parse_args()
+
+    if not HAS_NUMPY:
+        print("NumPy is required for the PCM engine: pip install numpy")
+        sys.exit(1)
+
+    print(
+        f"{'file':40} {'ffmpeg LUFS':>11} {'pcm LUFS':>9} {'Δ LU':>6} "
+        f"{'Δ dBTP':>7} {'ffmpeg s':>9} {'pcm s':>7} {'speedup':>8}"
+    )
+    total_ffmpeg = total_pcm = worst_gain = worst_peak = 0.0
+    for path in args.files:
+        result = compare_engines(path.read_bytes(), path.suffix.lstrip("."), args.sample_rate)
+        total_ffmpeg += result["ffmpeg_seconds"]
+        total_pcm += result["pcm_seconds"]
+        worst_gain = max(worst_gain, result["gain_error"])
+        worst_peak = max(worst_peak, result["peak_error"])
+        print(
+            f"{path.name[:40]:40} {result['ffmpeg_gain']:11.2f} {result['pcm_gain']:9.2f} "
+            f"{result['gain_error']:6.2f} {result['peak_error']:7.2f} "
+            f"{result['ffmpeg_seconds']:9.1f} {result['pcm_seconds']:7.1f} "
+            f"{result['speedup']:7.1f}x"
+        )
+
+    print(
+        f"\nWorst gain error {worst_gain:.2f} LU, worst peak error {worst_peak:.2f} dB, "
+        f"overall speedup {total_ffmpeg / max(total_pcm, 1e-9):.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,7 @@ import sys
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 # Import all required modules - works both as script and module
 try:
@@ -29,6 +29,7 @@ try:
     from src.ai_playlist.models.core import Playlist, SelectedTrack
     from src.subsonic.client import SubsonicClient
     from src.azuracast.main import AzuraCastSync
+    from src.azuracast.async_client import AsyncAzuraCastClient
 except ModuleNotFoundError:
     # Running as script, add parent directory to path
     sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -39,6 +40,7 @@ except ModuleNotFoundError:
     from src.ai_playlist.models.core import Playlist, SelectedTrack
     from src.subsonic.client import SubsonicClient
     from src.azuracast.main import AzuraCastSync
+    from src.azuracast.async_client import AsyncAzuraCastClient
 
 logger = logging.getLogger(__name__)
 
@@ -129,6 +131,128 @@ ERRORS: {len(self.errors)}
         )
 
 
+async def deploy_playlist(
+    playlist: "Playlist",
+    label: str,
+    azuracast: AzuraCastSync,
+    azuracast_async: AsyncAzuraCastClient,
+    playlist_info: Optional[Dict[str, Any]],
+    upload_lock: asyncio.Lock,
+    metrics: DeploymentMetrics,
+) -> None:
+    """
+    Upload, create, link and schedule one playlist in AzuraCast (steps 3-6)
+
+    Args:
+        playlist: Generated playlist to deploy
+        label: Progress label for log messages (e.g. "[3/42]")
+        azuracast: Sync client, used for track uploads with duplicate detection
+        azuracast_async: Async client, used for playlist operations
+        playlist_info: Existing AzuraCast playlist details, or None to create it
+        upload_lock: Serializes uploads across concurrently deployed playlists
+        metrics: Deployment metrics to update
+    """
+    logger.info(f"\n{label} Processing: {playlist.name}")
+
+    try:
+        # Convert SelectedTrack objects to dict format for AzuraCast
+        track_list = []
+        for track in playlist.tracks:
+            track_dict = {
+                "Name": track.title,
+                "AlbumArtist": track.artist,
+                "Album": track.album,
+                "subsonic_id": track.track_id,
+                "Duration": track.duration_seconds
+            }
+            track_list.append(track_dict)
+
+        logger.info(f"  {label} Tracks to upload: {len(track_list)}")
+
+        # STEP 3: Upload all tracks (with duplicate detection) without blocking the event loop
+        async with upload_lock:
+            await asyncio.to_thread(azuracast.upload_playlist, track_list)
+        metrics.tracks_uploaded += len(track_list)
+        logger.info(f"  {label} ✓ Uploaded tracks (duplicates handled)")
+
+        # STEP 4: Create/clear playlist in AzuraCast
+        if not playlist_info:
+            playlist_info = await azuracast_async.create_playlist(playlist.name)
+            if not playlist_info:
+                raise RuntimeError("playlist creation failed")
+            logger.info(f"  {label} ✓ Created playlist in AzuraCast")
+        else:
+            await azuracast_async.empty_playlist(playlist_info["id"])
+            logger.info(f"  {label} ✓ Cleared existing playlist")
+
+        metrics.playlists_created += 1
+
+        # STEP 5: Link tracks in AI-determined order
+        linked_count = await azuracast_async.link_tracks(
+            playlist_info["id"],
+            [t["azuracast_file_id"] for t in track_list if "azuracast_file_id" in t],
+        )
+
+        metrics.playlists_linked += 1
+        logger.info(f"  {label} ✓ Linked {linked_count} tracks in correct order")
+
+        # STEP 6: Schedule playlist with daypart timing
+        # Extract daypart name and date from playlist name (format: "Daypart Name - YYYY-MM-DD")
+        parts = playlist.name.rsplit(" - ", 1)
+        if len(parts) != 2:
+            logger.warning(f"  {label} ⚠ Invalid playlist name format: '{playlist.name}'")
+            return
+
+        daypart_name = parts[0]
+        date_str = parts[1]
+
+        # Parse the date to get the day of week
+        try:
+            playlist_date = datetime.strptime(date_str, "%Y-%m-%d")
+            day_of_week = playlist_date.weekday()  # 0=Monday, 6=Sunday
+
+            # Convert to AzuraCast format (0=Sunday, 1=Monday, ..., 6=Saturday)
+            azuracast_day = (day_of_week + 1) % 7
+
+        except ValueError as e:
+            logger.error(f"  {label} ✗ Invalid date format in playlist name: {date_str} - {e}")
+            return
+
+        if daypart_name in DAYPART_SCHEDULE:
+            schedule_config = DAYPART_SCHEDULE[daypart_name]
+
+            # Schedule for ONLY this specific date, not recurring
+            # Set start_date and end_date to the same date for non-recurring schedule
+            success = await azuracast_async.schedule_playlist(
+                playlist.name,
+                start_time=schedule_config["start_time"],
+                end_time=schedule_config["end_time"],
+                days=[azuracast_day],  # Single day only!
+                start_date=date_str,   # YYYY-MM-DD format
+                end_date=date_str,     # Same date = play only once
+                playlist_info=playlist_info,
+            )
+
+            if success:
+                metrics.playlists_scheduled += 1
+                day_names = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+                logger.info(
+                    f"  {label} ✓ Scheduled for {day_names[azuracast_day]} {date_str} "
+                    f"{schedule_config['start_time']}-{schedule_config['end_time']}"
+                )
+            else:
+                error = f"Failed to schedule playlist '{playlist.name}'"
+                logger.error(error)
+                metrics.errors.append(error)
+        else:
+            logger.warning(f"  {label} ⚠ No schedule mapping for daypart '{daypart_name}'")
+
+    except Exception as e:
+        error = f"Failed to process playlist '{playlist.name}': {str(e)}"
+        logger.error(error)
+        metrics.errors.append(error)
+
+
 async def complete_end_to_end() -> DeploymentMetrics:
     """
     Execute complete end-to-end AI playlist automation workflow
@@ -245,109 +369,33 @@ async def complete_end_to_end() -> DeploymentMetrics:
         logger.info("STEPS 3-5: UPLOADING TRACKS AND CREATING AZURACAST PLAYLISTS")
         logger.info("="*80)
 
-        for i, playlist in enumerate(all_playlists, 1):
-            logger.info(f"\n[{i}/{len(all_playlists)}] Processing: {playlist.name}")
-
-            try:
-                # Convert SelectedTrack objects to dict format for AzuraCast
-                track_list = []
-                for track in playlist.tracks:
-                    track_dict = {
-                        "Name": track.title,
-                        "AlbumArtist": track.artist,
-                        "Album": track.album,
-                        "subsonic_id": track.track_id,
-                        "Duration": track.duration_seconds
-                    }
-                    track_list.append(track_dict)
-
-                logger.info(f"  Tracks to upload: {len(track_list)}")
-
-                # STEP 3: Upload all tracks (with duplicate detection)
-                azuracast.upload_playlist(track_list)
-                metrics.tracks_uploaded += len(track_list)
-                logger.info(f"  ✓ Uploaded tracks (duplicates handled)")
-
-                # STEP 4: Create/clear playlist in AzuraCast
-                azuracast.clear_playlist_by_name(playlist.name)
-                playlist_info = azuracast.get_playlist(playlist.name)
-
-                if not playlist_info:
-                    playlist_info = azuracast.create_playlist(playlist.name)
-                    logger.info(f"  ✓ Created playlist in AzuraCast")
-                else:
-                    logger.info(f"  ✓ Cleared existing playlist")
-
-                metrics.playlists_created += 1
-
-                # STEP 5: Link tracks in AI-determined order
-                linked_count = 0
-                for track_dict in track_list:
-                    if "azuracast_file_id" in track_dict:
-                        azuracast.add_to_playlist(
-                            track_dict["azuracast_file_id"],
-                            playlist_info["id"]
-                        )
-                        linked_count += 1
-
-                metrics.playlists_linked += 1
-                logger.info(f"  ✓ Linked {linked_count} tracks in correct order")
-
-                # STEP 6: Schedule playlist with daypart timing
-                # Extract daypart name and date from playlist name (format: "Daypart Name - YYYY-MM-DD")
-                parts = playlist.name.rsplit(" - ", 1)
-                if len(parts) != 2:
-                    logger.warning(f"  ⚠ Invalid playlist name format: '{playlist.name}'")
-                    continue
-
-                daypart_name = parts[0]
-                date_str = parts[1]
-
-                # Parse the date to get the day of week
-                try:
-                    playlist_date = datetime.strptime(date_str, "%Y-%m-%d")
-                    day_of_week = playlist_date.weekday()  # 0=Monday, 6=Sunday
-
-                    # Convert to AzuraCast format (0=Sunday, 1=Monday, ..., 6=Saturday)
-                    azuracast_day = (day_of_week + 1) % 7
-
-                except ValueError as e:
-                    logger.error(f"  ✗ Invalid date format in playlist name: {date_str} - {e}")
-                    continue
-
-                if daypart_name in DAYPART_SCHEDULE:
-                    schedule_config = DAYPART_SCHEDULE[daypart_name]
-
-                    # Schedule for ONLY this specific date, not recurring
-                    # Set start_date and end_date to the same date for non-recurring schedule
-                    success = azuracast.schedule_playlist(
-                        playlist.name,
-                        start_time=schedule_config["start_time"],
-                        end_time=schedule_config["end_time"],
-                        days=[azuracast_day],  # Single day only!
-                        start_date=date_str,   # YYYY-MM-DD format
-                        end_date=date_str      # Same date = play only once
-                    )
-
-                    if success:
-                        metrics.playlists_scheduled += 1
-                        day_names = ["Sun", "Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
-                        logger.info(
-                            f"  ✓ Scheduled for {day_names[azuracast_day]} {date_str} "
-                            f"{schedule_config['start_time']}-{schedule_config['end_time']}"
-                        )
-                    else:
-                        error = f"Failed to schedule playlist '{playlist.name}'"
-                        logger.error(error)
-                        metrics.errors.append(error)
-                else:
-                    logger.warning(f"  ⚠ No schedule mapping for daypart '{daypart_name}'")
+        # Playlists are deployed concurrently; the async client's shared request
+        # budget bounds the load on AzuraCast. Uploads stay serialized in a worker
+        # thread because duplicate detection shares one known-tracks cache.
+        upload_lock = asyncio.Lock()
+        async with AsyncAzuraCastClient() as azuracast_async:
+            # Resolve every target playlist up front (one listing, concurrent detail fetches)
+            existing_playlists = await azuracast_async.get_playlists(
+                [p.name for p in all_playlists]
+            )
+
+            await asyncio.gather(*(
+                deploy_playlist(
+                    playlist,
+                    f"[{i}/{len(all_playlists)}]",
+                    azuracast,
+                    azuracast_async,
+                    existing_playlists.get(playlist.name),
+                    upload_lock,
+                    metrics,
+                )
+                for i, playlist in enumerate(all_playlists, 1)
+            ))
 
-            except Exception as e:
-                error = f"Failed to process playlist '{playlist.name}': {str(e)}"
-                logger.error(error)
-                metrics.errors.append(error)
-                continue
+            logger.info(
+                f"AzuraCast requests: {azuracast_async.budget.total_requests} "
+                f"({azuracast_async.budget.throttled_requests} rate limited)"
+            )
 
         # ========================================================================
         # STEP 7: Verification
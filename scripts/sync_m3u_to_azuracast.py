@@ -6,9 +6,10 @@ This script:
 2. Extracts Subsonic track IDs from the M3U files
 3. Retrieves full track metadata from Subsonic
 4. Downloads audio files from Subsonic
-5. Uploads files to AzuraCast (with duplicate detection)
-6. Creates/updates playlists in AzuraCast
-7. Links uploaded tracks to their respective playlists
+5. Adds ReplayGain metadata (analysed concurrently on the ReplayGain pool)
+6. Uploads files to AzuraCast (with duplicate detection)
+7. Creates/updates playlists in AzuraCast
+8. Links uploaded tracks to their respective playlists
 
 Usage:
     python scripts/sync_m3u_to_azuracast.py [--playlist-name "After Hours - 2025-10-09"]
@@ -20,9 +21,10 @@ import logging
 import os
 import sys
 from base64 import b64encode
+from collections import deque
 from io import BytesIO
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional, Tuple, Union
 
 from tqdm import tqdm
 
@@ -32,6 +34,9 @@ sys.path.insert(0, str(project_root))
 
 from src.azuracast.main import AzuraCastSync
 from src.logger import setup_logging
+from src.replaygain.cache import subsonic_source_key
+from src.replaygain.main import has_replaygain_metadata
+from src.replaygain.pool import ReplayGainJob, get_replaygain_pool
 from src.subsonic.client import SubsonicClient
 from src.subsonic.models import SubsonicConfig, SubsonicTrack
 
@@ -89,6 +94,9 @@ class M3UPlaylistSync:
         self.azuracast = AzuraCastSync()
         logger.info("AzuraCast client initialized")
 
+        # Loudness analysis runs ahead of uploads on the shared worker pool
+        self.replaygain_pool = get_replaygain_pool()
+
         # Track cache to avoid duplicate downloads
         self._track_cache: Dict[str, SubsonicTrack] = {}
         self._uploaded_files: Dict[str, str] = {}  # subsonic_id -> azuracast_file_id
@@ -186,6 +194,87 @@ class M3UPlaylistSync:
             logger.error(f"Failed to download track {track_id}: {e}")
             return None
 
+    def submit_replaygain(
+        self, subsonic_track: SubsonicTrack, audio_data: bytes
+    ) -> Union[bytes, ReplayGainJob]:
+        """Queue ReplayGain analysis for a downloaded track if it is not tagged yet.
+
+        Args:
+            subsonic_track: Subsonic track metadata
+            audio_data: Audio file bytes
+
+        Returns:
+            The original bytes if already tagged, otherwise the queued job
+        """
+        suffix = subsonic_track.suffix or "mp3"
+        if has_replaygain_metadata(BytesIO(audio_data), suffix):
+            logger.debug(f"ReplayGain metadata already present for track {subsonic_track.id}")
+            return audio_data
+        # Key cached loudness on Subsonic metadata so unchanged files skip hashing
+        return self.replaygain_pool.submit(
+            audio_data,
+            suffix,
+            label=subsonic_track.id,
+            cache_key=subsonic_source_key(subsonic_track),
+        )
+
+    @staticmethod
+    def resolve_replaygain(
+        track_id: str, audio_data: bytes, job: Union[bytes, ReplayGainJob]
+    ) -> bytes:
+        """Wait for a track's ReplayGain job, falling back to the untagged file.
+
+        Args:
+            track_id: Subsonic track ID
+            audio_data: Original audio file bytes
+            job: Result of submit_replaygain()
+
+        Returns:
+            Audio file bytes (tagged if analysis succeeded)
+        """
+        if not isinstance(job, ReplayGainJob):
+            return job
+        try:
+            return job.result()
+        except Exception as e:
+            logger.warning(f"ReplayGain failed for track {track_id}, uploading untagged: {e}")
+            return audio_data
+
+    def find_in_azuracast(self, track_id: str, metadata: Dict[str, str]) -> Optional[str]:
+        """Look up a track that is already in AzuraCast.
+
+        Args:
+            track_id: Subsonic track ID
+            metadata: Track metadata dict
+
+        Returns:
+            AzuraCast file ID, or None if the track still has to be uploaded
+        """
+        # Check if already uploaded
+        if track_id in self._uploaded_files:
+            logger.debug(f"Track {track_id} already uploaded")
+            return self._uploaded_files[track_id]
+
+        # Shared, disk-backed snapshot: one /files fetch per TTL across processes
+        known_tracks = self.azuracast.get_known_tracks_snapshot()
+
+        # Create a pseudo-track dict for duplicate detection
+        pseudo_track = {
+            "AlbumArtist": metadata.get("artist", "Unknown Artist"),
+            "Album": metadata.get("album", "Unknown Album"),
+            "Name": metadata.get("title", "Unknown Title"),
+            "azuracast_file_id": None,
+        }
+        if not self.azuracast.check_file_in_azuracast(known_tracks, pseudo_track):
+            return None
+
+        azuracast_file_id = pseudo_track.get("azuracast_file_id")
+        logger.info(
+            f"Track '{pseudo_track['Name']}' already exists in AzuraCast (ID: {azuracast_file_id})"
+        )
+        self._uploaded_files[track_id] = azuracast_file_id
+        return azuracast_file_id
+
     def upload_to_azuracast(
         self,
         track_id: str,
@@ -204,12 +293,12 @@ class M3UPlaylistSync:
         Returns:
             AzuraCast file ID or None if upload failed
         """
-        # Check if already uploaded
-        if track_id in self._uploaded_files:
-            logger.debug(f"Track {track_id} already uploaded")
-            return self._uploaded_files[track_id]
-
         try:
+            # Re-check: another process may have uploaded it while we analysed it
+            existing_file_id = self.find_in_azuracast(track_id, metadata)
+            if existing_file_id:
+                return existing_file_id
+
             artist = metadata.get("artist", "Unknown Artist")
             title = metadata.get("title", "Unknown Title")
             album = metadata.get("album", "Unknown Album")
@@ -224,37 +313,16 @@ class M3UPlaylistSync:
 
             file_path = f"{artist}/{album}/{title}{file_ext}"
 
-            # Check for duplicates in AzuraCast
-            known_tracks = self.azuracast.get_known_tracks()
-
-            # Create a pseudo-track dict for duplicate detection
-            pseudo_track = {
-                "AlbumArtist": artist,
-                "Album": album,
-                "Name": title,
-                "azuracast_file_id": None,
-            }
-
-            if not self.azuracast.check_file_in_azuracast(known_tracks, pseudo_track):
-                # Upload the file
-                upload_response = self.azuracast.upload_file_to_azuracast(
-                    audio_data, file_path
-                )
-                azuracast_file_id = upload_response.get("id")
-
-                if azuracast_file_id:
-                    logger.info(f"Uploaded track '{title}' to AzuraCast (ID: {azuracast_file_id})")
-                    self._uploaded_files[track_id] = azuracast_file_id
-                    return azuracast_file_id
-                else:
-                    logger.error(f"Upload response missing 'id' for track '{title}'")
-                    return None
-            else:
-                # Track already exists
-                azuracast_file_id = pseudo_track.get("azuracast_file_id")
-                logger.info(f"Track '{title}' already exists in AzuraCast (ID: {azuracast_file_id})")
+            upload_response = self.azuracast.upload_file_to_azuracast(audio_data, file_path)
+            azuracast_file_id = upload_response.get("id")
+
+            if azuracast_file_id:
+                logger.info(f"Uploaded track '{title}' to AzuraCast (ID: {azuracast_file_id})")
                 self._uploaded_files[track_id] = azuracast_file_id
                 return azuracast_file_id
+            else:
+                logger.error(f"Upload response missing 'id' for track '{title}'")
+                return None
 
         except Exception as e:
             logger.error(f"Failed to upload track {track_id}: {e}")
@@ -287,7 +355,42 @@ class M3UPlaylistSync:
         # Process tracks
         azuracast_track_ids = []
 
+        # Tracks waiting for ReplayGain analysis, in playlist order. Up to two jobs
+        # per pool worker run ahead of the upload to keep every core busy while
+        # bounding how many files are held in memory. Tracks already in AzuraCast
+        # are queued with their file ID only, to keep the playlist order.
+        in_flight: Deque[
+            Tuple[str, Optional[bytes], Dict, Union[None, str, bytes, ReplayGainJob]]
+        ] = deque()
+        lookahead = self.replaygain_pool.max_workers * 2
+
         with tqdm(total=len(tracks), desc=f"Processing {playlist_name}", unit="track") as pbar:
+
+            def upload_next() -> None:
+                track_id, audio_data, metadata, job = in_flight.popleft()
+                try:
+                    if audio_data is None:
+                        # Already in AzuraCast: job is its file ID
+                        azuracast_track_ids.append(job)
+                        return
+
+                    pbar.set_description(f"Analysing {metadata['title']}")
+                    audio_data = self.resolve_replaygain(track_id, audio_data, job)
+
+                    # Upload to AzuraCast
+                    azuracast_file_id = self.upload_to_azuracast(
+                        track_id, audio_data, metadata, pbar
+                    )
+
+                    if azuracast_file_id:
+                        azuracast_track_ids.append(azuracast_file_id)
+                    else:
+                        logger.warning(f"Skipping track {track_id} - upload failed")
+                except Exception as e:
+                    logger.error(f"Error processing track {track_id}: {e}")
+                finally:
+                    pbar.update(1)
+
             for track_meta in tracks:
                 track_id = track_meta["track_id"]
 
@@ -301,15 +404,6 @@ class M3UPlaylistSync:
                         pbar.update(1)
                         continue
 
-                    # Download from Subsonic
-                    pbar.set_description(f"Downloading {subsonic_track.title}")
-                    audio_data = self.download_subsonic_track(track_id)
-
-                    if not audio_data:
-                        logger.warning(f"Skipping track {track_id} - download failed")
-                        pbar.update(1)
-                        continue
-
                     # Prepare metadata for upload
                     metadata = {
                         "artist": subsonic_track.artist,
@@ -319,22 +413,36 @@ class M3UPlaylistSync:
                         "duration": subsonic_track.duration,
                     }
 
-                    # Upload to AzuraCast
-                    azuracast_file_id = self.upload_to_azuracast(
-                        track_id, audio_data, metadata, pbar
-                    )
+                    # Skip download and loudness analysis for tracks AzuraCast has
+                    existing_file_id = self.find_in_azuracast(track_id, metadata)
+                    if existing_file_id:
+                        in_flight.append((track_id, None, metadata, existing_file_id))
+                        continue
 
-                    if azuracast_file_id:
-                        azuracast_track_ids.append(azuracast_file_id)
-                    else:
-                        logger.warning(f"Skipping track {track_id} - upload failed")
+                    # Download from Subsonic
+                    pbar.set_description(f"Downloading {subsonic_track.title}")
+                    audio_data = self.download_subsonic_track(track_id)
+
+                    if not audio_data:
+                        logger.warning(f"Skipping track {track_id} - download failed")
+                        pbar.update(1)
+                        continue
+
+                    job = self.submit_replaygain(subsonic_track, audio_data)
+                    in_flight.append((track_id, audio_data, metadata, job))
 
                 except Exception as e:
                     logger.error(f"Error processing track {track_id}: {e}")
-
-                finally:
                     pbar.update(1)
 
+                while len(in_flight) >= lookahead:
+                    upload_next()
+
+            while in_flight:
+                upload_next()
+
+        self.replaygain_pool.log_throughput()
+
         # Create/update playlist in AzuraCast
         logger.info(f"Linking {len(azuracast_track_ids)} tracks to playlist '{playlist_name}'")
 
@@ -0,0 +1,171 @@
+"""
+Library-wide audio feature analysis (BPM, energy) for metadata enrichment.
+
+Replaces one `aubio tempo` CLI run per track with:
+1. A bounded excerpt decode - only the first EXCERPT_OFFSET + EXCERPT_SECONDS
+   seconds are decoded by the shared feature stage (src.replaygain.features),
+   which measures tempo and energy from the same PCM
+2. A process pool so many tracks are analysed at once
+3. Ranged Subsonic downloads that fetch only the bytes the excerpt needs
+
+Results are stored by MetadataEnhancer in its metadata cache.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from src.replaygain.features import (
+    EXCERPT_OFFSET,
+    EXCERPT_SECONDS,
+    AudioFeatures,
+    extract_features,
+)
+from src.replaygain.main import FfmpegSource
+from src.replaygain.pcm import HAS_NUMPY
+from src.subsonic.client import SubsonicClient
+from src.subsonic.models import SubsonicTrack
+
+logger = logging.getLogger(__name__)
+
+# Extra bytes fetched for tags and cover art ahead of the audio
+RANGE_HEADER_MARGIN = 1024 * 1024
+# Containers whose index may sit at the end of the file, so a prefix cannot be decoded
+UNRANGEABLE_SUFFIXES = {"m4a", "m4b", "mp4", "alac"}
+
+HAS_BPM_ANALYSIS = HAS_NUMPY
+
+
+def analyze_excerpt(source: FfmpegSource, timeout: Optional[float] = None) -> AudioFeatures:
+    """Decode a bounded excerpt of an audio file and extract its features.
+
+    Only BPM and energy are meaningful for the whole track; loudness covers
+    just the decoded excerpt.
+
+    Args:
+        source: The audio file (or its leading bytes) as bytes, path or stream.
+        timeout: Seconds before ffmpeg is killed (None for no limit).
+
+    Returns:
+        AudioFeatures of the excerpt.
+
+    Raises:
+        RuntimeError: If no audio was decoded.
+        CalledProcessError: If ffmpeg fails.
+        ReplayGainTimeout: If ffmpeg exceeded timeout.
+    """
+    return extract_features(source, timeout=timeout, duration=EXCERPT_OFFSET + EXCERPT_SECONDS)
+
+
+def analyze_bpm(source: FfmpegSource, timeout: Optional[float] = None) -> Optional[float]:
+    """Estimate the tempo of an audio file from a bounded excerpt.
+
+    Args:
+        source: The audio file (or its leading bytes) as bytes, path or stream.
+        timeout: Seconds before ffmpeg is killed (None for no limit).
+
+    Returns:
+        BPM rounded to one decimal, or None if no steady beat was found.
+    """
+    return analyze_excerpt(source, timeout).bpm
+
+
+def excerpt_byte_count(track: SubsonicTrack) -> Optional[int]:
+    """Estimate how many leading bytes of a track cover the analysed excerpt.
+
+    Args:
+        track: Subsonic track with bitRate or size/duration.
+
+    Returns:
+        Byte count for a ranged download, or None if the whole file is needed.
+    """
+    if (track.suffix or "").lower() in UNRANGEABLE_SUFFIXES:
+        return None
+    if track.bitRate:
+        bytes_per_second = track.bitRate * 1000 / 8
+    elif track.size and track.duration:
+        bytes_per_second = track.size / track.duration
+    else:
+        return None
+    # 25% slack for variable bitrate passages
+    length = int((EXCERPT_OFFSET + EXCERPT_SECONDS) * bytes_per_second * 1.25)
+    length += RANGE_HEADER_MARGIN
+    if track.size and length >= track.size:
+        return None
+    return length
+
+
+def fetch_excerpt(client: SubsonicClient, track: SubsonicTrack) -> bytes:
+    """Download just enough of a track for BPM analysis.
+
+    Args:
+        client: Connected Subsonic client.
+        track: Track to fetch.
+
+    Returns:
+        The leading bytes of the file, or the whole file when a prefix
+        cannot be decoded or its size is unknown.
+    """
+    length = excerpt_byte_count(track)
+    if length is None:
+        return client.download_track(track.id)
+    return client.download_track_range(track.id, length)
+
+
+class BpmAnalysisPool:
+    """Process pool running analyze_excerpt() on many tracks at once.
+
+    Feature extraction is CPU-bound NumPy work, so it runs in worker
+    processes rather than threads.
+
+    Configuration (environment):
+        BPM_WORKERS: Worker processes (default: CPU count).
+        BPM_JOB_TIMEOUT: Seconds per ffmpeg decode, 0 for no limit (default: 120).
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, job_timeout: Optional[float] = None
+    ) -> None:
+        """Initializes the pool.
+
+        Args:
+            max_workers: Worker processes (defaults to BPM_WORKERS or the CPU count).
+            job_timeout: Seconds per decode (defaults to BPM_JOB_TIMEOUT).
+        """
+        self.max_workers: int = (
+            max_workers or int(os.getenv("BPM_WORKERS", "0")) or (os.cpu_count() or 1)
+        )
+        if job_timeout is None:
+            job_timeout = float(os.getenv("BPM_JOB_TIMEOUT", "120"))
+        self.job_timeout: Optional[float] = job_timeout or None
+        # Spawned workers avoid forking a parent that runs HTTP and ffmpeg threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def submit(self, source: FfmpegSource) -> "Future[AudioFeatures]":
+        """Queue an audio file (bytes or path) for feature analysis.
+
+        Args:
+            source: The audio file or its leading bytes; must be picklable.
+
+        Returns:
+            Future resolving to the excerpt's AudioFeatures.
+        """
+        return self._executor.submit(analyze_excerpt, source, self.job_timeout)
+
+    def shutdown(self, cancel_pending: bool = False) -> None:
+        """Stop the pool.
+
+        Args:
+            cancel_pending: Drop queued jobs instead of waiting for them.
+        """
+        self._executor.shutdown(wait=True, cancel_futures=cancel_pending)
+
+    def __enter__(self) -> "BpmAnalysisPool":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.shutdown(cancel_pending=exc_type is not None)
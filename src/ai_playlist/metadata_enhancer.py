@@ -3,22 +3,51 @@ Track metadata enhancement using Last.fm API and aubio audio analysis.
 
 Provides two-tier metadata enrichment:
 1. Last.fm API (primary) - Retrieve genre, BPM, country from community tags
-2. aubio CLI (fallback) - Audio analysis for BPM detection when Last.fm fails
+2. Audio analysis (fallback) - BPM detection when Last.fm fails, in-process
+   via bpm_analyzer when NumPy is installed, otherwise the aubio CLI
 
-All metadata is permanently cached in SQLite to minimize API calls and processing.
+All metadata is permanently cached in SQLite (WAL mode, one reused connection
+per thread) to minimize API calls and processing.
+Artist- and album-level Last.fm results are cached too, so tracks by the same
+artist share one artist lookup, and enhance_tracks() enriches a whole library
+concurrently within Last.fm's rate limit.
+
+Tracks no source has anything for are remembered as known misses for
+METADATA_NEGATIVE_TTL_DAYS, so they are not looked up again on every run.
+
+BPM and energy stored by audio analysis alone (the BPM job or the ReplayGain
+batch) are partial entries: Last.fm is still asked for genre and country, and
+the measured features are kept alongside the result.
+
+This is the single enrichment engine: MetadataEnhancerService (services/)
+is an artist/title front end to the same store and rate limiter, so a track
+enriched through either is cached once and never looked up twice.
 
 FR-029: Metadata enhancement with permanent caching.
 """
 
 import os
+import shutil
 import subprocess
 import logging
 import sqlite3
+import threading
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple
-from datetime import datetime
+from typing import Optional, Dict, Any, Iterable, List, Set, Tuple
+from datetime import datetime, timedelta
 import json
 
+from src.replaygain.cache import get_loudness_cache, subsonic_source_key
+from src.replaygain.main import ReplayGainTimeout
+from src.subsonic.client import SubsonicClient
+from src.subsonic.models import SubsonicTrack
+
+from .bpm_analyzer import HAS_BPM_ANALYSIS, BpmAnalysisPool, analyze_bpm, fetch_excerpt
+
 logger = logging.getLogger(__name__)
 
 # Optional Last.fm support
@@ -35,6 +64,64 @@ class MetadataEnhancerError(Exception):
     pass
 
 
+class RateLimiter:
+    """Sliding one-second request window shared by all threads."""
+
+    def __init__(self, rate: float):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Requests per second (0 for no limit)
+        """
+        self.rate = rate
+        self._request_times: deque = deque(maxlen=max(int(rate), 1))
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Block until another request fits within the rate."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if len(self._request_times) >= self.rate:
+                sleep_time = 1.0 - (now - self._request_times[0])
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+            self._request_times.append(time.monotonic())
+
+
+_lastfm_rate_limiter: Optional[RateLimiter] = None
+_lastfm_rate_limiter_lock = threading.Lock()
+
+
+def get_lastfm_rate_limiter() -> RateLimiter:
+    """
+    Get the process-wide Last.fm rate limiter (LASTFM_RATE_LIMIT, default 5/s).
+
+    Returns:
+        The shared RateLimiter
+    """
+    global _lastfm_rate_limiter
+    with _lastfm_rate_limiter_lock:
+        if _lastfm_rate_limiter is None:
+            _lastfm_rate_limiter = RateLimiter(float(os.getenv("LASTFM_RATE_LIMIT", "5")))
+        return _lastfm_rate_limiter
+
+
+def normalize_metadata_key(text: str) -> str:
+    """
+    Normalize an artist or title for artist/title lookups.
+
+    Args:
+        text: Artist or track title
+
+    Returns:
+        NFKC-normalized, case-folded text with collapsed whitespace
+    """
+    return " ".join(unicodedata.normalize("NFKC", text or "").casefold().split())
+
+
 class MetadataEnhancer:
     """
     Two-tier metadata enhancement with permanent caching.
@@ -43,22 +130,47 @@ class MetadataEnhancer:
     1. Last.fm API (community-tagged metadata)
     2. aubio CLI (audio analysis fallback for BPM)
 
-    All results are cached in SQLite to minimize API calls.
+    All results are cached in SQLite to minimize API calls. Lookups that
+    find nothing are cached as known misses, which expire after
+    negative_ttl_days so the track is eventually retried.
+
+    Entries are keyed by track ID and indexed by normalized artist/title,
+    so callers that only know artist and title share the same cache.
+
+    Configuration (environment):
+        LASTFM_RATE_LIMIT: Last.fm requests per second across all enhancers (default: 5).
+        METADATA_WORKERS: Concurrent lookups in enhance_tracks() (default: 8).
+        METADATA_NEGATIVE_TTL_DAYS: Days a known miss is not retried (default: 7).
 
     Attributes:
         cache_db_path: Path to SQLite cache database
         lastfm_api_key: Last.fm API key (optional)
         lastfm_network: Initialized pylast Network object
         aubio_cli_path: Path to aubio executable
+        rate_limit: Last.fm requests per second (0 for no limit)
+        max_workers: Default concurrency of enhance_tracks()
+        negative_ttl_days: Days a known miss is not retried (0 disables)
+        avoided_lookups: Lookups skipped because the track was a known miss
     """
 
     DEFAULT_CACHE_DB = ".swarm/memory.db"
     AUBIO_CLI_PATH = "/usr/bin/aubio"
+    # Tracks between progress log lines in enhance_tracks()
+    PROGRESS_INTERVAL = 100
+    # Results buffered before a batched cache write
+    WRITE_BATCH_SIZE = 100
+    # Track IDs per SELECT in get_many() (below SQLite's host parameter limit)
+    LOOKUP_CHUNK_SIZE = 500
+    # Source of entries holding only audio features (BPM, energy), still to be enriched
+    FEATURES_SOURCE = "features"
 
     def __init__(
         self,
         cache_db_path: Optional[str] = None,
-        lastfm_api_key: Optional[str] = None
+        lastfm_api_key: Optional[str] = None,
+        rate_limit: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        negative_ttl_days: Optional[float] = None
     ):
         """
         Initialize metadata enhancer.
@@ -66,11 +178,36 @@ class MetadataEnhancer:
         Args:
             cache_db_path: Path to SQLite cache (default: .swarm/memory.db)
             lastfm_api_key: Last.fm API key (reads from env if not provided)
+            rate_limit: Private Last.fm request rate (default: the shared
+                LASTFM_RATE_LIMIT limiter)
+            max_workers: Default enhance_tracks() concurrency (default: METADATA_WORKERS)
+            negative_ttl_days: Days a known miss is not retried
+                (default: METADATA_NEGATIVE_TTL_DAYS)
         """
         self.cache_db_path = Path(
             cache_db_path or self.DEFAULT_CACHE_DB
         ).resolve()
 
+        self.rate_limiter = (
+            get_lastfm_rate_limiter() if rate_limit is None else RateLimiter(rate_limit)
+        )
+        self.rate_limit = self.rate_limiter.rate
+        self.max_workers = max_workers or int(os.getenv("METADATA_WORKERS", "8"))
+        if negative_ttl_days is None:
+            negative_ttl_days = float(os.getenv("METADATA_NEGATIVE_TTL_DAYS", "7"))
+        self.negative_ttl_days = negative_ttl_days
+        self.avoided_lookups = 0
+        self._avoided_lock = threading.Lock()
+
+        # Artist -> {genre, country}; (artist, album) -> genre. Backed by SQLite.
+        self._artist_cache: Dict[str, Dict[str, Optional[str]]] = {}
+        self._album_cache: Dict[Tuple[str, str], Optional[str]] = {}
+
+        self._local = threading.local()
+        # Connections by the thread that opened them
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+
         # Initialize Last.fm if available
         self.lastfm_api_key = lastfm_api_key or os.getenv("LASTFM_API_KEY")
         self.lastfm_network = None
@@ -102,25 +239,57 @@ class MetadataEnhancer:
             return Path(self.AUBIO_CLI_PATH)
 
         # Check PATH
-        aubio_path = subprocess.run(
-            ["which", "aubio"],
-            capture_output=True,
-            text=True
-        ).stdout.strip()
+        aubio_path = shutil.which("aubio")
 
         if aubio_path:
             logger.info(f"Found aubio at: {aubio_path}")
             return Path(aubio_path)
 
-        logger.warning("aubio CLI not found - BPM fallback unavailable")
+        if HAS_BPM_ANALYSIS:
+            logger.debug("aubio CLI not found - using in-process BPM analysis")
+        else:
+            logger.warning("aubio CLI not found - BPM fallback unavailable")
         return None
 
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's cache connection, opened on first use."""
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.cache_db_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+            self.close_idle_connections()
+            with self._connections_lock:
+                self._connections[threading.current_thread()] = conn
+        return conn
+
+    def close_idle_connections(self) -> None:
+        """Close the connections of threads that have exited (e.g. finished worker pools)."""
+        with self._connections_lock:
+            for thread in [thread for thread in self._connections if not thread.is_alive()]:
+                self._connections.pop(thread).close()
+
+    def close(self) -> None:
+        """Close every thread's cache connection."""
+        with self._connections_lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def __enter__(self) -> "MetadataEnhancer":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
     def _init_cache_db(self) -> None:
         """Initialize SQLite cache database with schema."""
         self.cache_db_path.parent.mkdir(parents=True, exist_ok=True)
 
-        conn = sqlite3.connect(str(self.cache_db_path))
-        try:
+        with self.connection as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS track_metadata_cache (
                     track_id TEXT PRIMARY KEY,
@@ -129,38 +298,80 @@ class MetadataEnhancer:
                     country TEXT,
                     source TEXT NOT NULL,
                     cached_at TEXT NOT NULL,
-                    metadata_json TEXT
+                    metadata_json TEXT,
+                    artist_key TEXT,
+                    title_key TEXT
                 )
             """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(track_metadata_cache)")}
+            for column in ("artist_key", "title_key"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE track_metadata_cache ADD COLUMN {column} TEXT")
+            # Feature-only rows were once stored as "aubio"; only they carry energy
+            conn.execute(
+                "UPDATE track_metadata_cache SET source = ? WHERE source = 'aubio' "
+                "AND genre IS NULL AND country IS NULL "
+                "AND json_type(metadata_json, '$.energy') IS NOT NULL",
+                (self.FEATURES_SOURCE,)
+            )
             conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_cached_at
                 ON track_metadata_cache(cached_at)
             """)
-            conn.commit()
-            logger.debug(f"Initialized metadata cache at: {self.cache_db_path}")
-        finally:
-            conn.close()
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_artist_title
+                ON track_metadata_cache(artist_key, title_key)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_miss_cache (
+                    track_id TEXT PRIMARY KEY,
+                    cached_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS artist_metadata_cache (
+                    artist TEXT PRIMARY KEY,
+                    genre TEXT,
+                    country TEXT,
+                    cached_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS album_metadata_cache (
+                    artist TEXT NOT NULL,
+                    album TEXT NOT NULL,
+                    genre TEXT,
+                    cached_at TEXT NOT NULL,
+                    PRIMARY KEY (artist, album)
+                )
+            """)
+        logger.debug(f"Initialized metadata cache at: {self.cache_db_path}")
 
     def enhance_track(
         self,
         track_id: str,
         artist: str,
         title: str,
-        audio_file_path: Optional[str] = None
+        audio_file_path: Optional[str] = None,
+        album: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Enhance track metadata with BPM, genre, country.
 
         Tries in order:
-        1. Check cache
+        1. Check cache (including known misses)
         2. Last.fm API
         3. aubio CLI (BPM only)
 
+        A cached entry holding only audio features still gets the Last.fm
+        lookup; its BPM and energy are kept.
+
         Args:
             track_id: Unique track identifier
             artist: Track artist name
             title: Track title
             audio_file_path: Path to audio file (for aubio fallback)
+            album: Album name (album tags are the first genre fallback)
 
         Returns:
             Dictionary with keys: bpm, genre, country, source
@@ -168,53 +379,123 @@ class MetadataEnhancer:
         Raises:
             MetadataEnhancerError: If all enhancement methods fail
         """
-        # Check cache first
-        cached = self._get_cached_metadata(track_id)
-        if cached:
+        # Check cache first, by track ID then by artist/title
+        cached = self._get_cached_metadata(track_id) or self._adopt_cached_metadata(
+            track_id, artist, title
+        )
+        features = None
+        if cached and cached["source"] == self.FEATURES_SOURCE:
+            # BPM is already measured, so only Last.fm is asked
+            features, audio_file_path = cached, None
+        elif cached:
             logger.debug(f"Cache hit for track {track_id}: {cached['source']}")
             return cached
+        if self._get_known_misses([track_id]):
+            logger.debug(f"Known miss for track {track_id}, skipping lookup")
+            self._count_avoided_lookups(1)
+            return features or self._no_metadata()
+
+        metadata, source = self._lookup_metadata(track_id, artist, title, audio_file_path, album)
+        if source == "none":
+            self._cache_misses([track_id])
+        elif source is not None:
+            metadata = self._with_features(metadata, features)
+            self._cache_metadata(track_id, metadata, source=source, artist=artist, title=title)
+            return metadata
+        return features or metadata
+
+    @staticmethod
+    def _with_features(
+        metadata: Dict[str, Any],
+        features: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Keep BPM and energy measured by audio analysis in looked-up metadata."""
+        if not features:
+            return metadata
+        merged = dict(metadata)
+        if features.get("bpm") is not None:
+            merged["bpm"] = features["bpm"]
+        merged["energy"] = features.get("energy")
+        return merged
+
+    @staticmethod
+    def _no_metadata() -> Dict[str, Any]:
+        """Metadata returned when no source has anything for a track."""
+        return {"bpm": None, "genre": None, "country": None, "source": "none"}
+
+    def _lookup_metadata(
+        self,
+        track_id: str,
+        artist: str,
+        title: str,
+        audio_file_path: Optional[str] = None,
+        album: Optional[str] = None
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Look up metadata from Last.fm, then audio analysis, without the cache.
+
+        Args:
+            track_id: Unique track identifier
+            artist: Track artist name
+            title: Track title
+            audio_file_path: Path to audio file (for aubio fallback)
+            album: Album name
+
+        Returns:
+            Tuple of (metadata, source); source is "none" if every source was
+            asked and had nothing, None if a source failed before answering
+        """
+        consulted = False
+        failed = False
 
         # Try Last.fm
         if self.lastfm_network:
+            consulted = True
             try:
-                metadata = self._enhance_from_lastfm(artist, title)
-                if metadata:
-                    self._cache_metadata(track_id, metadata, source="lastfm")
+                metadata = self._enhance_from_lastfm(artist, title, album)
+                if metadata and any(metadata.get(key) for key in ("bpm", "genre", "country")):
                     logger.info(
                         f"Enhanced {track_id} from Last.fm: "
                         f"BPM={metadata.get('bpm')}, genre={metadata.get('genre')}"
                     )
-                    return metadata
+                    return metadata, "lastfm"
             except Exception as e:
                 logger.warning(f"Last.fm failed for {track_id}: {e}")
+                failed = True
 
-        # Try aubio fallback (BPM only)
-        if self.aubio_cli_path and audio_file_path:
+        # Try audio analysis fallback (BPM only)
+        if (HAS_BPM_ANALYSIS or self.aubio_cli_path) and audio_file_path:
+            consulted = True
             try:
                 bpm = self._enhance_bpm_from_aubio(audio_file_path)
                 if bpm:
-                    metadata = {"bpm": bpm, "genre": None, "country": None}
-                    self._cache_metadata(track_id, metadata, source="aubio")
                     logger.info(f"Enhanced {track_id} BPM from aubio: {bpm}")
-                    return metadata
+                    return {"bpm": bpm, "genre": None, "country": None}, "aubio"
             except Exception as e:
                 logger.warning(f"aubio failed for {track_id}: {e}")
+                failed = True
 
         # No enhancement available
         logger.warning(f"No metadata enhancement available for {track_id}")
-        return {"bpm": None, "genre": None, "country": None, "source": "none"}
+        return self._no_metadata(), "none" if consulted and not failed else None
 
     def _enhance_from_lastfm(
         self,
         artist: str,
-        title: str
+        title: str,
+        album: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
         Retrieve metadata from Last.fm API.
 
+        Genre comes from the track's top tag, falling back to the album's and
+        then the artist's; country comes from the artist. Album and artist
+        results are cached, so only the track lookups are made per track.
+
         Args:
             artist: Track artist name
             title: Track title
+            album: Album name (optional)
 
         Returns:
             Dictionary with bpm, genre, country or None if not found
@@ -237,6 +518,7 @@ class MetadataEnhancer:
 
             # Get top tags (genres)
             try:
+                self._apply_rate_limit()
                 tags = track.get_top_tags(limit=5)
                 if tags:
                     # Primary genre is top tag
@@ -246,30 +528,266 @@ class MetadataEnhancer:
 
             # Get BPM from track info (if available)
             try:
-                track_info = track.get_info()
+                # Older pylast releases only; skip the rate limit slot otherwise
+                get_info = getattr(track, "get_info", None)
+                track_info = None
+                if get_info is not None:
+                    self._apply_rate_limit()
+                    track_info = get_info()
                 if hasattr(track_info, "bpm") and track_info.bpm:
                     metadata["bpm"] = float(track_info.bpm)
             except Exception as e:
                 logger.debug(f"Failed to get BPM: {e}")
 
-            # Get artist country
-            try:
-                artist_obj = self.lastfm_network.get_artist(artist)
-                artist_info = artist_obj.get_info()
-                if hasattr(artist_info, "country") and artist_info.country:
-                    metadata["country"] = artist_info.country
-            except Exception as e:
-                logger.debug(f"Failed to get country: {e}")
+            if not metadata["genre"] and album:
+                metadata["genre"] = self._get_album_genre(artist, album)
+
+            artist_metadata = self._get_artist_metadata(artist)
+            metadata["country"] = artist_metadata["country"]
+            if not metadata["genre"]:
+                metadata["genre"] = artist_metadata["genre"]
 
             return metadata
 
         except pylast.WSError as e:
-            logger.warning(f"Last.fm API error: {e}")
+            # Unknown tracks are a definite answer; other API errors are transient
+            if e.status != pylast.STATUS_INVALID_PARAMS:
+                raise
+            logger.debug(f"Last.fm has no track {artist} - {title}: {e}")
+            return None
+
+    def _apply_rate_limit(self) -> None:
+        """Wait until another Last.fm request fits within the rate limit."""
+        self.rate_limiter.wait()
+
+    def _count_avoided_lookups(self, count: int) -> None:
+        """Record lookups skipped because the tracks were known misses."""
+        with self._avoided_lock:
+            self.avoided_lookups += count
+
+    def _get_artist_metadata(self, artist: str) -> Dict[str, Optional[str]]:
+        """
+        Get an artist's top tag and country, from cache or Last.fm.
+
+        Args:
+            artist: Artist name
+
+        Returns:
+            Dictionary with genre and country (either may be None)
+        """
+        key = artist.strip().casefold()
+        cached = self._artist_cache.get(key)
+        if cached is not None:
+            return cached
+
+        row = self.connection.execute(
+            "SELECT genre, country FROM artist_metadata_cache WHERE artist = ?",
+            (key,)
+        ).fetchone()
+        if row:
+            cached = {"genre": row[0], "country": row[1]}
+            self._artist_cache[key] = cached
+            return cached
+
+        metadata: Dict[str, Optional[str]] = {"genre": None, "country": None}
+        complete = True
+        artist_obj = self.lastfm_network.get_artist(artist)
+        try:
+            self._apply_rate_limit()
+            tags = artist_obj.get_top_tags(limit=5)
+            if tags:
+                metadata["genre"] = tags[0].item.name
+        except pylast.WSError as e:
+            logger.debug(f"Failed to get artist tags: {e}")
+        except Exception as e:
+            logger.debug(f"Failed to get artist tags: {e}")
+            complete = False
+
+        # Get artist country
+        try:
+            get_info = getattr(artist_obj, "get_info", None)
+            artist_info = None
+            if get_info is not None:
+                self._apply_rate_limit()
+                artist_info = get_info()
+            if hasattr(artist_info, "country") and artist_info.country:
+                metadata["country"] = artist_info.country
+        except Exception as e:
+            logger.debug(f"Failed to get country: {e}")
+
+        self._artist_cache[key] = metadata
+        # Transient failures are retried next run; known answers are kept
+        if complete:
+            with self.connection as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO artist_metadata_cache "
+                    "(artist, genre, country, cached_at) VALUES (?, ?, ?, ?)",
+                    (key, metadata["genre"], metadata["country"], datetime.utcnow().isoformat())
+                )
+        return metadata
+
+    def _get_album_genre(self, artist: str, album: str) -> Optional[str]:
+        """
+        Get an album's top tag, from cache or Last.fm.
+
+        Args:
+            artist: Album artist name
+            album: Album name
+
+        Returns:
+            Top tag name or None
+        """
+        key = (artist.strip().casefold(), album.strip().casefold())
+        if key in self._album_cache:
+            return self._album_cache[key]
+
+        row = self.connection.execute(
+            "SELECT genre FROM album_metadata_cache WHERE artist = ? AND album = ?",
+            key
+        ).fetchone()
+        if row:
+            self._album_cache[key] = row[0]
+            return row[0]
+
+        genre = None
+        try:
+            self._apply_rate_limit()
+            tags = self.lastfm_network.get_album(artist, album).get_top_tags(limit=5)
+            if tags:
+                genre = tags[0].item.name
+        except pylast.WSError as e:
+            logger.debug(f"Failed to get album tags: {e}")
+        except Exception as e:
+            # Transient failure: remember for this run only
+            logger.debug(f"Failed to get album tags: {e}")
+            self._album_cache[key] = None
             return None
 
+        self._album_cache[key] = genre
+        with self.connection as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO album_metadata_cache "
+                "(artist, album, genre, cached_at) VALUES (?, ?, ?, ?)",
+                (*key, genre, datetime.utcnow().isoformat())
+            )
+        return genre
+
+    def enhance_tracks(
+        self,
+        tracks: Iterable[SubsonicTrack],
+        max_workers: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Enhance many tracks concurrently.
+
+        Tracks already in the cache, and known misses, are skipped (cached
+        audio features alone still get a Last.fm lookup), and results are
+        written in batches of WRITE_BATCH_SIZE as they arrive, so an
+        interrupted run resumes close to where it stopped.
+        Tracks are grouped by artist and each group is handled by one worker,
+        so an artist is looked up once even when its tracks are enhanced in
+        parallel. All workers share the Last.fm rate limit.
+
+        Args:
+            tracks: Tracks to enhance
+            max_workers: Concurrent lookups (default: max_workers)
+
+        Returns:
+            Mapping of track ID to metadata for every track, cached or new
+        """
+        tracks = list(tracks)
+        results: Dict[str, Dict[str, Any]] = self.get_many(track.id for track in tracks)
+        features = {
+            track_id: metadata for track_id, metadata in results.items()
+            if metadata["source"] == self.FEATURES_SOURCE
+        }
+        groups: Dict[str, List[SubsonicTrack]] = {}
+        pending: List[SubsonicTrack] = []
+        for track in tracks:
+            if track.id in features:
+                pending.append(track)
+                continue
+            if track.id in results:
+                continue
+            adopted = self._adopt_cached_metadata(track.id, track.artist, track.title)
+            if adopted:
+                results[track.id] = adopted
+            else:
+                pending.append(track)
+
+        known_misses = self._get_known_misses(track.id for track in pending)
+        for track in pending:
+            if track.id in known_misses:
+                results.setdefault(track.id, self._no_metadata())
+            else:
+                groups.setdefault((track.artist or "").strip().casefold(), []).append(track)
+        if known_misses:
+            self._count_avoided_lookups(len(known_misses))
+
+        total = sum(len(group) for group in groups.values())
+        if not total:
+            return results
+        logger.info(
+            f"Enhancing {total} tracks ({len(tracks) - len(pending)} already cached, "
+            f"{len(known_misses)} known misses skipped) by {len(groups)} artists"
+        )
+
+        def enhance_group(
+            group: List[SubsonicTrack]
+        ) -> List[Tuple[SubsonicTrack, Dict[str, Any], Optional[str]]]:
+            return [
+                (track, *self._lookup_metadata(
+                    track.id, track.artist, track.title, album=track.album
+                ))
+                for track in group
+            ]
+
+        done = 0
+        pending_writes: List[Tuple[str, Dict[str, Any], str, str, str]] = []
+        pending_misses: List[str] = []
+        workers = max_workers or self.max_workers
+        try:
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="metadata"
+            ) as executor:
+                futures = [executor.submit(enhance_group, group) for group in groups.values()]
+                for future in as_completed(futures):
+                    try:
+                        group_results = future.result()
+                    except Exception as e:
+                        logger.warning(f"Metadata enhancement failed for an artist group: {e}")
+                        continue
+                    for track, metadata, source in group_results:
+                        if source in ("none", None):
+                            if source == "none":
+                                pending_misses.append(track.id)
+                            metadata = features.get(track.id, metadata)
+                        else:
+                            metadata = self._with_features(metadata, features.get(track.id))
+                            pending_writes.append(
+                                (track.id, metadata, source, track.artist, track.title)
+                            )
+                        results[track.id] = metadata
+                    if len(pending_writes) + len(pending_misses) >= self.WRITE_BATCH_SIZE:
+                        self._cache_metadata_many(pending_writes)
+                        self._cache_misses(pending_misses)
+                        pending_writes = []
+                        pending_misses = []
+                    previous, done = done, done + len(group_results)
+                    if done // self.PROGRESS_INTERVAL > previous // self.PROGRESS_INTERVAL:
+                        logger.info(f"Enhanced {done}/{total} tracks")
+        finally:
+            self._cache_metadata_many(pending_writes)
+            self._cache_misses(pending_misses)
+            # The worker threads have exited with the executor
+            self.close_idle_connections()
+
+        logger.info(f"Enhanced {done}/{total} tracks")
+        return results
+
     def _enhance_bpm_from_aubio(self, audio_file_path: str) -> Optional[float]:
         """
-        Analyze BPM using aubio CLI.
+        Analyze BPM in-process (bpm_analyzer) or, without NumPy, with aubio CLI.
 
         Args:
             audio_file_path: Path to audio file
@@ -277,14 +795,23 @@ class MetadataEnhancer:
         Returns:
             BPM value or None if analysis fails
         """
-        if not self.aubio_cli_path:
-            return None
-
         audio_path = Path(audio_file_path)
-        if not audio_path.exists():
+        if (HAS_BPM_ANALYSIS or self.aubio_cli_path) and not audio_path.exists():
             logger.warning(f"Audio file not found: {audio_file_path}")
             return None
 
+        if HAS_BPM_ANALYSIS:
+            try:
+                return analyze_bpm(str(audio_path), timeout=30)
+            except ReplayGainTimeout:
+                logger.warning(f"BPM analysis timeout for {audio_file_path}")
+            except (subprocess.CalledProcessError, RuntimeError, OSError) as e:
+                logger.warning(f"BPM analysis failed for {audio_file_path}: {e}")
+            return None
+
+        if not self.aubio_cli_path:
+            return None
+
         try:
             # Run aubio tempo analysis
             result = subprocess.run(
@@ -314,6 +841,153 @@ class MetadataEnhancer:
             logger.warning(f"Failed to parse aubio output: {e}")
             return None
 
+    def analyze_library_bpm(
+        self,
+        tracks: Iterable[SubsonicTrack],
+        client: SubsonicClient,
+        pool: Optional[BpmAnalysisPool] = None
+    ) -> Dict[str, float]:
+        """
+        Detect BPM and energy for many tracks and store them in the cache.
+
+        Tracks whose cached metadata already has a BPM are skipped. Tracks
+        already decoded by the ReplayGain PCM engine reuse the features
+        stored in the loudness cache (REPLAYGAIN_CACHE_FILE) without another
+        decode. For the rest, leading bytes are fetched from Subsonic (ranged
+        download) and analysed on a process pool; downloads continue while
+        earlier tracks are analysed, with at most two excerpts per worker
+        held in memory. Results are written in batches of WRITE_BATCH_SIZE.
+
+        Args:
+            tracks: Tracks to cover
+            client: Connected Subsonic client
+            pool: Analysis pool to use (a temporary one is created if omitted)
+
+        Returns:
+            Mapping of track ID to detected BPM for newly analysed tracks
+        """
+        own_pool = pool is None
+        if own_pool:
+            pool = BpmAnalysisPool()
+
+        results: Dict[str, float] = {}
+        pending: Dict[Future, SubsonicTrack] = {}
+        unwritten: Dict[str, Dict[str, Any]] = {}
+
+        def store(track: SubsonicTrack, features: Dict[str, Any]) -> None:
+            if features.get("bpm") is None:
+                logger.debug(f"No steady beat found for {track.id}")
+                return
+            unwritten[track.id] = features
+            results[track.id] = features["bpm"]
+            if len(unwritten) >= self.WRITE_BATCH_SIZE:
+                self.cache_audio_features_many(unwritten)
+                unwritten.clear()
+
+        def collect(futures) -> None:
+            for future in futures:
+                track = pending.pop(future)
+                try:
+                    features = future.result()
+                except Exception as e:
+                    logger.warning(f"BPM analysis failed for {track.id}: {e}")
+                    continue
+                store(track, {"bpm": features.bpm, "energy": features.energy})
+
+        tracks = list(tracks)
+        cached = self.get_many(track.id for track in tracks)
+        try:
+            for track in tracks:
+                if track.id in cached and cached[track.id]["bpm"] is not None:
+                    continue
+                decoded = self._get_replaygain_features(track)
+                if decoded is not None:
+                    store(track, decoded)
+                    continue
+                try:
+                    excerpt = fetch_excerpt(client, track)
+                except Exception as e:
+                    logger.warning(f"Failed to fetch {track.id} for BPM analysis: {e}")
+                    continue
+                pending[pool.submit(excerpt)] = track
+                if len(pending) >= 2 * pool.max_workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(list(pending))
+        finally:
+            if own_pool:
+                pool.shutdown(cancel_pending=True)
+            self.cache_audio_features_many(unwritten)
+
+        logger.info(f"Detected BPM for {len(results)} tracks")
+        return results
+
+    def _get_replaygain_features(self, track: SubsonicTrack) -> Optional[Dict[str, Any]]:
+        """
+        Look up BPM/energy measured by the ReplayGain PCM engine.
+
+        Args:
+            track: Subsonic track
+
+        Returns:
+            Dictionary with bpm and energy, or None if the track was not decoded
+        """
+        loudness_cache = get_loudness_cache()
+        key = subsonic_source_key(track)
+        if loudness_cache is None or key is None:
+            return None
+        cached = loudness_cache.get(key)
+        if cached is None or "bpm" not in cached[2]:
+            return None
+        return {"bpm": cached[2]["bpm"], "energy": cached[2].get("energy")}
+
+    def cache_audio_features(self, track_id: str, features: Dict[str, Any]) -> None:
+        """
+        Store audio-analysis BPM and energy, keeping any cached genre/country.
+
+        Args:
+            track_id: Unique track identifier
+            features: Dictionary with bpm and energy
+        """
+        self.cache_audio_features_many({track_id: features})
+
+    def cache_audio_features_many(self, features: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Store BPM and energy for many tracks in one transaction.
+
+        Tracks not cached yet get a FEATURES_SOURCE entry, which Last.fm
+        enrichment still fills in later.
+
+        Args:
+            features: Mapping of track ID to dictionary with bpm and energy
+        """
+        if not features:
+            return
+        cached = self.get_many(features)
+        rows = []
+        for track_id, track_features in features.items():
+            metadata = cached.get(track_id)
+            if metadata:
+                source = metadata.pop("source")
+            else:
+                metadata = {"genre": None, "country": None}
+                source = self.FEATURES_SOURCE
+            metadata["bpm"] = track_features.get("bpm")
+            metadata["energy"] = track_features.get("energy")
+            rows.append((track_id, metadata, source, None, None))
+        self._cache_metadata_many(rows)
+
+    @staticmethod
+    def _row_to_metadata(row: Tuple) -> Dict[str, Any]:
+        """Convert a (bpm, genre, country, source, metadata_json) row to metadata."""
+        return {
+            "bpm": row[0],
+            "genre": row[1],
+            "country": row[2],
+            "energy": json.loads(row[4] or "{}").get("energy"),
+            "source": row[3]
+        }
+
     def _get_cached_metadata(self, track_id: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve metadata from cache.
@@ -324,33 +998,237 @@ class MetadataEnhancer:
         Returns:
             Cached metadata dictionary or None if not cached
         """
-        conn = sqlite3.connect(str(self.cache_db_path))
-        try:
-            cursor = conn.execute(
-                "SELECT bpm, genre, country, source FROM track_metadata_cache "
-                "WHERE track_id = ?",
-                (track_id,)
+        row = self.connection.execute(
+            "SELECT bpm, genre, country, source, metadata_json FROM track_metadata_cache "
+            "WHERE track_id = ?",
+            (track_id,)
+        ).fetchone()
+        return self._row_to_metadata(row) if row else None
+
+    def get_many(self, track_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve cached metadata for many tracks.
+
+        Args:
+            track_ids: Unique track identifiers
+
+        Returns:
+            Mapping of track ID to cached metadata; uncached tracks are absent
+        """
+        ids = list(dict.fromkeys(track_ids))
+        results: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(ids), self.LOOKUP_CHUNK_SIZE):
+            chunk = ids[start:start + self.LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                "SELECT track_id, bpm, genre, country, source, metadata_json "
+                f"FROM track_metadata_cache WHERE track_id IN ({placeholders})",
+                chunk
+            )
+            for row in rows:
+                results[row[0]] = self._row_to_metadata(row[1:])
+        return results
+
+    def _get_known_misses(self, track_ids: Iterable[str]) -> Set[str]:
+        """
+        Find tracks recently looked up without result.
+
+        Args:
+            track_ids: Unique track identifiers
+
+        Returns:
+            IDs of tracks with a miss younger than negative_ttl_days
+        """
+        ids = list(dict.fromkeys(track_ids))
+        if not ids or self.negative_ttl_days <= 0:
+            return set()
+        cutoff = (datetime.utcnow() - timedelta(days=self.negative_ttl_days)).isoformat()
+        misses: Set[str] = set()
+        for start in range(0, len(ids), self.LOOKUP_CHUNK_SIZE):
+            chunk = ids[start:start + self.LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                "SELECT track_id FROM metadata_miss_cache "
+                f"WHERE cached_at >= ? AND track_id IN ({placeholders})",
+                [cutoff, *chunk]
+            )
+            misses.update(row[0] for row in rows)
+        return misses
+
+    def _cache_misses(self, track_ids: Iterable[str]) -> None:
+        """
+        Record tracks no source had metadata for.
+
+        Args:
+            track_ids: Unique track identifiers
+        """
+        cached_at = datetime.utcnow().isoformat()
+        rows = [(track_id, cached_at) for track_id in track_ids]
+        if not rows or self.negative_ttl_days <= 0:
+            return
+        with self.connection as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO metadata_miss_cache (track_id, cached_at) VALUES (?, ?)",
+                rows
             )
-            row = cursor.fetchone()
 
-            if row:
-                return {
-                    "bpm": row[0],
-                    "genre": row[1],
-                    "country": row[2],
-                    "source": row[3]
-                }
+    @staticmethod
+    def artist_title_id(artist: str, title: str) -> str:
+        """
+        Build the cache ID used for entries known only by artist and title.
+
+        Args:
+            artist: Artist name
+            title: Track title
 
+        Returns:
+            Synthetic track ID
+        """
+        return f"{normalize_metadata_key(artist)}\x1f{normalize_metadata_key(title)}"
+
+    def get_by_artist_title(self, artist: str, title: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the most recent cached entry for an artist and title.
+
+        Args:
+            artist: Artist name
+            title: Track title
+
+        Returns:
+            Cached metadata plus track_id, cached_at and details (the full
+            stored metadata), or None if not cached
+        """
+        row = self.connection.execute(
+            "SELECT track_id, cached_at, bpm, genre, country, source, metadata_json "
+            "FROM track_metadata_cache WHERE artist_key = ? AND title_key = ? "
+            "ORDER BY cached_at DESC LIMIT 1",
+            (normalize_metadata_key(artist), normalize_metadata_key(title))
+        ).fetchone()
+        if not row:
             return None
+        metadata = self._row_to_metadata(row[2:])
+        metadata["track_id"] = row[0]
+        metadata["cached_at"] = row[1]
+        metadata["details"] = json.loads(row[6] or "{}")
+        return metadata
 
-        finally:
-            conn.close()
+    def _adopt_cached_metadata(
+        self,
+        track_id: str,
+        artist: Optional[str],
+        title: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Reuse an entry cached under the same artist/title for a track ID.
+
+        Entries stored by artist/title alone are moved to the track ID;
+        entries of another track (e.g. a duplicate) are copied.
+
+        Args:
+            track_id: Unique track identifier
+            artist: Track artist name
+            title: Track title
+
+        Returns:
+            Cached metadata or None if nothing matched
+        """
+        if not artist or not title:
+            return None
+        cached = self.get_by_artist_title(artist, title)
+        if not cached:
+            return None
+        source_id = cached.pop("track_id")
+        cached.pop("cached_at")
+        details = cached.pop("details")
+        with self.connection as conn:
+            if source_id == self.artist_title_id(artist, title):
+                conn.execute(
+                    "UPDATE OR REPLACE track_metadata_cache SET track_id = ? WHERE track_id = ?",
+                    (track_id, source_id)
+                )
+            else:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO track_metadata_cache
+                    (track_id, bpm, genre, country, source, cached_at, metadata_json,
+                     artist_key, title_key)
+                    SELECT ?, bpm, genre, country, source, cached_at, metadata_json,
+                           artist_key, title_key
+                    FROM track_metadata_cache WHERE track_id = ?
+                    """,
+                    (track_id, source_id)
+                )
+        logger.debug(f"Reused cached metadata of {source_id!r} for {track_id}")
+        return cached
+
+    def cache_by_artist_title(
+        self,
+        artist: str,
+        title: str,
+        metadata: Dict[str, Any],
+        source: str
+    ) -> None:
+        """
+        Store metadata for a track known only by artist and title.
+
+        Updates the existing entry for the artist/title (whatever its
+        track ID) or creates one under artist_title_id().
+
+        Args:
+            artist: Artist name
+            title: Track title
+            metadata: Dictionary with bpm, genre, country and any other details
+            source: Metadata source (lastfm, aubio, etc.)
+        """
+        cached = self.get_by_artist_title(artist, title)
+        track_id = cached["track_id"] if cached else self.artist_title_id(artist, title)
+        self._cache_metadata(track_id, metadata, source, artist=artist, title=title)
+
+    def enhance_by_artist_title(
+        self,
+        artist: str,
+        title: str,
+        audio_file_path: Optional[str] = None,
+        album: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Look up and cache metadata for a track known only by artist and title.
+
+        Cached entries are not consulted, so callers can apply their own
+        expiry first; known misses are. Lookups go through the same sources,
+        rate limit and miss cache as enhance_track().
+
+        Args:
+            artist: Track artist name
+            title: Track title
+            audio_file_path: Path to audio file (for aubio fallback)
+            album: Album name
+
+        Returns:
+            Dictionary with keys: bpm, genre, country, source ("none" if no
+            source had anything)
+        """
+        track_id = self.artist_title_id(artist, title)
+        if self._get_known_misses([track_id]):
+            logger.debug(f"Known miss for {artist} - {title}, skipping lookup")
+            self._count_avoided_lookups(1)
+            return self._no_metadata()
+
+        metadata, source = self._lookup_metadata(track_id, artist, title, audio_file_path, album)
+        if source == "none":
+            self._cache_misses([track_id])
+        elif source is not None:
+            self.cache_by_artist_title(artist, title, metadata, source)
+            return {**metadata, "source": source}
+        return self._no_metadata()
 
     def _cache_metadata(
         self,
         track_id: str,
         metadata: Dict[str, Any],
-        source: str
+        source: str,
+        artist: Optional[str] = None,
+        title: Optional[str] = None
     ) -> None:
         """
         Store metadata in cache.
@@ -359,56 +1237,89 @@ class MetadataEnhancer:
             track_id: Unique track identifier
             metadata: Dictionary with bpm, genre, country
             source: Metadata source (lastfm, aubio, etc.)
+            artist: Track artist name (indexes the entry for artist/title lookups)
+            title: Track title
         """
-        conn = sqlite3.connect(str(self.cache_db_path))
-        try:
-            conn.execute(
+        self._cache_metadata_many([(track_id, metadata, source, artist, title)])
+        logger.debug(f"Cached metadata for {track_id} from {source}")
+
+    def _cache_metadata_many(
+        self,
+        entries: Iterable[Tuple[str, Dict[str, Any], str, Optional[str], Optional[str]]]
+    ) -> None:
+        """
+        Store metadata for many tracks in one transaction.
+
+        An entry's artist/title keys are kept when it is rewritten without them.
+
+        Args:
+            entries: (track ID, metadata, source, artist, title) tuples;
+                artist and title may be None
+        """
+        cached_at = datetime.utcnow().isoformat()
+        rows = [
+            (
+                track_id,
+                metadata.get("bpm"),
+                metadata.get("genre"),
+                metadata.get("country"),
+                source,
+                cached_at,
+                json.dumps(metadata),
+                normalize_metadata_key(artist) if artist else None,
+                normalize_metadata_key(title) if title else None
+            )
+            for track_id, metadata, source, artist, title in entries
+        ]
+        if not rows:
+            return
+        with self.connection as conn:
+            conn.executemany(
                 """
-                INSERT OR REPLACE INTO track_metadata_cache
-                (track_id, bpm, genre, country, source, cached_at, metadata_json)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO track_metadata_cache
+                (track_id, bpm, genre, country, source, cached_at, metadata_json,
+                 artist_key, title_key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(track_id) DO UPDATE SET
+                    bpm = excluded.bpm,
+                    genre = excluded.genre,
+                    country = excluded.country,
+                    source = excluded.source,
+                    cached_at = excluded.cached_at,
+                    metadata_json = excluded.metadata_json,
+                    artist_key = COALESCE(excluded.artist_key, artist_key),
+                    title_key = COALESCE(excluded.title_key, title_key)
                 """,
-                (
-                    track_id,
-                    metadata.get("bpm"),
-                    metadata.get("genre"),
-                    metadata.get("country"),
-                    source,
-                    datetime.utcnow().isoformat(),
-                    json.dumps(metadata)
-                )
+                rows
             )
-            conn.commit()
-            logger.debug(f"Cached metadata for {track_id} from {source}")
-
-        finally:
-            conn.close()
 
     def get_cache_stats(self) -> Dict[str, int]:
         """
         Get cache statistics.
 
         Returns:
-            Dictionary with total_cached, lastfm_count, aubio_count
+            Dictionary with total_cached, lastfm_count, aubio_count,
+            features_count, known_misses
         """
-        conn = sqlite3.connect(str(self.cache_db_path))
-        try:
-            cursor = conn.execute(
-                "SELECT source, COUNT(*) FROM track_metadata_cache GROUP BY source"
-            )
-            stats = {"total_cached": 0, "lastfm_count": 0, "aubio_count": 0}
-
-            for source, count in cursor.fetchall():
-                stats["total_cached"] += count
-                if source == "lastfm":
-                    stats["lastfm_count"] = count
-                elif source == "aubio":
-                    stats["aubio_count"] = count
-
-            return stats
-
-        finally:
-            conn.close()
+        cursor = self.connection.execute(
+            "SELECT source, COUNT(*) FROM track_metadata_cache GROUP BY source"
+        )
+        stats = {"total_cached": 0, "lastfm_count": 0, "aubio_count": 0, "features_count": 0}
+
+        for source, count in cursor.fetchall():
+            stats["total_cached"] += count
+            if source == "lastfm":
+                stats["lastfm_count"] = count
+            elif source == "aubio":
+                stats["aubio_count"] = count
+            elif source == self.FEATURES_SOURCE:
+                stats["features_count"] = count
+
+        cutoff = (datetime.utcnow() - timedelta(days=self.negative_ttl_days)).isoformat()
+        stats["known_misses"] = self.connection.execute(
+            "SELECT COUNT(*) FROM metadata_miss_cache WHERE cached_at >= ?", (cutoff,)
+        ).fetchone()[0]
+        return stats
 
 
 def test_metadata_enhancement():
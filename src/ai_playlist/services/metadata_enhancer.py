@@ -2,26 +2,39 @@
 Metadata enhancement service for music tracks.
 
 Provides a fallback chain for retrieving music metadata:
-1. Last.fm API (primary source)
-2. aubio CLI tool (local audio analysis fallback)
-3. SQLite cache for previously retrieved metadata
+1. SQLite cache for previously retrieved metadata
+2. Last.fm API (primary source)
+3. Audio analysis (BPM fallback)
 
 Features:
 - Artist, track, album, genre, BPM, mood extraction
 - Persistent caching to minimize API calls
 - Configurable API credentials
 - Graceful degradation when APIs unavailable
+
+Lookups, the cache, the known-miss cache and the Last.fm rate limit are
+those of the track-ID based MetadataEnhancer engine
+(ai_playlist/metadata_enhancer.py): entries stored here are found there by
+artist/title and vice versa, so a track is only ever enriched and stored once.
 """
 
 import os
 import json
-import subprocess
+import logging
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
-from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+from dataclasses import dataclass, asdict, fields
 from datetime import datetime, timedelta
 
+from ..metadata_enhancer import MetadataEnhancer
+
+logger = logging.getLogger(__name__)
+
+# Entries stored by artist/title alone; their synthetic IDs (artist_title_id) contain \x1f
+ARTIST_TITLE_ENTRIES = "instr(track_id, char(31)) > 0"
+
 
 @dataclass
 class TrackMetadata:
@@ -47,16 +60,30 @@ class TrackMetadata:
         """Create from dictionary."""
         return cls(**data)
 
+    @classmethod
+    def from_cache(cls, artist: str, title: str, cached: Dict[str, Any]) -> "TrackMetadata":
+        """Create from a MetadataEnhancer cache entry, whichever API stored it."""
+        names = {field.name for field in fields(cls)}
+        data = {key: value for key, value in cached["details"].items() if key in names}
+        data.setdefault("artist", artist)
+        data.setdefault("title", title)
+        if data.get("genre") is None:
+            data["genre"] = cached["genre"]
+        if data.get("bpm") is None:
+            data["bpm"] = cached["bpm"]
+        return cls(**data)
+
 
 class MetadataEnhancerService:
     """
     Service for enhancing track metadata using multiple sources.
 
     Retrieval chain:
-    1. Check SQLite cache
-    2. Try Last.fm API
-    3. Fall back to aubio CLI analysis
-    4. Cache successful results
+    1. Check SQLite cache (shared with MetadataEnhancer)
+    2. Look up through MetadataEnhancer: Last.fm (within the shared rate
+       limit), then audio analysis; tracks neither source knows are
+       remembered as known misses
+    3. Cache successful results
 
     Example:
         >>> enhancer = MetadataEnhancerService(
@@ -67,6 +94,9 @@ class MetadataEnhancerService:
         >>> print(f"Genre: {metadata.genre}, BPM: {metadata.bpm}")
     """
 
+    # Default cache database of earlier releases, migrated into the default store
+    LEGACY_CACHE_DB = Path.home() / ".ai_playlist" / "metadata_cache.db"
+
     def __init__(
         self,
         cache_db: Optional[str] = None,
@@ -77,41 +107,59 @@ class MetadataEnhancerService:
         Initialize metadata enhancer.
 
         Args:
-            cache_db: Path to SQLite cache database (default: ~/.ai_playlist/metadata_cache.db)
+            cache_db: Path to SQLite cache database (default: MetadataEnhancer's,
+                .swarm/memory.db, which takes over entries from the former
+                default, ~/.ai_playlist/metadata_cache.db)
             lastfm_api_key: Last.fm API key (reads from env if not provided)
             cache_ttl_days: Days before cache entries expire
         """
-        if cache_db is None:
-            cache_dir = Path.home() / ".ai_playlist"
-            cache_dir.mkdir(exist_ok=True)
-            cache_db = str(cache_dir / "metadata_cache.db")
-
-        self.cache_db = Path(cache_db)
+        self.cache_db = Path(cache_db or MetadataEnhancer.DEFAULT_CACHE_DB)
         self.lastfm_api_key = lastfm_api_key or os.getenv("LASTFM_API_KEY")
         self.cache_ttl_days = cache_ttl_days
 
-        self._init_cache()
-
-    def _init_cache(self):
-        """Initialize SQLite cache database."""
-        self.cache_db.parent.mkdir(parents=True, exist_ok=True)
-
-        conn = sqlite3.connect(str(self.cache_db))
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS metadata_cache (
-                artist TEXT NOT NULL,
-                title TEXT NOT NULL,
-                metadata TEXT NOT NULL,
-                cached_at TEXT NOT NULL,
-                PRIMARY KEY (artist, title)
-            )
-        """)
-        conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_cached_at
-            ON metadata_cache(cached_at)
-        """)
-        conn.commit()
-        conn.close()
+        self.engine = MetadataEnhancer(
+            cache_db_path=str(self.cache_db), lastfm_api_key=self.lastfm_api_key
+        )
+        self._migrate_legacy_cache(self.engine.connection)
+        if cache_db is None and self.LEGACY_CACHE_DB.exists():
+            legacy_conn = sqlite3.connect(str(self.LEGACY_CACHE_DB))
+            try:
+                self._migrate_legacy_cache(legacy_conn)
+            finally:
+                legacy_conn.close()
+
+    def _migrate_legacy_cache(self, conn: sqlite3.Connection):
+        """
+        Move entries from the former artist/title metadata_cache table into the engine.
+
+        Args:
+            conn: Connection to the database holding the table (the cache
+                database itself or the former default, LEGACY_CACHE_DB)
+        """
+        legacy = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='metadata_cache'"
+        ).fetchone()
+        if not legacy:
+            return
+
+        rows = conn.execute("SELECT artist, title, metadata, cached_at FROM metadata_cache")
+        entries = []
+        for artist, title, metadata_json, cached_at in rows.fetchall():
+            # Entries already in the store are newer than the legacy cache
+            if self.engine.get_by_artist_title(artist, title):
+                continue
+            metadata = json.loads(metadata_json or "{}")
+            entries.append((artist, title, metadata, cached_at))
+        for artist, title, metadata, cached_at in entries:
+            self.engine.cache_by_artist_title(artist, title, metadata, source="lastfm")
+            with self.engine.connection as engine_conn:
+                engine_conn.execute(
+                    "UPDATE track_metadata_cache SET cached_at = ? WHERE track_id = ?",
+                    (cached_at, self.engine.artist_title_id(artist, title))
+                )
+        with conn:
+            conn.execute("DROP TABLE metadata_cache")
+        logger.info(f"Migrated {len(entries)} metadata cache entries to {self.cache_db}")
 
     def enhance_track(
         self,
@@ -125,7 +173,7 @@ class MetadataEnhancerService:
         Args:
             artist: Artist name
             title: Track title
-            audio_file: Optional path to audio file (for aubio fallback)
+            audio_file: Optional path to audio file (for the BPM fallback)
 
         Returns:
             TrackMetadata with enhanced information
@@ -135,191 +183,95 @@ class MetadataEnhancerService:
         if cached:
             return cached
 
-        # Try Last.fm API
-        if self.lastfm_api_key:
-            metadata = self._fetch_from_lastfm(artist, title)
-            if metadata:
-                self._save_to_cache(artist, title, metadata)
-                return metadata
-
-        # Fall back to aubio if audio file provided
-        if audio_file:
-            metadata = self._analyze_with_aubio(audio_file)
-            if metadata:
-                # Merge with basic info
-                metadata.artist = artist
-                metadata.title = title
-                self._save_to_cache(artist, title, metadata)
-                return metadata
-
-        # Return basic metadata if all else fails
-        metadata = TrackMetadata(artist=artist, title=title)
-        return metadata
+        # Looked-up metadata is cached by the engine; basic metadata if nothing was found
+        metadata = self.engine.enhance_by_artist_title(artist, title, audio_file)
+        return TrackMetadata(
+            artist=artist, title=title, genre=metadata["genre"], bpm=metadata["bpm"]
+        )
+
+    def enhance_tracks(
+        self,
+        tracks: Iterable[Tuple[str, str]],
+        max_workers: Optional[int] = None
+    ) -> List[TrackMetadata]:
+        """
+        Enhance many tracks concurrently.
+
+        Args:
+            tracks: (artist, title) pairs
+            max_workers: Concurrent lookups (default: the engine's METADATA_WORKERS)
+
+        Returns:
+            TrackMetadata for each pair, in input order
+        """
+        tracks = list(tracks)
+        workers = max_workers or self.engine.max_workers
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metadata") as executor:
+            return list(executor.map(lambda track: self.enhance_track(*track), tracks))
 
     def _get_from_cache(self, artist: str, title: str) -> Optional[TrackMetadata]:
         """Retrieve metadata from cache if not expired."""
-        conn = sqlite3.connect(str(self.cache_db))
-        cursor = conn.execute(
-            """
-            SELECT metadata, cached_at FROM metadata_cache
-            WHERE artist = ? AND title = ?
-            """,
-            (artist, title)
-        )
-        row = cursor.fetchone()
-        conn.close()
-
-        if not row:
+        cached = self.engine.get_by_artist_title(artist, title)
+        if not cached:
             return None
 
-        metadata_json, cached_at = row
-
         # Check if expired
-        cached_date = datetime.fromisoformat(cached_at)
+        cached_date = datetime.fromisoformat(cached["cached_at"])
         expiry_date = cached_date + timedelta(days=self.cache_ttl_days)
 
-        if datetime.now() > expiry_date:
+        if datetime.utcnow() > expiry_date:
             return None
 
-        return TrackMetadata.from_dict(json.loads(metadata_json))
+        return TrackMetadata.from_cache(artist, title, cached)
 
-    def _save_to_cache(self, artist: str, title: str, metadata: TrackMetadata):
+    def _save_to_cache(
+        self,
+        artist: str,
+        title: str,
+        metadata: TrackMetadata,
+        source: str = "lastfm"
+    ):
         """Save metadata to cache."""
-        conn = sqlite3.connect(str(self.cache_db))
-        conn.execute(
-            """
-            INSERT OR REPLACE INTO metadata_cache (artist, title, metadata, cached_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (artist, title, json.dumps(metadata.to_dict()), datetime.now().isoformat())
-        )
-        conn.commit()
-        conn.close()
-
-    def _fetch_from_lastfm(self, artist: str, title: str) -> Optional[TrackMetadata]:
-        """
-        Fetch metadata from Last.fm API.
-
-        Note: This is a simplified implementation. In production, you would:
-        - Use proper HTTP client with retries
-        - Handle rate limiting
-        - Parse full API response
-        """
-        # Skip if no API key
-        if not self.lastfm_api_key:
-            return None
-
-        try:
-            import requests
-
-            url = "http://ws.audioscrobbler.com/2.0/"
-            params = {
-                "method": "track.getInfo",
-                "api_key": self.lastfm_api_key,
-                "artist": artist,
-                "track": title,
-                "format": "json"
-            }
-
-            response = requests.get(url, params=params, timeout=5)
-            response.raise_for_status()
-
-            data = response.json()
-            track = data.get("track", {})
-
-            # Extract metadata
-            metadata = TrackMetadata(
-                artist=artist,
-                title=title,
-                album=track.get("album", {}).get("title"),
-                genre=None,  # Last.fm uses tags
-                tags=[tag["name"] for tag in track.get("toptags", {}).get("tag", [])[:5]]
-            )
-
-            # Extract mood/genre from tags
-            if metadata.tags:
-                metadata.genre = metadata.tags[0]
-
-            return metadata
-
-        except Exception:
-            # Silently fail and try next source
-            return None
-
-    def _analyze_with_aubio(self, audio_file: str) -> Optional[TrackMetadata]:
-        """
-        Analyze audio file with aubio CLI tools.
-
-        Extracts BPM using aubio's beat detection.
-        """
-        try:
-            # Check if aubio is available
-            result = subprocess.run(
-                ["aubio", "tempo", audio_file],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
-            if result.returncode != 0:
-                return None
-
-            # Parse BPM from output
-            # aubio tempo outputs lines like: "120.000000"
-            bpm = None
-            for line in result.stdout.strip().split("\n"):
-                try:
-                    bpm = float(line.strip())
-                    break
-                except ValueError:
-                    continue
-
-            if bpm:
-                return TrackMetadata(bpm=bpm)
-
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-
-        return None
+        self.engine.cache_by_artist_title(artist, title, metadata.to_dict(), source)
 
     def clear_cache(self, older_than_days: Optional[int] = None):
         """
-        Clear cache entries.
+        Clear cache entries stored by artist/title, and their known misses.
+
+        Entries of library tracks, keyed by track ID by MetadataEnhancer in
+        the same store, are kept.
 
         Args:
             older_than_days: Only clear entries older than this many days
                            (default: clear all)
         """
-        conn = sqlite3.connect(str(self.cache_db))
-
-        if older_than_days is None:
-            conn.execute("DELETE FROM metadata_cache")
-        else:
-            cutoff_date = datetime.now() - timedelta(days=older_than_days)
-            conn.execute(
-                "DELETE FROM metadata_cache WHERE cached_at < ?",
-                (cutoff_date.isoformat(),)
-            )
-
-        conn.commit()
-        conn.close()
+        cutoff = datetime.max if older_than_days is None else (
+            datetime.utcnow() - timedelta(days=older_than_days)
+        )
+        with self.engine.connection as conn:
+            for table in ("track_metadata_cache", "metadata_miss_cache"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE {ARTIST_TITLE_ENTRIES} AND cached_at < ?",
+                    (cutoff.isoformat(),)
+                )
 
     def get_cache_stats(self) -> Dict[str, int]:
-        """Get cache statistics."""
-        conn = sqlite3.connect(str(self.cache_db))
+        """Get statistics of the entries stored by artist/title."""
+        conn = self.engine.connection
 
-        cursor = conn.execute("SELECT COUNT(*) FROM metadata_cache")
+        cursor = conn.execute(
+            f"SELECT COUNT(*) FROM track_metadata_cache WHERE {ARTIST_TITLE_ENTRIES}"
+        )
         total = cursor.fetchone()[0]
 
-        cutoff_date = datetime.now() - timedelta(days=self.cache_ttl_days)
+        cutoff_date = datetime.utcnow() - timedelta(days=self.cache_ttl_days)
         cursor = conn.execute(
-            "SELECT COUNT(*) FROM metadata_cache WHERE cached_at >= ?",
+            "SELECT COUNT(*) FROM track_metadata_cache "
+            f"WHERE {ARTIST_TITLE_ENTRIES} AND cached_at >= ?",
             (cutoff_date.isoformat(),)
         )
         valid = cursor.fetchone()[0]
 
-        conn.close()
-
         return {
             "total_entries": total,
             "valid_entries": valid,
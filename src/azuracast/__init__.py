@@ -1,2 +1,3 @@
 # src/azuracast/__init__.py
 from .main import AzuraCastSync
+from .async_client import AsyncAzuraCastClient
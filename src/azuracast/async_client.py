@@ -0,0 +1,518 @@
+"""Async AzuraCast client for concurrent playlist deployment.
+
+Mirrors the playlist operations of :class:`~src.azuracast.main.AzuraCastSync`
+(list/create/empty/delete playlists, link files, schedule) on top of
+``httpx.AsyncClient`` so independent playlists can be deployed concurrently.
+
+All requests made through one client share an :class:`AdaptiveRequestBudget`:
+a global concurrency limit that halves when AzuraCast answers 429 (and pauses
+every request until the Retry-After delay has passed), then grows back by one
+slot per window of successful requests.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from base64 import b64encode
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .cache import add_known_track
+from .main import (
+    BASE_BACKOFF,
+    MAX_BACKOFF,
+    build_schedule_item,
+    generate_unique_suffix,
+    schedule_exists,
+    ssl_verification_enabled,
+)
+
+logger = logging.getLogger(__name__)
+
+# Transient server errors retried with backoff (429 is handled separately)
+RETRYABLE_STATUS_CODES = frozenset({413, 502, 503, 504})
+
+
+class AdaptiveRequestBudget:
+    """Global, adaptive limit on in-flight AzuraCast requests.
+
+    Uses additive-increase/multiplicative-decrease: every 429 halves the limit
+    and starts a shared cooldown, every successful request grows the limit by
+    1/limit (one slot per limit successes) up to max_concurrency.
+
+    Attributes:
+        max_concurrency: Upper bound on concurrent requests
+        min_concurrency: Lower bound the limit never shrinks below
+        limit: Current concurrency limit
+        total_requests: Requests issued through this budget
+        throttled_requests: Requests answered with 429
+
+    Example:
+        >>> budget = AdaptiveRequestBudget(max_concurrency=4)
+        >>> budget.limit
+        4.0
+    """
+
+    def __init__(self, max_concurrency: int = 8, min_concurrency: int = 1) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit: float = float(self.max_concurrency)
+        self.total_requests = 0
+        self.throttled_requests = 0
+        self._in_flight = 0
+        self._cooldown_until = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # Created lazily so the budget binds to the running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> None:
+        """Wait for a request slot, honouring any active 429 cooldown."""
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                delay = self._cooldown_until - time.monotonic()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self._in_flight < int(self.limit):
+                    break
+                await condition.wait()
+            self._in_flight += 1
+            self.total_requests += 1
+
+    async def release(self, throttled_for: Optional[float] = None) -> None:
+        """Return a request slot and adapt the limit.
+
+        Args:
+            throttled_for: Seconds to pause all requests if the server answered 429
+        """
+        condition = self._get_condition()
+        async with condition:
+            self._in_flight -= 1
+            if throttled_for is not None:
+                self.throttled_requests += 1
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self._cooldown_until = max(self._cooldown_until, time.monotonic() + throttled_for)
+                logger.warning(
+                    f"AzuraCast rate limited: pausing {throttled_for:.1f}s, "
+                    f"concurrency limit now {int(self.limit)}"
+                )
+            else:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            condition.notify_all()
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given in seconds."""
+    retry_after = response.headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        return None
+
+
+class AsyncAzuraCastClient:
+    """Async client for AzuraCast playlist management.
+
+    Configuration is read from the same environment variables as AzuraCastSync,
+    plus AZURACAST_MAX_CONCURRENCY (default 8) for the global request budget.
+
+    Example:
+        >>> async with AsyncAzuraCastClient() as client:  # doctest: +SKIP
+        ...     playlist = await client.create_playlist("Morning Drive")
+        ...     await client.link_tracks(playlist["id"], ["1", "2"])
+    """
+
+    def __init__(
+        self,
+        budget: Optional[AdaptiveRequestBudget] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        max_attempts: int = 6,
+    ) -> None:
+        """Initializes the client with environment variables.
+
+        Args:
+            budget: Shared request budget (created from AZURACAST_MAX_CONCURRENCY if None)
+            transport: Optional httpx transport (used by tests)
+            max_attempts: Attempts per request before giving up
+        """
+        self.host: str = os.getenv("AZURACAST_HOST", "")
+        self.api_key: str = os.getenv("AZURACAST_API_KEY", "")
+        self.station_id: str = os.getenv("AZURACAST_STATIONID", "")
+        self.budget = budget or AdaptiveRequestBudget(
+            int(os.getenv("AZURACAST_MAX_CONCURRENCY", "8"))
+        )
+        self.max_attempts = max_attempts
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._playlist_directory: Optional[Dict[str, Dict[str, Any]]] = None
+        self._directory_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "AsyncAzuraCastClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Closes the underlying HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.host}/api",
+                headers={"X-API-Key": self.api_key},
+                timeout=httpx.Timeout(300.0, connect=10.0),
+                # Same TLS setting as AzuraCastSync (off for self-signed stations)
+                verify=ssl_verification_enabled(),
+                transport=self._transport,
+            )
+        return self._client
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Exponential backoff with jitter, capped at MAX_BACKOFF."""
+        return min(BASE_BACKOFF * (2**attempt), MAX_BACKOFF) * random.uniform(0.5, 1.0)
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        json: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """Performs an HTTP request under the global budget with retry logic.
+
+        Args:
+            method: HTTP method (GET, POST, PUT, DELETE).
+            endpoint: API endpoint.
+            json: JSON data to be sent in the body of the request.
+            headers: Extra request headers.
+
+        Returns:
+            The response object if successful (404 responses are returned as-is).
+
+        Raises:
+            httpx.HTTPError: If the request fails or retries are exhausted.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self.budget.acquire()
+            try:
+                response = await self._get_client().request(
+                    method,
+                    endpoint,
+                    json=json,
+                    headers=headers,
+                    params={"unique_suffix": generate_unique_suffix()},
+                )
+            except httpx.TransportError as e:
+                await self.budget.release()
+                wait_time = self._backoff(attempt)
+                logger.warning(
+                    "Attempt %d: %s %s failed: %s. Retrying in %.1fs...",
+                    attempt,
+                    method,
+                    endpoint,
+                    e,
+                    wait_time,
+                )
+                await asyncio.sleep(wait_time)
+                continue
+
+            if response.status_code == 429:
+                # The budget pauses every request, not just this one
+                wait_time = _retry_after_seconds(response)
+                await self.budget.release(
+                    throttled_for=wait_time if wait_time is not None else self._backoff(attempt)
+                )
+                continue
+
+            await self.budget.release()
+
+            if response.status_code == 404:
+                logger.warning(
+                    "Attempt %d: %s %s resulted in 404 Not Found", attempt, method, endpoint
+                )
+                return response
+
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                wait_time = self._backoff(attempt)
+                logger.warning(
+                    "Attempt %d: %s %s returned HTTP %d. Retrying in %.1fs...",
+                    attempt,
+                    method,
+                    endpoint,
+                    response.status_code,
+                    wait_time,
+                )
+                await asyncio.sleep(wait_time)
+                continue
+
+            response.raise_for_status()
+            return response
+
+        logger.error("%s %s failed after %d attempts", method, endpoint, self.max_attempts)
+        raise httpx.HTTPError(f"Failed after {self.max_attempts} attempts")
+
+    async def get_playlist_directory(
+        self, force_refresh: bool = False
+    ) -> Dict[str, Dict[str, Any]]:
+        """Returns the station playlist directory, listing playlists only when needed.
+
+        Args:
+            force_refresh: Re-list station playlists even if the directory is cached.
+
+        Returns:
+            Mapping of playlist name to the playlist summary from the list endpoint.
+        """
+        if self._directory_lock is None:
+            self._directory_lock = asyncio.Lock()
+        async with self._directory_lock:
+            if force_refresh or self._playlist_directory is None:
+                response = await self._request("GET", f"/station/{self.station_id}/playlists")
+                self._playlist_directory = {p["name"]: p for p in response.json()}
+                logger.debug("Cached %d station playlists", len(self._playlist_directory))
+            return self._playlist_directory
+
+    def invalidate_playlist_directory(self) -> None:
+        """Forces the next playlist lookup to re-list station playlists."""
+        self._playlist_directory = None
+
+    async def get_playlist(self, playlist_name: str) -> Optional[Dict[str, Any]]:
+        """Retrieves full details of a playlist by name.
+
+        Args:
+            playlist_name: Name of the playlist.
+
+        Returns:
+            Playlist details, or None if it does not exist or the lookup failed.
+        """
+        try:
+            summary = (await self.get_playlist_directory()).get(playlist_name)
+            if not summary:
+                return None
+            response = await self._request(
+                "GET", f"/station/{self.station_id}/playlist/{summary['id']}"
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to get playlist '{playlist_name}': {e}")
+            return None
+        if response.status_code == 404:
+            self.invalidate_playlist_directory()
+            return None
+        return response.json()
+
+    async def get_playlists(self, playlist_names: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Retrieves full details of several playlists concurrently.
+
+        Args:
+            playlist_names: Names of the playlists.
+
+        Returns:
+            Mapping of each name to its details, or None if it does not exist.
+        """
+        names = list(dict.fromkeys(playlist_names))
+        details = await asyncio.gather(*(self.get_playlist(name) for name in names))
+        return dict(zip(names, details))
+
+    async def create_playlist(self, playlist_name: str) -> Optional[Dict[str, Any]]:
+        """Creates a new playlist in AzuraCast.
+
+        Args:
+            playlist_name: Name of the new playlist.
+
+        Returns:
+            Information of the created playlist or None if failed.
+        """
+        try:
+            response = await self._request(
+                "POST",
+                f"/station/{self.station_id}/playlists",
+                json={"name": playlist_name, "type": "default"},
+            )
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to create playlist '{playlist_name}': {e}")
+            return None
+        finally:
+            self.invalidate_playlist_directory()
+
+    async def delete_playlist(self, playlist_id: int) -> bool:
+        """Deletes a playlist.
+
+        Args:
+            playlist_id: ID of the playlist to be deleted.
+
+        Returns:
+            True if successful, False otherwise.
+        """
+        try:
+            await self._request("DELETE", f"/station/{self.station_id}/playlist/{playlist_id}")
+            return True
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to delete playlist with ID {playlist_id}: {e}")
+            return False
+        finally:
+            self.invalidate_playlist_directory()
+
+    async def empty_playlist(self, playlist_id: int) -> bool:
+        """Empties a playlist.
+
+        Args:
+            playlist_id: ID of the playlist to be emptied.
+
+        Returns:
+            True if successful, False otherwise.
+        """
+        try:
+            await self._request(
+                "DELETE", f"/station/{self.station_id}/playlist/{playlist_id}/empty"
+            )
+            return True
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to empty playlist with ID {playlist_id}: {e}")
+            return False
+
+    async def add_to_playlist(self, file_id: str, playlist_id: int) -> bool:
+        """Adds a file to a playlist.
+
+        Args:
+            file_id: ID of the file to be added.
+            playlist_id: ID of the playlist.
+
+        Returns:
+            True if successful, False otherwise.
+        """
+        try:
+            await self._request(
+                "PUT",
+                f"/station/{self.station_id}/file/{file_id}",
+                json={"playlists": [playlist_id]},
+            )
+            return True
+        except httpx.HTTPError as e:
+            logger.error(
+                f"Failed to add file with ID {file_id} to playlist with ID {playlist_id}: {e}"
+            )
+            return False
+
+    async def link_tracks(self, playlist_id: int, file_ids: List[str]) -> int:
+        """Adds files to a playlist one at a time, preserving their order.
+
+        Args:
+            playlist_id: ID of the playlist.
+            file_ids: File IDs in playback order.
+
+        Returns:
+            Number of files linked successfully.
+        """
+        linked = 0
+        for file_id in file_ids:
+            if await self.add_to_playlist(file_id, playlist_id):
+                linked += 1
+        return linked
+
+    async def upload_file(self, file_content: bytes, file_key: str) -> Dict[str, Any]:
+        """Uploads a file to AzuraCast and records it in the known tracks cache.
+
+        Args:
+            file_content: Content of the file to be uploaded.
+            file_key: Key (name) of the file to be uploaded.
+
+        Returns:
+            Response from the server, commonly including the uploaded file's metadata.
+
+        Raises:
+            ValueError: If the file is missing or too small to be audio.
+        """
+        if not file_content or not file_key:
+            raise ValueError("Missing filename or fileobj argument")
+        if len(file_content) < 1000:
+            raise ValueError("File is too small to be a valid audio file")
+
+        data = {"path": file_key, "file": b64encode(file_content).decode("utf-8")}
+        response = await self._request("POST", f"/station/{self.station_id}/files", json=data)
+        uploaded: Dict[str, Any] = response.json()
+        if isinstance(uploaded, dict) and uploaded.get("id"):
+            add_known_track(uploaded)
+        return uploaded
+
+    async def schedule_playlist(
+        self,
+        playlist_name: str,
+        start_time: str,
+        end_time: str,
+        days: Optional[List[int]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        playlist_info: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Schedule a playlist to play during specific time blocks.
+
+        IDEMPOTENT: If the playlist already has the same schedule, it won't create duplicates.
+
+        Args:
+            playlist_name: Name of the playlist to schedule.
+            start_time: Start time in HH:MM format (24-hour, e.g., "06:00").
+            end_time: End time in HH:MM format (24-hour, e.g., "10:00").
+            days: List of day numbers (0=Sunday, ..., 6=Saturday). Defaults to weekdays.
+            start_date: Start date in YYYY-MM-DD format (optional).
+            end_date: End date in YYYY-MM-DD format (optional).
+            playlist_info: Playlist details if already known (skips a lookup).
+
+        Returns:
+            True if scheduling was successful, False otherwise.
+        """
+        try:
+            if playlist_info is None:
+                playlist_info = await self.get_playlist(playlist_name)
+            if not playlist_info:
+                logger.error(f"Playlist '{playlist_name}' not found, cannot schedule")
+                return False
+
+            if days is None:
+                days = [1, 2, 3, 4, 5]  # Monday-Friday
+
+            schedule_item = build_schedule_item(start_time, end_time, days, start_date, end_date)
+            date_info = f" from {start_date} to {end_date}" if start_date else ""
+
+            if schedule_exists(playlist_info.get("schedule_items") or [], schedule_item):
+                logger.info(
+                    f"✓ Schedule already exists for '{playlist_name}' "
+                    f"({start_time}-{end_time} on days {days}{date_info})"
+                )
+                return True
+
+            response = await self._request(
+                "PUT",
+                f"/station/{self.station_id}/playlist/{playlist_info['id']}",
+                json={"name": playlist_name, "schedule_items": [schedule_item]},
+            )
+            if response.status_code != 200:
+                logger.error(f"Failed to schedule '{playlist_name}': HTTP {response.status_code}")
+                return False
+
+            logger.info(
+                f"✓ Scheduled '{playlist_name}' for {start_time}-{end_time} "
+                f"on days {days}{date_info}"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"Failed to schedule playlist '{playlist_name}': {e}")
+            return False
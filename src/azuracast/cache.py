@@ -2,13 +2,29 @@
 
 This module provides caching functionality to reduce API calls by storing
 known tracks with TTL-based expiration.
+
+The snapshot can optionally be persisted to disk (together with its derived
+dedup index) so that concurrent sync processes share one library listing.
+Snapshot files are replaced atomically, so readers never see a partial write,
+and refreshes are serialized with a file lock so only one process hits the
+API. Expired snapshots are revalidated with a conditional GET when the server
+supplied an ETag or Last-Modified validator. Our own uploads and deletes are
+written back to the snapshot under the same lock, and a process reloads the
+snapshot whenever another process has rewritten it.
 """
 
+import json
 import logging
+import os
+import tempfile
 import time
-from typing import Any, Callable
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterator, Optional
+
+from src.file_lock import FileLock
 
-from .models import KnownTracksCache
+from .detection import add_to_dedup_index, build_dedup_index, remove_from_dedup_index
+from .models import DedupIndex, KnownTracksCache, KnownTracksResponse
 
 # Module-level logger
 logger = logging.getLogger(__name__)
@@ -16,9 +32,168 @@ logger = logging.getLogger(__name__)
 # Global cache instance - start with expired cache (fetched_at=0.0)
 _known_tracks_cache = KnownTracksCache(tracks=[], fetched_at=0.0)
 
+SNAPSHOT_VERSION = 1
+
+# Snapshot file backing the in-memory cache (set by get_cached_known_tracks)
+_snapshot_file: Optional[str] = None
+_snapshot_key = ""
+# Modification time of the snapshot file when we last read or wrote it
+_snapshot_mtime: Optional[int] = None
+
+
+def _file_mtime(cache_file: str) -> Optional[int]:
+    """Return the snapshot file's modification time in nanoseconds, or None if missing."""
+    try:
+        return os.stat(cache_file).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _load_snapshot(cache_file: str, cache_key: str) -> Optional[dict[str, Any]]:
+    """Load a persisted snapshot, ignoring missing, corrupt or foreign files.
+
+    Args:
+        cache_file: Path to the snapshot file
+        cache_key: Identifies the AzuraCast host/station the snapshot belongs to
+
+    Returns:
+        Snapshot dictionary, or None if unusable
+    """
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable known tracks snapshot {cache_file}: {e}")
+        return None
+
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get("version") != SNAPSHOT_VERSION
+        or snapshot.get("key") != cache_key
+        or not isinstance(snapshot.get("tracks"), list)
+    ):
+        logger.debug(f"Ignoring known tracks snapshot {cache_file} (version or key mismatch)")
+        return None
+
+    return snapshot
+
+
+def _save_snapshot(cache_file: str, cache_key: str, cache: KnownTracksCache) -> None:
+    """Atomically persist the in-memory snapshot and its dedup index.
+
+    Args:
+        cache_file: Path to the snapshot file
+        cache_key: Identifies the AzuraCast host/station the snapshot belongs to
+        cache: Cache to persist
+    """
+    if cache.index is None:
+        cache.index = build_dedup_index(cache.tracks)
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "key": cache_key,
+        "fetched_at": cache.fetched_at,
+        "etag": cache.etag,
+        "last_modified": cache.last_modified,
+        "tracks": cache.tracks,
+        "index": cache.index.to_dict(),
+    }
+
+    global _snapshot_mtime
+
+    directory = os.path.dirname(os.path.abspath(cache_file))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".known_tracks.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, cache_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        _snapshot_mtime = _file_mtime(cache_file)
+    except OSError as e:
+        logger.warning(f"Failed to persist known tracks snapshot {cache_file}: {e}")
+
+
+def _adopt_snapshot(snapshot: dict[str, Any]) -> None:
+    """Replace the in-memory cache contents with a persisted snapshot."""
+    tracks = snapshot["tracks"]
+    _known_tracks_cache.tracks = tracks
+    _known_tracks_cache.fetched_at = float(snapshot.get("fetched_at", 0.0))
+    _known_tracks_cache.etag = snapshot.get("etag")
+    _known_tracks_cache.last_modified = snapshot.get("last_modified")
+    index_data = snapshot.get("index")
+    _known_tracks_cache.index = (
+        DedupIndex.from_dict(index_data, tracks) if isinstance(index_data, dict) else None
+    )
+
+
+def _reload_if_changed(cache_file: str, cache_key: str) -> None:
+    """Adopt the snapshot file if another process rewrote it since we last read it."""
+    global _snapshot_mtime
+
+    mtime = _file_mtime(cache_file)
+    if mtime is None or mtime == _snapshot_mtime:
+        return
+    snapshot = _load_snapshot(cache_file, cache_key)
+    _snapshot_mtime = mtime
+    if snapshot is not None and float(snapshot.get("fetched_at", 0.0)) >= (
+        _known_tracks_cache.fetched_at
+    ):
+        logger.debug(f"Reloading known tracks snapshot {cache_file} (changed on disk)")
+        _adopt_snapshot(snapshot)
+
+
+def _is_fresh(snapshot: Optional[dict[str, Any]]) -> bool:
+    """Check whether a persisted snapshot is within the cache TTL."""
+    if snapshot is None:
+        return False
+    age = time.time() - float(snapshot.get("fetched_at", 0.0))
+    return age <= _known_tracks_cache.ttl_seconds
+
+
+def _refresh(
+    fetch_fn: Callable[[], list[dict[str, Any]]],
+    conditional_fetch_fn: Optional[Callable[[Optional[str], Optional[str]], KnownTracksResponse]],
+    force_refresh: bool,
+) -> None:
+    """Refresh the in-memory cache from the API, revalidating when possible."""
+    if conditional_fetch_fn is None:
+        _known_tracks_cache.refresh(fetch_fn())
+        _known_tracks_cache.etag = None
+        _known_tracks_cache.last_modified = None
+        return
+
+    # Only send validators if we still hold the snapshot they describe
+    has_snapshot = not force_refresh and _known_tracks_cache.fetched_at > 0
+    response = conditional_fetch_fn(
+        _known_tracks_cache.etag if has_snapshot else None,
+        _known_tracks_cache.last_modified if has_snapshot else None,
+    )
+
+    if response.not_modified and has_snapshot:
+        logger.debug("Known tracks snapshot revalidated (304 Not Modified)")
+        _known_tracks_cache.fetched_at = time.time()
+    else:
+        _known_tracks_cache.refresh(response.tracks or [])
+
+    _known_tracks_cache.etag = response.etag
+    _known_tracks_cache.last_modified = response.last_modified
+
 
 def get_cached_known_tracks(
-    fetch_fn: Callable[[], list[dict[str, Any]]], force_refresh: bool = False
+    fetch_fn: Callable[[], list[dict[str, Any]]],
+    force_refresh: bool = False,
+    conditional_fetch_fn: Optional[
+        Callable[[Optional[str], Optional[str]], KnownTracksResponse]
+    ] = None,
+    cache_file: Optional[str] = None,
+    cache_key: str = "",
+    ttl_seconds: Optional[int] = None,
 ) -> list[dict[str, Any]]:
     """Retrieve known tracks with automatic cache management.
 
@@ -28,6 +203,12 @@ def get_cached_known_tracks(
     Args:
         fetch_fn: Callable that fetches fresh tracks from AzuraCast API
         force_refresh: Skip cache and force API call (default: False)
+        conditional_fetch_fn: Optional callable taking (etag, last_modified) and
+            returning a KnownTracksResponse; used instead of fetch_fn so that
+            expired snapshots can be revalidated with a 304
+        cache_file: Optional path of a snapshot shared between processes
+        cache_key: Identifies the host/station a persisted snapshot belongs to
+        ttl_seconds: Override the cache TTL
 
     Returns:
         List of known tracks (cached or fresh)
@@ -39,24 +220,176 @@ def get_cached_known_tracks(
         >>> len(tracks)
         1
     """
-    global _known_tracks_cache
+    global _known_tracks_cache, _snapshot_file, _snapshot_key, _snapshot_mtime
 
-    if force_refresh or _known_tracks_cache.is_expired():
-        logger.debug(
-            f"Refreshing known tracks cache "
-            f"(expired: {_known_tracks_cache.is_expired()}, forced: {force_refresh})"
-        )
-        fresh_tracks = fetch_fn()
-        _known_tracks_cache.refresh(fresh_tracks)
-    else:
+    if ttl_seconds is not None:
+        _known_tracks_cache.ttl_seconds = ttl_seconds
+
+    if cache_file != _snapshot_file or cache_key != _snapshot_key:
+        _snapshot_mtime = None
+    _snapshot_file = cache_file
+    _snapshot_key = cache_key
+
+    # Pick up uploads and deletes other processes wrote to the shared snapshot
+    if cache_file and not force_refresh and not _known_tracks_cache.is_expired():
+        _reload_if_changed(cache_file, cache_key)
+
+    if not force_refresh and not _known_tracks_cache.is_expired():
         logger.debug(
             f"Using cached known tracks "
             f"(age: {time.time() - _known_tracks_cache.fetched_at:.1f}s)"
         )
+        return _known_tracks_cache.get_tracks()
+
+    # Another process may already have refreshed the shared snapshot
+    if cache_file and not force_refresh:
+        mtime = _file_mtime(cache_file)
+        snapshot = _load_snapshot(cache_file, cache_key)
+        if _is_fresh(snapshot):
+            logger.debug(f"Using known tracks snapshot from {cache_file}")
+            _adopt_snapshot(snapshot)
+            _snapshot_mtime = mtime
+            return _known_tracks_cache.tracks
+
+    lock = FileLock(cache_file, mode="write") if cache_file else nullcontext()
+    with lock:
+        if cache_file and not force_refresh:
+            # Re-check under the lock: the previous holder may have just refreshed
+            mtime = _file_mtime(cache_file)
+            snapshot = _load_snapshot(cache_file, cache_key)
+            if _is_fresh(snapshot):
+                _adopt_snapshot(snapshot)
+                _snapshot_mtime = mtime
+                return _known_tracks_cache.tracks
+            if snapshot is not None and snapshot["fetched_at"] > _known_tracks_cache.fetched_at:
+                # Stale, but newer than ours: revalidate its validators
+                _adopt_snapshot(snapshot)
+
+        logger.debug(
+            f"Refreshing known tracks cache "
+            f"(expired: {_known_tracks_cache.is_expired()}, forced: {force_refresh})"
+        )
+        _refresh(fetch_fn, conditional_fetch_fn, force_refresh)
+
+        if cache_file:
+            _save_snapshot(cache_file, cache_key, _known_tracks_cache)
 
     return _known_tracks_cache.get_tracks()
 
 
+def get_cached_dedup_index(known_tracks: list[dict[str, Any]]) -> DedupIndex:
+    """Return the dedup index for a known tracks list.
+
+    The index of the cached snapshot is built once (or restored from disk) and
+    reused for every duplicate check until the snapshot is refreshed. Lists that
+    are not the cached snapshot get a freshly built index.
+
+    Args:
+        known_tracks: Track list returned by get_cached_known_tracks()
+
+    Returns:
+        DedupIndex over known_tracks
+    """
+    if known_tracks is not _known_tracks_cache.tracks:
+        return build_dedup_index(known_tracks)
+    return _index()
+
+
+@contextmanager
+def _updating_snapshot() -> Iterator[None]:
+    """Apply an in-memory change to the latest snapshot and write it back to disk.
+
+    With a snapshot file, the change is made under the snapshot's file lock on
+    top of whatever other processes wrote last, so concurrent sync processes see
+    each other's uploads and deletes within the TTL.
+    """
+    if not _snapshot_file:
+        yield
+        return
+
+    with FileLock(_snapshot_file, mode="write"):
+        _reload_if_changed(_snapshot_file, _snapshot_key)
+        yield
+        _save_snapshot(_snapshot_file, _snapshot_key, _known_tracks_cache)
+
+
+def _index() -> DedupIndex:
+    """Return the cached snapshot's dedup index, building it if necessary."""
+    if _known_tracks_cache.index is None:
+        _known_tracks_cache.index = build_dedup_index(_known_tracks_cache.tracks)
+    return _known_tracks_cache.index
+
+
+def _remove_track(file_id: Any) -> Optional[dict[str, Any]]:
+    """Remove a track from the in-memory snapshot and its index.
+
+    Returns:
+        The removed track record, or None if it was not cached
+    """
+    known_track = remove_from_dedup_index(_index(), file_id)
+    if known_track is None:
+        return None
+    tracks = _known_tracks_cache.tracks
+    # Mutate in place so callers holding the snapshot list see the change
+    for position, track in enumerate(tracks):
+        if track is known_track:
+            del tracks[position]
+            break
+    return known_track
+
+
+def add_known_track(known_track: dict[str, Any]) -> None:
+    """Record a track we just uploaded in the cached snapshot and its dedup index.
+
+    Keeps duplicate detection accurate for the rest of the run without a full
+    /files refetch, and writes the change to the shared snapshot file if one is
+    in use. Does nothing if no snapshot has been loaded yet.
+
+    Args:
+        known_track: AzuraCast file record returned by the upload endpoint
+    """
+    if _known_tracks_cache.fetched_at == 0.0 or "id" not in known_track:
+        return
+
+    with _updating_snapshot():
+        index = _index()
+        previous = index.by_id.get(str(known_track["id"]))
+        if previous is None:
+            _known_tracks_cache.tracks.append(known_track)
+        else:
+            # Re-upload of a known file: replace the entry where it stands
+            remove_from_dedup_index(index, known_track["id"])
+            tracks = _known_tracks_cache.tracks
+            for position, track in enumerate(tracks):
+                if track is previous:
+                    tracks[position] = known_track
+                    break
+        add_to_dedup_index(index, known_track)
+    logger.debug(f"Added file {known_track['id']} to known tracks cache")
+
+
+def remove_known_track(file_id: Any) -> bool:
+    """Drop a track we just deleted from the cached snapshot and its dedup index.
+
+    The change is written to the shared snapshot file if one is in use.
+
+    Args:
+        file_id: AzuraCast file ID (str or int)
+
+    Returns:
+        True if the track was present in the cache
+    """
+    if _known_tracks_cache.fetched_at == 0.0:
+        return False
+
+    with _updating_snapshot():
+        removed = _remove_track(file_id) is not None
+
+    if removed:
+        logger.debug(f"Removed file {file_id} from known tracks cache")
+    return removed
+
+
 def should_skip_replaygain_conflict(
     azuracast_track: dict[str, Any], source_track: dict[str, Any]
 ) -> bool:
@@ -11,20 +11,131 @@ All functions are designed for O(1) lookup with pre-built indices.
 import logging
 from typing import Any, Dict, List, Optional
 
-from .models import DetectionStrategy, UploadDecision
+from .models import DedupIndex, DetectionStrategy, UploadDecision
 from .normalization import build_track_fingerprint
 
 logger = logging.getLogger(__name__)
 
 
+def _known_track_mbid(known_track: Dict[str, Any]) -> str:
+    """Return the normalized MusicBrainz Track ID of an AzuraCast track ("" if none)."""
+    return (known_track.get("custom_fields") or {}).get("musicbrainz_trackid", "").strip().lower()
+
+
+def _known_track_fingerprint(known_track: Dict[str, Any]) -> Optional[str]:
+    """Return the metadata fingerprint of an AzuraCast track (None if malformed)."""
+    try:
+        return build_track_fingerprint(
+            {
+                "AlbumArtist": known_track.get("artist", ""),
+                "Album": known_track.get("album", ""),
+                "Name": known_track.get("title", ""),
+            }
+        )
+    except ValueError:
+        return None
+
+
+def _build_mbid_index(known_tracks: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Build MBID -> file IDs index."""
+    mbid_index: Dict[str, List[str]] = {}
+    for known_track in known_tracks:
+        known_mbid = _known_track_mbid(known_track)
+        if known_mbid:
+            mbid_index.setdefault(known_mbid, []).append(known_track["id"])
+    return mbid_index
+
+
+def _build_fingerprint_index(known_tracks: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Build fingerprint -> file IDs index, skipping malformed tracks."""
+    fingerprint_index: Dict[str, List[str]] = {}
+    for known_track in known_tracks:
+        known_fingerprint = _known_track_fingerprint(known_track)
+        if known_fingerprint:
+            fingerprint_index.setdefault(known_fingerprint, []).append(known_track["id"])
+    return fingerprint_index
+
+
+def build_dedup_index(known_tracks: List[Dict[str, Any]]) -> DedupIndex:
+    """Build the dedup index for a known tracks snapshot.
+
+    Args:
+        known_tracks: List of tracks already in AzuraCast library
+
+    Returns:
+        DedupIndex with MBID, fingerprint and ID lookups
+
+    Example:
+        >>> index = build_dedup_index([{"id": "1", "artist": "A", "album": "B", "title": "C"}])
+        >>> index.by_fingerprint
+        {'a|b|c': ['1']}
+    """
+    return DedupIndex(
+        by_mbid=_build_mbid_index(known_tracks),
+        by_fingerprint=_build_fingerprint_index(known_tracks),
+        by_id={str(t["id"]): t for t in known_tracks if "id" in t},
+    )
+
+
+def add_to_dedup_index(index: DedupIndex, known_track: Dict[str, Any]) -> None:
+    """Add one AzuraCast track to a dedup index in place.
+
+    Args:
+        index: Index to update
+        known_track: AzuraCast track record (must contain "id")
+    """
+    file_id = known_track["id"]
+    index.by_id[str(file_id)] = known_track
+
+    known_mbid = _known_track_mbid(known_track)
+    if known_mbid:
+        index.by_mbid.setdefault(known_mbid, []).append(file_id)
+
+    known_fingerprint = _known_track_fingerprint(known_track)
+    if known_fingerprint:
+        index.by_fingerprint.setdefault(known_fingerprint, []).append(file_id)
+
+
+def remove_from_dedup_index(index: DedupIndex, file_id: Any) -> Optional[Dict[str, Any]]:
+    """Remove one AzuraCast track from a dedup index in place.
+
+    Args:
+        index: Index to update
+        file_id: AzuraCast file ID (str or int)
+
+    Returns:
+        The removed track record, or None if it was not indexed
+    """
+    known_track = index.by_id.pop(str(file_id), None)
+    if known_track is None:
+        return None
+
+    for mapping, key in (
+        (index.by_mbid, _known_track_mbid(known_track)),
+        (index.by_fingerprint, _known_track_fingerprint(known_track)),
+    ):
+        if not key or key not in mapping:
+            continue
+        remaining = [fid for fid in mapping[key] if str(fid) != str(file_id)]
+        if remaining:
+            mapping[key] = remaining
+        else:
+            del mapping[key]
+
+    return known_track
+
+
 def check_file_exists_by_musicbrainz(
-    known_tracks: List[Dict[str, Any]], track: Dict[str, Any]
+    known_tracks: List[Dict[str, Any]],
+    track: Dict[str, Any],
+    index: Optional[DedupIndex] = None,
 ) -> Optional[str]:
     """Check for duplicate using MusicBrainz Track ID.
 
     Args:
         known_tracks: List of tracks already in AzuraCast library
         track: Source track to check for duplicates
+        index: Pre-built dedup index for known_tracks (built on the fly if None)
 
     Returns:
         AzuraCast file ID (str) if MBID match found, None otherwise
@@ -45,17 +156,8 @@ def check_file_exists_by_musicbrainz(
     # Normalize MBID for comparison
     source_mbid_norm = source_mbid.strip().lower()
 
-    # Build MBID index from known tracks for O(1) lookup
-    mbid_index: Dict[str, List[str]] = {}
-    for known_track in known_tracks:
-        known_mbid = (
-            known_track.get("custom_fields", {}).get("musicbrainz_trackid", "").strip().lower()
-        )
-
-        if known_mbid:
-            if known_mbid not in mbid_index:
-                mbid_index[known_mbid] = []
-            mbid_index[known_mbid].append(known_track["id"])
+    # Use pre-built MBID index for O(1) lookup
+    mbid_index = index.by_mbid if index is not None else _build_mbid_index(known_tracks)
 
     # Look up MBID in index
     if source_mbid_norm in mbid_index:
@@ -74,7 +176,10 @@ def check_file_exists_by_musicbrainz(
 
 
 def check_file_exists_by_metadata(
-    known_tracks: List[Dict[str, Any]], track: Dict[str, Any], duration_tolerance_seconds: int = 5
+    known_tracks: List[Dict[str, Any]],
+    track: Dict[str, Any],
+    duration_tolerance_seconds: int = 5,
+    index: Optional[DedupIndex] = None,
 ) -> Optional[str]:
     """Check for duplicate using normalized metadata fingerprint.
 
@@ -82,6 +187,7 @@ def check_file_exists_by_metadata(
         known_tracks: List of tracks in AzuraCast library
         track: Source track to check
         duration_tolerance_seconds: Allowable difference in duration (default: ±5s)
+        index: Pre-built dedup index for known_tracks (built on the fly if None)
 
     Returns:
         AzuraCast file ID (str) if metadata match found, None otherwise
@@ -110,26 +216,14 @@ def check_file_exists_by_metadata(
     if "RunTimeTicks" in track:
         source_duration = track["RunTimeTicks"] / 10_000_000  # Convert to seconds
 
-    # Build fingerprint index from known tracks
-    fingerprint_index: Dict[str, List[Dict[str, Any]]] = {}
-    for known_track in known_tracks:
-        try:
-            known_fingerprint = build_track_fingerprint(
-                {
-                    "AlbumArtist": known_track.get("artist", ""),
-                    "Album": known_track.get("album", ""),
-                    "Name": known_track.get("title", ""),
-                }
-            )
-            if known_fingerprint not in fingerprint_index:
-                fingerprint_index[known_fingerprint] = []
-            fingerprint_index[known_fingerprint].append(known_track)
-        except ValueError:
-            # Skip malformed known tracks
-            continue
-
-    # Look up fingerprint in index
-    candidates = fingerprint_index.get(source_fingerprint, [])
+    # Look up fingerprint in pre-built index
+    if index is None:
+        index = build_dedup_index(known_tracks)
+    candidates = [
+        index.by_id[str(file_id)]
+        for file_id in index.by_fingerprint.get(source_fingerprint, [])
+        if str(file_id) in index.by_id
+    ]
 
     # Validate duration within tolerance
     for candidate in candidates:
@@ -192,8 +286,58 @@ def should_skip_replaygain_conflict(
     return azuracast_has_rg and not source_has_rg
 
 
+REPLAYGAIN_LISTING_FIELDS = (
+    "replaygain_track_gain",
+    "replaygain_album_gain",
+    "r128_track_gain",
+    "r128_album_gain",
+)
+
+
+def get_replaygain_from_listing(azuracast_track: Optional[Dict[str, Any]]) -> Optional[bool]:
+    """Check the AzuraCast /files listing entry for ReplayGain data.
+
+    Looks at top-level fields, custom fields and extra metadata. Absence of these
+    fields is not proof that the file is untagged (AzuraCast only reports what it
+    was configured to extract), so callers must verify unknown results another way.
+    Amplify settings (amplify/liq_amplify) are a manual volume adjustment made in
+    AzuraCast, not ReplayGain tags, and are ignored.
+
+    Args:
+        azuracast_track: Track from the AzuraCast /files listing (may be None)
+
+    Returns:
+        True if the listing reports ReplayGain data, None if unknown
+
+    Example:
+        >>> get_replaygain_from_listing({"id": "1", "extra_metadata": {"r128_track_gain": -512}})
+        True
+        >>> get_replaygain_from_listing({"id": "1"}) is None
+        True
+    """
+    if not azuracast_track:
+        return None
+
+    sources = [
+        azuracast_track,
+        azuracast_track.get("custom_fields") or {},
+        azuracast_track.get("extra_metadata") or {},
+    ]
+    for source in sources:
+        if not isinstance(source, dict):
+            continue
+        for field_name in REPLAYGAIN_LISTING_FIELDS:
+            value = source.get(field_name)
+            if value is not None and value != "":
+                return True
+
+    return None
+
+
 def check_file_in_azuracast(
-    known_tracks: List[Dict[str, Any]], track: Dict[str, Any]
+    known_tracks: List[Dict[str, Any]],
+    track: Dict[str, Any],
+    index: Optional[DedupIndex] = None,
 ) -> UploadDecision:
     """Multi-strategy duplicate detection with fallback logic.
 
@@ -206,6 +350,7 @@ def check_file_in_azuracast(
     Args:
         known_tracks: List of tracks already in AzuraCast library
         track: Source track to check for duplicates
+        index: Pre-built dedup index for known_tracks (built once here if None)
 
     Returns:
         UploadDecision with should_upload, reason, strategy_used, and azuracast_file_id
@@ -222,8 +367,11 @@ def check_file_in_azuracast(
         >>> decision.strategy_used
         <DetectionStrategy.MUSICBRAINZ_ID: 'musicbrainz_id'>
     """
+    if index is None:
+        index = build_dedup_index(known_tracks)
+
     # Strategy 1: MusicBrainz ID match (highest priority)
-    mbid_match = check_file_exists_by_musicbrainz(known_tracks, track)
+    mbid_match = check_file_exists_by_musicbrainz(known_tracks, track, index=index)
     if mbid_match:
         return UploadDecision(
             should_upload=False,
@@ -233,11 +381,11 @@ def check_file_in_azuracast(
         )
 
     # Strategy 2: Normalized metadata match
-    metadata_match = check_file_exists_by_metadata(known_tracks, track)
+    metadata_match = check_file_exists_by_metadata(known_tracks, track, index=index)
     if metadata_match:
         # Detect source duplicates (multiple source tracks → same AzuraCast track)
         # Find the AzuraCast track
-        azuracast_track = next((t for t in known_tracks if t["id"] == metadata_match), None)
+        azuracast_track = index.by_id.get(str(metadata_match))
 
         # Check ReplayGain conflict
         if should_skip_replaygain_conflict(azuracast_track, track):
@@ -3,7 +3,9 @@ import time
 import logging
 import random
 import string
+import threading
 from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Union, Optional, Any
 from io import BytesIO
 
@@ -13,17 +15,39 @@ from urllib3.util.retry import Retry
 from tqdm import tqdm
 from src.track.main import Track
 
-from src.replaygain.main import has_replaygain_metadata
+from src.replaygain.main import (
+    check_replaygain_metadata,
+    has_replaygain_metadata,
+    id3v2_tag_size,
+)
+from src.replaygain.pool import get_replaygain_pool
 from src.logger import setup_logging
-from .cache import get_cached_known_tracks
+from .cache import (
+    add_known_track,
+    get_cached_dedup_index,
+    get_cached_known_tracks,
+    remove_known_track,
+)
 from .detection import check_file_in_azuracast as check_file_duplicate
-from .models import DetectionStrategy
+from .detection import get_replaygain_from_listing
+from .models import DetectionStrategy, KnownTracksResponse
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 BASE_BACKOFF = 2
 MAX_BACKOFF = 64
+# Extra bytes fetched past an ID3v2 tag so Mutagen can find the first audio frame
+TAG_HEADER_PADDING = 16 * 1024
+
+
+def ssl_verification_enabled() -> bool:
+    """Whether AzuraCast requests verify TLS certificates.
+
+    Off by default so stations with self-signed certificates work; set
+    AZURACAST_VERIFY_SSL=true to enable. Shared by the sync and async clients.
+    """
+    return os.getenv("AZURACAST_VERIFY_SSL", "false").strip().lower() in ("1", "true", "yes")
 
 
 def generate_unique_suffix() -> str:
@@ -31,6 +55,63 @@ def generate_unique_suffix() -> str:
     return "".join(random.choices(string.ascii_lowercase + string.digits, k=6))
 
 
+def time_to_hhmm(time_str: str) -> int:
+    """Converts an HH:MM time string to AzuraCast's HHMM integer format (e.g. "06:00" -> 600)."""
+    hours, minutes = time_str.split(":")
+    return int(hours) * 100 + int(minutes)
+
+
+def build_schedule_item(
+    start_time: str,
+    end_time: str,
+    days: List[int],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Builds an AzuraCast playlist schedule item.
+
+    Args:
+        start_time: Start time in HH:MM format.
+        end_time: End time in HH:MM format.
+        days: List of day numbers (0=Sunday, 1=Monday, ..., 6=Saturday).
+        start_date: Start date in YYYY-MM-DD format, or None for recurring.
+        end_date: End date in YYYY-MM-DD format, or None for recurring.
+
+    Returns:
+        Schedule item suitable for a playlist's schedule_items.
+    """
+    return {
+        "start_time": time_to_hhmm(start_time),
+        "end_time": time_to_hhmm(end_time),
+        "start_date": start_date,  # YYYY-MM-DD format or None for recurring
+        "end_date": end_date,  # YYYY-MM-DD format or None for recurring
+        "days": days,
+        "loop_once": False,
+    }
+
+
+def schedule_exists(
+    existing_schedules: List[Dict[str, Any]], schedule_item: Dict[str, Any]
+) -> bool:
+    """Checks whether a playlist already has an identical schedule item.
+
+    Args:
+        existing_schedules: The playlist's current schedule_items.
+        schedule_item: Item built by build_schedule_item().
+
+    Returns:
+        True if an equivalent schedule is already configured.
+    """
+    return any(
+        schedule.get("start_time") == schedule_item["start_time"]
+        and schedule.get("end_time") == schedule_item["end_time"]
+        and sorted(schedule.get("days", [])) == sorted(schedule_item["days"])
+        and schedule.get("start_date") == schedule_item["start_date"]
+        and schedule.get("end_date") == schedule_item["end_date"]
+        for schedule in existing_schedules
+    )
+
+
 class AzuraCastSync:
     """Client for interacting with the AzuraCast API for syncing playlists."""
 
@@ -45,12 +126,23 @@ class AzuraCastSync:
         self._force_reupload: bool = (
             os.getenv("AZURACAST_FORCE_REUPLOAD", "false").lower() == "true"
         )
+        # Optional snapshot of the known tracks shared between sync processes
+        self._cache_file: Optional[str] = os.getenv("AZURACAST_CACHE_FILE") or None
         self._legacy_detection: bool = (
             os.getenv("AZURACAST_LEGACY_DETECTION", "false").lower() == "true"
         )
         self._skip_replaygain_check: bool = (
             os.getenv("AZURACAST_SKIP_REPLAYGAIN_CHECK", "false").lower() == "true"
         )
+        self._playlist_workers: int = int(os.getenv("AZURACAST_PLAYLIST_WORKERS", "8"))
+        self._tag_header_bytes: int = int(os.getenv("AZURACAST_TAG_HEADER_BYTES", "262144"))
+
+        # ReplayGain verification results per AzuraCast file ID
+        self._replaygain_verified: Dict[str, bool] = {}
+
+        # Station playlist directory (name -> summary), invalidated on create/delete
+        self._playlist_directory: Optional[Dict[str, Dict[str, Any]]] = None
+        self._playlist_directory_lock = threading.Lock()
 
         # T036: Configuration validation
         if not self.host:
@@ -80,12 +172,13 @@ class AzuraCastSync:
         adapter: HTTPAdapter = HTTPAdapter(max_retries=retries)
         session.mount("http://", adapter)
         session.mount("https://", adapter)
-        # Disable SSL verification for self-signed certificates
-        session.verify = False
-        # Suppress warnings about unverified HTTPS requests
-        import urllib3
+        # SSL verification is disabled by default for self-signed certificates
+        session.verify = ssl_verification_enabled()
+        if not session.verify:
+            # Suppress warnings about unverified HTTPS requests
+            import urllib3
 
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         return session
 
     def _perform_request(
@@ -217,6 +310,54 @@ class AzuraCastSync:
         response: requests.Response = self._perform_request("GET", endpoint)
         return response.json()  # Ensure the JSON content is returned
 
+    def fetch_known_tracks_conditional(
+        self, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> KnownTracksResponse:
+        """Fetches known tracks, revalidating a cached snapshot if validators are given.
+
+        Args:
+            etag: ETag of the cached snapshot (sent as If-None-Match).
+            last_modified: Last-Modified of the cached snapshot (sent as If-Modified-Since).
+
+        Returns:
+            KnownTracksResponse with tracks=None if the server answered 304 Not Modified.
+        """
+        endpoint: str = f"/station/{self.station_id}/files"
+        headers: Dict[str, str] = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        response: requests.Response = self._perform_request("GET", endpoint, headers=headers)
+        new_etag = response.headers.get("ETag") or etag
+        new_last_modified = response.headers.get("Last-Modified") or last_modified
+        if response.status_code == 304:
+            return KnownTracksResponse(tracks=None, etag=new_etag, last_modified=new_last_modified)
+        return KnownTracksResponse(
+            tracks=response.json(),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+    def get_known_tracks_snapshot(self) -> List[Dict[str, Any]]:
+        """Returns the known tracks from the shared snapshot, refreshing or revalidating as needed.
+
+        Unlike get_known_tracks(), which always lists every file, this reuses
+        the on-disk snapshot (AZURACAST_CACHE_TTL) shared by all sync runs.
+
+        Returns:
+            List of dictionaries containing the known files' metadata.
+        """
+        return get_cached_known_tracks(
+            fetch_fn=self.get_known_tracks,
+            force_refresh=self._force_reupload,
+            conditional_fetch_fn=self.fetch_known_tracks_conditional,
+            cache_file=self._cache_file,
+            cache_key=f"{self.host}/{self.station_id}",
+            ttl_seconds=self._cache_ttl,
+        )
+
     def check_file_in_azuracast(
         self, known_tracks: List[Dict[str, Any]], track: Dict[str, Any]
     ) -> bool:
@@ -252,8 +393,10 @@ class AzuraCastSync:
             logger.debug("File '%s' does not exist in Azuracast (legacy detection)", title)
             return False
 
-        # New multi-strategy detection
-        decision = check_file_duplicate(known_tracks, track)
+        # New multi-strategy detection (index is shared for the whole snapshot)
+        decision = check_file_duplicate(
+            known_tracks, track, index=get_cached_dedup_index(known_tracks)
+        )
 
         # T035: INFO-level logging for duplicate decisions
         logger.info(decision.log_message())
@@ -298,6 +441,53 @@ class AzuraCastSync:
         logger.debug("Uploading file: %s, Size: %s", file_key, file_size)
 
         response: requests.Response = self._perform_request("POST", endpoint, json=data)
+        uploaded: Dict[str, Any] = response.json()
+        if isinstance(uploaded, dict) and uploaded.get("id"):
+            # Keep duplicate detection current without refetching /files
+            add_known_track(uploaded)
+        return uploaded
+
+    def _get_playlist_directory(self, force_refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Returns the station playlist directory, listing playlists only when needed.
+
+        Args:
+            force_refresh: Re-list station playlists even if the directory is cached.
+
+        Returns:
+            Mapping of playlist name to the playlist summary from the list endpoint.
+
+        Raises:
+            requests.exceptions.RequestException: If listing playlists fails.
+        """
+        with self._playlist_directory_lock:
+            if force_refresh or self._playlist_directory is None:
+                endpoint: str = f"/station/{self.station_id}/playlists"
+                response: requests.Response = self._perform_request("GET", endpoint)
+                playlists: List[Dict[str, Any]] = response.json()
+                self._playlist_directory = {playlist["name"]: playlist for playlist in playlists}
+                logger.debug("Cached %d station playlists", len(self._playlist_directory))
+            return self._playlist_directory
+
+    def invalidate_playlist_directory(self) -> None:
+        """Forces the next playlist lookup to re-list station playlists."""
+        with self._playlist_directory_lock:
+            self._playlist_directory = None
+
+    def _get_playlist_details(self, playlist_id: int) -> Optional[Dict[str, Any]]:
+        """Retrieves full playlist details (including schedule_items) by ID.
+
+        Args:
+            playlist_id: ID of the playlist.
+
+        Returns:
+            Playlist details, or None if the playlist no longer exists.
+        """
+        endpoint = f"/station/{self.station_id}/playlist/{playlist_id}"
+        response = self._perform_request("GET", endpoint)
+        if response.status_code == 404:
+            # Deleted outside this client - the cached directory is stale
+            self.invalidate_playlist_directory()
+            return None
         return response.json()
 
     def get_playlist(self, playlist_name: str) -> Optional[Dict[str, Any]]:
@@ -310,30 +500,49 @@ class AzuraCastSync:
             Playlist information if found (including schedule_items), None otherwise.
         """
         try:
-            # First get the list of playlists to find the ID
-            endpoint: str = f"/station/{self.station_id}/playlists"
-            response: requests.Response = self._perform_request("GET", endpoint)
-            playlists: List[Any] = response.json()
-
-            # Find playlist by name
-            playlist_summary = next(
-                (playlist for playlist in playlists if playlist["name"] == playlist_name), None
-            )
-
+            playlist_summary = self._get_playlist_directory().get(playlist_name)
             if not playlist_summary:
                 return None
 
-            # Get full playlist details including schedule_items
-            playlist_id = playlist_summary["id"]
-            detail_endpoint = f"/station/{self.station_id}/playlist/{playlist_id}"
-            detail_response = self._perform_request("GET", detail_endpoint)
-
-            return detail_response.json()
+            return self._get_playlist_details(playlist_summary["id"])
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get playlist '{playlist_name}': {e}")
             return None
 
+    def get_playlists(self, playlist_names: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Retrieves full details for several playlists, fetching details concurrently.
+
+        Args:
+            playlist_names: Names of the playlists.
+
+        Returns:
+            Mapping of each requested name to its playlist details, or None if not found.
+        """
+        results: Dict[str, Optional[Dict[str, Any]]] = {name: None for name in playlist_names}
+        try:
+            directory = self._get_playlist_directory()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to list playlists: {e}")
+            return results
+
+        found = [name for name in results if name in directory]
+        if not found:
+            return results
+
+        def fetch(name: str) -> Optional[Dict[str, Any]]:
+            try:
+                return self._get_playlist_details(directory[name]["id"])
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to get playlist '{name}': {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, self._playlist_workers)) as executor:
+            for name, details in zip(found, executor.map(fetch, found)):
+                results[name] = details
+
+        return results
+
     def create_playlist(self, playlist_name: str) -> Optional[Dict[str, Any]]:
         """Creates a new playlist in AzuraCast.
 
@@ -347,11 +556,31 @@ class AzuraCastSync:
             endpoint: str = f"/station/{self.station_id}/playlists"
             data: Dict[str, str] = {"name": playlist_name, "type": "default"}
             response: requests.Response = self._perform_request("POST", endpoint, json=data)
+            self.invalidate_playlist_directory()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to create playlist '{playlist_name}': {e}")
             return None
 
+    def delete_playlist(self, playlist_id: int) -> bool:
+        """Deletes a playlist.
+
+        Args:
+            playlist_id: ID of the playlist to be deleted.
+
+        Returns:
+            True if successful, False otherwise.
+        """
+        try:
+            endpoint: str = f"/station/{self.station_id}/playlist/{playlist_id}"
+            self._perform_request("DELETE", endpoint)
+            return True
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to delete playlist with ID {playlist_id}: {e}")
+            return False
+        finally:
+            self.invalidate_playlist_directory()
+
     def empty_playlist(self, playlist_id: int) -> bool:
         """Empties a playlist.
 
@@ -396,7 +625,11 @@ class AzuraCastSync:
         Args:
             playlist_name: Name of the playlist.
         """
-        playlist: Optional[Dict[str, Any]] = self.get_playlist(playlist_name)
+        try:
+            playlist: Optional[Dict[str, Any]] = self._get_playlist_directory().get(playlist_name)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to get playlist '{playlist_name}': {e}")
+            return
         if playlist:
             self.empty_playlist(playlist["id"])
 
@@ -431,9 +664,7 @@ class AzuraCastSync:
 
         try:
             # Use cached known tracks with TTL management
-            known_tracks: List[Dict[str, Any]] = get_cached_known_tracks(
-                fetch_fn=self.get_known_tracks, force_refresh=self._force_reupload
-            )
+            known_tracks: List[Dict[str, Any]] = self.get_known_tracks_snapshot()
 
             # Force reupload mode bypasses duplicate detection
             if self._force_reupload or not self.check_file_in_azuracast(known_tracks, track):
@@ -446,6 +677,8 @@ class AzuraCastSync:
                 track["azuracast_file_id"] = upload_response.get("id")
                 if track["azuracast_file_id"]:
                     track["_was_uploaded"] = True
+                    # Track.download() applies ReplayGain before upload
+                    self._replaygain_verified[str(track["azuracast_file_id"])] = True
                     logger.debug(
                         "Uploaded file '%s' to Azuracast with ID '%s'",
                         track["Name"],
@@ -474,10 +707,12 @@ class AzuraCastSync:
                     )
                     return True
 
-                file_content: bytes = self.download_file_from_azuracast(track_id)
-                content: BytesIO = BytesIO(file_content)
+                known_track: Optional[Dict[str, Any]] = get_cached_dedup_index(
+                    known_tracks
+                ).by_id.get(str(track_id))
+                file_format: str = os.path.splitext(track["Path"])[1]
 
-                if not has_replaygain_metadata(content, os.path.splitext(track["Path"])[1]):
+                if not self.verify_replaygain_in_azuracast(track_id, file_format, known_track):
                     logger.debug(
                         "File '%s' does not have ReplayGain metadata, deleting it from Azuracast.",
                         track["Name"],
@@ -496,6 +731,7 @@ class AzuraCastSync:
                         )
                         if upload_response and "id" in upload_response:
                             track["azuracast_file_id"] = upload_response["id"]
+                            self._replaygain_verified[str(upload_response["id"])] = True
                             logger.debug(
                                 "Re-uploaded file '%s' to Azuracast with ReplayGain ID '%s'",
                                 track["Name"],
@@ -531,6 +767,69 @@ class AzuraCastSync:
             logger.error("Error uploading '%s' to Azuracast: %s", track["Name"], e)
             return False
 
+    def verify_replaygain_in_azuracast(
+        self,
+        track_id: str,
+        file_format: str,
+        known_track: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Checks whether a file in AzuraCast carries ReplayGain metadata.
+
+        Checks are ordered by cost: the /files listing entry, then a ranged fetch
+        of the tag header, and only if that is inconclusive a full download.
+        Results are remembered per file ID.
+
+        Args:
+            track_id: ID of the file in AzuraCast.
+            file_format: Audio format (extension, with or without leading dot).
+            known_track: The file's entry from the /files listing, if available.
+
+        Returns:
+            True if the file has ReplayGain metadata, False otherwise.
+        """
+        cache_key = str(track_id)
+        if cache_key in self._replaygain_verified:
+            return self._replaygain_verified[cache_key]
+
+        source = "listing"
+        result: Optional[bool] = get_replaygain_from_listing(known_track)
+
+        if result is None:
+            source = "header"
+            header: bytes = self.download_file_header_from_azuracast(
+                track_id, self._tag_header_bytes
+            )
+            tag_size = id3v2_tag_size(header)
+            if tag_size and tag_size + TAG_HEADER_PADDING > len(header):
+                header = self.download_file_header_from_azuracast(
+                    track_id, tag_size + TAG_HEADER_PADDING
+                )
+            result = check_replaygain_metadata(BytesIO(header), file_format)
+
+        if result is None:
+            source = "download"
+            file_content: bytes = self.download_file_from_azuracast(track_id)
+            result = has_replaygain_metadata(BytesIO(file_content), file_format)
+
+        logger.debug("ReplayGain check for file '%s' via %s: %s", track_id, source, result)
+        self._replaygain_verified[cache_key] = result
+        return result
+
+    def download_file_header_from_azuracast(self, track_id: str, num_bytes: int) -> bytes:
+        """Downloads the leading bytes of a file from Azuracast using an HTTP range request.
+
+        Args:
+            track_id: ID of the file to download.
+            num_bytes: Number of bytes to request from the start of the file.
+
+        Returns:
+            Leading content of the file (the whole file if the server ignores ranges).
+        """
+        endpoint: str = f"/station/{self.station_id}/file/{track_id}/play"
+        headers: Dict[str, str] = {"Range": f"bytes=0-{num_bytes - 1}"}
+        response: requests.Response = self._perform_request("GET", endpoint, headers=headers)
+        return response.content[:num_bytes]
+
     def download_file_from_azuracast(self, track_id: str) -> bytes:
         """Downloads a file from Azuracast.
 
@@ -561,6 +860,8 @@ class AzuraCastSync:
                 result: Dict[str, Any] = response.json()
                 if result.get("success") is True:
                     logger.debug("Successfully deleted file with ID '%s' from Azuracast", track_id)
+                    remove_known_track(track_id)
+                    self._replaygain_verified.pop(str(track_id), None)
                     return True
                 logger.error(
                     "Failed to delete file with ID '%s' from Azuracast: %s",
@@ -624,6 +925,10 @@ class AzuraCastSync:
             f"Upload complete: {uploaded_count} uploaded, {skipped_count} skipped (duplicates), "
             f"{failed_count} failed out of {total_tracks} total tracks"
         )
+        # Track.download() analyses loudness on the shared ReplayGain pool
+        replaygain_pool = get_replaygain_pool()
+        if replaygain_pool.submitted:
+            replaygain_pool.log_throughput()
 
         return True
 
@@ -661,52 +966,22 @@ class AzuraCastSync:
 
             playlist_id = playlist_info["id"]
 
-            # Convert time string to HHMM integer format (e.g., "06:00" -> 600)
-            def time_to_hhmm(time_str: str) -> int:
-                hours, minutes = time_str.split(":")
-                return int(hours) * 100 + int(minutes)
-
-            start_hhmm = time_to_hhmm(start_time)
-            end_hhmm = time_to_hhmm(end_time)
-
             # Default to weekdays if not specified
             if days is None:
                 days = [1, 2, 3, 4, 5]  # Monday-Friday
 
-            # Check if schedule already exists with same configuration
-            existing_schedules = playlist_info.get("schedule_items", [])
+            schedule_item = build_schedule_item(start_time, end_time, days, start_date, end_date)
 
             # Check if we already have this exact schedule
-            schedule_exists = False
-            for schedule in existing_schedules:
-                if (schedule.get("start_time") == start_hhmm and
-                    schedule.get("end_time") == end_hhmm and
-                    sorted(schedule.get("days", [])) == sorted(days) and
-                    schedule.get("start_date") == start_date and
-                    schedule.get("end_date") == end_date):
-                    schedule_exists = True
-                    date_info = f" from {start_date} to {end_date}" if start_date else ""
-                    logger.info(
-                        f"✓ Schedule already exists for '{playlist_name}' "
-                        f"({start_time}-{end_time} on days {days}{date_info})"
-                    )
-                    break
-
-            if schedule_exists:
+            if schedule_exists(playlist_info.get("schedule_items", []), schedule_item):
+                date_info = f" from {start_date} to {end_date}" if start_date else ""
+                logger.info(
+                    f"✓ Schedule already exists for '{playlist_name}' "
+                    f"({start_time}-{end_time} on days {days}{date_info})"
+                )
                 # Schedule already configured - skip update
                 return True
 
-            # Build schedule_items array - REPLACE all existing schedules with just this one
-            # This ensures idempotency - we don't accumulate duplicate schedules
-            schedule_item = {
-                "start_time": start_hhmm,
-                "end_time": end_hhmm,
-                "start_date": start_date,  # YYYY-MM-DD format or None for recurring
-                "end_date": end_date,      # YYYY-MM-DD format or None for recurring
-                "days": days,
-                "loop_once": False,
-            }
-
             # Update playlist with schedule (replaces all existing schedule_items)
             endpoint = f"/station/{self.station_id}/playlist/{playlist_id}"
             data = {
@@ -740,6 +1015,7 @@ class AzuraCastSync:
             playlist: List of Track instances to add to the playlist.
         """
         self.clear_playlist_by_name(playlist_name)
+        playlist_info: Optional[Dict[str, Any]] = self.get_playlist(playlist_name)
 
         with tqdm(
             total=len(playlist), desc=f"Syncing playlist '{playlist_name}'", unit="track"
@@ -747,7 +1023,6 @@ class AzuraCastSync:
             for track in playlist:
                 try:
                     if "azuracast_file_id" in track:
-                        playlist_info: Optional[Dict[str, Any]] = self.get_playlist(playlist_name)
                         if playlist_info:
                             self.add_to_playlist(track["azuracast_file_id"], playlist_info["id"])
                             logger.debug(
@@ -756,12 +1031,10 @@ class AzuraCastSync:
                                 playlist_name,
                             )
                         else:
-                            created_playlist: Optional[Dict[str, Any]] = self.create_playlist(
-                                playlist_name
-                            )
-                            if created_playlist:
+                            playlist_info = self.create_playlist(playlist_name)
+                            if playlist_info:
                                 self.add_to_playlist(
-                                    track["azuracast_file_id"], created_playlist["id"]
+                                    track["azuracast_file_id"], playlist_info["id"]
                                 )
                                 logger.debug(
                                     "Created and added '%s' to new '%s' playlist in Azuracast.",
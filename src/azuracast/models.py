@@ -164,6 +164,9 @@ class KnownTracksCache:
         tracks: List of track dictionaries from AzuraCast API
         fetched_at: Unix timestamp when cache was last refreshed
         ttl_seconds: Time-to-live in seconds (default: 300 = 5 minutes)
+        index: Dedup index derived from tracks (built on demand)
+        etag: ETag validator of the snapshot, used for conditional revalidation
+        last_modified: Last-Modified validator of the snapshot
 
     Example:
         >>> cache = KnownTracksCache(ttl_seconds=300)
@@ -178,6 +181,9 @@ class KnownTracksCache:
     tracks: list[dict[str, Any]] = field(default_factory=list)
     fetched_at: float = field(default_factory=time.time)
     ttl_seconds: int = 300  # 5 minutes default
+    index: Optional["DedupIndex"] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
 
     def is_expired(self) -> bool:
         """Check if cache has exceeded TTL.
@@ -239,6 +245,7 @@ class KnownTracksCache:
         """
         self.tracks = new_tracks
         self.fetched_at = time.time()
+        self.index = None
 
     def invalidate(self) -> None:
         """Force cache expiration.
@@ -258,3 +265,78 @@ class KnownTracksCache:
         """
         self.fetched_at = 0.0
         self.tracks = []
+        self.index = None
+        self.etag = None
+        self.last_modified = None
+
+
+@dataclass
+class DedupIndex:
+    """Pre-built lookup indices over known tracks for O(1) duplicate detection.
+
+    Derived from a known tracks snapshot and persisted alongside it, so detection
+    does not rebuild its indices for every source track.
+
+    Attributes:
+        by_mbid: Normalized MusicBrainz Track ID -> AzuraCast file IDs
+        by_fingerprint: Normalized "artist|album|title" fingerprint -> AzuraCast file IDs
+        by_id: AzuraCast file ID (as string) -> track dictionary (rebuilt, not persisted)
+
+    Example:
+        >>> index = DedupIndex(by_mbid={"abc": ["1"]})
+        >>> index.by_mbid["abc"]
+        ['1']
+    """
+
+    by_mbid: dict[str, list[str]] = field(default_factory=dict)
+    by_fingerprint: dict[str, list[str]] = field(default_factory=dict)
+    by_id: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize the persistable indices.
+
+        Returns:
+            Dictionary with "mbid" and "fingerprint" index mappings
+        """
+        return {"mbid": self.by_mbid, "fingerprint": self.by_fingerprint}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], tracks: list[dict[str, Any]]) -> "DedupIndex":
+        """Restore indices persisted with :meth:`to_dict` for the given tracks.
+
+        Args:
+            data: Serialized indices
+            tracks: Track list the indices were built from
+
+        Returns:
+            DedupIndex with the ID lookup rebuilt from tracks
+        """
+        return cls(
+            by_mbid=data.get("mbid", {}),
+            by_fingerprint=data.get("fingerprint", {}),
+            by_id={str(track["id"]): track for track in tracks if "id" in track},
+        )
+
+
+@dataclass(frozen=True)
+class KnownTracksResponse:
+    """Result of a (possibly conditional) known tracks fetch.
+
+    Attributes:
+        tracks: Fresh track list, or None if the server reported no change (304)
+        etag: ETag validator returned by the server, if any
+        last_modified: Last-Modified validator returned by the server, if any
+
+    Example:
+        >>> KnownTracksResponse(tracks=None, etag='"abc"').not_modified
+        True
+    """
+
+    tracks: Optional[list[dict[str, Any]]]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        """True if the server confirmed the cached snapshot is still current."""
+        return self.tracks is None
@@ -5,7 +5,11 @@ import json
 import hashlib
 import sqlite3
 import threading
-from typing import List, Dict, Optional, Tuple, Any
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Any
 from logger import setup_logging
 
 setup_logging()
@@ -21,22 +25,87 @@ API_SECRET = os.getenv("LAST_FM_API_SECRET")
 USERNAME = os.getenv("LAST_FM_USERNAME", "")
 PASSWORD_HASH = pylast.md5(os.getenv("LAST_FM_PASSWORD", ""))
 CACHE_DB_FILE = os.getenv("LAST_FM_CACHE_FILE", "lastfm_cache.db")
+# Last.fm allows an average of 5 requests per second per API key
+RATE_LIMIT = int(os.getenv("LAST_FM_RATE_LIMIT", "5"))
+PREFETCH_WORKERS = int(os.getenv("LAST_FM_PREFETCH_WORKERS", "8"))
 
 
-class LastFMCache:
-    """Simple cache to store LastFM responses to minimize API traffic."""
+def normalize_cache_text(text: str) -> str:
+    """Normalizes an artist or track name for use in a cache key.
+
+    Applies Unicode NFKC, case folding and whitespace collapsing so that
+    near-duplicate spellings ("The Beatles", " the  beatles") share an entry.
+    Non-Latin characters are kept, so distinct titles never collide.
+
+    Args:
+        text: Artist or track name.
+
+    Returns:
+        The normalized text.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
 
-    def __init__(self, cache_file: str = "lastfm_cache.db") -> None:
+class LastFMCache:
+    """Cache of LastFM responses to minimize API traffic.
+
+    Each thread gets its own SQLite connection on a WAL-mode database, so
+    concurrent readers never block and writers do not share a connection.
+    Entries carry the time they were stored; entries older than the TTL are
+    treated as misses, so the next read refreshes them from Last.fm.
+    Negative results (unknown tracks, no similar tracks) are cached as empty
+    lists with their own, shorter TTL, so known misses are not re-queried on
+    every run but are still rechecked now and then.
+    """
+
+    def __init__(
+        self,
+        cache_file: str = "lastfm_cache.db",
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+    ) -> None:
         """Initializes the LastFMCache with an SQLite database.
 
         Args:
             cache_file: Path to the SQLite database file.
+            ttl: Seconds an entry stays fresh (defaults to LAST_FM_CACHE_TTL_DAYS, 30 days;
+                0 disables expiry).
+            negative_ttl: Seconds a negative entry stays fresh (defaults to
+                LAST_FM_NEGATIVE_TTL_DAYS, 7 days; 0 disables expiry).
         """
         self.cache_file = cache_file
-        self.connection = sqlite3.connect(self.cache_file, check_same_thread=False)
+        if ttl is None:
+            ttl = float(os.getenv("LAST_FM_CACHE_TTL_DAYS", "30")) * 86400
+        if negative_ttl is None:
+            negative_ttl = float(os.getenv("LAST_FM_NEGATIVE_TTL_DAYS", "7")) * 86400
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
         self.local = threading.local()
+        # Connections by the thread that opened them
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
         self._init_db()
 
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's database connection, opened on first use."""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.cache_file, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.close_idle_connections()
+            with self._connections_lock:
+                self._connections[threading.current_thread()] = connection
+        return connection
+
+    def close_idle_connections(self) -> None:
+        """Closes the connections of threads that have exited (e.g. finished worker pools)."""
+        with self._connections_lock:
+            for thread in [thread for thread in self._connections if not thread.is_alive()]:
+                self._connections.pop(thread).close()
+
     def _init_db(self) -> None:
         """Initializes the database and creates tables if they don't exist."""
         with self.connection as conn:
@@ -48,7 +117,15 @@ class LastFMCache:
                 )
             """
             )
-            conn.commit()
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+            if "cached_at" not in columns:
+                # Entries from before timestamps were recorded count as expired
+                conn.execute("ALTER TABLE cache ADD COLUMN cached_at REAL NOT NULL DEFAULT 0")
+            # Seed names, so entries can be read back as a similarity graph
+            if "artist" not in columns:
+                conn.execute("ALTER TABLE cache ADD COLUMN artist TEXT")
+            if "track" not in columns:
+                conn.execute("ALTER TABLE cache ADD COLUMN track TEXT")
 
     def _get_network(self) -> Optional[pylast.LastFMNetwork]:
         """Gets the thread-local network context for cache deserialization.
@@ -69,6 +146,9 @@ class LastFMCache:
     def get_cache_key(self, artist_name: str, track_name: str) -> str:
         """Generates a unique cache key for the given artist and track.
 
+        Names are normalized first, so case and whitespace variants of the
+        same track share a key.
+
         Args:
             artist_name: Name of the artist.
             track_name: Name of the track.
@@ -76,27 +156,37 @@ class LastFMCache:
         Returns:
             A unique cache key.
         """
-        key = f"{artist_name}-{track_name}"
+        key = f"{normalize_cache_text(artist_name)}\x1f{normalize_cache_text(track_name)}"
         return hashlib.md5(key.encode("utf-8")).hexdigest()
 
-    def get(self, artist_name: str, track_name: str) -> Optional[List[Dict[str, str]]]:
+    def get(
+        self, artist_name: str, track_name: str, allow_expired: bool = False
+    ) -> Optional[List[Dict[str, str]]]:
         """Retrieves cached data for a given artist and track.
 
         Args:
             artist_name: Name of the artist.
             track_name: Name of the track.
+            allow_expired: Return entries older than the TTL too (e.g. when
+                Last.fm cannot be reached to refresh them).
 
         Returns:
-            A list of dictionaries representing similar tracks, or None if not in cache.
+            A list of dictionaries representing similar tracks (empty for a
+            cached negative result), or None if not in cache or expired.
         """
         key = self.get_cache_key(artist_name, track_name)
-        cursor = self.connection.execute("SELECT data FROM cache WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        if row:
-            similar_tracks = json.loads(row[0])
-            logger.debug(f"Retrieved from cache: {similar_tracks}")
-            return similar_tracks
-        return None
+        row = self.connection.execute(
+            "SELECT data, cached_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+        similar_tracks = json.loads(row[0])
+        ttl = self.ttl if similar_tracks else self.negative_ttl
+        if not allow_expired and ttl and time.time() - row[1] > ttl:
+            logger.debug(f"Cache entry expired for {artist_name} - {track_name}")
+            return None
+        logger.debug(f"Retrieved from cache: {similar_tracks}")
+        return similar_tracks
 
     def set(self, artist_name: str, track_name: str, similar_tracks: List[Dict[str, str]]) -> None:
         """Caches similar tracks for a given artist and track.
@@ -104,30 +194,58 @@ class LastFMCache:
         Args:
             artist_name: Name of the artist.
             track_name: Name of the track.
-            similar_tracks: List of similar tracks.
+            similar_tracks: List of similar tracks; an empty list records a
+                negative result.
         """
         key = self.get_cache_key(artist_name, track_name)
         data_json = json.dumps(similar_tracks)
         try:
-            with self.connection:
-                self.connection.execute(
+            with self.connection as conn:
+                conn.execute(
                     """
-                    INSERT OR REPLACE INTO cache (key, data) 
-                    VALUES (?, ?)
+                    INSERT OR REPLACE INTO cache (key, data, cached_at, artist, track)
+                    VALUES (?, ?, ?, ?, ?)
                 """,
-                    (key, data_json),
+                    (key, data_json, time.time(), artist_name, track_name),
                 )
                 logger.debug(f"Cached data for {artist_name} - {track_name}")
         except Exception as e:
             logger.error(f"Failed to set cache for {artist_name} - {track_name}: {e}")
 
+    def iter_entries(self) -> Iterator[Tuple[str, str, List[Dict[str, str]]]]:
+        """Yields every cached seed with its similar tracks, expired entries included.
+
+        Entries stored before seed names were recorded are skipped.
+
+        Yields:
+            (artist, track, similar tracks) tuples.
+        """
+        rows = self.connection.execute(
+            "SELECT artist, track, data FROM cache WHERE artist IS NOT NULL AND track IS NOT NULL"
+        )
+        for artist_name, track_name, data in rows:
+            try:
+                yield artist_name, track_name, json.loads(data)
+            except ValueError as e:
+                logger.warning(
+                    f"Skipping unreadable cache entry for {artist_name} - {track_name}: {e}"
+                )
+
+    def close(self) -> None:
+        """Closes every thread's connection."""
+        with self._connections_lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections.clear()
+        self.local = threading.local()
+
     def __enter__(self) -> "LastFMCache":
         """Enter the runtime context for this object."""
         return self
 
     def __exit__(self, exc_type, exc_value, traceback) -> None:
         """Exit the runtime context, clean up resources."""
-        self.connection.close()
+        self.close()
 
 
 class LastFM:
@@ -144,6 +262,12 @@ class LastFM:
                 password_hash=PASSWORD_HASH,
             )
         self.cache = LastFMCache(CACHE_DB_FILE)
+        self.rate_limit = RATE_LIMIT
+        self._request_times: deque = deque(maxlen=max(RATE_LIMIT, 1))
+        self._rate_lock = threading.Lock()
+        # Requests saved by cached negative results
+        self.avoided_calls = 0
+        self._avoided_lock = threading.Lock()
         if self.network:
             self.cache.set_network(
                 self.network
@@ -164,11 +288,14 @@ class LastFM:
             return []
 
         cached_result = self.cache.get(artist_name, track_name)
-        if cached_result:
+        if cached_result is not None:
             logger.debug(f"Cache hit for Artist: {artist_name}, Track: {track_name}")
+            if not cached_result:
+                self._count_avoided_call()
             return cached_result
 
         try:
+            self._apply_rate_limit()
             track = self.network.get_track(artist_name, track_name)
             similar_tracks = track.get_similar()
 
@@ -195,15 +322,91 @@ class LastFM:
                 logger.debug(
                     f"Failed to retrieve similar tracks for {artist_name} - {track_name}: {e}"
                 )
-            else:
-                logger.warning(
-                    f"Failed to retrieve similar tracks for {artist_name} - {track_name}: {e}"
-                )
-            return []
+                self.cache.set(artist_name, track_name, [])
+                return []
+            logger.warning(
+                f"Failed to retrieve similar tracks for {artist_name} - {track_name}: {e}"
+            )
+            # Fall back to an expired entry rather than nothing
+            return self.cache.get(artist_name, track_name, allow_expired=True) or []
 
         except Exception as e:
             logger.error(f"An unexpected error occurred: {e}")
-            return []
+            return self.cache.get(artist_name, track_name, allow_expired=True) or []
+
+    def _count_avoided_call(self) -> None:
+        """Record a Last.fm request saved by a cached negative result."""
+        with self._avoided_lock:
+            self.avoided_calls += 1
+
+    def _apply_rate_limit(self) -> None:
+        """Wait until another Last.fm request fits within the rate limit.
+
+        Uses a sliding one-second window shared by all threads, so concurrent
+        prefetching stays within Last.fm's published limit.
+        """
+        if self.rate_limit <= 0:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            if len(self._request_times) >= self.rate_limit:
+                sleep_time = 1.0 - (now - self._request_times[0])
+                if sleep_time > 0:
+                    logger.debug(f"Last.fm rate limit reached, sleeping for {sleep_time:.3f}s")
+                    time.sleep(sleep_time)
+            self._request_times.append(time.monotonic())
+
+    def prefetch_similar_tracks(
+        self, seeds: Iterable[Tuple[str, str]], max_workers: int = PREFETCH_WORKERS
+    ) -> int:
+        """Resolves similar tracks for many seeds concurrently into the cache.
+
+        Seeds already cached, including known misses, are skipped; the rest are
+        fetched by a thread pool, rate limited to Last.fm's published limit, and
+        stored in the cache so later get_similar_tracks() calls return without
+        a round trip.
+
+        Args:
+            seeds: (artist, title) pairs.
+            max_workers: Concurrent requests in flight.
+
+        Returns:
+            Number of seeds fetched from Last.fm.
+        """
+        if self.network is None:
+            logger.error("Network is not initialized")
+            return 0
+
+        pending = []
+        known_misses = 0
+        seen = set()
+        for artist_name, track_name in seeds:
+            key = self.cache.get_cache_key(artist_name, track_name)
+            if key in seen:
+                continue
+            seen.add(key)
+            cached = self.cache.get(artist_name, track_name)
+            if cached is None:
+                pending.append((artist_name, track_name))
+            elif not cached:
+                known_misses += 1
+
+        if known_misses:
+            with self._avoided_lock:
+                self.avoided_calls += known_misses
+            logger.info(f"Skipping {known_misses} seeds Last.fm recently had no similar tracks for")
+        if not pending:
+            return 0
+
+        logger.info(
+            f"Prefetching similar tracks for {len(pending)} of {len(seen)} seeds "
+            f"({max_workers} workers, {self.rate_limit} requests/s)"
+        )
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lastfm") as executor:
+            list(executor.map(lambda seed: self.get_similar_tracks(*seed), pending))
+        # The worker threads have exited with the executor
+        self.cache.close_idle_connections()
+        return len(pending)
 
     def set_network(self, network: pylast.LastFMNetwork) -> None:
         """Sets the network context for cache deserialization.
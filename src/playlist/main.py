@@ -5,7 +5,7 @@ import logging
 import requests
 from collections import defaultdict, Counter
 from datetime import datetime
-from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 from tqdm import tqdm
 from dateutil.parser import parse
 from util.main import normalize_filename, write_m3u_playlist
@@ -27,6 +27,8 @@ class PlaylistManager:
         """Initializes PlaylistManager with empty tracks and playlists."""
         self.tracks: List["Track"] = []
         self.track_map: Dict[str, "Track"] = {}
+        # (lowercased title, lowercased album artist) -> track, built on first lookup
+        self._title_artist_index: Optional[Dict[Tuple[str, str], "Track"]] = None
         self.genres: Dict[str, List[str]] = defaultdict(list)
         self.playlists: Dict[str, Dict[str, List["Track"]]] = {
             "genres": defaultdict(list),
@@ -53,6 +55,7 @@ class PlaylistManager:
         if "Id" not in track:
             raise ValueError("Track must have an 'Id' field.")
         self.track_map[track["Id"]] = track
+        self._title_artist_index = None
         if track not in self.tracks:
             self.tracks.append(track)
 
@@ -121,14 +124,15 @@ class PlaylistManager:
         Returns:
             The track metadata dictionary if found, None otherwise.
         """
-        for track in self.track_map.values():
-            track_name = track.get("Name")
-            album_artist = track.get("AlbumArtist")
-
-            if isinstance(track_name, str) and isinstance(album_artist, str):
-                if track_name.lower() == title.lower() and album_artist.lower() == artist.lower():
-                    return track
-        return None
+        if self._title_artist_index is None:
+            index: Dict[Tuple[str, str], "Track"] = {}
+            for track in self.track_map.values():
+                track_name = track.get("Name")
+                album_artist = track.get("AlbumArtist")
+                if isinstance(track_name, str) and isinstance(album_artist, str):
+                    index.setdefault((track_name.lower(), album_artist.lower()), track)
+            self._title_artist_index = index
+        return self._title_artist_index.get((title.lower(), artist.lower()))
 
     def fetch_tracks(self) -> None:
         """Fetch tracks from configured music source (Subsonic or Emby)."""
@@ -442,6 +446,7 @@ class PlaylistManager:
         """Exit the runtime context, clean up resources."""
         self.tracks.clear()
         self.track_map.clear()
+        self._title_artist_index = None
         self.genres.clear()
         self.playlists.clear()
         self.artist_counter.clear()
@@ -0,0 +1,151 @@
+# src/radioplaylist/graph.py
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from lastfm.main import normalize_cache_text
+
+# Resolves (title, artist) to a library track id, or None if not in the library
+Resolver = Callable[[str, str], Optional[str]]
+
+
+def resolve_similar(
+    artist_name: str, similar_tracks: Iterable[Dict[str, str]], resolve: Resolver
+) -> List[str]:
+    """Resolves Last.fm similar tracks of a seed track to library track ids.
+
+    Similar tracks that are not in the library, or are by the seed's own
+    artist, are dropped.
+
+    Args:
+        artist_name: Artist of the seed track.
+        similar_tracks: Last.fm similar tracks ({"artist", "title"} dicts).
+        resolve: Maps (title, artist) to a library track id.
+
+    Returns:
+        Library ids of the similar tracks, most similar first.
+    """
+    seed_artist = normalize_cache_text(artist_name)
+    similar_ids = []
+    for similar_track in similar_tracks:
+        similar_artist = similar_track.get("artist")
+        similar_title = similar_track.get("title")
+        if not isinstance(similar_artist, str) or not isinstance(similar_title, str):
+            continue
+        if normalize_cache_text(similar_artist) == seed_artist:
+            continue
+        similar_id = resolve(similar_title, similar_artist)
+        if similar_id is not None:
+            similar_ids.append(similar_id)
+    return similar_ids
+
+
+class SimilarityGraph:
+    """Directed track-similarity graph over library track ids.
+
+    Each node lists the library tracks Last.fm considers similar to it, most
+    similar first. Built once from the Last.fm cache, it answers similar-track
+    queries without network calls or title/artist matching, and can be
+    expanded transitively.
+    """
+
+    def __init__(self) -> None:
+        """Initializes an empty graph."""
+        self.edges: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    def __contains__(self, track_id: object) -> bool:
+        return track_id in self.edges
+
+    @property
+    def edge_count(self) -> int:
+        """Total number of edges."""
+        return sum(len(similar) for similar in self.edges.values())
+
+    def add_edges(self, track_id: str, similar_ids: Iterable[str]) -> None:
+        """Records the similar tracks of a track, replacing any earlier edges.
+
+        Args:
+            track_id: Library id of the seed track.
+            similar_ids: Library ids of similar tracks, most similar first.
+        """
+        self.edges[track_id] = [
+            similar_id for similar_id in dict.fromkeys(similar_ids) if similar_id != track_id
+        ]
+
+    def neighbors(self, track_id: str) -> List[str]:
+        """Returns the tracks directly similar to a track.
+
+        Args:
+            track_id: Library track id.
+
+        Returns:
+            Similar track ids, most similar first (empty for unknown tracks).
+        """
+        return list(self.edges.get(track_id, []))
+
+    def expand(
+        self,
+        track_id: str,
+        depth: int = 1,
+        limit: Optional[int] = None,
+        first_hop: Optional[Iterable[str]] = None,
+    ) -> List[str]:
+        """Returns tracks reachable from a track, breadth first.
+
+        Args:
+            track_id: Library track id to start from.
+            depth: Maximum number of hops (1 for direct neighbours only).
+            limit: Maximum number of ids to return (None for no limit).
+            first_hop: Neighbours of the start track to use instead of its
+                edges, e.g. for a track that is not in the graph.
+
+        Returns:
+            Reachable track ids, nearest first, excluding the start track.
+        """
+        found: List[str] = []
+        visited = {track_id}
+        queue: deque = deque([(track_id, 0)])
+        while queue:
+            current, distance = queue.popleft()
+            if distance >= depth:
+                continue
+            if first_hop is not None and current == track_id:
+                neighbours = first_hop
+            else:
+                neighbours = self.edges.get(current, [])
+            for similar_id in neighbours:
+                if similar_id in visited:
+                    continue
+                visited.add(similar_id)
+                found.append(similar_id)
+                if limit is not None and len(found) >= limit:
+                    return found
+                queue.append((similar_id, distance + 1))
+        return found
+
+    @classmethod
+    def from_entries(
+        cls, entries: Iterable[Tuple[str, str, List[Dict[str, str]]]], resolve: Resolver
+    ) -> "SimilarityGraph":
+        """Builds a graph from Last.fm similar-track results.
+
+        Seeds and similar tracks that are not in the library are dropped, as are
+        similar tracks by the seed's own artist.
+
+        Args:
+            entries: (artist, title, similar tracks) tuples, e.g. from
+                LastFMCache.iter_entries().
+            resolve: Maps (title, artist) to a library track id.
+
+        Returns:
+            The similarity graph.
+        """
+        graph = cls()
+        for artist_name, track_name, similar_tracks in entries:
+            track_id = resolve(track_name, artist_name)
+            if track_id is None:
+                continue
+            graph.add_edges(track_id, resolve_similar(artist_name, similar_tracks, resolve))
+        return graph
@@ -1,8 +1,12 @@
 import logging
 import os
 import random
-from typing import Dict, List, Optional, Set, TYPE_CHECKING
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
 from logger import setup_logging
+from radioplaylist.graph import SimilarityGraph, resolve_similar
+from radioplaylist.matcher import RejectMatcher
 
 if TYPE_CHECKING:
     from playlist.main import PlaylistManager
@@ -12,6 +16,17 @@ if TYPE_CHECKING:
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Seed tracks sampled per playlist genre for the Last.fm prefetch
+PREFETCH_SEEDS_PER_GENRE = int(os.getenv("RADIO_PREFETCH_SEEDS", "100"))
+# Playlists generated concurrently by generate_playlists()
+GENERATION_WORKERS = int(os.getenv("RADIO_WORKERS", "4"))
+# Base seed for reproducible playlists (unset for a fresh selection each run)
+RANDOM_SEED = os.getenv("RADIO_SEED") or None
+# Hops followed through the similarity graph when expanding a seed track
+SIMILARITY_DEPTH = int(os.getenv("RADIO_SIMILARITY_DEPTH", "2"))
+# Similar tracks considered per seed track (Last.fm returns up to 100)
+SIMILAR_TRACK_LIMIT = 100
+
 
 class RadioPlaylistGenerator:
     def __init__(
@@ -19,6 +34,7 @@ class RadioPlaylistGenerator:
         playlist_manager: "PlaylistManager",
         lastfm_client: "LastFM",
         azuracast_sync: "AzuraCastSync",
+        seed: Optional[str] = RANDOM_SEED,
     ) -> None:
         """
         Initializes the RadioPlaylistGenerator with PlaylistManager, LastFM client, and AzuraCast sync.
@@ -27,13 +43,26 @@ class RadioPlaylistGenerator:
             playlist_manager: An instance of PlaylistManager
             lastfm_client: An instance of LastFM
             azuracast_sync: An instance of AzuraCastSync
+            seed: Base seed for reproducible playlists (defaults to RADIO_SEED)
         """
         self.playlist_manager = playlist_manager
         self.lastfm = lastfm_client
         self.azuracast_sync = azuracast_sync
+        self.seed = seed
         self.playlists: Dict[str, List[str]] = self.load_playlists_from_env()
         self.general_rejects: Dict[str, List[str]] = self.load_general_rejects()
         self.specific_rejects: Dict[str, List[str]] = self.load_specific_rejects()
+        # Reject-filtered, shuffled candidates per (playlist name, genre), drawn
+        # without replacement from the end
+        self.candidate_pools: Dict[Tuple[str, str], List[Dict[str, str]]] = {}
+        self.prefetched: Set[Tuple[str, str]] = set()
+        # Compiled (title/album, artist) reject matchers per playlist name
+        self.reject_matchers: Dict[str, Tuple[RejectMatcher, RejectMatcher]] = {}
+        # Reject verdicts per (playlist name, track id)
+        self.reject_verdicts: Dict[Tuple[str, str], bool] = {}
+        # Library track similarity, built from the Last.fm cache on first use
+        self.similarity_graph: Optional[SimilarityGraph] = None
+        self._graph_lock = threading.Lock()
 
     def load_playlists_from_env(self) -> Dict[str, List[str]]:
         """Load playlists and their corresponding genres from environment variables."""
@@ -97,15 +126,139 @@ class RadioPlaylistGenerator:
         name_parts = key[len("RADIO_PLAYLIST_") :].split("_")
         return " ".join(word.capitalize() for word in name_parts)
 
-    def _get_random_track_by_genre(self, genre: str) -> Optional[Dict[str, str]]:
+    def _make_rng(self, *scope: str) -> random.Random:
+        """Create a random generator for one playlist (and optionally one genre).
+
+        With a base seed, each scope gets its own derived seed, so a playlist's
+        selection does not depend on which other playlists are generated or in
+        what order.
+
+        Args:
+            scope: Playlist name, optionally followed by a genre.
+
+        Returns:
+            A seeded generator, or an unseeded one when no base seed is set.
+        """
+        if self.seed is None:
+            return random.Random()
+        return random.Random("\x1f".join((str(self.seed), *scope)))
+
+    def _get_candidate_pool(self, playlist_name: str, genre: str) -> List[Dict[str, str]]:
+        """Return the candidate pool for a playlist genre, building it on first use.
+
+        The genre's tracks are checked against the reject rules once and
+        shuffled; tracks are then drawn from the end of the list.
+
+        Args:
+            playlist_name: Name of the playlist.
+            genre: Genre of the pool.
+
+        Returns:
+            The remaining candidates, in random order.
+        """
+        key = (playlist_name, genre)
+        pool = self.candidate_pools.get(key)
+        if pool is None:
+            tracks_in_genre = self.playlist_manager.get_tracks_by_genre(genre)
+            pool = [
+                track for track in tracks_in_genre if not self._is_rejected(track, playlist_name)
+            ]
+            self._make_rng(playlist_name, genre).shuffle(pool)
+            self.candidate_pools[key] = pool
+            logger.debug(
+                f"Candidate pool for '{playlist_name}' / {genre}: {len(pool)} tracks, "
+                f"{len(tracks_in_genre) - len(pool)} rejected"
+            )
+        return pool
+
+    def _collect_seed_tracks(self, playlist_name: str, genre: str) -> List[Dict[str, str]]:
+        """Return the seed tracks generation will draw next for a playlist genre.
+
+        Args:
+            playlist_name: Name of the playlist.
+            genre: Genre to sample from.
+
+        Returns:
+            Up to PREFETCH_SEEDS_PER_GENRE tracks from the end of the candidate pool.
+        """
+        return self._get_candidate_pool(playlist_name, genre)[-PREFETCH_SEEDS_PER_GENRE:]
+
+    def prefetch_similar_tracks(self, playlist_names: Optional[Iterable[str]] = None) -> int:
+        """Warm the Last.fm cache with similar tracks for each playlist's seed tracks.
+
+        Seed tracks are sampled per playlist genre and resolved concurrently by
+        the LastFM client; generate_playlist() then draws its seeds from them,
+        so its similar-track lookups hit the cache.
+
+        Args:
+            playlist_names: Playlists to prefetch (default: all RADIO_PLAYLIST_* playlists).
+
+        Returns:
+            Number of seeds fetched from Last.fm.
+        """
+        names = list(playlist_names) if playlist_names is not None else list(self.playlists)
+        return self._prefetch(
+            (name, genre) for name in names for genre in self.playlists.get(name, [])
+        )
+
+    def _prefetch(self, playlist_genres: Iterable[Tuple[str, str]]) -> int:
+        """Collect seeds for (playlist, genre) pairs not yet prefetched and resolve them.
+
+        Args:
+            playlist_genres: (playlist name, genre) pairs.
+
+        Returns:
+            Number of seeds fetched from Last.fm.
+        """
+        seeds: List[Tuple[str, str]] = []
+        for playlist_genre in playlist_genres:
+            if playlist_genre in self.prefetched:
+                continue
+            self.prefetched.add(playlist_genre)
+            tracks = self._collect_seed_tracks(*playlist_genre)
+            for track in tracks:
+                artist = track.get("AlbumArtist")
+                title = track.get("Name")
+                if isinstance(artist, str) and isinstance(title, str):
+                    if artist.strip() and title.strip():
+                        seeds.append((artist.strip(), title.strip()))
+
+        if not seeds:
+            return 0
+        try:
+            return self.lastfm.prefetch_similar_tracks(seeds)
+        except Exception as e:
+            logger.error("An unexpected error occurred while prefetching similar tracks: %s", e)
+            return 0
+
+    def _get_random_track_by_genre(
+        self,
+        genre: str,
+        playlist_name: Optional[str] = None,
+        exclude: Optional[Set[str]] = None,
+    ) -> Optional[Dict[str, str]]:
         """Return a random track from the playlist manager that matches the specified genre.
 
+        With a playlist name, the track is drawn without replacement from the
+        playlist's reject-filtered candidate pool, whose next tracks are the
+        prefetched seeds.
+
         Args:
             genre: Genre to filter tracks.
+            playlist_name: Playlist whose candidate pool to draw from.
+            exclude: Track IDs to skip (e.g. already in the playlist).
 
         Returns:
             A random track dictionary or None if no tracks are found.
         """
+        if playlist_name is not None:
+            pool = self._get_candidate_pool(playlist_name, genre)
+            while pool:
+                track = pool.pop()
+                if not exclude or track["Id"] not in exclude:
+                    return track
+            return None
+
         tracks_in_genre = self.playlist_manager.get_tracks_by_genre(genre)
         if not tracks_in_genre:
             return None
@@ -182,6 +335,100 @@ class RadioPlaylistGenerator:
             logger.error("An unexpected error occurred while retrieving similar tracks: %s", e)
             return []
 
+    def build_similarity_graph(self) -> SimilarityGraph:
+        """Build the similarity graph from every entry in the Last.fm cache.
+
+        Entries are resolved to library track ids once, so expanding a seed
+        track during generation needs no network call or title/artist lookup.
+
+        Returns:
+            The new graph (also stored as similarity_graph).
+        """
+        try:
+            graph = SimilarityGraph.from_entries(
+                self.lastfm.cache.iter_entries(), self._resolve_track_id
+            )
+        except Exception as e:
+            logger.error("An unexpected error occurred while building the similarity graph: %s", e)
+            graph = SimilarityGraph()
+        logger.info(f"Similarity graph: {len(graph)} tracks, {graph.edge_count} edges")
+        self.similarity_graph = graph
+        return graph
+
+    def _resolve_track_id(self, title: str, artist: str) -> Optional[str]:
+        """Return the library id of a track by title and artist, or None."""
+        track = self.playlist_manager.get_track_by_title_and_artist(title, artist)
+        return track["Id"] if track else None
+
+    def _get_similarity_graph(self) -> SimilarityGraph:
+        """Return the similarity graph, building it on first use."""
+        with self._graph_lock:
+            if self.similarity_graph is None:
+                self.build_similarity_graph()
+            return self.similarity_graph
+
+    def _get_similar_library_tracks(self, track: Dict[str, str]) -> List[Dict[str, str]]:
+        """Return library tracks similar to a track, nearest first.
+
+        Tracks missing from the similarity graph are looked up through Last.fm
+        (and its cache) and expanded from there. The graph itself is never
+        changed during generation, so concurrently generated playlists all
+        expand over the same snapshot and seeded output does not depend on
+        thread scheduling.
+
+        Args:
+            track: The track information dictionary.
+
+        Returns:
+            Similar library tracks, up to SIMILARITY_DEPTH hops away.
+        """
+        graph = self._get_similarity_graph()
+        track_map = self.playlist_manager.track_map
+        track_id = track.get("Id")
+        first_hop = None
+        if track_id not in graph:
+            first_hop = resolve_similar(
+                track.get("AlbumArtist") or "",
+                self._get_similar_tracks(track),
+                self._resolve_track_id,
+            )
+
+        return [
+            track_map[similar_id]
+            for similar_id in graph.expand(
+                track_id, SIMILARITY_DEPTH, SIMILAR_TRACK_LIMIT, first_hop=first_hop
+            )
+            if similar_id in track_map
+        ]
+
+    def _get_reject_matchers(self, playlist_name: str) -> Tuple[RejectMatcher, RejectMatcher]:
+        """Compile the general and playlist-specific reject rules for a playlist.
+
+        Args:
+            playlist_name: The name of the playlist.
+
+        Returns:
+            Matchers for title/album keywords and for artist keywords.
+        """
+        matchers = self.reject_matchers.get(playlist_name)
+        if matchers is None:
+            matchers = (
+                RejectMatcher(
+                    [
+                        *(self.general_rejects.get("reject_playlist") or []),
+                        *self.specific_rejects.get(f"{playlist_name}_playlist", []),
+                    ]
+                ),
+                RejectMatcher(
+                    [
+                        *(self.general_rejects.get("reject_artist") or []),
+                        *self.specific_rejects.get(f"{playlist_name}_artist", []),
+                    ]
+                ),
+            )
+            self.reject_matchers[playlist_name] = matchers
+        return matchers
+
     def _is_rejected(self, track: Dict[str, str], playlist_name: str) -> bool:
         """Check if a track should be rejected based on general and specific reject rules.
 
@@ -196,6 +443,10 @@ class RadioPlaylistGenerator:
             logger.warning("No track provided for rejection check.")
             return True
 
+        track_id = track.get("Id")
+        if track_id and (playlist_name, track_id) in self.reject_verdicts:
+            return self.reject_verdicts[(playlist_name, track_id)]
+
         try:
             track_title = track.get("Name", "").strip().lower()
             album_title = track.get("Album", "").strip().lower()
@@ -208,32 +459,15 @@ class RadioPlaylistGenerator:
             if not artist_name:
                 logger.warning("Track has no artist name or artist name is invalid: %s", track)
 
-            # General rejections
-            if any(
-                reject in track_title for reject in self.general_rejects.get("reject_playlist", [])
-            ):
-                return True
-            if any(
-                reject in album_title for reject in self.general_rejects.get("reject_playlist", [])
-            ):
-                return True
-            if any(
-                reject in artist_name for reject in self.general_rejects.get("reject_artist", [])
-            ):
-                return True
-
-            # Specific playlist rejections
-            specific_playlist_rejects = self.specific_rejects.get(f"{playlist_name}_playlist", [])
-            specific_artist_rejects = self.specific_rejects.get(f"{playlist_name}_artist", [])
-
-            if any(reject in track_title for reject in specific_playlist_rejects):
-                return True
-            if any(reject in album_title for reject in specific_playlist_rejects):
-                return True
-            if any(reject in artist_name for reject in specific_artist_rejects):
-                return True
-
-            return False
+            title_matcher, artist_matcher = self._get_reject_matchers(playlist_name)
+            rejected = (
+                title_matcher.search(track_title)
+                or title_matcher.search(album_title)
+                or artist_matcher.search(artist_name)
+            )
+            if track_id:
+                self.reject_verdicts[(playlist_name, track_id)] = rejected
+            return rejected
         except Exception as e:
             logger.error(
                 "An unexpected error occurred while checking if the track is rejected: %s", e
@@ -281,7 +515,7 @@ class RadioPlaylistGenerator:
             Returns:
                 True if track is already in playlist, False otherwise.
             """
-            return track_id in {track["Id"] for track in playlist}
+            return track_id in seen_tracks
 
         def is_track_rejected(track: Dict[str, str]) -> bool:
             """Check if the track is rejected.
@@ -305,7 +539,7 @@ class RadioPlaylistGenerator:
                 A random genre or None if no genres are available.
             """
             available_genres = [genre for genre in genres if genre not in ignored_genres]
-            return random.choice(available_genres) if available_genres else None
+            return rng.choice(available_genres) if available_genres else None
 
         def add_track_to_playlist(track: Dict[str, str], playlist: List[Dict[str, str]]) -> None:
             """Add a track to the playlist and update duration.
@@ -338,6 +572,10 @@ class RadioPlaylistGenerator:
             """
             return self._remove_year_decade_filters(genres)
 
+        # Warm the Last.fm cache for this playlist's genres before generating
+        self._prefetch((playlist_name, genre) for genre in genres)
+
+        rng = self._make_rng(playlist_name)
         playlist = []
         playlist_duration = 0
         seen_tracks: Set[str] = set()
@@ -430,7 +668,8 @@ class RadioPlaylistGenerator:
                 "",
             )
 
-            initial_track = self._get_random_track_by_genre(genre)
+            # Pools hold only non-rejected tracks, drawn without replacement
+            initial_track = self._get_random_track_by_genre(genre, playlist_name, seen_tracks)
             if not initial_track:
                 ignored_genres.add(genre)
                 # Add event to report
@@ -448,40 +687,6 @@ class RadioPlaylistGenerator:
                 retry_count += 1
                 continue
 
-            if track_already_added(initial_track["Id"]):
-                ignored_genres.add(genre)
-                # Add event to report
-                self.playlist_manager.report.add_event(
-                    playlist_name,
-                    "TRACK_ALREADY_ADDED",
-                    "",
-                    initial_track.get("AlbumArtist", ""),
-                    initial_track.get("Name", ""),
-                    genre,
-                    "",
-                    "",
-                    "",
-                )
-                retry_count += 1
-                continue
-
-            if is_track_rejected(initial_track):
-                ignored_genres.add(genre)
-                # Add event to report
-                self.playlist_manager.report.add_event(
-                    playlist_name,
-                    "TRACK_REJECTED",
-                    "",
-                    initial_track.get("AlbumArtist", ""),
-                    initial_track.get("Name", ""),
-                    genre,
-                    "",
-                    "",
-                    "",
-                )
-                retry_count += 1
-                continue
-
             retry_count = 0  # Reset retry count on successful track addition
             add_track_to_playlist(initial_track, playlist)
             # Add event to report
@@ -497,11 +702,11 @@ class RadioPlaylistGenerator:
                 "",
             )
 
-            candidate_tracks = self._get_similar_tracks(initial_track)
+            similar_tracks = self._get_similar_library_tracks(initial_track)
             self.playlist_manager.report.add_event(
                 playlist_name,
                 "SIMILAR_TRACKS_FETCHED",
-                f"Found {len(candidate_tracks)} similar tracks",
+                f"Found {len(similar_tracks)} similar tracks",
                 initial_track.get("AlbumArtist", ""),
                 initial_track.get("Name", ""),
                 genre,
@@ -509,14 +714,9 @@ class RadioPlaylistGenerator:
                 "",
                 "",
             )
-            for candidate in candidate_tracks:
-                similar_track = self.playlist_manager.get_track_by_title_and_artist(
-                    candidate["title"], candidate["artist"]
-                )
-                if (
+            for similar_track in similar_tracks:
+                if not track_already_added(similar_track["Id"]) and not is_track_rejected(
                     similar_track
-                    and not track_already_added(similar_track["Id"])
-                    and not is_track_rejected(similar_track)
                 ):
                     self.playlist_manager.report.add_event(
                         playlist_name,
@@ -531,11 +731,58 @@ class RadioPlaylistGenerator:
                     )
                     add_track_to_playlist(similar_track, playlist)
 
-                if random.random() < 0.3:
+                if rng.random() < 0.3:
                     break
 
         return playlist
 
+    def generate_playlists(
+        self,
+        min_duration: int,
+        playlist_names: Optional[Iterable[str]] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, List[Dict[str, str]]]:
+        """Generate several radio playlists concurrently.
+
+        Playlists are independent apart from the shared Last.fm cache and
+        report, so each is built on its own worker thread. Seeds for all of
+        them are prefetched from Last.fm in one batch first, and the
+        similarity graph is rebuilt from the warmed cache.
+
+        Args:
+            min_duration: Minimum duration of each playlist in seconds.
+            playlist_names: Playlists to generate (default: all RADIO_PLAYLIST_* playlists).
+            max_workers: Worker threads (defaults to RADIO_WORKERS).
+
+        Returns:
+            Generated playlists by name, in the order requested. Playlists
+            whose generation failed are left out.
+        """
+        names = list(playlist_names) if playlist_names is not None else list(self.playlists)
+        names = [name for name in names if name in self.playlists]
+        if not names:
+            return {}
+
+        self.prefetch_similar_tracks(names)
+        self.build_similarity_graph()
+
+        workers = max(1, min(max_workers or GENERATION_WORKERS, len(names)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(
+                    self.generate_playlist, self.playlists[name], min_duration, name
+                )
+                for name in names
+            }
+
+        playlists: Dict[str, List[Dict[str, str]]] = {}
+        for name, future in futures.items():
+            try:
+                playlists[name] = future.result()
+            except Exception as e:
+                logger.error("An unexpected error occurred while generating '%s': %s", name, e)
+        return playlists
+
 
 if __name__ == "__main__":
     pass  # This is here to denote where any module-level code could be added, if necessary.
@@ -0,0 +1,81 @@
+# src/radioplaylist/matcher.py
+from collections import deque
+from typing import Dict, Iterable, List
+
+
+class RejectMatcher:
+    """Aho-Corasick automaton answering "does the text contain any pattern?".
+
+    Compiling the reject keywords once lets each field be scanned in a single
+    pass, however many keywords are configured, instead of one substring
+    search per keyword.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        """Compiles the automaton.
+
+        Args:
+            patterns: Keywords to match; empty strings are ignored.
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[bool] = [False]
+        self.patterns: List[str] = []
+
+        for pattern in dict.fromkeys(patterns):
+            if pattern:
+                self.patterns.append(pattern)
+                self._insert(pattern)
+        self._link()
+
+    def _insert(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(False)
+            state = next_state
+        self._terminal[state] = True
+
+    def _link(self) -> None:
+        """Builds failure links breadth-first, folding suffix matches into terminals."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._terminal[next_state] = (
+                    self._terminal[next_state] or self._terminal[self._fail[next_state]]
+                )
+                queue.append(next_state)
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def search(self, text: str) -> bool:
+        """Check whether any pattern occurs in text.
+
+        Args:
+            text: The text to scan (already lower-cased like the patterns).
+
+        Returns:
+            True if at least one pattern is a substring of text.
+        """
+        if not self.patterns:
+            return False
+        goto, fail, terminal = self._goto, self._fail, self._terminal
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
@@ -3,5 +3,21 @@ from .main import (
     calculate_replaygain,
     apply_replaygain,
     process_replaygain,
+    process_album_replaygain,
+    measure_replaygain,
+    tag_replaygain,
+    album_replaygain,
+    audio_duration,
+    replaygain_tag_fields,
+    write_replaygain_tags,
     has_replaygain_metadata,
+    check_replaygain_metadata,
+    id3v2_tag_size,
+    ReplayGainCancelled,
+    ReplayGainTimeout,
 )
+from .pool import ReplayGainPool, ReplayGainJob, get_replaygain_pool
+from .cache import LoudnessCache, content_key, source_key, get_loudness_cache
+from .pcm import LoudnessMeter, calculate_replaygain_pcm, compare_engines
+from .tags import ReplayGainTags, read_replaygain_tags
+from .features import AudioFeatures, extract_features, calculate_replaygain_features
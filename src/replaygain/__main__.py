@@ -0,0 +1,10 @@
+"""
+ReplayGain Module - Batch Loudness Analysis Entry Point
+
+Enables execution via: python -m src.replaygain
+"""
+
+from .batch import main
+
+if __name__ == "__main__":
+    exit(main())
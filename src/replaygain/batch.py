@@ -0,0 +1,384 @@
+# src/replaygain/batch.py
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict
+from datetime import timedelta
+from io import BytesIO
+from typing import Iterator, List, Optional, Set
+
+from src.ai_playlist.metadata_enhancer import MetadataEnhancer
+from src.logger import setup_logging
+from src.replaygain.cache import (
+    LoudnessCache,
+    content_key,
+    get_loudness_cache,
+    subsonic_source_key,
+)
+from src.replaygain.main import has_replaygain_metadata
+from src.replaygain.pool import ReplayGainPool
+from src.subsonic.client import SubsonicClient
+from src.subsonic.models import SubsonicConfig, SubsonicTrack
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Seconds between progress reports
+REPORT_INTERVAL = 30
+# Completed tracks between progress file saves
+PROGRESS_SAVE_EVERY = 25
+
+
+def walk_library(client: SubsonicClient) -> Iterator[SubsonicTrack]:
+    """Yield every track in the Subsonic library using ID3 browsing.
+
+    Args:
+        client: Connected Subsonic client.
+
+    Yields:
+        SubsonicTrack for each track, album by album.
+    """
+    for artist in client.get_artists():
+        try:
+            albums = client.get_artist(artist["id"]).get("album", [])
+        except Exception as e:
+            logger.warning(f"Failed to fetch artist {artist['id']} ({artist.get('name')}): {e}")
+            continue
+        for album in albums:
+            try:
+                yield from client.get_album(album["id"])
+            except Exception as e:
+                logger.warning(f"Failed to fetch album {album['id']} ({album.get('name')}): {e}")
+
+
+def _write_json_atomic(path: str, data) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".replaygain-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_library_snapshot(
+    client: SubsonicClient, snapshot_file: str, refresh: bool = False
+) -> List[SubsonicTrack]:
+    """Load the library track list from a snapshot file, walking the library if needed.
+
+    Walking a large library takes thousands of requests, so the listing is
+    saved and reused by later (resumed) runs.
+
+    Args:
+        client: Connected Subsonic client.
+        snapshot_file: Path of the JSON snapshot.
+        refresh: Walk the library even if a snapshot exists.
+
+    Returns:
+        All tracks in the library.
+    """
+    if not refresh and os.path.exists(snapshot_file):
+        with open(snapshot_file, encoding="utf-8") as f:
+            tracks = [SubsonicTrack(**item) for item in json.load(f)]
+        logger.info(f"Loaded {len(tracks)} tracks from library snapshot {snapshot_file}")
+        return tracks
+
+    logger.info("Walking Subsonic library...")
+    tracks = [track for track in walk_library(client) if not track.isDir and not track.isVideo]
+    _write_json_atomic(snapshot_file, [asdict(track) for track in tracks])
+    logger.info(f"Saved {len(tracks)} tracks to library snapshot {snapshot_file}")
+    return tracks
+
+
+class BatchProgress:
+    """Thread-safe counters with throughput and ETA for a batch run."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self.analysed = 0
+        self.skipped = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._started_at = time.monotonic()
+
+    def record(self, outcome: str) -> None:
+        """Count a finished track ('analysed', 'skipped' or 'failed')."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    @property
+    def done(self) -> int:
+        """Tracks finished, whatever the outcome."""
+        return self.analysed + self.skipped + self.failed
+
+    def tracks_per_minute(self) -> float:
+        """Finished tracks per minute since the run started."""
+        elapsed = max(time.monotonic() - self._started_at, 1e-6)
+        return self.done * 60.0 / elapsed
+
+    def eta(self) -> Optional[timedelta]:
+        """Estimated time until all tracks are finished, or None before the first one."""
+        rate = self.tracks_per_minute()
+        if rate <= 0:
+            return None
+        return timedelta(seconds=int((self.total - self.done) * 60.0 / rate))
+
+    def summary(self) -> str:
+        """One-line progress report."""
+        eta = self.eta()
+        return (
+            f"{self.done}/{self.total} tracks ({self.analysed} analysed, {self.skipped} skipped, "
+            f"{self.failed} failed), {self.tracks_per_minute():.1f} tracks/min, "
+            f"ETA {eta if eta is not None else 'unknown'}"
+        )
+
+
+class ReplayGainBatch:
+    """Pre-computes loudness for the whole library into the loudness cache.
+
+    Tracks are downloaded concurrently and measured on a ReplayGainPool. Each
+    measurement is committed to the cache as soon as it finishes, and finished
+    track IDs are recorded in a progress file, so an interrupted run resumes
+    where it stopped. Measurements are stored under both the Subsonic source
+    key and the content hash, so later uploads of the same file hit the
+    cache. With the PCM engine, the BPM and energy measured in the same
+    decode are also stored in the metadata cache when one is given.
+    """
+
+    def __init__(
+        self,
+        client: SubsonicClient,
+        cache: LoudnessCache,
+        pool: ReplayGainPool,
+        progress_file: str,
+        download_workers: Optional[int] = None,
+        metadata_enhancer: Optional[MetadataEnhancer] = None,
+    ) -> None:
+        """Initializes the batch.
+
+        Args:
+            client: Connected Subsonic client.
+            cache: Loudness cache receiving the measurements.
+            pool: Worker pool running the analysis.
+            progress_file: JSON file recording finished track IDs.
+            download_workers: Concurrent downloads, each holding one file in memory
+                (defaults to twice the pool's workers so analysis never waits on the network).
+            metadata_enhancer: Metadata cache receiving BPM and energy (PCM engine only).
+        """
+        self.client = client
+        self.cache = cache
+        self.pool = pool
+        self.progress_file = progress_file
+        self.download_workers = download_workers or 2 * pool.max_workers
+        self.metadata_enhancer = metadata_enhancer
+        self._done_ids: Set[str] = self._load_progress()
+        self._progress_lock = threading.Lock()
+        self._unsaved = 0
+
+    def _load_progress(self) -> Set[str]:
+        try:
+            with open(self.progress_file, encoding="utf-8") as f:
+                return set(json.load(f).get("done", []))
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable progress file {self.progress_file}: {e}")
+            return set()
+
+    def _save_progress(self) -> None:
+        with self._progress_lock:
+            done = sorted(self._done_ids)
+            self._unsaved = 0
+        _write_json_atomic(self.progress_file, {"done": done})
+
+    def _mark_done(self, track_id: str) -> None:
+        with self._progress_lock:
+            self._done_ids.add(track_id)
+            self._unsaved += 1
+            save = self._unsaved >= PROGRESS_SAVE_EVERY
+        if save:
+            self._save_progress()
+
+    def pending(self, tracks: List[SubsonicTrack]) -> List[SubsonicTrack]:
+        """Return the tracks that are neither finished nor already cached."""
+        pending = []
+        for track in tracks:
+            if track.id in self._done_ids:
+                continue
+            key = subsonic_source_key(track)
+            if key is not None and self.cache.has(key):
+                continue
+            pending.append(track)
+        return pending
+
+    def analyse_track(self, track: SubsonicTrack) -> str:
+        """Download and measure one track.
+
+        Returns:
+            'analysed', or 'skipped' if the file already carries ReplayGain tags
+            or its content is already cached.
+        """
+        suffix = track.suffix or "mp3"
+        audio_data = self.client.download_track(track.id)
+        # Tagged files are not re-analysed on upload either
+        if has_replaygain_metadata(BytesIO(audio_data), suffix):
+            return "skipped"
+        key = subsonic_source_key(track) or content_key(audio_data)
+        if self.cache.has(key):
+            return "skipped"
+        label = f"{track.artist} - {track.title}"
+        gain, peak, metadata, _ = self.pool.submit_measurement(
+            audio_data, suffix, label, key
+        ).result()
+        # Uploads (Track.download) only have the file bytes, so they look up by content hash
+        upload_key = content_key(audio_data)
+        if upload_key != key:
+            self.cache.set(upload_key, gain, peak, metadata)
+        if self.metadata_enhancer is not None and metadata.get("bpm") is not None:
+            self.metadata_enhancer.cache_audio_features(track.id, metadata)
+        return "analysed"
+
+    def run(self, tracks: List[SubsonicTrack]) -> BatchProgress:
+        """Analyse every pending track, reporting throughput and ETA.
+
+        Args:
+            tracks: Library tracks to cover.
+
+        Returns:
+            BatchProgress with the final counts.
+        """
+        pending = self.pending(tracks)
+        logger.info(
+            f"{len(tracks) - len(pending)} of {len(tracks)} tracks already done, "
+            f"{len(pending)} to analyse with {self.pool.max_workers} workers"
+        )
+        progress = BatchProgress(len(pending))
+        last_report = time.monotonic()
+
+        executor = ThreadPoolExecutor(
+            max_workers=self.download_workers, thread_name_prefix="replaygain-download"
+        )
+        try:
+            futures = {executor.submit(self.analyse_track, track): track for track in pending}
+            for future in as_completed(futures):
+                track = futures[future]
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to analyse track {track.id} ({track.title}): {e}")
+                    outcome = "failed"
+                else:
+                    self._mark_done(track.id)
+                progress.record(outcome)
+
+                if time.monotonic() - last_report >= REPORT_INTERVAL:
+                    logger.info(progress.summary())
+                    last_report = time.monotonic()
+        finally:
+            # On interruption, drop queued downloads; finished work is already saved
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._save_progress()
+
+        logger.info(f"Finished: {progress.summary()}")
+        return progress
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """Create the argument parser for the batch command."""
+    parser = argparse.ArgumentParser(
+        prog="python -m src.replaygain",
+        description="Pre-compute loudness for the whole Subsonic library into the loudness cache",
+    )
+    parser.add_argument(
+        "--cache-file",
+        default=os.getenv("REPLAYGAIN_CACHE_FILE", "replaygain_cache.db"),
+        help="Loudness cache database (default: REPLAYGAIN_CACHE_FILE or replaygain_cache.db)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        default="replaygain_library.json",
+        help="Library snapshot file reused by resumed runs (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--refresh-library",
+        action="store_true",
+        help="Walk the library again instead of using an existing snapshot",
+    )
+    parser.add_argument(
+        "--progress",
+        default="replaygain_progress.json",
+        help="Progress file recording finished tracks (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Concurrent analyses (default: CPU count)"
+    )
+    parser.add_argument(
+        "--downloads", type=int, default=None, help="Concurrent downloads (default: 2 x workers)"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["ffmpeg", "pcm"],
+        default=None,
+        help="Measurement engine (default: REPLAYGAIN_ENGINE or ffmpeg)",
+    )
+    parser.add_argument(
+        "--metadata-cache",
+        default=None,
+        help="Also store BPM and energy in this MetadataEnhancer cache (PCM engine only)",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Analyse at most N tracks")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the batch command.
+
+    Returns:
+        Exit code: 0 if every track was processed, 1 if some failed.
+    """
+    args = create_parser().parse_args(argv)
+
+    # Measurements are written by measure_replaygain() through the shared cache
+    os.environ["REPLAYGAIN_CACHE_FILE"] = args.cache_file
+    if args.engine:
+        os.environ["REPLAYGAIN_ENGINE"] = args.engine
+
+    config = SubsonicConfig(
+        url=os.getenv("SUBSONIC_URL"),
+        username=os.getenv("SUBSONIC_USER"),
+        password=os.getenv("SUBSONIC_PASSWORD"),
+        api_key=os.getenv("SUBSONIC_API_KEY"),
+        client_name=os.getenv("SUBSONIC_CLIENT_NAME", "playlistgen"),
+    )
+    pool = ReplayGainPool(max_workers=args.workers)
+    with SubsonicClient(config) as client:
+        tracks = load_library_snapshot(client, args.snapshot, refresh=args.refresh_library)
+        if args.limit is not None:
+            tracks = tracks[: args.limit]
+        metadata_enhancer = None
+        if args.metadata_cache:
+            metadata_enhancer = MetadataEnhancer(cache_db_path=args.metadata_cache)
+        batch = ReplayGainBatch(
+            client,
+            get_loudness_cache(),
+            pool,
+            args.progress,
+            download_workers=args.downloads,
+            metadata_enhancer=metadata_enhancer,
+        )
+        try:
+            progress = batch.run(tracks)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted; run the command again to resume")
+            pool.shutdown(cancel_pending=True)
+            return 130
+    pool.shutdown()
+    return 1 if progress.failed else 0
@@ -0,0 +1,175 @@
+# src/replaygain/cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+from src.logger import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def content_key(file_content: bytes) -> str:
+    """Generates a cache key from the audio file content.
+
+    Args:
+        file_content: The binary content of the audio file, as received from the source.
+
+    Returns:
+        A key of the form "sha256:<hex digest>".
+    """
+    return f"sha256:{hashlib.sha256(file_content).hexdigest()}"
+
+
+def source_key(source_id: str, size: Any, mtime: Any) -> str:
+    """Generates a cache key from source metadata, avoiding hashing the file.
+
+    Args:
+        source_id: Track ID in the source library (e.g. Subsonic or Emby).
+        size: File size in bytes.
+        mtime: Modification (or creation) timestamp reported by the source.
+
+    Returns:
+        A key of the form "source:<id>:<size>:<mtime>".
+    """
+    return f"source:{source_id}:{size}:{mtime}"
+
+
+def subsonic_source_key(track: Any) -> Optional[str]:
+    """Generates the cache key for a Subsonic track from its library metadata.
+
+    Subsonic reports no modification time, so the creation timestamp is used
+    together with the file size to notice replaced files.
+
+    Args:
+        track: SubsonicTrack (or any object with id, size and created).
+
+    Returns:
+        The source key, or None if the server did not report the file size.
+    """
+    if not getattr(track, "size", None):
+        return None
+    return source_key(f"subsonic:{track.id}", track.size, track.created)
+
+
+class LoudnessCache:
+    """SQLite cache of loudness measurements to avoid re-running ffmpeg analysis."""
+
+    def __init__(self, cache_file: str) -> None:
+        """Initializes the LoudnessCache with an SQLite database.
+
+        Args:
+            cache_file: Path to the SQLite database file.
+        """
+        self.cache_file = cache_file
+        self.connection = sqlite3.connect(self.cache_file, check_same_thread=False)
+        # ReplayGain pool workers share this connection
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._init_db()
+
+    def _init_db(self) -> None:
+        """Initializes the database and creates tables if they don't exist."""
+        with self._lock, self.connection as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS loudness (
+                    key TEXT PRIMARY KEY,
+                    gain REAL NOT NULL,
+                    peak REAL NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """
+            )
+
+    def get(self, key: str) -> Optional[Tuple[float, float, dict]]:
+        """Retrieves a cached measurement.
+
+        Args:
+            key: Cache key from content_key() or source_key().
+
+        Returns:
+            A tuple of (gain, peak, loudnorm JSON data), or None if not cached.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT gain, peak, data FROM loudness WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        logger.debug(f"Loudness cache hit for {key}")
+        return row[0], row[1], json.loads(row[2])
+
+    def has(self, key: str) -> bool:
+        """Checks whether a measurement is cached, without counting a hit or miss.
+
+        Args:
+            key: Cache key from content_key() or source_key().
+
+        Returns:
+            True if the key is cached.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM loudness WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def set(self, key: str, gain: float, peak: float, data: dict) -> None:
+        """Caches a measurement.
+
+        Args:
+            key: Cache key from content_key() or source_key().
+            gain: Measured gain (dB).
+            peak: Measured true peak.
+            data: Full loudnorm JSON data.
+        """
+        try:
+            with self._lock, self.connection as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO loudness (key, gain, peak, data, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """,
+                    (key, gain, peak, json.dumps(data), time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to cache loudness for {key}: {e}")
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self.connection.close()
+
+
+_shared_cache: Optional[LoudnessCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_loudness_cache() -> Optional[LoudnessCache]:
+    """Return the process-wide loudness cache.
+
+    The cache is enabled by setting REPLAYGAIN_CACHE_FILE to the database path.
+
+    Returns:
+        The shared LoudnessCache, or None if caching is disabled.
+    """
+    global _shared_cache
+    cache_file = os.getenv("REPLAYGAIN_CACHE_FILE")
+    if not cache_file:
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None or _shared_cache.cache_file != cache_file:
+            _shared_cache = LoudnessCache(cache_file)
+        return _shared_cache
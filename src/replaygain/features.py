@@ -0,0 +1,317 @@
+# src/replaygain/features.py
+
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.logger import setup_logging
+from src.replaygain.main import FfmpegSource
+from src.replaygain.pcm import DEFAULT_SAMPLE_RATE, HAS_NUMPY, LoudnessMeter, decode_pcm
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+if HAS_NUMPY:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+# Optional aubio binding for beat tracking (needs NumPy)
+try:
+    import aubio
+
+    HAS_AUBIO = True
+except ImportError:
+    HAS_AUBIO = False
+
+# Tempo and energy come from an excerpt: intros rarely carry the beat, so
+# EXCERPT_OFFSET seconds are skipped where the track is long enough
+EXCERPT_OFFSET = 30
+EXCERPT_SECONDS = 30
+# Onset envelope STFT
+WINDOW_SIZE = 1024
+HOP_SIZE = 256
+# Onset envelope smoothing in hops
+ENVELOPE_SMOOTHING = 5
+MIN_BPM = 60.0
+MAX_BPM = 200.0
+# Tempo prior: log-normal around PRIOR_BPM, PRIOR_OCTAVES wide, to settle
+# half/double tempo ambiguity
+PRIOR_BPM = 120.0
+PRIOR_OCTAVES = 1.0
+# Energy scale: loudness between these maps to 0..1, as does the onset rate
+ENERGY_QUIET_LUFS = -30.0
+ENERGY_LOUD_LUFS = -6.0
+ENERGY_MAX_ONSETS_PER_SECOND = 8.0
+
+
+def onset_envelope(mono: "np.ndarray", sample_rate: int) -> Tuple["np.ndarray", float]:
+    """Compute the spectral-flux onset strength of mono audio.
+
+    Args:
+        mono: Mono PCM samples.
+        sample_rate: Sample rate of mono.
+
+    Returns:
+        Tuple of (envelope, frame_rate) with one non-negative value per hop.
+    """
+    frame_rate = sample_rate / HOP_SIZE
+    if len(mono) < WINDOW_SIZE * 8:
+        return np.zeros(0), frame_rate
+    frames = sliding_window_view(mono, WINDOW_SIZE)[::HOP_SIZE] * np.hanning(WINDOW_SIZE)
+    spectrum = np.log1p(100.0 * np.abs(np.fft.rfft(frames, axis=1)))
+    return np.maximum(np.diff(spectrum, axis=0), 0.0).sum(axis=1), frame_rate
+
+
+def _tempo_from_aubio(mono: "np.ndarray", sample_rate: int) -> Optional[float]:
+    tempo = aubio.tempo("default", WINDOW_SIZE, HOP_SIZE, sample_rate)
+    samples = mono.astype(np.float32)
+    beats = []
+    for start in range(0, len(samples) - HOP_SIZE + 1, HOP_SIZE):
+        if tempo(samples[start : start + HOP_SIZE]):
+            beats.append(tempo.get_last_s())
+    if len(beats) < 4:
+        return None
+    return float(np.median(60.0 / np.diff(beats)))
+
+
+def _tempo_from_envelope(envelope: "np.ndarray", frame_rate: float) -> Optional[float]:
+    if not envelope.size:
+        return None
+    # Smear onsets over a few frames so beat periods that are not a whole
+    # number of hops still line up in the autocorrelation
+    smoothing = np.hanning(ENVELOPE_SMOOTHING + 2)[1:-1]
+    flux = np.convolve(envelope, smoothing / smoothing.sum(), mode="same")
+    flux -= flux.mean()
+    if not flux.any():
+        return None
+
+    # Autocorrelation of the onset envelope via FFT
+    size = 1 << (2 * len(flux) - 1).bit_length()
+    acf = np.fft.irfft(np.abs(np.fft.rfft(flux, size)) ** 2, size)[: len(flux)]
+
+    min_lag = max(int(frame_rate * 60.0 / MAX_BPM), 1)
+    max_lag = min(math.ceil(frame_rate * 60.0 / MIN_BPM), len(acf) - 2)
+    if max_lag <= min_lag:
+        return None
+    lags = np.arange(min_lag, max_lag + 1)
+    prior = np.exp(-0.5 * (np.log2(60.0 * frame_rate / lags / PRIOR_BPM) / PRIOR_OCTAVES) ** 2)
+    best = min_lag + int(np.argmax(acf[min_lag : max_lag + 1] * prior))
+
+    # Parabolic interpolation for a sub-frame lag
+    left, centre, right = acf[best - 1], acf[best], acf[best + 1]
+    denominator = left - 2 * centre + right
+    offset = 0.5 * (left - right) / denominator if denominator < 0 else 0.0
+    return 60.0 * frame_rate / (best + offset)
+
+
+def estimate_bpm(
+    samples: "np.ndarray", sample_rate: int, envelope: Optional["np.ndarray"] = None
+) -> Optional[float]:
+    """Estimate the tempo of decoded audio.
+
+    Uses aubio's beat tracker when installed, otherwise autocorrelation of
+    the onset envelope.
+
+    Args:
+        samples: PCM samples, shape (frames,) or (frames, channels).
+        sample_rate: Sample rate of samples.
+        envelope: Precomputed onset_envelope() of samples.
+
+    Returns:
+        BPM rounded to one decimal, or None if no steady beat was found.
+    """
+    mono = samples.mean(axis=1) if samples.ndim > 1 else samples
+    bpm = _tempo_from_aubio(mono, sample_rate) if HAS_AUBIO else None
+    if bpm is None:
+        if envelope is None:
+            envelope, _ = onset_envelope(mono, sample_rate)
+        bpm = _tempo_from_envelope(envelope, sample_rate / HOP_SIZE)
+    if bpm is None or not MIN_BPM / 2 <= bpm <= MAX_BPM * 2:
+        return None
+    return round(bpm, 1)
+
+
+def estimate_energy(loudness: float, envelope: "np.ndarray", frame_rate: float) -> float:
+    """Estimate perceived energy from loudness and onset density.
+
+    Args:
+        loudness: Integrated loudness in LUFS.
+        envelope: Onset envelope from onset_envelope().
+        frame_rate: Envelope values per second.
+
+    Returns:
+        Energy between 0 (quiet, sparse) and 1 (loud, busy), to two decimals.
+    """
+    loudness_score = (loudness - ENERGY_QUIET_LUFS) / (ENERGY_LOUD_LUFS - ENERGY_QUIET_LUFS)
+    onset_score = 0.0
+    if envelope.size > 2 and envelope.any():
+        inner = envelope[1:-1]
+        threshold = envelope.mean() + envelope.std()
+        peaks = (inner > envelope[:-2]) & (inner >= envelope[2:]) & (inner > threshold)
+        onsets_per_second = peaks.sum() * frame_rate / len(envelope)
+        onset_score = onsets_per_second / ENERGY_MAX_ONSETS_PER_SECOND
+    energy = 0.5 * min(max(loudness_score, 0.0), 1.0) + 0.5 * min(max(onset_score, 0.0), 1.0)
+    return round(energy, 2)
+
+
+@dataclass
+class AudioFeatures:
+    """Features measured from one decode of a track.
+
+    gain and peak are the integrated loudness (LUFS) and true peak (dBTP) as
+    returned by measure_replaygain(); loudness holds the loudnorm-style data.
+    """
+
+    gain: float
+    peak: float
+    bpm: Optional[float]
+    energy: float
+    duration: float
+    loudness: Dict[str, str] = field(default_factory=dict)
+
+    def metadata(self) -> dict:
+        """Loudness data extended with the other features, as stored in the loudness cache.
+
+        Only the loudness values are written as tags (see LOUDNESS_TAG_KEYS).
+        """
+        return {**self.loudness, "bpm": self.bpm, "energy": self.energy}
+
+
+class FeatureExtractor:
+    """Streaming feature extraction over decoded PCM.
+
+    Every chunk feeds the loudness meter; only the tempo/energy excerpt (at
+    most EXCERPT_OFFSET + EXCERPT_SECONDS of mono audio) is kept in memory.
+    """
+
+    def __init__(self, sample_rate: int, channels: int) -> None:
+        """Initializes the extractor.
+
+        Args:
+            sample_rate: Sample rate of the PCM data.
+            channels: Number of interleaved channels (1 or 2).
+        """
+        self.sample_rate = sample_rate
+        self.meter = LoudnessMeter(sample_rate, channels)
+        self._excerpt_limit = (EXCERPT_OFFSET + EXCERPT_SECONDS) * sample_rate
+        self._excerpt: List["np.ndarray"] = []
+        self._excerpt_frames = 0
+
+    @property
+    def samples(self) -> int:
+        """Frames fed so far."""
+        return self.meter.samples
+
+    def add(self, samples: "np.ndarray") -> None:
+        """Feed PCM frames to the extractor.
+
+        Args:
+            samples: Array of shape (frames, channels) with samples in [-1, 1].
+        """
+        self.meter.add(samples)
+        if self._excerpt_frames < self._excerpt_limit:
+            mono = samples.mean(axis=1)[: self._excerpt_limit - self._excerpt_frames]
+            self._excerpt.append(mono)
+            self._excerpt_frames += len(mono)
+
+    def result(self) -> AudioFeatures:
+        """Return the features of everything fed so far."""
+        loudness = self.meter.result()
+        # The last EXCERPT_SECONDS of the kept audio: past the intro when
+        # the track is long enough, otherwise its end
+        excerpt = np.concatenate(self._excerpt)[-EXCERPT_SECONDS * self.sample_rate :]
+        envelope, frame_rate = onset_envelope(excerpt, self.sample_rate)
+        return AudioFeatures(
+            gain=float(loudness["input_i"]),
+            peak=float(loudness["input_tp"]),
+            bpm=estimate_bpm(excerpt, self.sample_rate, envelope),
+            energy=estimate_energy(float(loudness["input_i"]), envelope, frame_rate),
+            duration=self.samples / self.sample_rate,
+            loudness=loudness,
+        )
+
+
+def extract_features(
+    source: FfmpegSource,
+    sample_rate: Optional[int] = None,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    duration: Optional[float] = None,
+) -> AudioFeatures:
+    """Decode an audio file once and measure loudness, peak, BPM and energy.
+
+    Args:
+        source: The audio file as bytes, path, file object or chunk iterable.
+        sample_rate: Decoding sample rate (defaults to REPLAYGAIN_PCM_SAMPLE_RATE or 24000).
+        timeout: Seconds before ffmpeg is killed (None for no limit).
+        cancel_event: Event that kills ffmpeg when set.
+        duration: Decode only the first duration seconds; loudness then covers
+            only that excerpt.
+
+    Returns:
+        AudioFeatures of the decoded audio.
+
+    Raises:
+        RuntimeError: If NumPy is not installed or no audio was decoded.
+        CalledProcessError: If ffmpeg fails.
+        ReplayGainTimeout: If ffmpeg exceeded timeout.
+        ReplayGainCancelled: If the job was cancelled.
+    """
+    if not HAS_NUMPY:
+        raise RuntimeError("NumPy is required for audio feature extraction")
+    sample_rate = sample_rate or int(
+        os.getenv("REPLAYGAIN_PCM_SAMPLE_RATE", str(DEFAULT_SAMPLE_RATE))
+    )
+
+    extractor: Optional[FeatureExtractor] = None
+    for rate, channels, samples in decode_pcm(
+        source, sample_rate, timeout, cancel_event, duration=duration
+    ):
+        if extractor is None:
+            extractor = FeatureExtractor(rate, channels)
+        extractor.add(samples)
+
+    if extractor is None or extractor.samples == 0:
+        raise RuntimeError("No audio decoded")
+
+    features = extractor.result()
+    logger.debug(
+        f"Features ({features.duration:.0f}s at {extractor.sample_rate} Hz): "
+        f"{features.gain} LUFS, {features.peak} dBTP, {features.bpm} BPM, "
+        f"energy {features.energy}"
+    )
+    return features
+
+
+def calculate_replaygain_features(
+    file_like: FfmpegSource,
+    file_format: str,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Tuple[float, float, dict]:
+    """Calculate ReplayGain values with the PCM engine, recording BPM and energy too.
+
+    Drop-in for calculate_replaygain(): the returned data is the loudnorm-style
+    dict extended with "bpm" and "energy", so the loudness cache holds every
+    feature from the single decode.
+
+    Args:
+        file_like: The audio content as a file-like object, file path, bytes or
+            iterable of chunks.
+        file_format: The format of the audio file (e.g., 'mp3', 'flac', 'opus').
+        timeout: Seconds before ffmpeg is killed (None for no limit).
+        cancel_event: Event that kills ffmpeg when set.
+
+    Returns:
+        A tuple containing the gain (in dB), peak values, and the feature data.
+
+    Raises:
+        RuntimeError: If NumPy is not installed or the stream could not be decoded.
+        ReplayGainTimeout: If ffmpeg exceeded timeout.
+        ReplayGainCancelled: If the job was cancelled.
+    """
+    features = extract_features(file_like, timeout=timeout, cancel_event=cancel_event)
+    return features.gain, features.peak, features.metadata()
@@ -2,30 +2,215 @@
 
 import logging
 import json
+import os
+import threading
+import time
 from io import BytesIO
-from typing import Tuple, Optional
-from mutagen import File as MutagenFile
-from subprocess import Popen, PIPE, CalledProcessError
-from math import isnan
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple, Optional, Union
+from mutagen import File as MutagenFile, MutagenError
+from mutagen.id3 import ID3, TXXX, ID3v1SaveOptions
+from mutagen.mp4 import MP4FreeForm, MP4Tags
+from subprocess import Popen, PIPE, DEVNULL, CalledProcessError, TimeoutExpired
+from math import isnan, log10
 
 from src.logger import setup_logging
+from src.replaygain.cache import content_key, get_loudness_cache
+from src.replaygain.tags import read_replaygain_tags
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# How often a running ffmpeg job checks for cancellation (seconds)
+CANCEL_POLL_INTERVAL = 0.5
+# Size of the chunks streamed to and from ffmpeg
+STREAM_CHUNK_SIZE = 64 * 1024
+# ffmpeg output larger than this is spooled to a temporary file
+SPOOL_MAX_MEMORY = 16 * 1024 * 1024
 
-def calculate_replaygain(file_like: BytesIO, file_format: str) -> Tuple[float, float, dict]:
+# Loudness measurements written as tags; the rest of the data (other loudnorm
+# values, BPM and energy from the PCM engine) stays in the caches
+LOUDNESS_TAG_KEYS = ("input_i", "input_tp", "input_lra", "input_thresh")
+
+# Bytes, a file path, a binary file object or an iterable of byte chunks
+FfmpegSource = Union[bytes, str, os.PathLike, BinaryIO, Iterable[bytes]]
+
+
+class ReplayGainTimeout(RuntimeError):
+    """Raised when an ffmpeg job exceeds its time limit (the process is killed)."""
+
+
+class ReplayGainCancelled(RuntimeError):
+    """Raised when an ffmpeg job is cancelled (the process is killed)."""
+
+
+def iter_source(source: FfmpegSource, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the content of an ffmpeg input source in chunks.
+
+    Args:
+        source: Bytes, a file path, a binary file object (read from its start)
+            or an iterable of byte chunks.
+        chunk_size: Maximum size of each chunk.
+
+    Yields:
+        Chunks of the source content.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        for offset in range(0, len(view), chunk_size):
+            yield view[offset : offset + chunk_size]
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter(lambda: f.read(chunk_size), b"")
+    elif hasattr(source, "read"):
+        source.seek(0)
+        yield from iter(lambda: source.read(chunk_size), b"")
+    else:
+        yield from source
+
+
+def start_ffmpeg_feeder(process: Popen, source: FfmpegSource) -> threading.Thread:
+    """Start a thread that streams source into a process's stdin and closes it.
+
+    Args:
+        process: Process started with stdin=PIPE.
+        source: Input passed to iter_source().
+
+    Returns:
+        The started feeder thread.
+    """
+
+    def feed() -> None:
+        try:
+            for chunk in iter_source(source):
+                process.stdin.write(chunk)
+            process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass  # The process exited early; its return code reports why
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    return feeder
+
+
+def stream_ffmpeg(
+    command: List[str],
+    source: FfmpegSource,
+    sink: Optional[BinaryIO] = None,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Tuple[int, bytes]:
+    """Run an ffmpeg command, streaming source to stdin and stdout to sink.
+
+    Input is written and output read in chunks by helper threads, so neither
+    is held in memory as a whole by this function.
+
+    Args:
+        command: Command line to execute.
+        source: Input passed to iter_source().
+        sink: Binary file object receiving stdout (None discards it).
+        timeout: Seconds before the process is killed (None for no limit).
+        cancel_event: Event that kills the process when set.
+
+    Returns:
+        A tuple of (returncode, stderr).
+
+    Raises:
+        ReplayGainTimeout: If the process ran longer than timeout.
+        ReplayGainCancelled: If cancel_event was set while the process ran.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    stderr_chunks: List[bytes] = []
+
+    with Popen(
+        command, stdin=PIPE, stdout=PIPE if sink is not None else DEVNULL, stderr=PIPE
+    ) as process:
+
+        def copy_stdout() -> None:
+            for chunk in iter(lambda: process.stdout.read(STREAM_CHUNK_SIZE), b""):
+                sink.write(chunk)
+
+        helpers = [
+            start_ffmpeg_feeder(process, source),
+            threading.Thread(target=lambda: stderr_chunks.extend(process.stderr), daemon=True),
+        ]
+        if sink is not None:
+            helpers.append(threading.Thread(target=copy_stdout, daemon=True))
+        for helper in helpers[1:]:
+            helper.start()
+
+        try:
+            while True:
+                wait = CANCEL_POLL_INTERVAL if cancel_event is not None else None
+                if deadline is not None:
+                    remaining = max(0.0, deadline - time.monotonic())
+                    wait = remaining if wait is None else min(wait, remaining)
+                try:
+                    process.wait(timeout=wait)
+                    break
+                except TimeoutExpired:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ReplayGainCancelled(f"{command[0]} job cancelled")
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise ReplayGainTimeout(f"{command[0]} job exceeded {timeout}s")
+        finally:
+            if process.poll() is None:
+                process.kill()
+            for helper in helpers:
+                helper.join()
+
+    return process.returncode, b"".join(stderr_chunks)
+
+
+def run_ffmpeg(
+    command: List[str],
+    input_bytes: FfmpegSource,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Tuple[int, bytes, bytes]:
+    """Run an ffmpeg command, feeding input_bytes on stdin and collecting stdout.
+
+    Args:
+        command: Command line to execute.
+        input_bytes: Input passed to iter_source().
+        timeout: Seconds before the process is killed (None for no limit).
+        cancel_event: Event that kills the process when set.
+
+    Returns:
+        A tuple of (returncode, stdout, stderr).
+
+    Raises:
+        ReplayGainTimeout: If the process ran longer than timeout.
+        ReplayGainCancelled: If cancel_event was set while the process ran.
+    """
+    with SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as output:
+        returncode, err = stream_ffmpeg(command, input_bytes, output, timeout, cancel_event)
+        output.seek(0)
+        return returncode, output.read(), err
+
+
+def calculate_replaygain(
+    file_like: FfmpegSource,
+    file_format: str,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Tuple[float, float, dict]:
     """Calculate ReplayGain values for an audio file using ffmpeg with loudnorm filter.
 
     Args:
-        file_like: A file-like object representing the audio content.
+        file_like: The audio content as a file-like object, file path, bytes or
+            iterable of chunks; it is streamed to ffmpeg without being copied.
         file_format: The format of the audio file (e.g., 'mp3', 'flac', 'opus').
+        timeout: Seconds before ffmpeg is killed (None for no limit).
+        cancel_event: Event that kills ffmpeg when set.
 
     Returns:
         A tuple containing the gain (in dB), peak values, and the full parsed JSON data.
 
     Raises:
         RuntimeError: If ReplayGain calculation fails or could not be parsed.
+        ReplayGainTimeout: If ffmpeg exceeded timeout.
+        ReplayGainCancelled: If the job was cancelled.
     """
     command = [
         "ffmpeg",
@@ -39,14 +224,12 @@ def calculate_replaygain(file_like: BytesIO, file_format: str) -> Tuple[float, f
         "-",
     ]
 
-    with Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE) as process:
-        out, err = process.communicate(input=file_like.getvalue())
+    # The null muxer writes nothing to stdout; loudnorm reports on stderr
+    returncode, err = stream_ffmpeg(command, file_like, None, timeout, cancel_event)
 
-    if process.returncode != 0:
-        logger.error(
-            f"ffmpeg command failed with error {process.returncode}: {err.decode('utf-8')}"
-        )
-        raise CalledProcessError(process.returncode, command, output=out, stderr=err)
+    if returncode != 0:
+        logger.error(f"ffmpeg command failed with error {returncode}: {err.decode('utf-8')}")
+        raise CalledProcessError(returncode, command, stderr=err)
 
     json_output, json_lines = "", False
     for line in err.decode("utf-8").splitlines():
@@ -75,38 +258,41 @@ def calculate_replaygain(file_like: BytesIO, file_format: str) -> Tuple[float, f
     return gain, peak, parsed_data
 
 
-def ffmpeg_process(input_bytes, cmd):
-    # Start the FFmpeg process
-    proc = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
-    # Pass the input data and get the output
-    output, error = proc.communicate(input=input_bytes)
-    if proc.returncode != 0:
-        raise Exception("FFmpeg error: " + error.decode("utf-8"))
-    return BytesIO(output)
-
-
 def apply_replaygain(
-    file_like: BytesIO,
+    file_like: FfmpegSource,
     gain: float,
     peak: float,
     file_format: str,
     r128_track_gain: Optional[int] = None,
     r128_album_gain: Optional[int] = None,
     loudness_metadata: Optional[dict] = None,
-) -> bytes:
-    """Apply ReplayGain and additional loudness metadata to an audio file using FFmpeg and return as BytesIO.
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    album_gain: Optional[float] = None,
+    album_peak: Optional[float] = None,
+    output: Optional[BinaryIO] = None,
+) -> Optional[bytes]:
+    """Apply ReplayGain and additional loudness metadata to an audio file using FFmpeg.
+
+    Input and output are streamed; output is spooled to a temporary file
+    once it outgrows SPOOL_MAX_MEMORY, or written straight to output.
 
     Args:
-        file_like (BytesIO): The audio file data.
+        file_like (FfmpegSource): The audio file data, path or chunk iterable.
         gain (float): ReplayGain track gain to set (in dB).
         peak (float): ReplayGain track peak to set.
         file_format (str): Format of the audio file ('mp3', 'flac', 'opus', etc.).
         r128_track_gain (Optional[int]): Optional R128 track gain.
         r128_album_gain (Optional[int]): Optional R128 album gain.
-        loudness_metadata (Optional[dict]): Additional loudness metadata to be embedded.
+        loudness_metadata (Optional[dict]): Loudness data; only LOUDNESS_TAG_KEYS are embedded.
+        timeout (Optional[float]): Seconds before ffmpeg is killed (None for no limit).
+        cancel_event (Optional[threading.Event]): Event that kills ffmpeg when set.
+        album_gain (Optional[float]): Optional ReplayGain album gain (in dB).
+        album_peak (Optional[float]): Optional ReplayGain album peak.
+        output (Optional[BinaryIO]): File object to stream the result to.
 
     Returns:
-        BytesIO: The modified audio file data as a BytesIO object.
+        Optional[bytes]: The modified audio file data, or None if it was written to output.
 
     Raises:
         Exception: If FFmpeg processing fails.
@@ -120,15 +306,20 @@ def apply_replaygain(
         f"replaygain_track_peak={peak}",
     ]
 
+    if album_gain is not None:
+        metadata_cmd.extend(["-metadata", f"replaygain_album_gain={album_gain} dB"])
+
+    if album_peak is not None:
+        metadata_cmd.extend(["-metadata", f"replaygain_album_peak={album_peak}"])
+
     if r128_track_gain is not None:
         metadata_cmd.extend(["-metadata", f"R128_TRACK_GAIN={r128_track_gain}"])
 
     if r128_album_gain is not None:
         metadata_cmd.extend(["-metadata", f"R128_ALBUM_GAIN={r128_album_gain}"])
 
-    if loudness_metadata:
-        for key, value in loudness_metadata.items():
-            metadata_cmd.extend(["-metadata", f"{key}={value}"])
+    for key, value in loudness_tag_fields(loudness_metadata).items():
+        metadata_cmd.extend(["-metadata", f"{key}={value}"])
 
     extra_opts = []
     if file_format.lower() == "mp3":
@@ -151,45 +342,313 @@ def apply_replaygain(
         + ["-f", file_format, "-"]
     )
 
-    with Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE) as process:
-        output, error = process.communicate(input=file_like.getvalue())
+    if output is not None:
+        returncode, error = stream_ffmpeg(command, file_like, output, timeout, cancel_event)
+        result = None
+    else:
+        returncode, result, error = run_ffmpeg(command, file_like, timeout, cancel_event)
 
-    if process.returncode != 0:
+    if returncode != 0:
         logger.error(f"FFmpeg error: {error.decode()}")
         raise Exception(f"FFmpeg error: {error.decode()}")
 
-    return output
+    return result
 
 
-def process_replaygain(file_content: bytes, file_format: str) -> bytes:
-    """Process ReplayGain for a given audio file content.
+def loudness_tag_fields(loudness_metadata: Optional[dict]) -> Dict[str, str]:
+    """Select the loudness measurements that are written as tags.
+
+    Args:
+        loudness_metadata (Optional[dict]): Loudness data as returned by measure_replaygain().
+
+    Returns:
+        Dict[str, str]: The LOUDNESS_TAG_KEYS values present (and not None), as strings.
+    """
+    return {
+        key: str(loudness_metadata[key])
+        for key in LOUDNESS_TAG_KEYS
+        if loudness_metadata and loudness_metadata.get(key) is not None
+    }
+
+
+def replaygain_tag_fields(
+    gain: float,
+    peak: float,
+    r128_track_gain: Optional[int] = None,
+    r128_album_gain: Optional[int] = None,
+    loudness_metadata: Optional[dict] = None,
+    album_gain: Optional[float] = None,
+    album_peak: Optional[float] = None,
+) -> Dict[str, str]:
+    """Build the tag name/value pairs written for ReplayGain and loudness metadata.
+
+    Args:
+        gain (float): ReplayGain track gain to set (in dB).
+        peak (float): ReplayGain track peak to set.
+        r128_track_gain (Optional[int]): Optional R128 track gain.
+        r128_album_gain (Optional[int]): Optional R128 album gain.
+        loudness_metadata (Optional[dict]): Loudness data; only LOUDNESS_TAG_KEYS are embedded.
+        album_gain (Optional[float]): Optional ReplayGain album gain (in dB).
+        album_peak (Optional[float]): Optional ReplayGain album peak.
+
+    Returns:
+        Dict[str, str]: Tag names mapped to their string values.
+    """
+    fields = {
+        "replaygain_track_gain": f"{gain} dB",
+        "replaygain_track_peak": f"{peak}",
+    }
+    if album_gain is not None:
+        fields["replaygain_album_gain"] = f"{album_gain} dB"
+    if album_peak is not None:
+        fields["replaygain_album_peak"] = f"{album_peak}"
+    if r128_track_gain is not None:
+        fields["R128_TRACK_GAIN"] = str(r128_track_gain)
+    if r128_album_gain is not None:
+        fields["R128_ALBUM_GAIN"] = str(r128_album_gain)
+    fields.update(loudness_tag_fields(loudness_metadata))
+    return fields
+
+
+def write_replaygain_tags(
+    file_content: bytes,
+    file_format: str,
+    gain: float,
+    peak: float,
+    r128_track_gain: Optional[int] = None,
+    r128_album_gain: Optional[int] = None,
+    loudness_metadata: Optional[dict] = None,
+    album_gain: Optional[float] = None,
+    album_peak: Optional[float] = None,
+) -> bytes:
+    """Write ReplayGain and loudness metadata tags in place with Mutagen.
+
+    Only the tag block is rewritten; the audio stream is left untouched, so no
+    ffmpeg re-mux is needed. Supports ID3 (mp3), Vorbis comments (flac, opus,
+    ogg) and MP4 freeform atoms (m4a).
+
+    Args:
+        file_content (bytes): The audio file data.
+        file_format (str): Format of the audio file ('mp3', 'flac', 'opus', 'm4a', etc.).
+        gain (float): ReplayGain track gain to set (in dB).
+        peak (float): ReplayGain track peak to set.
+        r128_track_gain (Optional[int]): Optional R128 track gain.
+        r128_album_gain (Optional[int]): Optional R128 album gain.
+        loudness_metadata (Optional[dict]): Loudness data; only LOUDNESS_TAG_KEYS are embedded.
+        album_gain (Optional[float]): Optional ReplayGain album gain (in dB).
+        album_peak (Optional[float]): Optional ReplayGain album peak.
+
+    Returns:
+        bytes: The audio file data with updated tags.
+
+    Raises:
+        ValueError: If Mutagen does not recognise the file.
+        MutagenError: If the tags cannot be written.
+    """
+    fields = replaygain_tag_fields(
+        gain, peak, r128_track_gain, r128_album_gain, loudness_metadata, album_gain, album_peak
+    )
+
+    buffer = BytesIO(file_content)
+    audio_file = MutagenFile(buffer)
+    if audio_file is None:
+        raise ValueError(f"Unsupported or corrupted {file_format} file, cannot write tags")
+
+    if audio_file.tags is None:
+        audio_file.add_tags()
+    tags = audio_file.tags
+    # Mutagen saves relative to the current position of file objects
+    buffer.seek(0)
+
+    if isinstance(tags, ID3):
+        for key, value in fields.items():
+            tags.add(TXXX(encoding=3, desc=key, text=[value]))
+        # Match the ID3v2.3 + ID3v1 layout previously written by ffmpeg
+        audio_file.save(buffer, v2_version=3, v1=ID3v1SaveOptions.CREATE)
+    elif isinstance(tags, MP4Tags):
+        for key, value in fields.items():
+            tags[f"----:com.apple.iTunes:{key}"] = [MP4FreeForm(value.encode("utf-8"))]
+        audio_file.save(buffer)
+    else:
+        # Vorbis comments (FLAC, Ogg Opus, Ogg Vorbis)
+        for key, value in fields.items():
+            tags[key] = [value]
+        audio_file.save(buffer)
+
+    logger.debug(f"Wrote {len(fields)} loudness tags to {file_format} file with Mutagen")
+    return buffer.getvalue()
+
+
+def measure_replaygain(
+    file_content: bytes,
+    file_format: str,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    cache_key: Optional[str] = None,
+) -> Tuple[float, float, dict]:
+    """Measure loudness, reusing a cached measurement when available.
+
+    If REPLAYGAIN_CACHE_FILE is set, measurements are cached and reused.
+    Setting REPLAYGAIN_ENGINE=pcm measures with the NumPy PCM engine
+    (src.replaygain.features) instead of ffmpeg's loudnorm filter; the same
+    decode also yields BPM and energy, returned in the data dict.
 
     Args:
         file_content: The binary content of the audio file.
         file_format: The format of the audio file.
+        timeout: Seconds each ffmpeg run may take (None for no limit).
+        cancel_event: Event that aborts the job when set.
+        cache_key: Loudness cache key (defaults to a hash of file_content).
 
     Returns:
-        bytes: The binary content of the audio file with ReplayGain and other loudness metadata.
+        A tuple containing the gain (in dB), peak values, and the full parsed JSON data.
+    """
+    loudness_cache = get_loudness_cache()
+    if loudness_cache is not None:
+        cache_key = cache_key or content_key(file_content)
+        cached = loudness_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    calculate = calculate_replaygain
+    if os.getenv("REPLAYGAIN_ENGINE", "ffmpeg").lower() == "pcm":
+        # Imported here as the PCM engine builds on this module
+        from src.replaygain.features import HAS_NUMPY, calculate_replaygain_features
+
+        if HAS_NUMPY:
+            calculate = calculate_replaygain_features
+        else:
+            logger.warning("REPLAYGAIN_ENGINE=pcm requires NumPy; measuring with ffmpeg")
+
+    gain, peak, loudness_metadata = calculate(
+        file_content, file_format, timeout=timeout, cancel_event=cancel_event
+    )
+    if loudness_cache is not None:
+        loudness_cache.set(cache_key, gain, peak, loudness_metadata)
+    return gain, peak, loudness_metadata
+
+
+def audio_duration(file_content: bytes) -> Optional[float]:
+    """Return the duration of an audio file in seconds, read from its headers.
+
+    Args:
+        file_content: The binary content of the audio file.
+
+    Returns:
+        Duration in seconds, or None if Mutagen cannot determine it.
+    """
+    try:
+        audio_file = MutagenFile(BytesIO(file_content))
+    except Exception as e:
+        logger.debug(f"Error reading file with Mutagen: {e}")
+        return None
+    length = getattr(getattr(audio_file, "info", None), "length", None)
+    return float(length) if length else None
+
+
+def album_replaygain(
+    measurements: List[Tuple[float, float]], durations: Optional[List[Optional[float]]] = None
+) -> Tuple[float, float]:
+    """Derive album loudness and peak from per-track measurements.
+
+    Integrated loudness is an energy average, so track loudness is converted
+    to power, averaged weighted by duration and converted back. Tracks with
+    an unknown duration are weighted by the mean of the known durations.
+
+    Args:
+        measurements: (gain, peak) for each track, as returned by calculate_replaygain.
+        durations: Track durations in seconds, parallel to measurements.
+
+    Returns:
+        A tuple of the album gain (in dB) and album peak.
+
+    Raises:
+        ValueError: If measurements is empty.
     """
-    file_like = BytesIO(file_content)
+    if not measurements:
+        raise ValueError("Album ReplayGain needs at least one track")
+
+    durations = list(durations or [None] * len(measurements))
+    known = [d for d in durations if d]
+    default_weight = sum(known) / len(known) if known else 1.0
+    weights = [d or default_weight for d in durations]
+
+    power = sum(w * 10 ** (gain / 10) for w, (gain, _) in zip(weights, measurements))
+    album_gain = round(10 * log10(power / sum(weights)), 2)
+    album_peak = max(peak for _, peak in measurements)
+    return album_gain, album_peak
+
+
+def r128_gain(gain: float) -> int:
+    """Convert a ReplayGain gain (in dB) to an R128 Q7.8 gain value."""
+    return int((gain - 1.0) * 256)
+
+
+def tag_replaygain(
+    file_content: bytes,
+    file_format: str,
+    gain: float,
+    peak: float,
+    loudness_metadata: dict,
+    album_gain: Optional[float] = None,
+    album_peak: Optional[float] = None,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> bytes:
+    """Write measured ReplayGain values to an audio file.
+
+    Tags are written in place with Mutagen; formats Mutagen cannot tag fall
+    back to an ffmpeg re-mux.
+
+    Args:
+        file_content: The binary content of the audio file.
+        file_format: The format of the audio file.
+        gain: ReplayGain track gain (in dB).
+        peak: ReplayGain track peak.
+        loudness_metadata: Full loudnorm JSON data for the track.
+        album_gain: ReplayGain album gain (in dB), if the album was measured.
+        album_peak: ReplayGain album peak, if the album was measured.
+        timeout: Seconds each ffmpeg run may take (None for no limit).
+        cancel_event: Event that aborts the job when set.
 
-    gain, peak, loudness_metadata = calculate_replaygain(file_like, file_format)
+    Returns:
+        bytes: The binary content of the audio file with ReplayGain and other loudness metadata.
+    """
     r128_track_gain = (
-        int((gain - 1.0) * 256)
+        r128_gain(gain)
         if "R128_TRACK_GAIN" not in loudness_metadata
         else int(loudness_metadata["R128_TRACK_GAIN"])
     )
-    r128_album_gain = 0
+    # Without an album measurement, leave album fields unset rather than claim 0 dB
+    r128_album_gain = r128_gain(album_gain) if album_gain is not None else None
 
-    updated_content = apply_replaygain(
-        file_like,
-        gain,
-        peak,
-        file_format,
-        r128_track_gain=r128_track_gain,
-        r128_album_gain=r128_album_gain,
-        loudness_metadata=loudness_metadata,
-    )
+    try:
+        updated_content = write_replaygain_tags(
+            file_content,
+            file_format,
+            gain,
+            peak,
+            r128_track_gain=r128_track_gain,
+            r128_album_gain=r128_album_gain,
+            loudness_metadata=loudness_metadata,
+            album_gain=album_gain,
+            album_peak=album_peak,
+        )
+    except (MutagenError, ValueError) as e:
+        logger.warning(f"Mutagen could not tag {file_format} file ({e}), falling back to ffmpeg")
+        updated_content = apply_replaygain(
+            file_content,
+            gain,
+            peak,
+            file_format,
+            r128_track_gain=r128_track_gain,
+            r128_album_gain=r128_album_gain,
+            loudness_metadata=loudness_metadata,
+            timeout=timeout,
+            cancel_event=cancel_event,
+            album_gain=album_gain,
+            album_peak=album_peak,
+        )
 
     final_size = len(updated_content)
     logger.debug(f"Final post-replaygain file size: {final_size} bytes")
@@ -197,41 +656,166 @@ def process_replaygain(file_content: bytes, file_format: str) -> bytes:
     return updated_content
 
 
-def has_replaygain_metadata(content: BytesIO, file_format: str) -> bool:
-    """Check if the file content has ReplayGain metadata.
+def process_replaygain(
+    file_content: bytes,
+    file_format: str,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    cache_key: Optional[str] = None,
+) -> bytes:
+    """Process ReplayGain for a given audio file content.
+
+    ffmpeg is only used to measure loudness; tags are written in place with
+    Mutagen. Formats Mutagen cannot tag fall back to an ffmpeg re-mux.
+    If REPLAYGAIN_CACHE_FILE is set, measurements are cached and reused.
 
     Args:
-        content: The binary content of the audio file.
+        file_content: The binary content of the audio file.
         file_format: The format of the audio file.
+        timeout: Seconds each ffmpeg run may take (None for no limit).
+        cancel_event: Event that aborts the job when set.
+        cache_key: Loudness cache key (defaults to a hash of file_content).
 
     Returns:
-        bool: True if ReplayGain metadata is present, False otherwise.
+        bytes: The binary content of the audio file with ReplayGain and other loudness metadata.
+    """
+    gain, peak, loudness_metadata = measure_replaygain(
+        file_content, file_format, timeout=timeout, cancel_event=cancel_event, cache_key=cache_key
+    )
+    return tag_replaygain(
+        file_content,
+        file_format,
+        gain,
+        peak,
+        loudness_metadata,
+        timeout=timeout,
+        cancel_event=cancel_event,
+    )
+
+
+def process_album_replaygain(
+    files: List[Tuple[bytes, str]],
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    cache_keys: Optional[List[Optional[str]]] = None,
+) -> List[bytes]:
+    """Process ReplayGain for all tracks of an album, adding album gain and peak.
+
+    Tracks are measured one after another; use ReplayGainPool.process_album to
+    measure them concurrently.
+
+    Args:
+        files: (file_content, file_format) for each track of the album.
+        timeout: Seconds each ffmpeg run may take (None for no limit).
+        cancel_event: Event that aborts the job when set.
+        cache_keys: Loudness cache keys parallel to files (default: content hashes).
+
+    Returns:
+        List[bytes]: The tagged file contents, in the same order as files.
+    """
+    cache_keys = cache_keys or [None] * len(files)
+    measurements = [
+        measure_replaygain(content, fmt, timeout, cancel_event, key)
+        for (content, fmt), key in zip(files, cache_keys)
+    ]
+    durations = [audio_duration(content) for content, _ in files]
+    album_gain, album_peak = album_replaygain(
+        [(gain, peak) for gain, peak, _ in measurements], durations
+    )
+    return [
+        tag_replaygain(
+            content, fmt, gain, peak, metadata, album_gain, album_peak, timeout, cancel_event
+        )
+        for (content, fmt), (gain, peak, metadata) in zip(files, measurements)
+    ]
+
+
+def check_replaygain_metadata(content: BytesIO, file_format: str) -> Optional[bool]:
+    """Check for ReplayGain metadata, distinguishing "absent" from "unreadable".
+
+    Tags are read from the container header with read_replaygain_tags(), which
+    works on partial content (e.g. a ranged download of the file header) as long
+    as the tag block is present. Containers it cannot read are opened with Mutagen.
+
+    Args:
+        content: The binary content (or leading part) of the audio file.
+        file_format: The format of the audio file, with or without a leading dot.
+
+    Returns:
+        True if ReplayGain metadata is present, False if the tags were read and
+        contain none, or None if the content could not be parsed.
     """
+    tags = read_replaygain_tags(content)
+    if tags is not None:
+        return tags.present
+
     content.seek(0)
     try:
-        from mutagen import File as MutagenFile
-
-        audio_file = MutagenFile(content, easy=True)
+        audio_file = MutagenFile(content)
     except Exception as e:
-        logger.error(f"Error reading file with Mutagen: {e}")
-        return False
+        logger.debug(f"Error reading file with Mutagen: {e}")
+        return None
 
     if audio_file is None:
-        logger.error("Unsupported file format or corrupted file.")
-        return False
-
-    def log_replaygain_metadata(tags, metadata_keys):
-        has_metadata = False
-        for key in metadata_keys:
-            if key in tags:
-                logger.debug(f"Found ReplayGain metadata: {key} = {tags[key]}")
-                has_metadata = True
-        return has_metadata
+        logger.debug("Unsupported file format or corrupted file.")
+        return None
 
+    # Tag names as Mutagen exposes them (compared case-insensitively): ID3 stores
+    # ReplayGain in TXXX frames (or RVA2), MP4 in iTunes freeform atoms.
     metadata_keys = {
-        "mp3": ["replaygain_track_gain", "replaygain_track_peak"],
+        "mp3": [
+            "txxx:replaygain_track_gain",
+            "txxx:replaygain_track_peak",
+            "rva2:track",
+        ],
         "flac": ["replaygain_track_gain", "replaygain_track_peak"],
-        "opus": ["R128_TRACK_GAIN", "R128_ALBUM_GAIN"],
-    }.get(file_format.lower(), [])
+        "opus": ["r128_track_gain", "r128_album_gain"],
+        "m4a": [
+            "----:com.apple.itunes:replaygain_track_gain",
+            "----:com.apple.itunes:replaygain_track_peak",
+        ],
+    }.get(file_format.lower().lstrip("."), [])
+
+    present_keys = {key.lower() for key in (audio_file.tags or {}).keys()}
+
+    has_metadata = False
+    for key in metadata_keys:
+        if key in present_keys:
+            logger.debug(f"Found ReplayGain metadata: {key}")
+            has_metadata = True
+    return has_metadata
+
+
+def id3v2_tag_size(header: bytes) -> Optional[int]:
+    """Return the total size of a leading ID3v2 tag, including its header and footer.
+
+    Args:
+        header: At least the first 10 bytes of the file.
+
+    Returns:
+        Tag size in bytes, or None if the data does not start with an ID3v2 tag.
+    """
+    if len(header) < 10 or header[:3] != b"ID3":
+        return None
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)  # syncsafe integer
+    footer = 10 if header[5] & 0x10 else 0
+    return 10 + size + footer
+
 
-    return log_replaygain_metadata(audio_file, metadata_keys)
+def has_replaygain_metadata(content: BytesIO, file_format: str) -> bool:
+    """Check if the file content has ReplayGain metadata.
+
+    Args:
+        content: The binary content of the audio file.
+        file_format: The format of the audio file.
+
+    Returns:
+        bool: True if ReplayGain metadata is present, False otherwise.
+    """
+    result = check_replaygain_metadata(content, file_format)
+    if result is None:
+        logger.error("Unable to read ReplayGain metadata: unsupported format or corrupted file.")
+        return False
+    return result
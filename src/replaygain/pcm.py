@@ -0,0 +1,446 @@
+# src/replaygain/pcm.py
+
+import logging
+import os
+import struct
+import threading
+import time
+from io import BytesIO
+from subprocess import PIPE, CalledProcessError, Popen
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from src.logger import setup_logging
+from src.replaygain.main import (
+    CANCEL_POLL_INTERVAL,
+    FfmpegSource,
+    ReplayGainCancelled,
+    ReplayGainTimeout,
+    calculate_replaygain,
+    start_ffmpeg_feeder,
+)
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Optional NumPy support
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Decoded sample rate; loudness is dominated by content well below 12 kHz
+DEFAULT_SAMPLE_RATE = 24000
+# Seconds of PCM processed per chunk (bounds memory for long mixes)
+CHUNK_SECONDS = 10
+# Gating sub-block length (seconds); 400 ms blocks overlap by 75% (ITU-R BS.1770)
+SUBBLOCK_SECONDS = 0.1
+TRUE_PEAK_OVERSAMPLING = 4
+# True peak is oversampled in frames of this many samples (a power of two keeps
+# the FFTs fast); neighbouring frames overlap by twice the margin
+TRUE_PEAK_FRAME = 4096
+TRUE_PEAK_MARGIN = 32
+# Frames whose sample peak is more than 6 dB below the running true peak
+# cannot raise it, so they are not oversampled
+TRUE_PEAK_HEADROOM = 2.0
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+LRA_RELATIVE_GATE = -20.0
+
+# ITU-R BS.1770 K-weighting filter (pre-filter shelf, then RLB high-pass) at 48 kHz
+K_WEIGHTING_48K = (
+    (
+        (1.53512485958697, -2.69169618940638, 1.19839281085285),
+        (1.0, -1.69065929318241, 0.73248077421585),
+    ),
+    ((1.0, -2.0, 1.0), (1.0, -1.99004745483398, 0.99007225036621)),
+)
+
+
+def k_weighting_response(frequencies: "np.ndarray") -> "np.ndarray":
+    """Return the K-weighting power response |H(f)|² at the given frequencies.
+
+    Args:
+        frequencies: Frequencies in Hz (below 24 kHz).
+
+    Returns:
+        The squared magnitude response for each frequency.
+    """
+    z = np.exp(-2j * np.pi * np.asarray(frequencies) / 48000.0)
+    response = np.ones_like(z)
+    for (b0, b1, b2), (a0, a1, a2) in K_WEIGHTING_48K:
+        response *= (b0 + b1 * z + b2 * z**2) / (a0 + a1 * z + a2 * z**2)
+    return np.abs(response) ** 2
+
+
+def _gated_power(powers: "np.ndarray", relative_gate: float) -> Tuple[Optional[float], float]:
+    """Apply the absolute and relative gates to block powers.
+
+    Returns:
+        The mean power of the gated blocks (None if every block was gated) and
+        the relative gate threshold in LUFS.
+    """
+    loudness = -0.691 + 10 * np.log10(np.maximum(powers, 1e-20))
+    above_absolute = powers[loudness > ABSOLUTE_GATE]
+    if above_absolute.size == 0:
+        return None, ABSOLUTE_GATE
+    threshold = -0.691 + 10 * np.log10(above_absolute.mean()) + relative_gate
+    gated = powers[(loudness > ABSOLUTE_GATE) & (loudness > threshold)]
+    return (gated.mean() if gated.size else None), threshold
+
+
+class LoudnessMeter:
+    """Streaming ITU-R BS.1770 loudness and true-peak meter over float PCM.
+
+    K-weighting is applied in the frequency domain: each 100 ms sub-block is
+    transformed once and its K-weighted mean square obtained via Parseval's
+    theorem, so no per-sample IIR loop runs in Python. Gating blocks (400 ms,
+    75% overlap) and short-term windows (3 s) are averages of sub-blocks.
+    True peak is estimated by FFT oversampling of the decoded signal.
+    """
+
+    def __init__(self, sample_rate: int, channels: int) -> None:
+        """Initializes the meter.
+
+        Args:
+            sample_rate: Sample rate of the PCM data.
+            channels: Number of interleaved channels (1 or 2).
+        """
+        if not HAS_NUMPY:
+            raise RuntimeError("NumPy is required for the PCM loudness engine")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.subblock_size = int(sample_rate * SUBBLOCK_SECONDS)
+
+        # rfft bins count twice except DC (and Nyquist for even sizes)
+        bin_weights = np.full(self.subblock_size // 2 + 1, 2.0)
+        bin_weights[0] = 1.0
+        if self.subblock_size % 2 == 0:
+            bin_weights[-1] = 1.0
+        frequencies = np.fft.rfftfreq(self.subblock_size, d=1.0 / sample_rate)
+        self._bin_weights = bin_weights * k_weighting_response(frequencies) / self.subblock_size**2
+
+        self._pending = np.zeros((0, channels))
+        self._peak_tail = np.zeros((0, channels))
+        self._subblock_powers: List["np.ndarray"] = []
+        self._sample_peak = 0.0
+        self._true_peak = 0.0
+        self.samples = 0
+
+    def add(self, samples: "np.ndarray") -> None:
+        """Feed PCM frames to the meter.
+
+        Args:
+            samples: Array of shape (frames, channels) with samples in [-1, 1].
+        """
+        if samples.size == 0:
+            return
+        self.samples += len(samples)
+        self._sample_peak = max(self._sample_peak, float(np.abs(samples).max()))
+        self._update_true_peak(samples)
+
+        samples = np.concatenate([self._pending, samples])
+        complete = len(samples) // self.subblock_size
+        if complete:
+            blocks = samples[: complete * self.subblock_size].reshape(
+                complete, self.subblock_size, self.channels
+            )
+            spectrum = np.fft.rfft(blocks, axis=1)
+            # Sum of channel mean squares (G = 1.0 for mono, left and right)
+            powers = (np.abs(spectrum) ** 2 * self._bin_weights[:, None]).sum(axis=(1, 2))
+            self._subblock_powers.append(powers)
+        self._pending = samples[complete * self.subblock_size :]
+
+    def _update_true_peak(self, samples: "np.ndarray") -> None:
+        # Only the centre of each frame is used; the margins give the FFT
+        # interpolation context on both sides and are covered by neighbours.
+        window = np.concatenate([self._peak_tail, samples])
+        hop = TRUE_PEAK_FRAME - 2 * TRUE_PEAK_MARGIN
+        frames = max(0, (len(window) - 2 * TRUE_PEAK_MARGIN) // hop)
+        self._peak_tail = window[frames * hop :]
+        if not frames:
+            return
+
+        framed = np.lib.stride_tricks.sliding_window_view(
+            window[: frames * hop + 2 * TRUE_PEAK_MARGIN], TRUE_PEAK_FRAME, axis=0
+        )[::hop]
+        frame_peaks = np.abs(framed).max(axis=(1, 2))
+        framed = framed[frame_peaks * TRUE_PEAK_HEADROOM > self._true_peak]
+        if len(framed):
+            upsampled = (
+                np.fft.irfft(
+                    np.fft.rfft(framed, axis=-1),
+                    n=TRUE_PEAK_FRAME * TRUE_PEAK_OVERSAMPLING,
+                    axis=-1,
+                )
+                * TRUE_PEAK_OVERSAMPLING
+            )
+            start = TRUE_PEAK_MARGIN * TRUE_PEAK_OVERSAMPLING
+            centre = upsampled[..., start:-start]
+            self._true_peak = max(self._true_peak, float(np.abs(centre).max()))
+
+    def result(self) -> Dict[str, str]:
+        """Return the measurement in the same form as ffmpeg's loudnorm JSON.
+
+        Returns:
+            Dict with input_i (LUFS), input_tp (dBTP), input_lra (LU) and
+            input_thresh (LUFS), formatted as strings like loudnorm prints them.
+        """
+        powers = np.concatenate(self._subblock_powers) if self._subblock_powers else np.zeros(0)
+
+        integrated, threshold = ABSOLUTE_GATE, ABSOLUTE_GATE
+        if len(powers) >= 4:
+            blocks = np.convolve(powers, np.ones(4) / 4, mode="valid")
+            gated, threshold = _gated_power(blocks, RELATIVE_GATE)
+            if gated is not None:
+                integrated = -0.691 + 10 * np.log10(gated)
+
+        lra = 0.0
+        if len(powers) >= 30:
+            short_term = np.convolve(powers, np.ones(30) / 30, mode="valid")
+            loudness = -0.691 + 10 * np.log10(np.maximum(short_term, 1e-20))
+            _, lra_threshold = _gated_power(short_term, LRA_RELATIVE_GATE)
+            gated = loudness[(loudness > ABSOLUTE_GATE) & (loudness > lra_threshold)]
+            if gated.size:
+                low, high = np.percentile(gated, [10, 95])
+                lra = float(high - low)
+
+        peak = max(self._true_peak, self._sample_peak, 1e-9)
+        return {
+            "input_i": f"{integrated:.2f}",
+            "input_tp": f"{20 * np.log10(peak):.2f}",
+            "input_lra": f"{lra:.2f}",
+            "input_thresh": f"{threshold:.2f}",
+        }
+
+
+def _read_exact(stream: IO[bytes], size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise RuntimeError("Unexpected end of PCM stream from ffmpeg")
+        data += chunk
+    return data
+
+
+def _read_wav_header(stream: IO[bytes]) -> Tuple[int, int]:
+    """Read a streamed WAV header up to the start of the data chunk.
+
+    Returns:
+        A tuple of (channels, sample_rate).
+    """
+    riff, _, wave = struct.unpack("<4sI4s", _read_exact(stream, 12))
+    if riff != b"RIFF" or wave != b"WAVE":
+        raise RuntimeError("ffmpeg did not produce a WAV stream")
+
+    channels = sample_rate = None
+    while True:
+        chunk_id, size = struct.unpack("<4sI", _read_exact(stream, 8))
+        if chunk_id == b"data":
+            break
+        payload = _read_exact(stream, size + (size & 1))
+        if chunk_id == b"fmt ":
+            _, channels, sample_rate = struct.unpack("<HHI", payload[:8])
+    if channels is None:
+        raise RuntimeError("WAV stream from ffmpeg has no fmt chunk")
+    return channels, sample_rate
+
+
+def decode_pcm(
+    source: FfmpegSource,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    duration: Optional[float] = None,
+) -> Iterator[Tuple[int, int, "np.ndarray"]]:
+    """Decode an audio file once to float PCM, streamed from ffmpeg in chunks.
+
+    Sources with more than two channels are downmixed to stereo.
+
+    Args:
+        source: The audio file as bytes, path, file object or chunk iterable.
+        sample_rate: Sample rate to resample to.
+        timeout: Seconds before ffmpeg is killed (None for no limit).
+        cancel_event: Event that kills ffmpeg when set.
+        duration: Decode only the first duration seconds (None for the whole file).
+
+    Yields:
+        Tuples of (sample_rate, channels, samples) where samples has shape
+        (frames, channels).
+
+    Raises:
+        CalledProcessError: If ffmpeg fails.
+        ReplayGainTimeout: If ffmpeg exceeded timeout.
+        ReplayGainCancelled: If the job was cancelled.
+    """
+    command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-i",
+        "pipe:0",
+        "-vn",
+        "-af",
+        "aformat=channel_layouts=mono|stereo",
+        "-ar",
+        str(sample_rate),
+        "-c:a",
+        "pcm_f32le",
+        "-f",
+        "wav",
+        "pipe:1",
+    ]
+    if duration is not None:
+        command[-5:-5] = ["-t", str(duration)]
+    deadline = None if timeout is None else time.monotonic() + timeout
+    finished = threading.Event()
+    stopped: List[Exception] = []
+    stderr_lines: List[bytes] = []
+
+    with Popen(command, stdin=PIPE, stdout=PIPE, stderr=PIPE) as process:
+
+        def drain_stderr() -> None:
+            for line in process.stderr:
+                stderr_lines.append(line)
+                del stderr_lines[:-20]
+
+        def watch() -> None:
+            while not finished.wait(CANCEL_POLL_INTERVAL):
+                if cancel_event is not None and cancel_event.is_set():
+                    stopped.append(ReplayGainCancelled("ffmpeg decode cancelled"))
+                elif deadline is not None and time.monotonic() >= deadline:
+                    stopped.append(ReplayGainTimeout(f"ffmpeg decode exceeded {timeout}s"))
+                else:
+                    continue
+                process.kill()
+                return
+
+        helpers = [threading.Thread(target=target, daemon=True) for target in (drain_stderr, watch)]
+        for helper in helpers:
+            helper.start()
+        helpers.append(start_ffmpeg_feeder(process, source))
+        try:
+            try:
+                channels, rate = _read_wav_header(process.stdout)
+            except RuntimeError:
+                if stopped:
+                    raise stopped[0]
+                process.wait()
+                raise CalledProcessError(process.returncode, command, stderr=b"".join(stderr_lines))
+
+            frame_bytes = 4 * channels
+            chunk_bytes = rate * CHUNK_SECONDS * frame_bytes
+            remainder = b""
+            while True:
+                data = process.stdout.read(chunk_bytes)
+                if not data:
+                    break
+                data = remainder + data
+                usable = len(data) - len(data) % frame_bytes
+                remainder = data[usable:]
+                samples = np.frombuffer(data[:usable], dtype="<f4").reshape(-1, channels)
+                yield rate, channels, samples.astype(np.float64)
+
+            process.wait()
+            if stopped:
+                raise stopped[0]
+            if process.returncode != 0:
+                raise CalledProcessError(process.returncode, command, stderr=b"".join(stderr_lines))
+        finally:
+            finished.set()
+            if process.poll() is None:
+                process.kill()
+            for helper in helpers:
+                helper.join()
+
+
+def calculate_replaygain_pcm(
+    file_like: FfmpegSource,
+    file_format: str,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    sample_rate: Optional[int] = None,
+) -> Tuple[float, float, dict]:
+    """Calculate ReplayGain values by decoding once to PCM and measuring in NumPy.
+
+    A faster alternative to calculate_replaygain for long files. The file is
+    decoded and resampled once by ffmpeg; integrated loudness, loudness range
+    and true peak are computed from the streamed PCM. Content above the
+    reduced Nyquist frequency is ignored, so peaks may read slightly lower
+    than ffmpeg's loudnorm; use compare_engines() to check the deviation.
+
+    Args:
+        file_like: The audio content as a file-like object, file path, bytes or
+            iterable of chunks.
+        file_format: The format of the audio file (e.g., 'mp3', 'flac', 'opus').
+        timeout: Seconds before ffmpeg is killed (None for no limit).
+        cancel_event: Event that kills ffmpeg when set.
+        sample_rate: Decoding sample rate (defaults to REPLAYGAIN_PCM_SAMPLE_RATE or 24000).
+
+    Returns:
+        A tuple containing the gain (in dB), peak values, and loudnorm-style JSON data.
+
+    Raises:
+        RuntimeError: If NumPy is not installed or the stream could not be decoded.
+        ReplayGainTimeout: If ffmpeg exceeded timeout.
+        ReplayGainCancelled: If the job was cancelled.
+    """
+    if not HAS_NUMPY:
+        raise RuntimeError("NumPy is required for the PCM loudness engine")
+    sample_rate = sample_rate or int(
+        os.getenv("REPLAYGAIN_PCM_SAMPLE_RATE", str(DEFAULT_SAMPLE_RATE))
+    )
+
+    meter: Optional[LoudnessMeter] = None
+    for rate, channels, samples in decode_pcm(file_like, sample_rate, timeout, cancel_event):
+        if meter is None:
+            meter = LoudnessMeter(rate, channels)
+        meter.add(samples)
+
+    if meter is None or meter.samples == 0:
+        raise RuntimeError(f"No audio decoded from {file_format} file")
+
+    parsed_data = meter.result()
+    logger.debug(
+        f"PCM loudness ({meter.samples / meter.sample_rate:.0f}s at {meter.sample_rate} Hz): "
+        f"{parsed_data}"
+    )
+    return float(parsed_data["input_i"]), float(parsed_data["input_tp"]), parsed_data
+
+
+def compare_engines(
+    file_content: bytes, file_format: str, sample_rate: Optional[int] = None
+) -> Dict[str, float]:
+    """Measure a file with both engines and report accuracy and speed.
+
+    Args:
+        file_content: The binary content of the audio file.
+        file_format: The format of the audio file.
+        sample_rate: Decoding sample rate for the PCM engine.
+
+    Returns:
+        Dict with each engine's gain, peak and seconds, the absolute gain and
+        peak differences, and the PCM engine's speedup factor.
+    """
+    started = time.perf_counter()
+    ffmpeg_gain, ffmpeg_peak, _ = calculate_replaygain(BytesIO(file_content), file_format)
+    ffmpeg_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pcm_gain, pcm_peak, _ = calculate_replaygain_pcm(
+        BytesIO(file_content), file_format, sample_rate=sample_rate
+    )
+    pcm_seconds = time.perf_counter() - started
+
+    return {
+        "ffmpeg_gain": ffmpeg_gain,
+        "ffmpeg_peak": ffmpeg_peak,
+        "ffmpeg_seconds": ffmpeg_seconds,
+        "pcm_gain": pcm_gain,
+        "pcm_peak": pcm_peak,
+        "pcm_seconds": pcm_seconds,
+        "gain_error": abs(pcm_gain - ffmpeg_gain),
+        "peak_error": abs(pcm_peak - ffmpeg_peak),
+        "speedup": ffmpeg_seconds / max(pcm_seconds, 1e-9),
+    }
@@ -0,0 +1,317 @@
+# src/replaygain/pool.py
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from src.logger import setup_logging
+from src.replaygain.main import (
+    ReplayGainCancelled,
+    album_replaygain,
+    audio_duration,
+    measure_replaygain,
+    process_replaygain,
+    tag_replaygain,
+)
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ReplayGainJob:
+    """Handle for a queued or running ReplayGain analysis job."""
+
+    def __init__(self, label: str, future: Future, cancel_event: threading.Event) -> None:
+        self.label = label
+        self.future = future
+        self._cancel_event = cancel_event
+
+    def cancel(self) -> None:
+        """Cancel the job: drop it from the queue, or kill ffmpeg if it is running."""
+        self._cancel_event.set()
+        self.future.cancel()
+
+    def done(self) -> bool:
+        """Return True if the job finished, failed or was cancelled."""
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> bytes:
+        """Wait for the job and return the tagged file content.
+
+        Args:
+            timeout: Seconds to wait for the job (None waits indefinitely).
+
+        Returns:
+            bytes: The audio file content with ReplayGain metadata.
+
+        Raises:
+            ReplayGainCancelled: If the job was cancelled.
+            ReplayGainTimeout: If ffmpeg exceeded the pool's job timeout.
+            concurrent.futures.TimeoutError: If the job did not finish within timeout.
+        """
+        try:
+            return self.future.result(timeout=timeout)
+        except CancelledError as e:
+            raise ReplayGainCancelled(f"ReplayGain job '{self.label}' cancelled") from e
+
+
+class ReplayGainPool:
+    """Worker pool that runs ReplayGain analysis jobs concurrently.
+
+    Each job runs ffmpeg in its own process, so worker threads are enough to
+    keep every core busy; the executor's queue holds jobs waiting for a worker.
+    Jobs are killed when they exceed the per-job timeout or are cancelled.
+
+    Configuration (environment):
+        REPLAYGAIN_WORKERS: Concurrent ffmpeg jobs (default: CPU count).
+        REPLAYGAIN_JOB_TIMEOUT: Seconds per ffmpeg run, 0 for no limit (default: 600).
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, job_timeout: Optional[float] = None
+    ) -> None:
+        """Initializes the pool.
+
+        Args:
+            max_workers: Concurrent jobs (defaults to REPLAYGAIN_WORKERS or the CPU count).
+            job_timeout: Seconds per ffmpeg run (defaults to REPLAYGAIN_JOB_TIMEOUT).
+        """
+        self.max_workers: int = (
+            max_workers or int(os.getenv("REPLAYGAIN_WORKERS", "0")) or (os.cpu_count() or 1)
+        )
+        if job_timeout is None:
+            job_timeout = float(os.getenv("REPLAYGAIN_JOB_TIMEOUT", "600"))
+        self.job_timeout: Optional[float] = job_timeout or None
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="replaygain"
+        )
+        self._lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def submit(
+        self,
+        file_content: bytes,
+        file_format: str,
+        label: str = "",
+        cache_key: Optional[str] = None,
+    ) -> ReplayGainJob:
+        """Queue a file for ReplayGain analysis and tagging.
+
+        Args:
+            file_content: The binary content of the audio file.
+            file_format: The format of the audio file.
+            label: Name used in log messages (e.g. the track title).
+            cache_key: Loudness cache key (defaults to a hash of file_content).
+
+        Returns:
+            ReplayGainJob: Handle to wait for or cancel the job.
+        """
+        return self._submit(
+            lambda cancel_event: process_replaygain(
+                file_content,
+                file_format,
+                timeout=self.job_timeout,
+                cancel_event=cancel_event,
+                cache_key=cache_key,
+            ),
+            label,
+        )
+
+    def process(
+        self,
+        file_content: bytes,
+        file_format: str,
+        label: str = "",
+        cache_key: Optional[str] = None,
+    ) -> bytes:
+        """Analyse and tag a file through the pool, waiting for the result.
+
+        Args:
+            file_content: The binary content of the audio file.
+            file_format: The format of the audio file.
+            label: Name used in log messages (e.g. the track title).
+            cache_key: Loudness cache key (defaults to a hash of file_content).
+
+        Returns:
+            bytes: The audio file content with ReplayGain metadata.
+        """
+        return self.submit(file_content, file_format, label, cache_key).result()
+
+    def process_album(
+        self,
+        files: List[Tuple[bytes, str]],
+        label: str = "",
+        cache_keys: Optional[List[Optional[str]]] = None,
+    ) -> List[bytes]:
+        """Analyse all tracks of an album concurrently and tag them with album gain.
+
+        Every track is measured in its own job; once all measurements are in,
+        album loudness and peak are derived and the tags of every file are
+        written in one batch.
+
+        Args:
+            files: (file_content, file_format) for each track of the album.
+            label: Name used in log messages (e.g. the album title).
+            cache_keys: Loudness cache keys parallel to files (default: content hashes).
+
+        Returns:
+            List[bytes]: The tagged file contents, in the same order as files.
+
+        Raises:
+            ReplayGainCancelled: If a measurement was cancelled.
+            ReplayGainTimeout: If ffmpeg exceeded the pool's job timeout.
+        """
+        cache_keys = cache_keys or [None] * len(files)
+        jobs = [
+            self.submit_measurement(content, fmt, f"{label} #{number}", key)
+            for number, ((content, fmt), key) in enumerate(zip(files, cache_keys), start=1)
+        ]
+        try:
+            measurements = [job.result() for job in jobs]
+        except Exception:
+            for job in jobs:
+                job.cancel()
+            raise
+
+        album_gain, album_peak = album_replaygain(
+            [(gain, peak) for gain, peak, _, _ in measurements],
+            [duration for _, _, _, duration in measurements],
+        )
+        logger.info(f"Album '{label}': gain {album_gain} dB, peak {album_peak}")
+        return [
+            tag_replaygain(
+                content,
+                fmt,
+                gain,
+                peak,
+                metadata,
+                album_gain,
+                album_peak,
+                timeout=self.job_timeout,
+            )
+            for (content, fmt), (gain, peak, metadata, _) in zip(files, measurements)
+        ]
+
+    def submit_measurement(
+        self,
+        file_content: bytes,
+        file_format: str,
+        label: str = "",
+        cache_key: Optional[str] = None,
+    ) -> ReplayGainJob:
+        """Queue a file for loudness measurement only, without tagging it.
+
+        Measurements are stored in the loudness cache when it is enabled.
+
+        Args:
+            file_content: The binary content of the audio file.
+            file_format: The format of the audio file.
+            label: Name used in log messages (e.g. the track title).
+            cache_key: Loudness cache key (defaults to a hash of file_content).
+
+        Returns:
+            ReplayGainJob: Handle whose result is (gain, peak, loudnorm data, duration).
+        """
+
+        def work(cancel_event: threading.Event) -> Tuple[float, float, dict, Optional[float]]:
+            gain, peak, metadata = measure_replaygain(
+                file_content,
+                file_format,
+                timeout=self.job_timeout,
+                cancel_event=cancel_event,
+                cache_key=cache_key,
+            )
+            return gain, peak, metadata, audio_duration(file_content)
+
+        return self._submit(work, label)
+
+    def _submit(self, work: Callable[[threading.Event], T], label: str) -> ReplayGainJob:
+        cancel_event = threading.Event()
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            self.submitted += 1
+        future = self._executor.submit(self._run, work, cancel_event, label)
+        future.add_done_callback(self._count_if_cancelled)
+        return ReplayGainJob(label, future, cancel_event)
+
+    def _run(
+        self, work: Callable[[threading.Event], T], cancel_event: threading.Event, label: str
+    ) -> T:
+        started = time.monotonic()
+        try:
+            if cancel_event.is_set():
+                raise ReplayGainCancelled(f"ReplayGain job '{label}' cancelled")
+            result = work(cancel_event)
+        except ReplayGainCancelled:
+            with self._lock:
+                self.cancelled += 1
+            raise
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"ReplayGain job '{label}' failed: {e}")
+            raise
+        with self._lock:
+            self.completed += 1
+        logger.debug(f"ReplayGain job '{label}' took {time.monotonic() - started:.1f}s")
+        return result
+
+    def _count_if_cancelled(self, future: Future) -> None:
+        # Jobs cancelled while still queued never reach _run
+        if future.cancelled():
+            with self._lock:
+                self.cancelled += 1
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs queued or running."""
+        with self._lock:
+            return self.submitted - self.completed - self.failed - self.cancelled
+
+    def tracks_per_minute(self) -> float:
+        """Completed jobs per minute since the first job was submitted."""
+        with self._lock:
+            if self._started_at is None or self.completed == 0:
+                return 0.0
+            elapsed = max(time.monotonic() - self._started_at, 1e-6)
+            return self.completed * 60.0 / elapsed
+
+    def log_throughput(self) -> None:
+        """Log completed/failed counts and throughput in tracks per minute."""
+        logger.info(
+            f"ReplayGain: {self.completed} analysed, {self.failed} failed, "
+            f"{self.cancelled} cancelled, {self.tracks_per_minute():.1f} tracks/min "
+            f"({self.max_workers} workers)"
+        )
+
+    def shutdown(self, cancel_pending: bool = False) -> None:
+        """Stop the pool.
+
+        Args:
+            cancel_pending: Drop queued jobs instead of waiting for them.
+        """
+        self._executor.shutdown(wait=True, cancel_futures=cancel_pending)
+
+
+_shared_pool: Optional[ReplayGainPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_replaygain_pool() -> ReplayGainPool:
+    """Return the process-wide ReplayGain pool, creating it on first use."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ReplayGainPool()
+        return _shared_pool
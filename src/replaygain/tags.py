@@ -0,0 +1,386 @@
+# src/replaygain/tags.py
+
+import logging
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from src.logger import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+ASF_HEADER_GUID = bytes.fromhex("3026b2758e66cf11a6d900aa0062ce6c")
+ASF_EXTENDED_CONTENT_GUID = bytes.fromhex("40a4d0d207e3d21197f000a0c95ea850")
+# MP4 atoms that contain child atoms on the way to the iTunes metadata list
+MP4_CONTAINERS = {b"moov", b"udta", b"meta", b"ilst"}
+
+
+class _Truncated(Exception):
+    """The stream ended before the tag block did (e.g. a partial download)."""
+
+
+@dataclass
+class ReplayGainTags:
+    """ReplayGain values read from a file's tags (None where a tag is absent)."""
+
+    track_gain: Optional[float] = None
+    track_peak: Optional[float] = None
+    album_gain: Optional[float] = None
+    album_peak: Optional[float] = None
+    r128_track_gain: Optional[int] = None
+    r128_album_gain: Optional[int] = None
+
+    @property
+    def present(self) -> bool:
+        """True if the file carries track-level (or R128) ReplayGain metadata."""
+        return any(
+            value is not None
+            for value in (
+                self.track_gain,
+                self.track_peak,
+                self.r128_track_gain,
+                self.r128_album_gain,
+            )
+        )
+
+    def set(self, key: str, value: str) -> None:
+        """Record a tag value if key is a ReplayGain tag name (case-insensitive)."""
+        name = key.strip().lower()
+        if name.startswith("replaygain_"):
+            name = name[len("replaygain_") :]
+        try:
+            if name in ("track_gain", "track_peak", "album_gain", "album_peak"):
+                setattr(self, name, float(value.strip().split()[0]))
+            elif name in ("r128_track_gain", "r128_album_gain"):
+                setattr(self, name, int(value.strip()))
+        except (ValueError, IndexError):
+            logger.debug(f"Ignoring malformed {key} tag: {value!r}")
+
+
+def _read(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) < size:
+        raise _Truncated()
+    return data
+
+
+def _syncsafe(data: bytes) -> int:
+    value = 0
+    for byte in data:
+        value = (value << 7) | (byte & 0x7F)
+    return value
+
+
+def _split_text(encoding: int, data: bytes) -> List[str]:
+    """Split an ID3 text payload on its null terminators and decode it."""
+    if encoding in (1, 2):
+        codec = "utf-16" if encoding == 1 else "utf-16-be"
+        parts, start = [], 0
+        for offset in range(0, len(data) - 1, 2):
+            if data[offset : offset + 2] == b"\x00\x00":
+                parts.append(data[start:offset])
+                start = offset + 2
+        parts.append(data[start:])
+        return [part.decode(codec, errors="replace") for part in parts]
+    codec = "latin-1" if encoding == 0 else "utf-8"
+    return [part.decode(codec, errors="replace") for part in data.split(b"\x00")]
+
+
+def _parse_rva2(frame: bytes, tags: ReplayGainTags) -> None:
+    identification, _, data = frame.partition(b"\x00")
+    scope = identification.decode("latin-1").lower()
+    if scope not in ("track", "album"):
+        return
+    while len(data) >= 4:
+        channel, adjustment, peak_bits = struct.unpack(">BhB", data[:4])
+        peak_bytes = (peak_bits + 7) // 8
+        peak_raw = int.from_bytes(data[4 : 4 + peak_bytes], "big") if peak_bytes else None
+        data = data[4 + peak_bytes :]
+        if channel == 1:  # Master volume
+            setattr(tags, f"{scope}_gain", adjustment / 512.0)
+            if peak_raw is not None and peak_bits:
+                setattr(tags, f"{scope}_peak", peak_raw / float(1 << (peak_bits - 1)))
+            return
+
+
+def _parse_id3v2(stream: BinaryIO, tags: ReplayGainTags) -> None:
+    """Parse an ID3v2 tag positioned at the stream's current offset."""
+    header = _read(stream, 10)
+    version, flags = header[3], header[5]
+    if version not in (2, 3, 4):
+        raise ValueError(f"Unsupported ID3v2 version {version}")
+    body = stream.read(_syncsafe(header[6:10]))
+    truncated = len(body) < _syncsafe(header[6:10])
+    if flags & 0x10:
+        stream.seek(10, 1)  # Footer
+
+    if version < 4 and flags & 0x80:
+        body = body.replace(b"\xff\x00", b"\xff")
+    offset = 0
+    if flags & 0x40 and version == 3:
+        offset = 4 + struct.unpack(">I", body[:4])[0]
+    elif flags & 0x40 and version == 4:
+        offset = _syncsafe(body[:4])
+
+    id_size, header_size = (3, 6) if version == 2 else (4, 10)
+    while offset + header_size <= len(body):
+        frame_id = body[offset : offset + id_size]
+        if not frame_id.strip(b"\x00"):
+            break  # Padding
+        if version == 2:
+            size = int.from_bytes(body[offset + 3 : offset + 6], "big")
+            frame_flags = 0
+        elif version == 3:
+            size = struct.unpack(">I", body[offset + 4 : offset + 8])[0]
+            frame_flags = struct.unpack(">H", body[offset + 8 : offset + 10])[0]
+        else:
+            size = _syncsafe(body[offset + 4 : offset + 8])
+            frame_flags = struct.unpack(">H", body[offset + 8 : offset + 10])[0]
+        frame = body[offset + header_size : offset + header_size + size]
+        offset += header_size + size
+        if len(frame) < size:
+            truncated = True
+            break
+
+        if version == 3 and frame_flags & 0x00C0:
+            continue  # Compressed or encrypted
+        if version == 4:
+            if frame_flags & 0x000C:
+                continue  # Compressed or encrypted
+            if frame_flags & 0x0002:
+                frame = frame.replace(b"\xff\x00", b"\xff")
+            if frame_flags & 0x0001:
+                frame = frame[4:]  # Data length indicator
+
+        if frame_id in (b"TXXX", b"TXX") and frame:
+            text = _split_text(frame[0], frame[1:])
+            if len(text) >= 2:
+                tags.set(text[0], text[1])
+        elif frame_id == b"RVA2":
+            _parse_rva2(frame, tags)
+
+    if truncated and not tags.present:
+        raise _Truncated()
+
+
+def _parse_vorbis_comment(data: bytes, tags: ReplayGainTags) -> None:
+    try:
+        vendor_length = struct.unpack("<I", data[:4])[0]
+        offset = 4 + vendor_length
+        count = struct.unpack("<I", data[offset : offset + 4])[0]
+        offset += 4
+        for _ in range(count):
+            length = struct.unpack("<I", data[offset : offset + 4])[0]
+            comment = data[offset + 4 : offset + 4 + length]
+            if len(comment) < length:
+                raise _Truncated()
+            offset += 4 + length
+            key, sep, value = comment.decode("utf-8", errors="replace").partition("=")
+            if sep:
+                tags.set(key, value)
+    except struct.error as e:
+        raise _Truncated() from e
+
+
+def _parse_flac(stream: BinaryIO, tags: ReplayGainTags) -> None:
+    _read(stream, 4)  # fLaC
+    while True:
+        block_header = _read(stream, 4)
+        block_type = block_header[0] & 0x7F
+        size = int.from_bytes(block_header[1:], "big")
+        if block_type == 4:
+            _parse_vorbis_comment(_read(stream, size), tags)
+            return
+        if block_header[0] & 0x80:
+            return  # Last metadata block, no comments
+        stream.seek(size, 1)
+
+
+def _ogg_packets(stream: BinaryIO) -> Iterator[bytes]:
+    """Yield the packets of the first logical stream in an Ogg file."""
+    serial = None
+    packet = b""
+    while True:
+        header = _read(stream, 27)
+        if header[:4] != b"OggS":
+            raise _Truncated()
+        page_serial = header[14:18]
+        lacing = _read(stream, header[26])
+        data = _read(stream, sum(lacing))
+        if serial is None:
+            serial = page_serial
+        if page_serial != serial:
+            continue
+        offset = 0
+        for segment in lacing:
+            packet += data[offset : offset + segment]
+            offset += segment
+            if segment < 255:
+                yield packet
+                packet = b""
+
+
+def _parse_ogg(stream: BinaryIO, tags: ReplayGainTags) -> None:
+    packets = _ogg_packets(stream)
+    first = next(packets)
+    comments = next(packets)
+    if first.startswith(b"OpusHead") and comments.startswith(b"OpusTags"):
+        _parse_vorbis_comment(comments[8:], tags)
+    elif first.startswith(b"\x01vorbis") and comments.startswith(b"\x03vorbis"):
+        _parse_vorbis_comment(comments[7:], tags)
+    elif first.startswith(b"\x7fFLAC"):
+        _parse_vorbis_comment(comments[4:], tags)  # FLAC metadata block header
+    elif first.startswith(b"Speex   "):
+        _parse_vorbis_comment(comments, tags)
+
+
+def _mp4_boxes(stream: BinaryIO, end: Optional[int]) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload offset, payload size) for boxes up to end."""
+    while end is None or stream.tell() + 8 <= end:
+        header = stream.read(8)
+        if len(header) < 8:
+            if end is None and not header:
+                return
+            raise _Truncated()
+        size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", _read(stream, 8))[0]
+            header_size = 16
+        start = stream.tell()
+        if size == 0:  # Box extends to the end of its parent (or the file)
+            payload_size = (end - start) if end is not None else -1
+        else:
+            payload_size = size - header_size
+        yield box_type, start, payload_size
+        if payload_size < 0:
+            return
+        stream.seek(start + payload_size)
+
+
+def _parse_mp4_item(stream: BinaryIO, end: int, tags: ReplayGainTags) -> None:
+    name, value = None, None
+    for box_type, start, size in _mp4_boxes(stream, end):
+        data = _read(stream, size)
+        if box_type == b"name":
+            name = data[4:].decode("utf-8", errors="replace")
+        elif box_type == b"data":
+            value = data[8:].decode("utf-8", errors="replace")
+    if name and value is not None:
+        tags.set(name, value)
+
+
+def _parse_mp4(stream: BinaryIO, end: Optional[int], tags: ReplayGainTags) -> bool:
+    """Walk MP4 boxes towards moov/udta/meta/ilst. Returns True once ilst was read."""
+    for box_type, start, size in _mp4_boxes(stream, end):
+        box_end = start + size if size >= 0 else None
+        if box_type == b"meta":
+            # Full box with version/flags, except in some QuickTime files
+            if _read(stream, 4) != b"\x00\x00\x00\x00":
+                stream.seek(start)
+        if box_type == b"ilst":
+            for item_type, item_start, item_size in _mp4_boxes(stream, box_end):
+                if item_type == b"----":
+                    _parse_mp4_item(stream, item_start + item_size, tags)
+            return True
+        if box_type in MP4_CONTAINERS and _parse_mp4(stream, box_end, tags):
+            return True
+        if box_type == b"moov":
+            return True  # moov without iTunes metadata
+    return False
+
+
+def _parse_asf(stream: BinaryIO, tags: ReplayGainTags) -> None:
+    header = _read(stream, 30)
+    object_count = struct.unpack("<I", header[24:28])[0]
+    for _ in range(object_count):
+        guid = _read(stream, 16)
+        size = struct.unpack("<Q", _read(stream, 8))[0]
+        data = _read(stream, size - 24)
+        if guid != ASF_EXTENDED_CONTENT_GUID:
+            continue
+        offset = 2
+        for _ in range(struct.unpack("<H", data[:2])[0]):
+            name_length = struct.unpack("<H", data[offset : offset + 2])[0]
+            name = data[offset + 2 : offset + 2 + name_length].decode("utf-16-le").rstrip("\x00")
+            offset += 2 + name_length
+            value_type, value_length = struct.unpack("<HH", data[offset : offset + 4])
+            value = data[offset + 4 : offset + 4 + value_length]
+            offset += 4 + value_length
+            if value_type == 0:  # Unicode string
+                tags.set(name, value.decode("utf-16-le").rstrip("\x00"))
+        return
+
+
+def _parse_iff(stream: BinaryIO, tags: ReplayGainTags, big_endian: bool) -> None:
+    """Find an ID3 chunk in a RIFF (WAV) or FORM (AIFF) container."""
+    size_format = ">I" if big_endian else "<I"
+    container_end = 8 + struct.unpack(size_format, _read(stream, 12)[4:8])[0]
+    available = stream.seek(0, 2)
+    position = stream.seek(12)
+    while position + 8 <= container_end:
+        if position + 8 > available:
+            raise _Truncated()  # Chunks beyond the downloaded part
+        chunk_id = _read(stream, 4)
+        size = struct.unpack(size_format, _read(stream, 4))[0]
+        if chunk_id.lower() == b"id3 ":
+            _parse_id3v2(stream, tags)
+            return
+        position = stream.seek(size + (size & 1), 1)
+
+
+def read_replaygain_tags(stream: BinaryIO) -> Optional[ReplayGainTags]:
+    """Read ReplayGain tags from the header of an audio file.
+
+    The container is detected from its signature, not the file extension, and
+    only the tag blocks are read: the leading ID3v2 tag (MP3, AAC), FLAC and Ogg
+    (Opus, Vorbis, FLAC, Speex) Vorbis comments, MP4 iTunes freeform atoms
+    (M4A, ALAC), ASF extended content (WMA) and ID3 chunks in WAV and AIFF.
+    Audio data is skipped with seeks, so the stream may be a file on disk or
+    the leading part of a download.
+
+    Args:
+        stream: Seekable binary stream positioned anywhere; read from its start.
+
+    Returns:
+        The tags found (empty if the file has none), or None if the format is
+        not recognised or the tag block is cut off before it could be read.
+    """
+    stream.seek(0)
+    signature = stream.read(12)
+    stream.seek(0)
+    tags = ReplayGainTags()
+
+    try:
+        if signature[:3] == b"ID3":
+            _parse_id3v2(stream, tags)
+            # FLAC files sometimes carry a leading ID3 tag before their own comments
+            if not tags.present and stream.read(4) == b"fLaC":
+                stream.seek(-4, 1)
+                _parse_flac(stream, tags)
+        elif signature[:4] == b"fLaC":
+            _parse_flac(stream, tags)
+        elif signature[:4] == b"OggS":
+            _parse_ogg(stream, tags)
+        elif signature[4:8] == b"ftyp":
+            if not _parse_mp4(stream, None, tags):
+                return None  # moov lies beyond the available data
+        elif signature == ASF_HEADER_GUID[:12]:
+            _parse_asf(stream, tags)
+        elif signature[:4] == b"RIFF" and signature[8:12] == b"WAVE":
+            _parse_iff(stream, tags, big_endian=False)
+        elif signature[:4] == b"FORM" and signature[8:12] in (b"AIFF", b"AIFC"):
+            _parse_iff(stream, tags, big_endian=True)
+        elif len(signature) >= 2 and signature[0] == 0xFF and signature[1] & 0xE0 == 0xE0:
+            pass  # Bare MPEG/ADTS frames: no leading tag block
+        else:
+            return None
+    except (_Truncated, StopIteration):
+        logger.debug("Tag block incomplete, cannot read ReplayGain tags from header")
+        return None
+    except (struct.error, UnicodeDecodeError, ValueError) as e:
+        logger.debug(f"Malformed tag block: {e}")
+        return None
+
+    return tags
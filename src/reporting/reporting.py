@@ -2,6 +2,7 @@
 
 import datetime
 import logging
+import threading
 from typing import Dict, List, Optional
 
 import markdown
@@ -38,11 +39,16 @@ class Event:
 
 
 class PlaylistReport:
-    """Class to generate a Markdown report for M3U playlist generation."""
+    """Class to generate a Markdown report for M3U playlist generation.
+
+    Events may be added from several threads at once, e.g. while radio
+    playlists are generated concurrently.
+    """
 
     def __init__(self) -> None:
         """Initializes a PlaylistReport with an empty dictionary of events."""
         self.playlists: Dict[str, List[Event]] = {}
+        self._lock = threading.Lock()
 
     def add_event(
         self,
@@ -71,9 +77,8 @@ class PlaylistReport:
         """
         event = Event(event_type, notes, artist_name, track_name, genre, length_seconds, gain, peak)
         logger.debug(f"Adding event to playlist '{playlist_name}': {event.__dict__}")
-        if playlist_name not in self.playlists:
-            self.playlists[playlist_name] = []
-        self.playlists[playlist_name].append(event)
+        with self._lock:
+            self.playlists.setdefault(playlist_name, []).append(event)
 
     def _calculate_column_widths(self, events: List[Event]) -> Dict[str, int]:
         """Calculates the maximum width for each column based on the events.
@@ -122,7 +127,10 @@ class PlaylistReport:
             f"## {datetime.datetime.now().strftime('%H:%M %a %-d %B %Y')}",
         ]
 
-        for playlist_name, events in self.playlists.items():
+        with self._lock:
+            snapshot = [(name, list(events)) for name, events in self.playlists.items()]
+
+        for playlist_name, events in snapshot:
             report_lines.append(f"\n### {playlist_name}\n")
 
             # Calculate max widths for formatting
@@ -807,6 +807,53 @@ class SubsonicClient:
         logger.info(f"Downloaded {len(response.content)} bytes for track {track_id}")
         return response.content
 
+    def download_track_range(self, track_id: str, length: int) -> bytes:
+        """Download the first length bytes of the original file.
+
+        Sends an HTTP Range request; if the server ignores it, the response is
+        read only up to length bytes and the connection is closed, so the rest
+        of the file is never transferred.
+
+        Args:
+            track_id: Track ID to download
+            length: Number of bytes to fetch from the start of the file
+
+        Returns:
+            Up to length bytes of the audio file
+
+        Raises:
+            SubsonicError: If API returns error response
+            httpx.HTTPError: If download fails
+
+        Example:
+            >>> head = client.download_track_range("789", 2 * 1024 * 1024)
+        """
+        url = self._build_url("download")
+        params = self._build_params(id=track_id)
+
+        logger.debug(f"Downloading first {length} bytes of track: {track_id}")
+        self._apply_rate_limit()
+        with self.client.stream(
+            "GET", url, params=params, headers={"Range": f"bytes=0-{length - 1}"}
+        ) as response:
+            content_type = response.headers.get("content-type", "")
+            if content_type.startswith(("text/xml", "application/json")):
+                response.read()
+                self._handle_response(response, expect_binary=True)  # Will raise SubsonicError
+
+            response.raise_for_status()
+            chunks = []
+            received = 0
+            for chunk in response.iter_bytes():
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= length:
+                    break
+
+        content = b"".join(chunks)[:length]
+        logger.info(f"Downloaded {len(content)} bytes (ranged) for track {track_id}")
+        return content
+
     def get_music_folders(self) -> List[Dict]:
         """Get all configured music folders.
 
@@ -4,7 +4,8 @@ import logging
 from typing import TYPE_CHECKING, Optional, Tuple
 from io import BytesIO
 
-from src.replaygain.main import process_replaygain, has_replaygain_metadata
+from src.replaygain.main import has_replaygain_metadata
+from src.replaygain.pool import get_replaygain_pool
 
 from src.logger import setup_logging
 
@@ -69,7 +70,10 @@ class Track(dict):
         file_format = self["Path"].split(".")[-1].lower()
 
         if not has_replaygain_metadata(self.content, file_format):
-            self.content = BytesIO(process_replaygain(self.content.getvalue(), file_format))
+            # Analysis runs on the shared pool so concurrent downloads use all cores
+            self.content = BytesIO(
+                get_replaygain_pool().process(self.content.getvalue(), file_format, self["Name"])
+            )
             logger.debug(f"Applied ReplayGain to track '{self['Name']}'")
         else:
             logger.debug(f"ReplayGain metadata already present for track '{self['Name']}'")
@@ -0,0 +1,198 @@
+"""Contract tests for the async AzuraCast client and its adaptive request budget."""
+import asyncio
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from src.azuracast.async_client import AdaptiveRequestBudget, AsyncAzuraCastClient
+from src.azuracast.main import AzuraCastSync
+
+ENV = {
+    "AZURACAST_HOST": "https://test.example.com",
+    "AZURACAST_API_KEY": "test-key",
+    "AZURACAST_STATIONID": "1",
+}
+
+PLAYLISTS = [
+    {"id": 10, "name": "Morning Drive"},
+    {"id": 11, "name": "After Hours"},
+]
+
+
+def _client(handler, **kwargs):
+    with patch.dict("os.environ", ENV):
+        return AsyncAzuraCastClient(transport=httpx.MockTransport(handler), **kwargs)
+
+
+def _station_api(requests_seen):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append((request.method, request.url.path))
+        path = request.url.path
+        if request.method == "GET" and path == "/api/station/1/playlists":
+            return httpx.Response(200, json=PLAYLISTS)
+        if request.method == "GET" and path.startswith("/api/station/1/playlist/"):
+            playlist_id = int(path.rsplit("/", 1)[1])
+            return httpx.Response(200, json={"id": playlist_id, "schedule_items": []})
+        if request.method == "POST" and path == "/api/station/1/playlists":
+            return httpx.Response(200, json={"id": 12, **json.loads(request.content)})
+        return httpx.Response(200, json={"success": True})
+
+    return handler
+
+
+class TestAsyncPlaylistOperations:
+    async def test_get_playlists_lists_once(self):
+        seen = []
+        async with _client(_station_api(seen)) as client:
+            results = await client.get_playlists(["Morning Drive", "After Hours", "Unknown"])
+
+        assert results["Morning Drive"]["id"] == 10
+        assert results["After Hours"]["id"] == 11
+        assert results["Unknown"] is None
+        assert seen.count(("GET", "/api/station/1/playlists")) == 1
+
+    async def test_sends_api_key(self):
+        headers = []
+
+        def handler(request):
+            headers.append(request.headers.get("X-API-Key"))
+            return httpx.Response(200, json={"success": True})
+
+        async with _client(handler) as client:
+            assert await client.empty_playlist(10) is True
+        assert headers == ["test-key"]
+
+    async def test_create_invalidates_directory(self):
+        seen = []
+        async with _client(_station_api(seen)) as client:
+            await client.get_playlist("Morning Drive")
+            created = await client.create_playlist("New Playlist")
+            await client.get_playlist("Morning Drive")
+
+        assert created["id"] == 12
+        assert seen.count(("GET", "/api/station/1/playlists")) == 2
+
+    async def test_link_tracks_preserves_order(self):
+        seen = []
+        async with _client(_station_api(seen)) as client:
+            assert await client.link_tracks(10, ["3", "1", "2"]) == 3
+
+        assert [path for _, path in seen] == [
+            "/api/station/1/file/3",
+            "/api/station/1/file/1",
+            "/api/station/1/file/2",
+        ]
+
+    async def test_schedule_uses_known_playlist_info(self):
+        seen = []
+        async with _client(_station_api(seen)) as client:
+            ok = await client.schedule_playlist(
+                "Morning Drive", "06:00", "10:00", days=[1],
+                playlist_info={"id": 10, "schedule_items": []},
+            )
+
+        assert ok is True
+        assert seen == [("PUT", "/api/station/1/playlist/10")]
+
+    async def test_existing_schedule_is_not_rewritten(self):
+        seen = []
+        existing = {
+            "id": 10,
+            "schedule_items": [
+                {"start_time": 600, "end_time": 1000, "days": [1],
+                 "start_date": None, "end_date": None}
+            ],
+        }
+        async with _client(_station_api(seen)) as client:
+            assert await client.schedule_playlist(
+                "Morning Drive", "06:00", "10:00", days=[1], playlist_info=existing
+            )
+        assert seen == []
+
+
+class TestRetryAndBudget:
+    async def test_429_retries_and_shrinks_limit(self):
+        responses = [
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json={"success": True}),
+        ]
+        budget = AdaptiveRequestBudget(max_concurrency=8)
+        async with _client(lambda request: responses.pop(0), budget=budget) as client:
+            assert await client.empty_playlist(10) is True
+
+        assert budget.throttled_requests == 1
+        assert budget.total_requests == 2
+        assert budget.limit < 8
+
+    async def test_transient_errors_are_retried(self):
+        responses = [httpx.Response(503), httpx.Response(200, json={"success": True})]
+        with patch("src.azuracast.async_client.asyncio.sleep") as mock_sleep:
+            async with _client(lambda request: responses.pop(0)) as client:
+                assert await client.empty_playlist(10) is True
+        mock_sleep.assert_called_once()
+
+    async def test_gives_up_after_max_attempts(self):
+        async with _client(
+            lambda request: httpx.Response(429, headers={"Retry-After": "0"}), max_attempts=3
+        ) as client:
+            with pytest.raises(httpx.HTTPError):
+                await client._request("GET", "/station/1/playlists")
+
+    async def test_client_errors_are_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(400)
+
+        async with _client(handler) as client:
+            assert await client.empty_playlist(10) is False
+        assert len(calls) == 1
+
+    async def test_concurrency_never_exceeds_limit(self):
+        in_flight = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json={"success": True})
+
+        budget = AdaptiveRequestBudget(max_concurrency=3)
+        async with _client(handler, budget=budget) as client:
+            results = await asyncio.gather(*(client.empty_playlist(i) for i in range(12)))
+
+        assert all(results)
+        assert peak <= 3
+
+    async def test_limit_recovers_after_successes(self):
+        budget = AdaptiveRequestBudget(max_concurrency=4)
+        await budget.acquire()
+        await budget.release(throttled_for=0)
+        assert budget.limit == 2
+
+        for _ in range(20):
+            await budget.acquire()
+            await budget.release()
+        assert budget.limit == 4
+
+
+class TestTlsVerification:
+    @pytest.mark.parametrize("setting, expected", [(None, False), ("true", True)])
+    def test_sync_and_async_clients_share_verify_setting(self, setting, expected):
+        env = dict(ENV)
+        if setting is not None:
+            env["AZURACAST_VERIFY_SSL"] = setting
+        with patch.dict("os.environ", env), patch(
+            "src.azuracast.async_client.httpx.AsyncClient"
+        ) as async_client:
+            AsyncAzuraCastClient()._get_client()
+            session = AzuraCastSync()._get_session()
+
+        assert async_client.call_args.kwargs["verify"] is expected
+        assert session.verify is expected
@@ -0,0 +1,87 @@
+"""Contract tests for the single-decode audio feature extraction stage."""
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.replaygain.features import (  # noqa: E402
+    EXCERPT_OFFSET,
+    FeatureExtractor,
+    calculate_replaygain_features,
+    estimate_bpm,
+    extract_features,
+)
+
+RATE = 24000
+
+
+def click_track(bpm, seconds=30.0, amplitude=1.0, channels=2):
+    samples = np.zeros(int(seconds * RATE))
+    click = amplitude * np.hanning(200) * np.sin(np.arange(200) * 0.9)
+    for start in np.arange(0, seconds, 60.0 / bpm):
+        index = int(start * RATE)
+        samples[index : index + 200] += click[: len(samples) - index]
+    return np.repeat(samples[:, None], channels, axis=1)
+
+
+class TestEstimateBpm:
+    @pytest.mark.parametrize("bpm", [92.0, 128.0, 150.0])
+    def test_detects_click_tempo(self, bpm):
+        assert estimate_bpm(click_track(bpm), RATE) == pytest.approx(bpm, abs=1.0)
+
+    def test_silence_has_no_tempo(self):
+        assert estimate_bpm(np.zeros((RATE * 10, 2)), RATE) is None
+
+
+class TestFeatureExtractor:
+    def test_tempo_comes_from_after_the_intro(self):
+        extractor = FeatureExtractor(RATE, 2)
+        # A different-tempo intro is skipped; only the excerpt window is kept
+        for chunk in np.array_split(click_track(90.0, seconds=EXCERPT_OFFSET), 3):
+            extractor.add(chunk)
+        extractor.add(click_track(140.0, seconds=40.0))
+
+        features = extractor.result()
+
+        assert features.bpm == pytest.approx(140.0, abs=1.0)
+        assert features.duration == pytest.approx(EXCERPT_OFFSET + 40.0)
+
+    def test_energy_follows_loudness_and_density(self):
+        def energy(samples):
+            extractor = FeatureExtractor(RATE, 2)
+            extractor.add(samples)
+            return extractor.result().energy
+
+        busy = energy(click_track(170.0))
+        sparse = energy(click_track(70.0))
+        quiet = energy(click_track(70.0, amplitude=0.01))
+
+        assert 0.0 <= quiet < sparse < busy <= 1.0
+
+
+class TestExtractFeatures:
+    def test_single_decode_yields_all_features(self):
+        chunks = [(RATE, 2, chunk) for chunk in np.array_split(click_track(128.0), 3)]
+        with patch("src.replaygain.features.decode_pcm", return_value=iter(chunks)) as decode:
+            features = extract_features(BytesIO(b"audio"))
+
+        decode.assert_called_once()
+        assert features.bpm == pytest.approx(128.0, abs=1.0)
+        assert features.peak == float(features.loudness["input_tp"])
+        assert 0.0 <= features.energy <= 1.0
+
+    def test_replaygain_data_carries_features(self):
+        chunks = [(RATE, 2, click_track(128.0))]
+        with patch("src.replaygain.features.decode_pcm", return_value=iter(chunks)):
+            gain, peak, data = calculate_replaygain_features(BytesIO(b"audio"), "flac")
+
+        assert gain == float(data["input_i"])
+        assert data["bpm"] == pytest.approx(128.0, abs=1.0)
+        assert "energy" in data
+
+    def test_empty_decode_is_an_error(self):
+        with patch("src.replaygain.features.decode_pcm", return_value=iter([])):
+            with pytest.raises(RuntimeError):
+                extract_features(BytesIO(b"audio"))
@@ -0,0 +1,275 @@
+"""Contract tests for the disk-backed known tracks snapshot and dedup index."""
+import json
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.azuracast import cache
+from src.azuracast.detection import build_dedup_index, check_file_in_azuracast
+from src.azuracast.main import AzuraCastSync
+from src.azuracast.models import DedupIndex, KnownTracksResponse
+
+TRACKS = [
+    {
+        "id": 1,
+        "artist": "Artist",
+        "album": "Album",
+        "title": "Song",
+        "custom_fields": {"musicbrainz_trackid": "MBID-1"},
+    },
+    {"id": 2, "artist": "Other", "album": "Record", "title": "Tune", "length": 200.0},
+]
+
+ENV = {
+    "AZURACAST_HOST": "https://test.example.com",
+    "AZURACAST_API_KEY": "test-key",
+    "AZURACAST_STATIONID": "1",
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_cache():
+    cache._known_tracks_cache.invalidate()
+    cache._known_tracks_cache.ttl_seconds = 300
+    yield
+    cache._known_tracks_cache.invalidate()
+    cache._known_tracks_cache.ttl_seconds = 300
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return str(tmp_path / "known_tracks.json")
+
+
+def _conditional(tracks=TRACKS, etag='"v1"'):
+    return Mock(return_value=KnownTracksResponse(tracks=tracks, etag=etag))
+
+
+class TestDedupIndex:
+    def test_build_dedup_index(self):
+        index = build_dedup_index(TRACKS)
+        assert index.by_mbid == {"mbid-1": [1]}
+        assert index.by_fingerprint["other|record|tune"] == [2]
+        assert index.by_id["2"]["title"] == "Tune"
+
+    def test_round_trip_restores_id_lookup(self):
+        index = build_dedup_index(TRACKS)
+        restored = DedupIndex.from_dict(json.loads(json.dumps(index.to_dict())), TRACKS)
+        assert restored.by_mbid == index.by_mbid
+        assert restored.by_id["1"] is TRACKS[0]
+
+    def test_detection_with_index_matches_without(self):
+        index = build_dedup_index(TRACKS)
+        for source in (
+            {"Name": "Song", "AlbumArtist": "A", "ProviderIds": {"MusicBrainzTrack": "mbid-1"}},
+            {"Name": "Tune", "AlbumArtist": "Other", "Album": "Record"},
+            {"Name": "Missing", "AlbumArtist": "Nobody", "Album": "None"},
+        ):
+            with_index = check_file_in_azuracast(TRACKS, source, index=index)
+            without_index = check_file_in_azuracast(TRACKS, source)
+            assert with_index.azuracast_file_id == without_index.azuracast_file_id
+            assert with_index.should_upload == without_index.should_upload
+
+
+class TestDiskSnapshot:
+    def test_refresh_persists_tracks_and_index(self, cache_file):
+        fetch = _conditional()
+        cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=fetch, cache_file=cache_file, cache_key="k"
+        )
+
+        with open(cache_file, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        assert snapshot["tracks"] == TRACKS
+        assert snapshot["etag"] == '"v1"'
+        assert snapshot["index"]["mbid"] == {"mbid-1": [1]}
+
+    def test_fresh_snapshot_shared_between_processes(self, cache_file):
+        fetch = _conditional()
+        cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=fetch, cache_file=cache_file, cache_key="k"
+        )
+
+        # Simulate a second process: empty in-memory cache, same snapshot file
+        cache._known_tracks_cache.invalidate()
+        other_fetch = _conditional()
+        tracks = cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=other_fetch, cache_file=cache_file, cache_key="k"
+        )
+
+        assert tracks == TRACKS
+        other_fetch.assert_not_called()
+        assert cache.get_cached_dedup_index(tracks).by_mbid == {"mbid-1": [1]}
+
+    def test_snapshot_for_other_station_is_ignored(self, cache_file):
+        cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=_conditional(), cache_file=cache_file, cache_key="a"
+        )
+        cache._known_tracks_cache.invalidate()
+        fetch = _conditional(tracks=[])
+        assert cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=fetch, cache_file=cache_file, cache_key="b"
+        ) == []
+        fetch.assert_called_once_with(None, None)
+
+    def test_stale_snapshot_is_revalidated_with_validators(self, cache_file):
+        cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=_conditional(), cache_file=cache_file, cache_key="k"
+        )
+        cache._known_tracks_cache.invalidate()
+        with open(cache_file, encoding="utf-8") as f:
+            snapshot = json.load(f)
+        snapshot["fetched_at"] = time.time() - 3600
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+
+        not_modified = Mock(return_value=KnownTracksResponse(tracks=None, etag='"v1"'))
+        tracks = cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=not_modified, cache_file=cache_file, cache_key="k"
+        )
+
+        not_modified.assert_called_once_with('"v1"', None)
+        assert tracks == TRACKS
+        with open(cache_file, encoding="utf-8") as f:
+            assert json.load(f)["fetched_at"] > time.time() - 60
+
+    def test_corrupt_snapshot_triggers_fetch(self, cache_file):
+        with open(cache_file, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        fetch = _conditional()
+        assert cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=fetch, cache_file=cache_file, cache_key="k"
+        ) == TRACKS
+        fetch.assert_called_once()
+
+    def test_force_refresh_skips_snapshot_and_validators(self, cache_file):
+        cache.get_cached_known_tracks(
+            Mock(), conditional_fetch_fn=_conditional(), cache_file=cache_file, cache_key="k"
+        )
+        fetch = _conditional(tracks=TRACKS[:1], etag='"v2"')
+        tracks = cache.get_cached_known_tracks(
+            Mock(),
+            force_refresh=True,
+            conditional_fetch_fn=fetch,
+            cache_file=cache_file,
+            cache_key="k",
+        )
+        fetch.assert_called_once_with(None, None)
+        assert tracks == TRACKS[:1]
+
+
+class TestConditionalFetch:
+    @pytest.fixture
+    def client(self):
+        with patch.dict("os.environ", ENV):
+            yield AzuraCastSync()
+
+    def test_sends_validators_and_handles_304(self, client):
+        response = Mock(status_code=304, headers={})
+        with patch.object(client, "_perform_request", return_value=response) as mock_request:
+            result = client.fetch_known_tracks_conditional('"v1"', "Mon, 01 Jan 2024 00:00:00 GMT")
+
+        headers = mock_request.call_args.kwargs["headers"]
+        assert headers["If-None-Match"] == '"v1"'
+        assert headers["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+        assert result.not_modified
+        assert result.etag == '"v1"'
+
+    def test_full_response_returns_tracks_and_validators(self, client):
+        response = Mock(status_code=200, headers={"ETag": '"v2"'})
+        response.json.return_value = TRACKS
+        with patch.object(client, "_perform_request", return_value=response):
+            result = client.fetch_known_tracks_conditional()
+
+        assert result.tracks == TRACKS
+        assert result.etag == '"v2"'
+        assert not result.not_modified
+
+
+class TestIncrementalUpdates:
+    """Our own uploads and deletes update the snapshot without a refetch."""
+
+    @pytest.fixture
+    def client(self):
+        with patch.dict("os.environ", ENV):
+            yield AzuraCastSync()
+
+    @pytest.fixture
+    def tracks(self):
+        tracks = cache.get_cached_known_tracks(lambda: [dict(t) for t in TRACKS])
+        cache.get_cached_dedup_index(tracks)  # Build the index so it is updated too
+        return tracks
+
+    def test_upload_adds_track_and_index_entries(self, client, tracks):
+        uploaded = {"id": 3, "artist": "New", "album": "Album", "title": "Fresh"}
+        response = Mock(status_code=200)
+        response.json.return_value = uploaded
+        with patch.object(client, "_perform_request", return_value=response):
+            client.upload_file_to_azuracast(b"x" * 2000, "New/Album/Fresh.mp3")
+
+        assert tracks[-1] == uploaded
+        index = cache.get_cached_dedup_index(tracks)
+        assert index.by_fingerprint["new|album|fresh"] == [3]
+        decision = check_file_in_azuracast(
+            tracks, {"Name": "Fresh", "AlbumArtist": "New", "Album": "Album"}, index=index
+        )
+        assert decision.azuracast_file_id == 3
+
+    def test_delete_removes_track_and_index_entries(self, client, tracks):
+        response = Mock(status_code=200)
+        response.json.return_value = {"success": True}
+        with patch.object(client, "_perform_request", return_value=response):
+            assert client.delete_file_from_azuracast("1") is True
+
+        assert [t["id"] for t in tracks] == [2]
+        index = cache.get_cached_dedup_index(tracks)
+        assert "1" not in index.by_id
+        assert index.by_mbid == {}
+
+    def test_reupload_replaces_existing_entry(self, tracks):
+        cache.add_known_track({"id": 2, "artist": "Other", "album": "Record", "title": "Tune"})
+
+        assert [t["id"] for t in tracks] == [1, 2]
+        assert cache.get_cached_dedup_index(tracks).by_fingerprint["other|record|tune"] == [2]
+
+    def test_changes_are_written_to_the_shared_snapshot(self, cache_file):
+        cache.get_cached_known_tracks(
+            lambda: [dict(t) for t in TRACKS], cache_file=cache_file, cache_key="k"
+        )
+
+        cache.add_known_track({"id": 3, "artist": "New", "album": "Album", "title": "Fresh"})
+        cache.remove_known_track(1)
+
+        snapshot = cache._load_snapshot(cache_file, "k")
+        assert [t["id"] for t in snapshot["tracks"]] == [2, 3]
+        assert snapshot["index"]["fingerprint"]["new|album|fresh"] == [3]
+
+        # A second process starting within the TTL sees our upload and delete
+        cache._known_tracks_cache.invalidate()
+        fetch = Mock()
+        tracks = cache.get_cached_known_tracks(fetch, cache_file=cache_file, cache_key="k")
+        fetch.assert_not_called()
+        assert [t["id"] for t in tracks] == [2, 3]
+
+    def test_changes_by_other_processes_are_picked_up(self, cache_file):
+        fetch = Mock(return_value=[dict(t) for t in TRACKS])
+        cache.get_cached_known_tracks(fetch, cache_file=cache_file, cache_key="k")
+
+        # Another process uploads a track and rewrites the snapshot
+        snapshot = cache._load_snapshot(cache_file, "k")
+        snapshot["tracks"].append({"id": 4, "artist": "A", "album": "B", "title": "C"})
+        snapshot["index"] = build_dedup_index(snapshot["tracks"]).to_dict()
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        cache._snapshot_mtime -= 1  # Coarse filesystem timestamps
+
+        tracks = cache.get_cached_known_tracks(fetch, cache_file=cache_file, cache_key="k")
+
+        assert fetch.call_count == 1
+        assert [t["id"] for t in tracks] == [1, 2, 4]
+        assert cache.get_cached_dedup_index(tracks).by_fingerprint["a|b|c"] == [4]
+
+    def test_no_snapshot_is_left_alone(self):
+        cache.add_known_track({"id": 9, "title": "Song"})
+        assert cache._known_tracks_cache.tracks == []
@@ -0,0 +1,90 @@
+"""Contract tests for the persistent loudness-measurement cache."""
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.replaygain.cache import LoudnessCache, content_key, get_loudness_cache, source_key
+from src.replaygain.main import process_replaygain
+
+LOUDNORM = {"input_i": "-14.2", "input_tp": "-0.8", "target_offset": "0.2"}
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return str(tmp_path / "loudness.db")
+
+
+class TestLoudnessCache:
+    def test_round_trip(self, cache_file):
+        cache = LoudnessCache(cache_file)
+        cache.set("k", -3.8, 0.91, LOUDNORM)
+
+        assert cache.get("k") == (-3.8, 0.91, LOUDNORM)
+        assert cache.get("missing") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_persists_across_instances(self, cache_file):
+        LoudnessCache(cache_file).set("k", -3.8, 0.91, LOUDNORM)
+        assert LoudnessCache(cache_file).get("k") == (-3.8, 0.91, LOUDNORM)
+
+    def test_keys(self):
+        assert content_key(b"audio") == content_key(b"audio")
+        assert content_key(b"audio") != content_key(b"other")
+        assert source_key("subsonic:1", 1024, "2024-01-01T00:00:00Z") != source_key(
+            "subsonic:1", 2048, "2024-01-01T00:00:00Z"
+        )
+
+    def test_concurrent_writers(self, cache_file):
+        cache = LoudnessCache(cache_file)
+        threads = [
+            threading.Thread(target=cache.set, args=(f"k{i}", float(i), 1.0, LOUDNORM))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert all(cache.get(f"k{i}")[0] == float(i) for i in range(8))
+
+    def test_disabled_without_env(self, monkeypatch):
+        monkeypatch.delenv("REPLAYGAIN_CACHE_FILE", raising=False)
+        assert get_loudness_cache() is None
+
+
+class TestProcessReplayGainCache:
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, monkeypatch, cache_file):
+        monkeypatch.setenv("REPLAYGAIN_CACHE_FILE", cache_file)
+
+    @pytest.fixture
+    def measure(self):
+        with patch(
+            "src.replaygain.main.calculate_replaygain", return_value=(-3.8, 0.91, LOUDNORM)
+        ) as mock_measure, patch(
+            "src.replaygain.main.write_replaygain_tags", side_effect=lambda c, *a, **kw: c
+        ) as mock_write:
+            yield mock_measure, mock_write
+
+    def test_second_run_skips_analysis(self, measure):
+        mock_measure, mock_write = measure
+        process_replaygain(b"audio", "flac")
+        process_replaygain(b"audio", "flac")
+
+        mock_measure.assert_called_once()
+        assert mock_write.call_count == 2
+        assert mock_write.call_args.args[2:4] == (-3.8, 0.91)
+
+    def test_source_key_is_used_when_given(self, measure):
+        mock_measure, _ = measure
+        process_replaygain(b"audio", "flac", cache_key="source:1:5:t")
+        process_replaygain(b"re-encoded", "flac", cache_key="source:1:5:t")
+
+        mock_measure.assert_called_once()
+        assert get_loudness_cache().get("source:1:5:t") is not None
+
+    def test_different_content_is_measured(self, measure):
+        mock_measure, _ = measure
+        process_replaygain(b"audio", "flac")
+        process_replaygain(b"other", "flac")
+        assert mock_measure.call_count == 2
@@ -0,0 +1,125 @@
+"""Contract tests for the AzuraCastSync station playlist directory cache."""
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.azuracast.main import AzuraCastSync
+
+ENV = {
+    "AZURACAST_HOST": "https://test.example.com",
+    "AZURACAST_API_KEY": "test-key",
+    "AZURACAST_STATIONID": "1",
+}
+
+PLAYLISTS = [
+    {"id": 10, "name": "Morning Drive"},
+    {"id": 11, "name": "After Hours"},
+]
+
+
+def _response(payload, status_code=200):
+    response = Mock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    return response
+
+
+def _fake_api(method, endpoint, **kwargs):
+    if method == "GET" and endpoint == "/station/1/playlists":
+        return _response(PLAYLISTS)
+    if method == "GET" and endpoint.startswith("/station/1/playlist/"):
+        playlist_id = int(endpoint.rsplit("/", 1)[1])
+        return _response({"id": playlist_id, "schedule_items": []})
+    if method == "POST" and endpoint == "/station/1/playlists":
+        return _response({"id": 12, "name": kwargs["json"]["name"]})
+    return _response({"success": True})
+
+
+@pytest.fixture
+def client():
+    with patch.dict("os.environ", ENV):
+        yield AzuraCastSync()
+
+
+def _list_calls(mock_request):
+    return [c for c in mock_request.call_args_list if c.args == ("GET", "/station/1/playlists")]
+
+
+class TestPlaylistDirectory:
+    """Name -> id lookups reuse one station playlist listing."""
+
+    def test_repeated_lookups_list_playlists_once(self, client):
+        with patch.object(client, "_perform_request", side_effect=_fake_api) as mock_request:
+            assert client.get_playlist("Morning Drive")["id"] == 10
+            assert client.get_playlist("After Hours")["id"] == 11
+            client.clear_playlist_by_name("Morning Drive")
+            client.schedule_playlist("After Hours", "06:00", "10:00")
+
+            assert len(_list_calls(mock_request)) == 1
+
+    def test_clear_playlist_does_not_fetch_details(self, client):
+        with patch.object(client, "_perform_request", side_effect=_fake_api) as mock_request:
+            client.clear_playlist_by_name("Morning Drive")
+
+            methods = [c.args for c in mock_request.call_args_list]
+            assert methods == [
+                ("GET", "/station/1/playlists"),
+                ("DELETE", "/station/1/playlist/10/empty"),
+            ]
+
+    def test_missing_playlist_returns_none_without_detail_fetch(self, client):
+        with patch.object(client, "_perform_request", side_effect=_fake_api) as mock_request:
+            assert client.get_playlist("Unknown") is None
+            assert mock_request.call_count == 1
+
+    def test_create_invalidates_directory(self, client):
+        with patch.object(client, "_perform_request", side_effect=_fake_api) as mock_request:
+            client.get_playlist("Morning Drive")
+            client.create_playlist("New Playlist")
+            client.get_playlist("Morning Drive")
+
+            assert len(_list_calls(mock_request)) == 2
+
+    def test_delete_invalidates_directory(self, client):
+        with patch.object(client, "_perform_request", side_effect=_fake_api) as mock_request:
+            client.get_playlist("Morning Drive")
+            assert client.delete_playlist(10) is True
+            client.get_playlist("Morning Drive")
+
+            assert len(_list_calls(mock_request)) == 2
+
+    def test_stale_entry_invalidates_directory(self, client):
+        def api(method, endpoint, **kwargs):
+            if endpoint == "/station/1/playlist/10":
+                return _response({"message": "not found"}, status_code=404)
+            return _fake_api(method, endpoint, **kwargs)
+
+        with patch.object(client, "_perform_request", side_effect=api) as mock_request:
+            assert client.get_playlist("Morning Drive") is None
+            client.get_playlist("After Hours")
+
+            assert len(_list_calls(mock_request)) == 2
+
+
+class TestGetPlaylists:
+    """Batch detail fetches."""
+
+    def test_returns_details_for_each_name(self, client):
+        with patch.object(client, "_perform_request", side_effect=_fake_api) as mock_request:
+            results = client.get_playlists(["Morning Drive", "After Hours", "Unknown"])
+
+            assert results["Morning Drive"]["id"] == 10
+            assert results["After Hours"]["id"] == 11
+            assert results["Unknown"] is None
+            assert len(_list_calls(mock_request)) == 1
+            assert mock_request.call_count == 3
+
+    def test_listing_failure_returns_all_none(self, client):
+        import requests
+
+        with patch.object(
+            client,
+            "_perform_request",
+            side_effect=requests.exceptions.RequestException("boom"),
+        ):
+            assert client.get_playlists(["Morning Drive"]) == {"Morning Drive": None}
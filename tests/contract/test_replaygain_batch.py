@@ -0,0 +1,169 @@
+"""Contract tests for the resumable library loudness batch."""
+import json
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.replaygain.batch import BatchProgress, ReplayGainBatch, load_library_snapshot
+from src.replaygain.cache import LoudnessCache, content_key, subsonic_source_key
+from src.replaygain.pool import ReplayGainPool
+from src.subsonic.models import SubsonicTrack
+from src.track.main import Track
+
+
+def make_track(track_id: str, size=1000) -> SubsonicTrack:
+    return SubsonicTrack(
+        id=track_id, title=f"Song {track_id}", artist="Artist", album="Album", duration=200,
+        path=f"Artist/Album/{track_id}.flac", suffix="flac", created="2024-01-01T00:00:00Z",
+        size=size,
+    )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LoudnessCache(str(tmp_path / "loudness.db"))
+
+
+@pytest.fixture
+def pool():
+    pool = ReplayGainPool(max_workers=2, job_timeout=30)
+    yield pool
+    pool.shutdown(cancel_pending=True)
+
+
+@pytest.fixture
+def client():
+    client = Mock()
+    client.download_track.side_effect = lambda track_id: f"audio-{track_id}".encode()
+    return client
+
+
+@pytest.fixture
+def measure(cache):
+    """Stand-in for measure_replaygain that writes to the test cache."""
+
+    def fake_measure(content, file_format, cache_key=None, **kwargs):
+        if content == b"audio-bad":
+            raise RuntimeError("ffmpeg failed")
+        cache.set(cache_key, -9.0, -1.0, {"bpm": 120.0, "energy": 0.5})
+        return -9.0, -1.0, {"bpm": 120.0, "energy": 0.5}
+
+    with patch("src.replaygain.pool.measure_replaygain", side_effect=fake_measure), patch(
+        "src.replaygain.pool.audio_duration", return_value=200.0
+    ), patch("src.replaygain.batch.has_replaygain_metadata", return_value=False):
+        yield
+
+
+class TestReplayGainBatch:
+    def test_analyses_library_into_cache(self, client, cache, pool, measure, tmp_path):
+        tracks = [make_track(str(i)) for i in range(5)]
+        batch = ReplayGainBatch(client, cache, pool, str(tmp_path / "progress.json"))
+
+        progress = batch.run(tracks)
+
+        assert (progress.analysed, progress.failed) == (5, 0)
+        assert all(cache.has(subsonic_source_key(track)) for track in tracks)
+        with open(tmp_path / "progress.json", encoding="utf-8") as f:
+            assert sorted(json.load(f)["done"]) == ["0", "1", "2", "3", "4"]
+
+    def test_resume_skips_finished_tracks(self, client, cache, pool, measure, tmp_path):
+        progress_file = str(tmp_path / "progress.json")
+        tracks = [make_track(str(i)) for i in range(4)]
+        ReplayGainBatch(client, cache, pool, progress_file).run(tracks[:2])
+        client.download_track.reset_mock()
+
+        progress = ReplayGainBatch(client, cache, pool, progress_file).run(tracks)
+
+        assert progress.total == 2
+        assert sorted(c.args[0] for c in client.download_track.call_args_list) == ["2", "3"]
+
+    def test_cached_tracks_are_not_downloaded(self, client, cache, pool, measure, tmp_path):
+        track = make_track("1")
+        cache.set(subsonic_source_key(track), -9.0, -1.0, {})
+
+        batch = ReplayGainBatch(client, cache, pool, str(tmp_path / "progress.json"))
+        assert batch.pending([track]) == []
+
+    def test_failures_are_retried_next_run(self, client, cache, pool, measure, tmp_path):
+        progress_file = str(tmp_path / "progress.json")
+        tracks = [make_track("ok"), make_track("bad")]
+
+        progress = ReplayGainBatch(client, cache, pool, progress_file).run(tracks)
+
+        assert (progress.analysed, progress.failed) == (1, 1)
+        assert ReplayGainBatch(client, cache, pool, progress_file).pending(tracks) == [tracks[1]]
+
+    def test_tracks_without_size_use_content_hash(self, client, cache, pool, measure, tmp_path):
+        batch = ReplayGainBatch(client, cache, pool, str(tmp_path / "progress.json"))
+        assert batch.run([make_track("1", size=None)]).analysed == 1
+        assert batch.analyse_track(make_track("1", size=None)) == "skipped"
+
+    def test_measurements_are_also_keyed_by_content(self, client, cache, pool, measure, tmp_path):
+        ReplayGainBatch(client, cache, pool, str(tmp_path / "progress.json")).run(
+            [make_track("1")]
+        )
+
+        assert cache.has(content_key(b"audio-1"))
+
+    def test_upload_hits_batch_populated_cache(
+        self, client, cache, pool, measure, tmp_path, monkeypatch
+    ):
+        ReplayGainBatch(client, cache, pool, str(tmp_path / "progress.json")).run(
+            [make_track("1")]
+        )
+        monkeypatch.setenv("REPLAYGAIN_CACHE_FILE", cache.cache_file)
+        monkeypatch.setenv("EMBY_SERVER_URL", "http://emby")
+        monkeypatch.setenv("EMBY_API_KEY", "key")
+        response = Mock(content=b"audio-1")
+        track = Track({"Id": "e1", "Name": "Song 1", "Path": "Artist/Album/1.flac"}, Mock())
+
+        with patch("src.track.main.requests.get", return_value=response), patch(
+            "src.track.main.has_replaygain_metadata", return_value=False
+        ), patch("src.track.main.get_replaygain_pool", return_value=pool), patch(
+            "src.replaygain.main.calculate_replaygain"
+        ) as calculate, patch(
+            "src.replaygain.main.tag_replaygain", return_value=b"tagged-audio"
+        ) as tag:
+            assert track.download() == b"tagged-audio"
+
+        calculate.assert_not_called()
+        assert tag.call_args.args[2:4] == (-9.0, -1.0)
+
+    def test_features_feed_metadata_cache(self, client, cache, pool, measure, tmp_path):
+        enhancer = Mock()
+        batch = ReplayGainBatch(
+            client, cache, pool, str(tmp_path / "progress.json"), metadata_enhancer=enhancer
+        )
+
+        batch.run([make_track("1")])
+
+        enhancer.cache_audio_features.assert_called_once_with(
+            "1", {"bpm": 120.0, "energy": 0.5}
+        )
+
+
+class TestBatchProgress:
+    def test_eta_from_throughput(self):
+        progress = BatchProgress(total=10)
+        assert progress.eta() is None
+        progress.record("analysed")
+        progress.record("skipped")
+        with patch.object(progress, "tracks_per_minute", return_value=2.0):
+            assert progress.eta() == timedelta(minutes=4)
+        assert "2/10 tracks" in progress.summary()
+
+
+class TestLibrarySnapshot:
+    def test_snapshot_is_reused(self, tmp_path):
+        client = Mock()
+        client.get_artists.return_value = [{"id": "ar1", "name": "Artist"}]
+        client.get_artist.return_value = {"album": [{"id": "al1", "name": "Album"}]}
+        client.get_album.return_value = [make_track("1"), make_track("2")]
+        snapshot = str(tmp_path / "library.json")
+
+        first = load_library_snapshot(client, snapshot)
+        second = load_library_snapshot(client, snapshot)
+
+        assert second == first
+        client.get_album.assert_called_once_with("al1")
@@ -0,0 +1,208 @@
+"""Contract tests for the ReplayGain worker pool and ffmpeg job control."""
+import threading
+import time
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from unittest.mock import patch
+
+import pytest
+
+from src.replaygain.main import (
+    ReplayGainCancelled,
+    ReplayGainTimeout,
+    album_replaygain,
+    iter_source,
+    replaygain_tag_fields,
+    run_ffmpeg,
+    stream_ffmpeg,
+)
+from src.replaygain.pool import ReplayGainPool
+
+
+class TestRunFfmpeg:
+    """run_ffmpeg() is command-agnostic, so plain POSIX tools stand in for ffmpeg."""
+
+    def test_passes_input_and_returns_output(self):
+        returncode, out, _ = run_ffmpeg(["cat"], b"audio", timeout=5)
+        assert (returncode, out) == (0, b"audio")
+
+    def test_timeout_kills_process(self):
+        started = time.monotonic()
+        with pytest.raises(ReplayGainTimeout):
+            run_ffmpeg(["sleep", "10"], b"", timeout=0.2)
+        assert time.monotonic() - started < 5
+
+    def test_cancel_event_kills_process(self):
+        cancel_event = threading.Event()
+        threading.Timer(0.1, cancel_event.set).start()
+        started = time.monotonic()
+        with pytest.raises(ReplayGainCancelled):
+            run_ffmpeg(["sleep", "10"], b"", cancel_event=cancel_event)
+        assert time.monotonic() - started < 5
+
+
+class TestStreamFfmpeg:
+    def test_sources_are_chunked(self, tmp_path):
+        path = tmp_path / "track.flac"
+        path.write_bytes(b"abcdefg")
+
+        for source in (b"abcdefg", str(path), path, BytesIO(b"abcdefg"), [b"abc", b"defg"]):
+            chunks = list(iter_source(source, chunk_size=3))
+            assert b"".join(chunks) == b"abcdefg"
+            assert max(len(chunk) for chunk in chunks) <= 4
+
+    def test_streams_path_to_sink(self, tmp_path):
+        path = tmp_path / "track.flac"
+        data = bytes(range(256)) * 4096  # 1 MiB, more than the pipe buffers hold
+        path.write_bytes(data)
+        sink = BytesIO()
+
+        returncode, err = stream_ffmpeg(["cat"], path, sink, timeout=10)
+
+        assert (returncode, err) == (0, b"")
+        assert sink.getvalue() == data
+
+    def test_large_output_is_spooled_to_disk(self):
+        data = b"x" * (256 * 1024)
+        with patch("src.replaygain.main.SPOOL_MAX_MEMORY", 1024), patch(
+            "src.replaygain.main.SpooledTemporaryFile", wraps=SpooledTemporaryFile
+        ) as spool:
+            returncode, out, _ = run_ffmpeg(
+                ["cat"], iter([data[:1000], data[1000:]]), timeout=10
+            )
+
+        assert (returncode, out) == (0, data)
+        spool.assert_called_once_with(max_size=1024)
+
+    def test_stderr_is_collected_without_sink(self):
+        returncode, err = stream_ffmpeg(["sh", "-c", "cat >/dev/null; echo done >&2"], b"in")
+        assert (returncode, err) == (0, b"done\n")
+
+
+@pytest.fixture
+def pool():
+    pool = ReplayGainPool(max_workers=2, job_timeout=30)
+    yield pool
+    pool.shutdown(cancel_pending=True)
+
+
+class TestReplayGainPool:
+    def test_process_returns_tagged_content(self, pool):
+        with patch("src.replaygain.pool.process_replaygain", side_effect=lambda c, f, **kw: c + b"+rg"):
+            assert pool.process(b"audio", "mp3", label="Song") == b"audio+rg"
+
+        assert pool.completed == 1
+        assert pool.pending == 0
+        assert pool.tracks_per_minute() > 0
+
+    def test_job_timeout_is_passed_to_analysis(self, pool):
+        with patch("src.replaygain.pool.process_replaygain", return_value=b"") as mock_process:
+            pool.process(b"audio", "flac")
+        assert mock_process.call_args.kwargs["timeout"] == 30
+
+    def test_jobs_run_concurrently(self, pool):
+        def slow(content, file_format, **kwargs):
+            time.sleep(0.3)
+            return content
+
+        with patch("src.replaygain.pool.process_replaygain", side_effect=slow):
+            started = time.monotonic()
+            jobs = [pool.submit(b"%d" % i, "mp3") for i in range(4)]
+            assert [job.result() for job in jobs] == [b"0", b"1", b"2", b"3"]
+
+        # Two workers: four 0.3s jobs take ~0.6s rather than 1.2s
+        assert time.monotonic() - started < 1.0
+
+    def test_cancel_queued_and_running_jobs(self):
+        pool = ReplayGainPool(max_workers=1, job_timeout=30)
+        running = threading.Event()
+
+        def blocking(content, file_format, cancel_event=None, **kwargs):
+            running.set()
+            cancel_event.wait(5)
+            raise ReplayGainCancelled("killed")
+
+        with patch("src.replaygain.pool.process_replaygain", side_effect=blocking):
+            first = pool.submit(b"a", "mp3")
+            queued = pool.submit(b"b", "mp3")
+            assert running.wait(5)
+
+            queued.cancel()
+            first.cancel()
+
+            with pytest.raises(ReplayGainCancelled):
+                queued.result(timeout=5)
+            with pytest.raises(ReplayGainCancelled):
+                first.result(timeout=5)
+
+        pool.shutdown()
+        assert pool.cancelled == 2
+        assert pool.pending == 0
+
+    def test_failures_are_counted_and_raised(self, pool):
+        with patch("src.replaygain.pool.process_replaygain", side_effect=RuntimeError("bad file")):
+            with pytest.raises(RuntimeError):
+                pool.process(b"audio", "mp3")
+        assert pool.failed == 1
+        assert pool.tracks_per_minute() == 0.0
+
+
+class TestAlbumReplayGain:
+    def test_album_loudness_is_duration_weighted_energy_mean(self):
+        gain, peak = album_replaygain([(-10.0, 0.5), (-20.0, 0.9)], [100.0, 100.0])
+        # Energy mean of -10 and -20 LUFS, dominated by the louder track
+        assert gain == pytest.approx(-12.6, abs=0.01)
+        assert peak == 0.9
+
+        weighted, _ = album_replaygain([(-10.0, 0.5), (-20.0, 0.9)], [10.0, 1000.0])
+        assert weighted < gain
+
+    def test_unknown_durations_use_mean_weight(self):
+        assert album_replaygain([(-14.0, 0.5), (-14.0, 0.5)], [None, 200.0])[0] == -14.0
+
+    def test_empty_album_is_rejected(self):
+        with pytest.raises(ValueError):
+            album_replaygain([])
+
+    def test_process_album_measures_concurrently_and_tags_batch(self, pool):
+        measured = {b"one": (-10.0, 0.5, {}), b"two": (-20.0, 0.9, {})}
+        in_flight, peak = 0, 0
+        lock = threading.Lock()
+
+        def measure(content, file_format, **kwargs):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.2)
+            with lock:
+                in_flight -= 1
+            return measured[content]
+
+        with patch("src.replaygain.pool.measure_replaygain", side_effect=measure), patch(
+            "src.replaygain.pool.audio_duration", return_value=100.0
+        ), patch(
+            "src.replaygain.pool.tag_replaygain",
+            side_effect=lambda c, f, g, p, m, ag, ap, **kw: (c, g, ag, ap),
+        ):
+            results = pool.process_album([(b"one", "flac"), (b"two", "flac")], label="Album")
+
+        assert peak == 2
+        assert [r[:2] for r in results] == [(b"one", -10.0), (b"two", -20.0)]
+        assert [r[2:] for r in results] == [(-12.6, 0.9), (-12.6, 0.9)]
+
+    def test_album_tags_are_written(self):
+        fields = replaygain_tag_fields(-9.0, 0.8, album_gain=-12.6, album_peak=0.9)
+        assert fields["replaygain_album_gain"] == "-12.6 dB"
+        assert fields["replaygain_album_peak"] == "0.9"
+
+    def test_only_loudness_values_are_tagged(self):
+        loudness = {"input_i": "-14.2", "input_lra": None, "target_offset": "0.2"}
+        fields = replaygain_tag_fields(
+            -9.0, 0.8, loudness_metadata={**loudness, "bpm": None, "energy": 0.4}
+        )
+        assert fields == {
+            "replaygain_track_gain": "-9.0 dB",
+            "replaygain_track_peak": "0.8",
+            "input_i": "-14.2",
+        }
@@ -0,0 +1,216 @@
+"""Contract tests for in-place ReplayGain tagging with Mutagen."""
+import struct
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from mutagen import File as MutagenFile
+from mutagen.id3 import ID3, RVA2, TXXX
+from mutagen.ogg import OggPage
+
+from src.replaygain.main import (
+    check_replaygain_metadata,
+    id3v2_tag_size,
+    process_replaygain,
+    write_replaygain_tags,
+)
+from src.replaygain.tags import (
+    ASF_EXTENDED_CONTENT_GUID,
+    ASF_HEADER_GUID,
+    ReplayGainTags,
+    read_replaygain_tags,
+)
+
+# Silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz)
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+
+def make_mp3() -> bytes:
+    return MP3_FRAME * 20
+
+
+def make_flac() -> bytes:
+    # STREAMINFO: 4096-sample blocks, 44.1 kHz, stereo, 16 bit
+    streaminfo = (
+        struct.pack(">HH", 4096, 4096)
+        + b"\x00" * 6
+        + bytes([0x0A, 0xC4, 0x40, 0xF0])
+        + b"\x00" * 20
+    )
+    return b"fLaC" + b"\x80" + len(streaminfo).to_bytes(3, "big") + streaminfo + b"\xff\xf8" + b"\x00" * 100
+
+
+def make_opus() -> bytes:
+    head = b"OpusHead" + bytes([1, 2]) + struct.pack("<HIhB", 312, 48000, 0, 0)
+    tags = b"OpusTags" + struct.pack("<I", 4) + b"test" + struct.pack("<I", 0)
+    pages = []
+    for sequence, (packet, position) in enumerate([(head, 0), (tags, 0), (b"\xfc" + b"\x00" * 20, 960)]):
+        page = OggPage()
+        page.serial, page.sequence, page.position, page.packets = 1, sequence, position, [packet]
+        page.first = sequence == 0
+        page.last = sequence == 2
+        pages.append(page.write())
+    return b"".join(pages)
+
+
+def _atom(name: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(data)) + name + data
+
+
+def make_m4a() -> bytes:
+    mvhd = _atom(b"mvhd", b"\x00" * 12 + struct.pack(">II", 1000, 1000) + b"\x00" * 80)
+    mdhd = _atom(b"mdhd", b"\x00" * 12 + struct.pack(">II", 44100, 44100) + b"\x00" * 4)
+    hdlr = _atom(b"hdlr", b"\x00" * 8 + b"soun" + b"\x00" * 13)
+    moov = _atom(b"moov", mvhd + _atom(b"trak", _atom(b"mdia", mdhd + hdlr)))
+    return _atom(b"ftyp", b"M4A \x00\x00\x00\x00M4A mp42isom") + moov + _atom(b"mdat", b"\x01" * 100)
+
+
+FORMATS = [
+    ("mp3", make_mp3, "TXXX:replaygain_track_gain"),
+    ("flac", make_flac, "replaygain_track_gain"),
+    ("opus", make_opus, "replaygain_track_gain"),
+    ("m4a", make_m4a, "----:com.apple.iTunes:replaygain_track_gain"),
+]
+
+
+@pytest.mark.parametrize("file_format,factory,gain_key", FORMATS)
+class TestWriteReplayGainTags:
+    def test_tags_are_written_and_detected(self, file_format, factory, gain_key):
+        original = factory()
+        assert check_replaygain_metadata(BytesIO(original), file_format) is False
+
+        tagged = write_replaygain_tags(
+            original, file_format, -9.5, 0.9, r128_track_gain=-2688, r128_album_gain=0,
+            loudness_metadata={"input_lra": "5.2"},
+        )
+
+        assert check_replaygain_metadata(BytesIO(tagged), file_format) is True
+        tags = MutagenFile(BytesIO(tagged)).tags
+        value = tags[gain_key]
+        text = value.text[0] if hasattr(value, "text") else value[0]
+        text = text.decode() if isinstance(text, bytes) else text
+        assert text == "-9.5 dB"
+
+    def test_audio_stream_is_untouched(self, file_format, factory, gain_key):
+        original = factory()
+        tagged = write_replaygain_tags(original, file_format, -9.5, 0.9)
+
+        if file_format == "mp3":
+            # MP3 length is estimated from file size, so compare the frames directly
+            assert original in tagged
+        else:
+            original_info = MutagenFile(BytesIO(original)).info
+            assert MutagenFile(BytesIO(tagged)).info.length == original_info.length
+
+
+class TestProcessReplayGain:
+    def test_ffmpeg_only_measures(self):
+        measured = (-9.5, 0.9, {"input_i": "-9.5", "input_tp": "0.9"})
+        with patch("src.replaygain.main.calculate_replaygain", return_value=measured), \
+                patch("src.replaygain.main.apply_replaygain") as mock_apply:
+            tagged = process_replaygain(make_flac(), "flac")
+
+        mock_apply.assert_not_called()
+        tags = MutagenFile(BytesIO(tagged)).tags
+        assert tags["replaygain_track_gain"] == ["-9.5 dB"]
+        assert tags["R128_TRACK_GAIN"] == [str(int((-9.5 - 1.0) * 256))]
+        assert tags["input_tp"] == ["0.9"]
+        # Per-track tagging has no album measurement to write
+        assert "R128_ALBUM_GAIN" not in tags
+        assert "replaygain_album_gain" not in tags
+
+    def test_unrecognised_format_falls_back_to_ffmpeg(self):
+        measured = (-9.5, 0.9, {})
+        with patch("src.replaygain.main.calculate_replaygain", return_value=measured), \
+                patch("src.replaygain.main.apply_replaygain", return_value=b"remuxed") as mock_apply:
+            assert process_replaygain(b"\x00" * 2000, "wav") == b"remuxed"
+        mock_apply.assert_called_once()
+
+
+def _id3_tag(*frames) -> bytes:
+    tags = ID3()
+    for frame in frames:
+        tags.add(frame)
+    buf = BytesIO()
+    tags.save(buf)
+    return buf.getvalue()
+
+
+def make_wav(id3: bytes) -> bytes:
+    fmt = struct.pack("<HHIIHH", 1, 2, 44100, 176400, 4, 16)
+    chunks = (
+        b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"data" + struct.pack("<I", 400) + b"\x00" * 400
+        + b"id3 " + struct.pack("<I", len(id3)) + id3
+    )
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+
+def make_wma(gain: str) -> bytes:
+    name = "replaygain_track_gain\x00".encode("utf-16-le")
+    value = f"{gain}\x00".encode("utf-16-le")
+    descriptor = struct.pack("<H", len(name)) + name + struct.pack("<HH", 0, len(value)) + value
+    content = struct.pack("<H", 1) + descriptor
+    extended = ASF_EXTENDED_CONTENT_GUID + struct.pack("<Q", 24 + len(content)) + content
+    return ASF_HEADER_GUID + struct.pack("<QIBB", 30 + len(extended), 1, 1, 2) + extended
+
+
+class TestReadReplayGainTags:
+    @pytest.mark.parametrize("file_format,factory,gain_key", FORMATS)
+    def test_reads_values_written_by_tagger(self, file_format, factory, gain_key):
+        assert read_replaygain_tags(BytesIO(factory())) == ReplayGainTags()
+
+        tagged = write_replaygain_tags(
+            factory(), file_format, -9.5, 0.9, r128_track_gain=-2688, album_gain=-8.25
+        )
+        tags = read_replaygain_tags(BytesIO(tagged))
+
+        assert tags.present
+        assert (tags.track_gain, tags.track_peak) == (-9.5, 0.9)
+        assert (tags.r128_track_gain, tags.album_gain) == (-2688, -8.25)
+
+    def test_id3v24_and_rva2(self):
+        header = _id3_tag(RVA2(desc="track", channel=1, gain=-4.5, peak=0.5))
+        tags = read_replaygain_tags(BytesIO(header + make_mp3()))
+        assert tags.track_gain == -4.5
+        assert tags.track_peak == pytest.approx(0.5, abs=1e-3)
+
+    def test_utf16_txxx(self):
+        header = _id3_tag(TXXX(encoding=1, desc="REPLAYGAIN_TRACK_GAIN", text=["+1.25 dB"]))
+        assert read_replaygain_tags(BytesIO(header + make_mp3())).track_gain == 1.25
+
+    def test_wav_id3_chunk(self):
+        id3 = _id3_tag(TXXX(encoding=3, desc="replaygain_track_gain", text=["-7.0 dB"]))
+        assert read_replaygain_tags(BytesIO(make_wav(id3))).track_gain == -7.0
+
+    def test_wma_extended_content(self):
+        assert read_replaygain_tags(BytesIO(make_wma("-6.10 dB"))).track_gain == -6.1
+
+    def test_partial_header_download(self):
+        tagged = write_replaygain_tags(make_mp3(), "mp3", -9.5, 0.9)
+        partial = tagged[: id3v2_tag_size(tagged)]
+        assert read_replaygain_tags(BytesIO(partial)).track_gain == -9.5
+
+    def test_truncated_before_tags_is_unknown(self):
+        tagged = write_replaygain_tags(make_flac(), "flac", -9.5, 0.9)
+        assert read_replaygain_tags(BytesIO(tagged[:60])) is None
+        # WAV keeps its ID3 chunk after the audio data
+        id3 = _id3_tag(TXXX(encoding=3, desc="replaygain_track_gain", text=["-7.0 dB"]))
+        assert read_replaygain_tags(BytesIO(make_wav(id3)[:200])) is None
+
+    def test_mp4_with_moov_after_mdat(self):
+        tagged = write_replaygain_tags(make_m4a(), "m4a", -9.5, 0.9)
+        ftyp_size = struct.unpack(">I", tagged[:4])[0]
+        moov_size = struct.unpack(">I", tagged[ftyp_size : ftyp_size + 4])[0]
+        ftyp, moov = tagged[:ftyp_size], tagged[ftyp_size : ftyp_size + moov_size]
+        mdat = tagged[ftyp_size + moov_size :]
+
+        assert read_replaygain_tags(BytesIO(ftyp + mdat + moov)).track_gain == -9.5
+        assert read_replaygain_tags(BytesIO(ftyp + mdat)) is None
+
+    def test_unknown_container(self):
+        assert read_replaygain_tags(BytesIO(b"\x00" * 64)) is None
+
+    def test_detection_does_not_depend_on_suffix(self):
+        tagged = write_replaygain_tags(make_flac(), "flac", -9.5, 0.9)
+        assert check_replaygain_metadata(BytesIO(tagged), "ogg") is True
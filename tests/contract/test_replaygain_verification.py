@@ -0,0 +1,202 @@
+"""Contract tests for skip-download ReplayGain verification in AzuraCastSync."""
+from io import BytesIO
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from mutagen.easyid3 import EasyID3
+
+from src.azuracast.detection import get_replaygain_from_listing
+from src.azuracast.main import AzuraCastSync
+from src.replaygain.main import check_replaygain_metadata, id3v2_tag_size
+
+ENV = {
+    "AZURACAST_HOST": "https://test.example.com",
+    "AZURACAST_API_KEY": "test-key",
+    "AZURACAST_STATIONID": "1",
+}
+
+# Silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz)
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+
+def make_mp3(replaygain: bool) -> bytes:
+    buf = BytesIO(MP3_FRAME * 50)
+    tags = EasyID3()
+    tags["title"] = "Song"
+    if replaygain:
+        tags["replaygain_track_gain"] = "-3.20 dB"
+        tags["replaygain_track_peak"] = "0.950000"
+    tags.save(buf)
+    return buf.getvalue()
+
+
+def _ranged_api(content: bytes):
+    """Fake _perform_request serving /play with Range support."""
+
+    def api(method, endpoint, headers=None, **kwargs):
+        response = Mock()
+        response.status_code = 200
+        if endpoint.endswith("/play"):
+            data = content
+            if headers and "Range" in headers:
+                end = int(headers["Range"].split("-")[1])
+                data = content[: end + 1]
+                response.status_code = 206
+            response.content = data
+        return response
+
+    return api
+
+
+@pytest.fixture
+def client():
+    with patch.dict("os.environ", {**ENV, "AZURACAST_TAG_HEADER_BYTES": "64"}):
+        yield AzuraCastSync()
+
+
+class TestGetReplayGainFromListing:
+    def test_top_level_replaygain_field(self):
+        assert get_replaygain_from_listing({"id": "1", "replaygain_track_gain": -3.5}) is True
+
+    def test_extra_metadata_replaygain(self):
+        track = {"id": "1", "extra_metadata": {"r128_track_gain": -512}}
+        assert get_replaygain_from_listing(track) is True
+
+    def test_amplify_is_not_replaygain(self):
+        track = {"id": "1", "amplify": -2.0, "extra_metadata": {"liq_amplify": -4}}
+        assert get_replaygain_from_listing(track) is None
+
+    def test_custom_field(self):
+        track = {"id": "1", "custom_fields": {"replaygain_track_gain": "-1.2 dB"}}
+        assert get_replaygain_from_listing(track) is True
+
+    def test_empty_values_are_unknown(self):
+        track = {"id": "1", "replaygain_track_gain": None, "extra_metadata": {"r128_track_gain": ""}}
+        assert get_replaygain_from_listing(track) is None
+
+    def test_missing_track_is_unknown(self):
+        assert get_replaygain_from_listing(None) is None
+
+
+class TestPartialTagDetection:
+    def test_id3v2_tag_size(self):
+        data = make_mp3(replaygain=True)
+        size = id3v2_tag_size(data)
+        assert size is not None and 10 < size < len(data)
+        assert data[size:size + 2] == b"\xff\xfb"
+
+    def test_id3v2_tag_size_without_tag(self):
+        assert id3v2_tag_size(MP3_FRAME) is None
+
+    def test_partial_header_is_enough(self):
+        data = make_mp3(replaygain=True)
+        partial = data[: id3v2_tag_size(data) + 2000]
+        assert check_replaygain_metadata(BytesIO(partial), ".mp3") is True
+
+    def test_untagged_returns_false(self):
+        assert check_replaygain_metadata(BytesIO(make_mp3(replaygain=False)), "mp3") is False
+
+    def test_unreadable_returns_none(self):
+        assert check_replaygain_metadata(BytesIO(b"ID3" + b"\x00" * 20), "mp3") is None
+
+
+class TestVerifyReplayGainInAzuraCast:
+    def test_listing_skips_download(self, client):
+        with patch.object(client, "_perform_request") as mock_request:
+            known = {"id": "5", "replaygain_track_gain": -2.0}
+            assert client.verify_replaygain_in_azuracast("5", ".mp3", known) is True
+            mock_request.assert_not_called()
+
+    def test_header_fetch_uses_range_and_extends_to_tag(self, client):
+        content = make_mp3(replaygain=True)
+        with patch.object(
+            client, "_perform_request", side_effect=_ranged_api(content)
+        ) as mock_request:
+            assert client.verify_replaygain_in_azuracast("5", ".mp3", {"id": "5"}) is True
+
+            ranges = [c.kwargs["headers"]["Range"] for c in mock_request.call_args_list]
+            assert ranges[0] == "bytes=0-63"
+            assert len(ranges) == 2  # Second fetch covers the whole ID3 tag
+            assert all("Range" in c.kwargs["headers"] for c in mock_request.call_args_list)
+
+    def test_untagged_file_detected_from_header(self, client):
+        content = make_mp3(replaygain=False)
+        with patch.object(client, "_perform_request", side_effect=_ranged_api(content)):
+            assert client.verify_replaygain_in_azuracast("5", "mp3") is False
+
+    def test_unreadable_header_falls_back_to_full_download(self, client):
+        with patch.object(client, "download_file_header_from_azuracast", return_value=b"junk"), \
+                patch.object(
+                    client, "download_file_from_azuracast", return_value=make_mp3(True)
+                ) as mock_download:
+            assert client.verify_replaygain_in_azuracast("5", "mp3") is True
+            mock_download.assert_called_once_with("5")
+
+    def test_results_are_remembered_per_file_id(self, client):
+        content = make_mp3(replaygain=True)
+        with patch.object(
+            client, "_perform_request", side_effect=_ranged_api(content)
+        ) as mock_request:
+            client.verify_replaygain_in_azuracast("5", "mp3")
+            calls = mock_request.call_count
+            assert client.verify_replaygain_in_azuracast(5, "mp3") is True
+            assert mock_request.call_count == calls
+
+
+class FakeTrack(dict):
+    """Minimal stand-in for src.track.main.Track."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.download = Mock(return_value=make_mp3(replaygain=True))
+        self.clear_content = Mock()
+
+
+class TestUploadFileAndSetTrackId:
+    def test_existing_track_with_listing_replaygain_is_not_downloaded(self, client):
+        known_tracks = [
+            {
+                "id": "42",
+                "title": "Song",
+                "custom_fields": {"musicbrainz_trackid": "mbid-1"},
+                "replaygain_track_gain": -6.1,
+            }
+        ]
+        track = FakeTrack(
+            {
+                "Name": "Song",
+                "AlbumArtist": "Artist",
+                "Path": "/music/song.mp3",
+                "ProviderIds": {"MusicBrainzTrack": "mbid-1"},
+            }
+        )
+
+        with patch("src.azuracast.main.get_cached_known_tracks", return_value=known_tracks), \
+                patch.object(client, "_perform_request") as mock_request:
+            assert client.upload_file_and_set_track_id(track, MagicMock()) is True
+            mock_request.assert_not_called()
+            track.download.assert_not_called()
+            assert track["azuracast_file_id"] == "42"
+
+    def test_existing_track_without_replaygain_is_reuploaded(self, client):
+        known_tracks = [
+            {"id": "42", "title": "Song", "custom_fields": {"musicbrainz_trackid": "mbid-1"}}
+        ]
+        track = FakeTrack(
+            {
+                "Name": "Song",
+                "AlbumArtist": "Artist",
+                "Path": "/music/song.mp3",
+                "ProviderIds": {"MusicBrainzTrack": "mbid-1"},
+            }
+        )
+
+        with patch("src.azuracast.main.get_cached_known_tracks", return_value=known_tracks), \
+                patch.object(
+                    client, "_perform_request", side_effect=_ranged_api(make_mp3(False))
+                ), \
+                patch.object(client, "delete_file_from_azuracast", return_value=True), \
+                patch.object(client, "upload_file_to_azuracast", return_value={"id": 43}):
+            assert client.upload_file_and_set_track_id(track, MagicMock()) is True
+            assert track["azuracast_file_id"] == 43
+            assert client.verify_replaygain_in_azuracast(43, "mp3") is True
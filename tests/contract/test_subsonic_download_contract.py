@@ -233,3 +233,23 @@ def test_download_contract_matches_openapi_spec(mock_subsonic_client):
         assert len(audio_data) > 0
         assert mock_response.headers["content-type"].startswith("audio/")
         assert int(mock_response.headers["content-length"]) == len(audio_data)
+
+
+def test_download_track_range_reads_only_requested_bytes(mock_subsonic_client):
+    """Test ranged download sends a Range header and stops after length bytes."""
+    import httpx
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        # Server ignores Range and sends the whole file
+        return httpx.Response(200, headers={"content-type": "audio/flac"}, content=b"x" * 100_000)
+
+    mock_subsonic_client.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    audio_data = mock_subsonic_client.download_track_range("300", 1000)
+
+    assert audio_data == b"x" * 1000
+    assert requests[0].headers["Range"] == "bytes=0-999"
+    assert requests[0].url.path.endswith("/download")
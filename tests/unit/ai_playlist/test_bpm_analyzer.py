@@ -0,0 +1,103 @@
+"""Unit tests for library BPM analysis feeding the metadata cache."""
+from concurrent.futures import Future
+from unittest.mock import Mock
+
+import pytest
+
+from src.ai_playlist.bpm_analyzer import RANGE_HEADER_MARGIN, excerpt_byte_count, fetch_excerpt
+from src.ai_playlist.metadata_enhancer import MetadataEnhancer
+from src.replaygain.cache import LoudnessCache, subsonic_source_key
+from src.replaygain.features import AudioFeatures
+from src.subsonic.models import SubsonicTrack
+
+
+def make_track(track_id="1", suffix="mp3", bit_rate=320, size=10_000_000, duration=240):
+    return SubsonicTrack(
+        id=track_id, title="Song", artist="Artist", album="Album", duration=duration,
+        path=f"a/{track_id}.{suffix}", suffix=suffix, created="", size=size, bitRate=bit_rate,
+    )
+
+
+class TestExcerptFetch:
+    def test_byte_count_from_bitrate(self):
+        # 60 s at 320 kbps with 25% slack
+        assert excerpt_byte_count(make_track()) == 3_000_000 + RANGE_HEADER_MARGIN
+
+    def test_whole_file_when_prefix_unusable(self):
+        assert excerpt_byte_count(make_track(suffix="m4a")) is None
+        assert excerpt_byte_count(make_track(size=2_000_000)) is None
+        assert excerpt_byte_count(make_track(bit_rate=None, size=None)) is None
+
+    def test_fetch_uses_ranged_download(self):
+        client = Mock()
+        fetch_excerpt(client, make_track())
+        client.download_track_range.assert_called_once_with("1", 3_000_000 + RANGE_HEADER_MARGIN)
+
+        fetch_excerpt(client, make_track(suffix="m4a"))
+        client.download_track.assert_called_once_with("1")
+
+
+class TestAnalyzeLibraryBpm:
+    @pytest.fixture
+    def enhancer(self, tmp_path):
+        return MetadataEnhancer(cache_db_path=str(tmp_path / "cache.db"))
+
+    @pytest.fixture
+    def pool(self):
+        pool = Mock(max_workers=1)
+
+        def submit(excerpt):
+            future = Future()
+            if excerpt == b"bad":
+                future.set_exception(RuntimeError("ffmpeg failed"))
+            else:
+                bpm = None if excerpt == b"quiet" else 128.0
+                future.set_result(AudioFeatures(-9.0, -1.0, bpm, 0.7, 60.0))
+            return future
+
+        pool.submit.side_effect = submit
+        return pool
+
+    def test_results_are_cached(self, enhancer, pool):
+        client = Mock()
+        client.download_track_range.side_effect = lambda track_id, length: {
+            "2": b"bad", "3": b"quiet"
+        }.get(track_id, b"audio")
+        tracks = [make_track(str(i)) for i in range(4)]
+        enhancer._cache_metadata("0", {"bpm": 100.0, "genre": "Rock", "country": None}, "lastfm")
+
+        results = enhancer.analyze_library_bpm(tracks, client, pool)
+
+        assert results == {"1": 128.0}
+        assert client.download_track_range.call_count == 3
+        assert enhancer._get_cached_metadata("1") == {
+            "bpm": 128.0, "genre": None, "country": None, "energy": 0.7, "source": "features"
+        }
+        assert enhancer._get_cached_metadata("2") is None
+        assert enhancer._get_cached_metadata("3") is None
+
+    def test_keeps_cached_genre(self, enhancer, pool):
+        enhancer._cache_metadata("1", {"bpm": None, "genre": "House", "country": "FR"}, "lastfm")
+        client = Mock()
+        client.download_track_range.return_value = b"audio"
+
+        enhancer.analyze_library_bpm([make_track("1")], client, pool)
+
+        assert enhancer._get_cached_metadata("1") == {
+            "bpm": 128.0, "genre": "House", "country": "FR", "energy": 0.7, "source": "lastfm"
+        }
+
+    def test_reuses_replaygain_decode(self, enhancer, pool, tmp_path, monkeypatch):
+        loudness_cache = LoudnessCache(str(tmp_path / "loudness.db"))
+        monkeypatch.setattr(
+            "src.ai_playlist.metadata_enhancer.get_loudness_cache", lambda: loudness_cache
+        )
+        track = make_track("1")
+        loudness_cache.set(subsonic_source_key(track), -9.0, -1.0, {"bpm": 96.0, "energy": 0.4})
+        client = Mock()
+
+        assert enhancer.analyze_library_bpm([track], client, pool) == {"1": 96.0}
+
+        client.download_track_range.assert_not_called()
+        pool.submit.assert_not_called()
+        assert enhancer._get_cached_metadata("1")["energy"] == 0.4
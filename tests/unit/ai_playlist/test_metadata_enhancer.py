@@ -0,0 +1,298 @@
+"""Tests for MetadataEnhancer Last.fm enrichment: artist/album caches, misses and bulk API."""
+import threading
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from src.ai_playlist.metadata_enhancer import MetadataEnhancer
+from src.subsonic.models import SubsonicTrack
+
+
+def tags(*names):
+    return [SimpleNamespace(item=SimpleNamespace(name=name)) for name in names]
+
+
+def make_track(track_id, artist="Artist", album="Album"):
+    return SubsonicTrack(
+        id=track_id,
+        title=f"Song {track_id}",
+        artist=artist,
+        album=album,
+        duration=200,
+        path=f"{track_id}.mp3",
+        suffix="mp3",
+        created="2024-01-01T00:00:00",
+    )
+
+
+class FakeNetwork:
+    """pylast network stand-in counting calls by kind."""
+
+    def __init__(self, track_tags=(), album_tags=("Album Tag",), artist_tags=("Artist Tag",)):
+        self.track_tags = track_tags
+        self.album_tags = album_tags
+        self.artist_tags = artist_tags
+        self.calls = {"track": 0, "album": 0, "artist": 0}
+        self.lock = threading.Lock()
+
+    def _count(self, kind, result):
+        with self.lock:
+            self.calls[kind] += 1
+        return result
+
+    def get_track(self, artist, title):
+        return Mock(
+            spec=["get_top_tags"],
+            get_top_tags=lambda limit: self._count("track", tags(*self.track_tags)),
+        )
+
+    def get_album(self, artist, album):
+        return Mock(
+            spec=["get_top_tags"],
+            get_top_tags=lambda limit: self._count("album", tags(*self.album_tags)),
+        )
+
+    def get_artist(self, artist):
+        return Mock(
+            spec=["get_top_tags"],
+            get_top_tags=lambda limit: self._count("artist", tags(*self.artist_tags)),
+        )
+
+
+@pytest.fixture
+def enhancer(tmp_path):
+    enhancer = MetadataEnhancer(cache_db_path=str(tmp_path / "cache.db"), rate_limit=0)
+    enhancer.lastfm_network = FakeNetwork()
+    return enhancer
+
+
+class TestArtistAndAlbumCaches:
+    def test_track_tag_preferred(self, enhancer):
+        enhancer.lastfm_network.track_tags = ("Track Tag",)
+
+        metadata = enhancer.enhance_track("1", "Artist", "Song", album="Album")
+
+        assert metadata["genre"] == "Track Tag"
+        assert enhancer.lastfm_network.calls["album"] == 0
+
+    def test_album_then_artist_fallback(self, enhancer):
+        assert enhancer.enhance_track("1", "Artist", "Song", album="Album")["genre"] == "Album Tag"
+
+        enhancer.lastfm_network.album_tags = ()
+        assert enhancer.enhance_track("2", "Artist", "Song 2", album="Other")["genre"] == (
+            "Artist Tag"
+        )
+
+    def test_artist_and_album_looked_up_once(self, enhancer):
+        for track_id in ("1", "2", "3"):
+            enhancer.enhance_track(track_id, " artist ", f"Song {track_id}", album="ALBUM")
+
+        assert enhancer.lastfm_network.calls == {"track": 3, "album": 1, "artist": 1}
+
+    def test_caches_persist(self, enhancer, tmp_path):
+        enhancer.enhance_track("1", "Artist", "Song", album="Album")
+
+        reopened = MetadataEnhancer(cache_db_path=str(tmp_path / "cache.db"), rate_limit=0)
+        reopened.lastfm_network = FakeNetwork(album_tags=("Other",), artist_tags=("Other",))
+        metadata = reopened.enhance_track("2", "Artist", "Song 2", album="Album")
+
+        assert metadata["genre"] == "Album Tag"
+        assert reopened.lastfm_network.calls == {"track": 1, "album": 0, "artist": 0}
+
+    def test_transient_album_failure_not_persisted(self, enhancer, tmp_path):
+        enhancer.lastfm_network.get_album = Mock(side_effect=ConnectionError("offline"))
+
+        assert enhancer._get_album_genre("Artist", "Album") is None
+
+        reopened = MetadataEnhancer(cache_db_path=str(tmp_path / "cache.db"), rate_limit=0)
+        reopened.lastfm_network = FakeNetwork()
+        assert reopened._get_album_genre("Artist", "Album") == "Album Tag"
+
+
+class TestEnhanceTracks:
+    def test_enhances_concurrently_and_skips_cached(self, enhancer):
+        tracks = [
+            make_track(str(i), artist=f"Artist {i % 3}", album=f"Album {i % 3}")
+            for i in range(12)
+        ]
+        enhancer.enhance_track("0", "Artist 0", "Song 0", album="Album 0")
+        enhancer.lastfm_network.calls = {"track": 0, "album": 0, "artist": 0}
+
+        results = enhancer.enhance_tracks(tracks, max_workers=4)
+
+        assert set(results) == {str(i) for i in range(12)}
+        assert all(metadata["genre"] == "Album Tag" for metadata in results.values())
+        # Track 0 was cached; artist 0 / album 0 were too
+        assert enhancer.lastfm_network.calls == {"track": 11, "album": 2, "artist": 2}
+
+    def test_resumes_from_cache(self, enhancer, tmp_path):
+        tracks = [make_track(str(i)) for i in range(5)]
+        enhancer.enhance_tracks(tracks)
+
+        reopened = MetadataEnhancer(cache_db_path=str(tmp_path / "cache.db"), rate_limit=0)
+        reopened.lastfm_network = FakeNetwork()
+        results = reopened.enhance_tracks(tracks)
+
+        assert len(results) == 5
+        assert reopened.lastfm_network.calls == {"track": 0, "album": 0, "artist": 0}
+
+
+class TestKnownMisses:
+    @pytest.fixture
+    def empty_network(self, enhancer):
+        enhancer.lastfm_network = FakeNetwork(album_tags=(), artist_tags=())
+        return enhancer.lastfm_network
+
+    def test_miss_not_looked_up_again(self, enhancer, empty_network, tmp_path):
+        assert enhancer.enhance_track("1", "Artist", "Song")["source"] == "none"
+
+        reopened = MetadataEnhancer(cache_db_path=str(tmp_path / "cache.db"), rate_limit=0)
+        reopened.lastfm_network = FakeNetwork()
+        assert reopened.enhance_track("1", "Artist", "Song")["source"] == "none"
+
+        assert reopened.lastfm_network.calls == {"track": 0, "album": 0, "artist": 0}
+        assert reopened.avoided_lookups == 1
+        assert reopened.get_cache_stats()["known_misses"] == 1
+
+    def test_miss_retried_after_ttl(self, enhancer, empty_network):
+        enhancer.enhance_track("1", "Artist", "Song")
+        enhancer.connection.execute(
+            "UPDATE metadata_miss_cache SET cached_at = '2000-01-01T00:00:00'"
+        )
+        enhancer.lastfm_network = FakeNetwork(track_tags=("Track Tag",))
+
+        assert enhancer.enhance_track("1", "Artist", "Song")["genre"] == "Track Tag"
+
+    def test_transient_failure_not_recorded(self, enhancer):
+        enhancer.lastfm_network.get_track = Mock(side_effect=ConnectionError("offline"))
+
+        enhancer.enhance_track("1", "Artist", "Song")
+
+        assert enhancer._get_known_misses(["1"]) == set()
+
+    def test_bulk_skips_known_misses(self, enhancer, empty_network):
+        tracks = [make_track(str(i)) for i in range(4)]
+        enhancer.enhance_tracks(tracks[:2])
+        empty_network.calls = {"track": 0, "album": 0, "artist": 0}
+
+        results = enhancer.enhance_tracks(tracks)
+
+        assert set(results) == {"0", "1", "2", "3"}
+        assert empty_network.calls["track"] == 2
+        assert enhancer.avoided_lookups == 2
+
+
+class TestAudioFeatureEntries:
+    """BPM/energy stored by audio analysis alone must not block Last.fm enrichment."""
+
+    def test_features_alone_are_enriched(self, enhancer):
+        enhancer.cache_audio_features("1", {"bpm": 128.0, "energy": 0.7})
+
+        metadata = enhancer.enhance_track("1", "Artist", "Song", album="Album")
+
+        assert (metadata["genre"], metadata["bpm"], metadata["energy"]) == (
+            "Album Tag", 128.0, 0.7
+        )
+        assert enhancer._get_cached_metadata("1")["source"] == "lastfm"
+        assert enhancer.lastfm_network.calls["track"] == 1
+
+    def test_bulk_enriches_features(self, enhancer):
+        enhancer.cache_audio_features_many({"0": {"bpm": 90.0, "energy": 0.2}})
+
+        results = enhancer.enhance_tracks([make_track("0"), make_track("1")])
+
+        assert results["0"]["genre"] == "Album Tag"
+        assert results["0"]["bpm"] == 90.0
+        assert enhancer.lastfm_network.calls["track"] == 2
+
+    def test_miss_keeps_features(self, enhancer):
+        enhancer.lastfm_network = FakeNetwork(album_tags=(), artist_tags=())
+        enhancer.cache_audio_features("1", {"bpm": 128.0, "energy": 0.7})
+
+        assert enhancer.enhance_track("1", "Artist", "Song")["bpm"] == 128.0
+        assert enhancer.enhance_track("1", "Artist", "Song")["bpm"] == 128.0
+        assert enhancer.lastfm_network.calls["track"] == 1
+
+    def test_legacy_feature_rows_are_marked_partial(self, enhancer, tmp_path):
+        enhancer._cache_metadata(
+            "1", {"bpm": 128.0, "genre": None, "country": None, "energy": 0.7}, "aubio"
+        )
+        enhancer._cache_metadata("2", {"bpm": 100.0, "genre": None, "country": None}, "aubio")
+
+        reopened = MetadataEnhancer(cache_db_path=str(tmp_path / "cache.db"), rate_limit=0)
+
+        assert reopened._get_cached_metadata("1")["source"] == MetadataEnhancer.FEATURES_SOURCE
+        assert reopened._get_cached_metadata("2")["source"] == "aubio"
+
+
+def test_rate_limit_spaces_requests(tmp_path, monkeypatch):
+    enhancer = MetadataEnhancer(cache_db_path=str(tmp_path / "cache.db"), rate_limit=2)
+    sleeps = []
+    monkeypatch.setattr("src.ai_playlist.metadata_enhancer.time.sleep", sleeps.append)
+
+    for _ in range(3):
+        enhancer._apply_rate_limit()
+
+    assert len(sleeps) == 1 and 0 < sleeps[0] <= 1.0
+
+
+class TestCacheStore:
+    def test_uses_wal_and_reuses_connection(self, enhancer):
+        assert enhancer.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert enhancer.connection is enhancer.connection
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(enhancer.connection))
+        thread.start()
+        thread.join()
+        assert other[0] is not enhancer.connection
+
+    def test_get_many(self, enhancer, monkeypatch):
+        monkeypatch.setattr(MetadataEnhancer, "LOOKUP_CHUNK_SIZE", 7)
+        enhancer._cache_metadata_many(
+            (str(i), {"bpm": float(i), "genre": "Rock", "country": None}, "lastfm", None, None)
+            for i in range(20)
+        )
+
+        cached = enhancer.get_many([str(i) for i in range(25)] + ["3"])
+
+        assert set(cached) == {str(i) for i in range(20)}
+        assert cached["3"] == {
+            "bpm": 3.0, "genre": "Rock", "country": None, "energy": None, "source": "lastfm"
+        }
+        assert enhancer.get_many([]) == {}
+
+    def test_bulk_results_written_in_batches(self, enhancer, monkeypatch):
+        monkeypatch.setattr(MetadataEnhancer, "WRITE_BATCH_SIZE", 4)
+        batches = []
+        write = enhancer._cache_metadata_many
+        monkeypatch.setattr(
+            enhancer, "_cache_metadata_many",
+            lambda entries: batches.append(len(entries)) or write(entries)
+        )
+
+        enhancer.enhance_tracks(
+            [make_track(str(i), artist=f"Artist {i}") for i in range(10)], max_workers=1
+        )
+
+        assert sum(batches) == 10
+        assert max(batches) < 10
+        assert enhancer.get_cache_stats()["lastfm_count"] == 10
+
+    def test_worker_connections_closed_after_bulk_run(self, enhancer):
+        enhancer.connection
+        for run in range(3):
+            enhancer.enhance_tracks(
+                [make_track(f"{run}-{i}", artist=f"Artist {i}") for i in range(8)],
+                max_workers=4,
+            )
+
+        assert list(enhancer._connections.values()) == [enhancer.connection]
+
+    def test_close(self, enhancer):
+        enhancer.connection
+        enhancer.close()
+
+        # A new connection is opened on next use
+        assert enhancer.get_many(["missing"]) == {}
@@ -0,0 +1,62 @@
+"""
+Pytest fixtures shared by the radio playlist unit tests.
+
+This module provides an in-memory playlist manager and a factory for
+RadioPlaylistGenerator instances built on top of it.
+"""
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from radioplaylist.main import RadioPlaylistGenerator
+
+
+class FakePlaylistManager:
+    """In-memory stand-in for PlaylistManager's genre and title/artist lookups."""
+
+    def __init__(self, tracks_by_genre=None):
+        self.tracks_by_genre = tracks_by_genre or {}
+        tracks = [t for genre_tracks in self.tracks_by_genre.values() for t in genre_tracks]
+        self.by_title_artist = {(t["Name"].lower(), t["AlbumArtist"].lower()): t for t in tracks}
+        self.track_map = {t["Id"]: t for t in tracks}
+        self.report = Mock()
+
+    def get_tracks_by_genre(self, genre):
+        return self.tracks_by_genre.get(genre.lower(), [])
+
+    def get_track_by_title_and_artist(self, title, artist):
+        return self.by_title_artist.get((title.lower(), artist.lower()))
+
+
+@pytest.fixture
+def fake_lastfm():
+    """Last.fm client mock with an empty cache and no similar tracks."""
+    lastfm = Mock()
+    lastfm.prefetch_similar_tracks.return_value = 0
+    lastfm.cache.iter_entries.return_value = []
+    lastfm.get_similar_tracks.return_value = []
+    return lastfm
+
+
+@pytest.fixture
+def make_generator(monkeypatch, fake_lastfm):
+    """
+    Factory for generators over a FakePlaylistManager.
+
+    RADIO_* settings are cleared first; keyword arguments named RADIO_* are
+    set as environment variables before the generator reads them. The
+    ``fake_lastfm`` fixture is used unless another client is passed.
+    """
+    for key in list(os.environ):
+        if key.startswith("RADIO_"):
+            monkeypatch.delenv(key)
+
+    def build(tracks_by_genre=None, lastfm=None, **kwargs):
+        for key in [key for key in kwargs if key.startswith("RADIO_")]:
+            monkeypatch.setenv(key, kwargs.pop(key))
+        return RadioPlaylistGenerator(
+            FakePlaylistManager(tracks_by_genre), lastfm or fake_lastfm, Mock(), **kwargs
+        )
+
+    return build
@@ -2,8 +2,9 @@
 Unit tests for MetadataEnhancerService.
 
 Tests cover:
-- Last.fm API retrieval
-- aubio CLI fallback
+- Last.fm API retrieval (through the MetadataEnhancer engine)
+- Audio analysis fallback
+- Known-miss caching
 - SQLite caching
 - Cache expiration
 - Fallback chain behavior
@@ -19,12 +20,41 @@ from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock, call
 import pytest
 
+from ai_playlist.metadata_enhancer import MetadataEnhancer
 from ai_playlist.services.metadata_enhancer import (
     MetadataEnhancerService,
     TrackMetadata,
 )
 
 
+def backdate(cache_db, artist, title, days):
+    """Move a cached entry's timestamp back by the given number of days."""
+    conn = sqlite3.connect(str(cache_db))
+    old_date = (datetime.utcnow() - timedelta(days=days)).isoformat()
+    conn.execute(
+        "UPDATE track_metadata_cache SET cached_at = ? WHERE track_id = ?",
+        (old_date, MetadataEnhancer.artist_title_id(artist, title))
+    )
+    conn.commit()
+    conn.close()
+
+
+def write_legacy_cache(cache_db, artist, title, genre):
+    """Create the former artist/title metadata_cache table with one entry."""
+    conn = sqlite3.connect(str(cache_db))
+    conn.execute(
+        "CREATE TABLE metadata_cache (artist TEXT NOT NULL, title TEXT NOT NULL, "
+        "metadata TEXT NOT NULL, cached_at TEXT NOT NULL, PRIMARY KEY (artist, title))"
+    )
+    metadata = TrackMetadata(artist=artist, title=title, genre=genre)
+    conn.execute(
+        "INSERT INTO metadata_cache VALUES (?, ?, ?, ?)",
+        (artist, title, json.dumps(metadata.to_dict()), datetime.utcnow().isoformat())
+    )
+    conn.commit()
+    conn.close()
+
+
 class TestTrackMetadata:
     """Test TrackMetadata dataclass."""
 
@@ -124,19 +154,55 @@ class TestMetadataEnhancerInit:
 
             service = MetadataEnhancerService(cache_db=str(cache_db))
 
-            # Verify table exists
+            # Verify the shared MetadataEnhancer table exists
             conn = sqlite3.connect(str(cache_db))
             cursor = conn.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='metadata_cache'"
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='track_metadata_cache'"
             )
             assert cursor.fetchone() is not None
 
             # Verify columns
-            cursor = conn.execute("PRAGMA table_info(metadata_cache)")
+            cursor = conn.execute("PRAGMA table_info(track_metadata_cache)")
             columns = {row[1] for row in cursor.fetchall()}
-            assert columns == {"artist", "title", "metadata", "cached_at"}
+            assert {"track_id", "artist_key", "title_key", "metadata_json", "cached_at"} <= columns
+
+            conn.close()
+
+    def test_legacy_cache_migrated(self):
+        """Test entries from the old metadata_cache table are carried over."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_db = Path(tmp_dir) / "test.db"
+            write_legacy_cache(cache_db, "Beatles", "Hey Jude", "Rock")
 
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+
+            cached = service._get_from_cache("Beatles", "Hey Jude")
+            assert cached.genre == "Rock"
+            tables = {
+                row[0] for row in service.engine.connection.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table'"
+                )
+            }
+            assert "metadata_cache" not in tables
+
+    def test_legacy_default_cache_migrated(self):
+        """Test the former default database is migrated into the default store."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            legacy_db = Path(tmp_dir) / "metadata_cache.db"
+            write_legacy_cache(legacy_db, "Beatles", "Hey Jude", "Rock")
+
+            with patch.object(
+                MetadataEnhancer, "DEFAULT_CACHE_DB", str(Path(tmp_dir) / "memory.db")
+            ), patch.object(MetadataEnhancerService, "LEGACY_CACHE_DB", legacy_db):
+                service = MetadataEnhancerService()
+                # Migrated once; the legacy table is gone
+                MetadataEnhancerService()
+
+            assert service._get_from_cache("Beatles", "Hey Jude").genre == "Rock"
+            conn = sqlite3.connect(str(legacy_db))
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
             conn.close()
+            assert "metadata_cache" not in tables
 
     def test_init_creates_cache_directory(self):
         """Test cache directory is created if missing."""
@@ -197,15 +263,9 @@ class TestMetadataEnhancerCache:
 
             metadata = TrackMetadata(artist="Beatles", title="Hey Jude")
 
-            # Manually insert old cache entry
-            conn = sqlite3.connect(str(cache_db))
-            old_date = (datetime.now() - timedelta(days=2)).isoformat()
-            conn.execute(
-                "INSERT INTO metadata_cache (artist, title, metadata, cached_at) VALUES (?, ?, ?, ?)",
-                ("Beatles", "Hey Jude", json.dumps(metadata.to_dict()), old_date)
-            )
-            conn.commit()
-            conn.close()
+            # Cache, then age the entry past the TTL
+            service._save_to_cache("Beatles", "Hey Jude", metadata)
+            backdate(cache_db, "Beatles", "Hey Jude", days=2)
 
             # Should return None (expired)
             cached = service._get_from_cache("Beatles", "Hey Jude")
@@ -232,164 +292,95 @@ class TestMetadataEnhancerCache:
 
 
 class TestMetadataEnhancerLastFm:
-    """Test Last.fm API integration."""
+    """Test Last.fm lookups go through the MetadataEnhancer engine."""
 
-    @patch('requests.get')
-    def test_lastfm_success(self, mock_get):
-        """Test successful Last.fm API call."""
+    def test_lastfm_success(self):
+        """Test a Last.fm result is returned and cached."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
-            service = MetadataEnhancerService(
-                cache_db=str(cache_db),
-                lastfm_api_key="test_key"
-            )
-
-            # Mock successful API response
-            mock_response = MagicMock()
-            mock_response.json.return_value = {
-                "track": {
-                    "name": "Hey Jude",
-                    "artist": {"name": "The Beatles"},
-                    "album": {"title": "The Beatles 1967-1970"},
-                    "toptags": {
-                        "tag": [
-                            {"name": "classic rock"},
-                            {"name": "60s"},
-                            {"name": "british"}
-                        ]
-                    }
-                }
-            }
-            mock_response.raise_for_status = MagicMock()
-            mock_get.return_value = mock_response
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+            service.engine.lastfm_network = MagicMock()
 
-            metadata = service._fetch_from_lastfm("The Beatles", "Hey Jude")
+            with patch.object(
+                service.engine, "_enhance_from_lastfm",
+                return_value={"bpm": None, "genre": "classic rock", "country": "GB"}
+            ) as mock_lastfm:
+                metadata = service.enhance_track("The Beatles", "Hey Jude")
 
-            assert metadata is not None
+            mock_lastfm.assert_called_once_with("The Beatles", "Hey Jude", None)
             assert metadata.artist == "The Beatles"
             assert metadata.title == "Hey Jude"
-            assert metadata.album == "The Beatles 1967-1970"
             assert metadata.genre == "classic rock"
-            assert "60s" in metadata.tags
+            assert service._get_from_cache("The Beatles", "Hey Jude").genre == "classic rock"
 
-    @patch('requests.get')
-    def test_lastfm_failure(self, mock_get):
-        """Test Last.fm API failure returns None."""
+    def test_lastfm_failure(self):
+        """Test a Last.fm error returns basic metadata and is not remembered as a miss."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
-            service = MetadataEnhancerService(
-                cache_db=str(cache_db),
-                lastfm_api_key="test_key"
-            )
-
-            # Mock API error
-            mock_get.side_effect = Exception("API Error")
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+            service.engine.lastfm_network = MagicMock()
 
-            metadata = service._fetch_from_lastfm("Beatles", "Hey Jude")
+            with patch.object(
+                service.engine, "_enhance_from_lastfm", side_effect=Exception("API Error")
+            ):
+                metadata = service.enhance_track("Beatles", "Hey Jude")
 
-            assert metadata is None
+            assert metadata.genre is None
+            track_id = MetadataEnhancer.artist_title_id("Beatles", "Hey Jude")
+            assert service.engine._get_known_misses([track_id]) == set()
 
     def test_lastfm_no_api_key(self):
-        """Test Last.fm returns None when no API key."""
+        """Test Last.fm is not asked without an API key."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
 
-            # Clear environment variable if it exists
-            old_key = os.environ.pop('LASTFM_API_KEY', None)
-
-            try:
+            with patch.dict(os.environ, clear=False):
+                os.environ.pop("LASTFM_API_KEY", None)
                 service = MetadataEnhancerService(cache_db=str(cache_db))
 
-                # Should return None when no API key
-                metadata = service._fetch_from_lastfm("Beatles", "Hey Jude")
+            with patch.object(service.engine, "_enhance_from_lastfm") as mock_lastfm:
+                metadata = service.enhance_track("Beatles", "Hey Jude")
 
-                assert metadata is None
-            finally:
-                # Restore environment variable if it existed
-                if old_key is not None:
-                    os.environ['LASTFM_API_KEY'] = old_key
+            mock_lastfm.assert_not_called()
+            assert metadata == TrackMetadata(artist="Beatles", title="Hey Jude")
 
 
-class TestMetadataEnhancerAubio:
-    """Test aubio fallback functionality."""
+class TestMetadataEnhancerAudioAnalysis:
+    """Test the audio analysis fallback of the engine."""
 
-    @patch('subprocess.run')
-    def test_aubio_success(self, mock_run):
-        """Test successful aubio BPM extraction."""
+    def test_bpm_from_audio_file(self):
+        """Test BPM is detected from the audio file when Last.fm has nothing."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
             service = MetadataEnhancerService(cache_db=str(cache_db))
+            service.engine.aubio_cli_path = Path("/usr/bin/aubio")
 
-            # Mock aubio output
-            mock_result = MagicMock()
-            mock_result.returncode = 0
-            mock_result.stdout = "147.000000\n"
-            mock_run.return_value = mock_result
-
-            metadata = service._analyze_with_aubio("/path/to/audio.mp3")
+            with patch.object(
+                service.engine, "_enhance_bpm_from_aubio", return_value=147.0
+            ) as mock_bpm:
+                metadata = service.enhance_track("Beatles", "Hey Jude", "/path/to/audio.mp3")
 
-            assert metadata is not None
+            mock_bpm.assert_called_once_with("/path/to/audio.mp3")
             assert metadata.bpm == 147.0
+            assert service.engine.get_by_artist_title("Beatles", "Hey Jude")["source"] == "aubio"
 
-            # Verify aubio was called correctly
-            mock_run.assert_called_once()
-            args = mock_run.call_args[0][0]
-            assert args[0] == "aubio"
-            assert args[1] == "tempo"
-
-    @patch('subprocess.run')
-    def test_aubio_not_installed(self, mock_run):
-        """Test aubio fallback when tool not installed."""
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            cache_db = Path(tmp_dir) / "test.db"
-            service = MetadataEnhancerService(cache_db=str(cache_db))
-
-            # Mock aubio not found
-            mock_run.side_effect = FileNotFoundError()
-
-            metadata = service._analyze_with_aubio("/path/to/audio.mp3")
-
-            assert metadata is None
-
-    @patch('subprocess.run')
-    def test_aubio_timeout(self, mock_run):
-        """Test aubio timeout handling."""
+    def test_no_audio_file(self):
+        """Test audio analysis is skipped without an audio file."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
             service = MetadataEnhancerService(cache_db=str(cache_db))
 
-            # Mock timeout
-            import subprocess
-            mock_run.side_effect = subprocess.TimeoutExpired(cmd="aubio", timeout=30)
+            with patch.object(service.engine, "_enhance_bpm_from_aubio") as mock_bpm:
+                metadata = service.enhance_track("Beatles", "Hey Jude")
 
-            metadata = service._analyze_with_aubio("/path/to/audio.mp3")
-
-            assert metadata is None
-
-    @patch('subprocess.run')
-    def test_aubio_invalid_output(self, mock_run):
-        """Test aubio with invalid output."""
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            cache_db = Path(tmp_dir) / "test.db"
-            service = MetadataEnhancerService(cache_db=str(cache_db))
-
-            # Mock invalid output
-            mock_result = MagicMock()
-            mock_result.returncode = 0
-            mock_result.stdout = "invalid\noutput\n"
-            mock_run.return_value = mock_result
-
-            metadata = service._analyze_with_aubio("/path/to/audio.mp3")
-
-            assert metadata is None
+            mock_bpm.assert_not_called()
+            assert metadata.bpm is None
 
 
 class TestMetadataEnhancerFallbackChain:
     """Test the complete fallback chain."""
 
-    @patch('subprocess.run')
-    @patch('requests.get')
-    def test_fallback_chain_cache_hit(self, mock_requests, mock_subprocess):
+    def test_fallback_chain_cache_hit(self):
         """Test cache is checked first."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
@@ -408,92 +399,66 @@ class TestMetadataEnhancerFallbackChain:
             service._save_to_cache("Beatles", "Hey Jude", cached_metadata)
 
             # Enhance should use cache
-            metadata = service.enhance_track("Beatles", "Hey Jude", "/audio.mp3")
+            with patch.object(service.engine, "_lookup_metadata") as mock_lookup:
+                metadata = service.enhance_track("Beatles", "Hey Jude", "/audio.mp3")
 
             assert metadata.genre == "Rock"
             assert metadata.bpm == 147.0
 
-            # No API calls should be made
-            mock_requests.assert_not_called()
-            mock_subprocess.assert_not_called()
+            # No lookups should be made
+            mock_lookup.assert_not_called()
 
-    @patch('subprocess.run')
-    @patch('requests.get')
-    def test_fallback_chain_lastfm(self, mock_requests, mock_subprocess):
-        """Test Last.fm is tried after cache miss."""
+    def test_fallback_chain_expired_entry_refreshed(self):
+        """Test an expired entry is looked up again and updated in place."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
-            service = MetadataEnhancerService(
-                cache_db=str(cache_db),
-                lastfm_api_key="test_key"
-            )
-
-            # Mock Last.fm success
-            mock_response = MagicMock()
-            mock_response.json.return_value = {
-                "track": {
-                    "name": "Hey Jude",
-                    "artist": {"name": "Beatles"},
-                    "toptags": {"tag": [{"name": "rock"}]}
-                }
-            }
-            mock_response.raise_for_status = MagicMock()
-            mock_requests.return_value = mock_response
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+            service._save_to_cache("Beatles", "Hey Jude", TrackMetadata(genre="Rock"))
+            backdate(cache_db, "Beatles", "Hey Jude", days=40)
 
-            metadata = service.enhance_track("Beatles", "Hey Jude")
+            with patch.object(
+                service.engine, "_lookup_metadata",
+                return_value=({"bpm": None, "genre": "Pop", "country": None}, "lastfm")
+            ):
+                metadata = service.enhance_track("Beatles", "Hey Jude")
 
-            assert metadata.genre == "rock"
-            mock_requests.assert_called_once()
-            mock_subprocess.assert_not_called()
+            assert metadata.genre == "Pop"
+            assert service.get_cache_stats()["total_entries"] == 1
 
-            # Should be cached now
-            cached = service._get_from_cache("Beatles", "Hey Jude")
-            assert cached is not None
-
-    @patch('subprocess.run')
-    @patch('requests.get')
-    def test_fallback_chain_aubio(self, mock_requests, mock_subprocess):
-        """Test aubio is tried after Last.fm fails."""
+    def test_fallback_chain_aubio(self):
+        """Test audio analysis is tried after Last.fm fails."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
-            service = MetadataEnhancerService(
-                cache_db=str(cache_db),
-                lastfm_api_key="test_key"
-            )
-
-            # Mock Last.fm failure
-            mock_requests.side_effect = Exception("API Error")
-
-            # Mock aubio success
-            mock_result = MagicMock()
-            mock_result.returncode = 0
-            mock_result.stdout = "147.0\n"
-            mock_subprocess.return_value = mock_result
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+            service.engine.lastfm_network = MagicMock()
+            service.engine.aubio_cli_path = Path("/usr/bin/aubio")
 
-            metadata = service.enhance_track("Beatles", "Hey Jude", "/audio.mp3")
+            with patch.object(
+                service.engine, "_enhance_from_lastfm", side_effect=Exception("API Error")
+            ) as mock_lastfm, patch.object(
+                service.engine, "_enhance_bpm_from_aubio", return_value=147.0
+            ) as mock_bpm:
+                metadata = service.enhance_track("Beatles", "Hey Jude", "/audio.mp3")
 
             assert metadata.artist == "Beatles"
             assert metadata.bpm == 147.0
+            mock_lastfm.assert_called_once()
+            mock_bpm.assert_called_once()
 
-            mock_requests.assert_called_once()
-            mock_subprocess.assert_called_once()
-
-    @patch('subprocess.run')
-    @patch('requests.get')
-    def test_fallback_chain_all_fail(self, mock_requests, mock_subprocess):
+    def test_fallback_chain_all_fail(self):
         """Test graceful degradation when all sources fail."""
         with tempfile.TemporaryDirectory() as tmp_dir:
             cache_db = Path(tmp_dir) / "test.db"
-            service = MetadataEnhancerService(
-                cache_db=str(cache_db),
-                lastfm_api_key="test_key"
-            )
-
-            # Mock all failures
-            mock_requests.side_effect = Exception("API Error")
-            mock_subprocess.side_effect = FileNotFoundError()
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+            service.engine.lastfm_network = MagicMock()
+            service.engine.aubio_cli_path = Path("/usr/bin/aubio")
 
-            metadata = service.enhance_track("Beatles", "Hey Jude", "/audio.mp3")
+            with patch.object(
+                service.engine, "_enhance_from_lastfm", side_effect=Exception("API Error")
+            ), patch.object(
+                service.engine, "_enhance_bpm_from_aubio", side_effect=FileNotFoundError()
+            ):
+                metadata = service.enhance_track("Beatles", "Hey Jude", "/audio.mp3")
 
             # Should return basic metadata
             assert metadata.artist == "Beatles"
@@ -501,6 +466,23 @@ class TestMetadataEnhancerFallbackChain:
             assert metadata.bpm is None
             assert metadata.genre is None
 
+    def test_known_miss_not_looked_up_again(self):
+        """Test a track no source knows is skipped through the engine's miss cache."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_db = Path(tmp_dir) / "test.db"
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+            service.engine.lastfm_network = MagicMock()
+
+            with patch.object(
+                service.engine, "_enhance_from_lastfm", return_value=None
+            ) as mock_lastfm:
+                service.enhance_track("Unknown", "Track")
+                metadata = service.enhance_track("Unknown", "Track")
+
+            mock_lastfm.assert_called_once()
+            assert metadata == TrackMetadata(artist="Unknown", title="Track")
+            assert service.engine.avoided_lookups == 1
+
 
 class TestMetadataEnhancerUtilities:
     """Test utility methods."""
@@ -516,16 +498,19 @@ class TestMetadataEnhancerUtilities:
                 metadata = TrackMetadata(artist=f"Artist{i}", title=f"Track{i}")
                 service._save_to_cache(f"Artist{i}", f"Track{i}", metadata)
 
+            # Library track entry of the engine, in the same store
+            service.engine._cache_metadata("track-2", {"genre": "Rock"}, "lastfm")
+
             # Clear all
             service.clear_cache()
 
-            # Verify empty
+            # Only the engine's entry is left
             conn = sqlite3.connect(str(cache_db))
-            cursor = conn.execute("SELECT COUNT(*) FROM metadata_cache")
-            count = cursor.fetchone()[0]
+            cursor = conn.execute("SELECT track_id FROM track_metadata_cache")
+            remaining = [row[0] for row in cursor.fetchall()]
             conn.close()
 
-            assert count == 0
+            assert remaining == ["track-2"]
 
     def test_clear_cache_old_only(self):
         """Test clearing only old cache entries."""
@@ -534,33 +519,18 @@ class TestMetadataEnhancerUtilities:
             service = MetadataEnhancerService(cache_db=str(cache_db))
 
             # Add old entry
-            conn = sqlite3.connect(str(cache_db))
-            old_date = (datetime.now() - timedelta(days=40)).isoformat()
-            conn.execute(
-                "INSERT INTO metadata_cache VALUES (?, ?, ?, ?)",
-                ("OldArtist", "OldTrack", "{}", old_date)
-            )
+            service._save_to_cache("OldArtist", "OldTrack", TrackMetadata())
+            backdate(cache_db, "OldArtist", "OldTrack", days=40)
 
             # Add recent entry
-            recent_date = datetime.now().isoformat()
-            conn.execute(
-                "INSERT INTO metadata_cache VALUES (?, ?, ?, ?)",
-                ("NewArtist", "NewTrack", "{}", recent_date)
-            )
-            conn.commit()
-            conn.close()
+            service._save_to_cache("NewArtist", "NewTrack", TrackMetadata())
 
             # Clear entries older than 30 days
             service.clear_cache(older_than_days=30)
 
             # Verify only recent entry remains
-            conn = sqlite3.connect(str(cache_db))
-            cursor = conn.execute("SELECT artist FROM metadata_cache")
-            artists = [row[0] for row in cursor.fetchall()]
-            conn.close()
-
-            assert "NewArtist" in artists
-            assert "OldArtist" not in artists
+            assert service.engine.get_by_artist_title("NewArtist", "NewTrack") is not None
+            assert service.engine.get_by_artist_title("OldArtist", "OldTrack") is None
 
     def test_get_cache_stats(self):
         """Test cache statistics."""
@@ -577,14 +547,8 @@ class TestMetadataEnhancerUtilities:
                 service._save_to_cache(f"Artist{i}", f"Track{i}", metadata)
 
             # Add expired entry
-            conn = sqlite3.connect(str(cache_db))
-            old_date = (datetime.now() - timedelta(days=40)).isoformat()
-            conn.execute(
-                "INSERT INTO metadata_cache VALUES (?, ?, ?, ?)",
-                ("OldArtist", "OldTrack", "{}", old_date)
-            )
-            conn.commit()
-            conn.close()
+            service._save_to_cache("OldArtist", "OldTrack", TrackMetadata())
+            backdate(cache_db, "OldArtist", "OldTrack", days=40)
 
             stats = service.get_cache_stats()
 
@@ -593,5 +557,40 @@ class TestMetadataEnhancerUtilities:
             assert stats["expired_entries"] == 1
 
 
+class TestMetadataEnhancerSharedStore:
+    """Test the service and MetadataEnhancer share one cache."""
+
+    def test_engine_reuses_service_entry(self):
+        """Test a track enriched by the service is not fetched again by track ID."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_db = Path(tmp_dir) / "test.db"
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+            service._save_to_cache(
+                "Beatles", "Hey Jude", TrackMetadata(artist="Beatles", title="Hey Jude", bpm=147.0)
+            )
+
+            engine = MetadataEnhancer(cache_db_path=str(cache_db))
+            with patch.object(engine, "_lookup_metadata") as mock_lookup:
+                metadata = engine.enhance_track("track-1", "beatles", "Hey  Jude")
+
+            mock_lookup.assert_not_called()
+            assert metadata["bpm"] == 147.0
+
+    def test_service_reads_engine_entry(self):
+        """Test an entry cached by MetadataEnhancer is a service cache hit."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_db = Path(tmp_dir) / "test.db"
+            service = MetadataEnhancerService(cache_db=str(cache_db))
+            service.engine.cache_by_artist_title(
+                "Beatles", "Hey Jude", {"bpm": 147.0, "genre": "Rock"}, source="lastfm"
+            )
+
+            cached = service._get_from_cache("beatles", "hey jude")
+
+            assert cached.bpm == 147.0
+            assert cached.genre == "Rock"
+            assert cached.artist == "beatles"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,139 @@
+"""Unit tests for LastFMCache: WAL, per-thread connections, TTLs and key normalization."""
+import sqlite3
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+import lastfm.main as lastfm_main
+from lastfm.main import LastFM, LastFMCache, normalize_cache_text
+
+SIMILAR = [{"artist": "Other", "title": "Song"}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LastFMCache(str(tmp_path / "lastfm.db"), ttl=3600)
+    yield cache
+    cache.close()
+
+
+class TestLastFMCache:
+    def test_uses_wal(self, cache):
+        assert cache.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_near_duplicate_keys_share_entry(self, cache):
+        cache.set("The Beatles", "Let It Be", SIMILAR)
+
+        assert cache.get("  the  BEATLES ", "let it be") == SIMILAR
+        assert normalize_cache_text("ＡＢＣ  Straße") == "abc strasse"
+        assert cache.get_cache_key("A-B", "C") != cache.get_cache_key("A", "B-C")
+
+    def test_expired_entries_are_misses(self, cache):
+        cache.set("Artist", "Song", SIMILAR)
+
+        with patch("lastfm.main.time.time", return_value=time.time() + 7200):
+            assert cache.get("Artist", "Song") is None
+            assert cache.get("Artist", "Song", allow_expired=True) == SIMILAR
+
+    def test_negative_entries_use_own_ttl(self, tmp_path):
+        cache = LastFMCache(str(tmp_path / "lastfm.db"), ttl=3600, negative_ttl=60)
+        try:
+            cache.set("Artist", "Known", SIMILAR)
+            cache.set("Artist", "Unknown", [])
+
+            assert cache.get("Artist", "Unknown") == []
+            with patch("lastfm.main.time.time", return_value=time.time() + 120):
+                assert cache.get("Artist", "Unknown") is None
+                assert cache.get("Artist", "Known") == SIMILAR
+        finally:
+            cache.close()
+
+    def test_set_refreshes_timestamp(self, cache):
+        later = time.time() + 7200
+        cache.set("Artist", "Song", SIMILAR)
+        with patch("lastfm.main.time.time", return_value=later):
+            cache.set("Artist", "Song", [])
+            assert cache.get("Artist", "Song") == []
+
+    def test_threads_use_own_connections(self, cache):
+        errors = []
+        connections = []
+
+        def worker(index):
+            try:
+                connections.append(cache.connection)
+                for i in range(20):
+                    cache.set("Artist", f"Song {index}-{i}", SIMILAR)
+                    assert cache.get("Artist", f"Song {index}-{i}") == SIMILAR
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        assert len(set(map(id, connections))) == 8
+        # Connections of exited threads are closed; the main thread's stays open
+        cache.close_idle_connections()
+        assert list(cache._connections.values()) == [cache.connection]
+        count = cache.connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        assert count == 160
+
+    def test_migrates_untimestamped_table(self, tmp_path):
+        path = str(tmp_path / "old.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, data TEXT)")
+            conn.execute("INSERT INTO cache VALUES ('k', '[]')")
+
+        cache = LastFMCache(path, ttl=3600)
+        try:
+            row = cache.connection.execute("SELECT cached_at FROM cache").fetchone()
+            assert row == (0,)
+            cache.set("Artist", "Song", SIMILAR)
+            assert list(cache.iter_entries()) == [("Artist", "Song", SIMILAR)]
+        finally:
+            cache.close()
+
+
+def test_expired_entry_used_when_lastfm_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(lastfm_main, "CACHE_DB_FILE", str(tmp_path / "lastfm.db"))
+    client = LastFM()
+    client.network = Mock()
+    client.network.get_track.side_effect = lastfm_main.pylast.WSError(None, 11, "Unavailable")
+    client.cache.ttl = 1
+    client.cache.set("Artist", "Song", SIMILAR)
+
+    with patch("lastfm.main.time.time", return_value=time.time() + 10):
+        assert client.get_similar_tracks("Artist", "Song") == SIMILAR
+    client.cache.close()
+
+
+def test_track_not_found_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(lastfm_main, "CACHE_DB_FILE", str(tmp_path / "lastfm.db"))
+    client = LastFM()
+    client.network = Mock()
+    client.network.get_track.side_effect = lastfm_main.pylast.WSError(None, 6, "Track not found")
+
+    assert client.get_similar_tracks("Artist", "Unknown") == []
+    assert client.get_similar_tracks("artist", "unknown") == []
+    assert client.prefetch_similar_tracks([("Artist", "Unknown")]) == 0
+
+    assert client.network.get_track.call_count == 1
+    assert client.avoided_calls == 2
+    client.cache.close()
+
+
+def test_transient_errors_are_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(lastfm_main, "CACHE_DB_FILE", str(tmp_path / "lastfm.db"))
+    client = LastFM()
+    client.network = Mock()
+    client.network.get_track.side_effect = lastfm_main.pylast.WSError(None, 11, "Unavailable")
+
+    assert client.get_similar_tracks("Artist", "Song") == []
+    assert client.cache.get("Artist", "Song") is None
+    client.cache.close()
@@ -0,0 +1,116 @@
+"""Unit tests for concurrent, rate-limited Last.fm similar-track prefetching."""
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+import lastfm.main as lastfm_main
+from lastfm.main import LastFM
+
+
+@pytest.fixture
+def lastfm(tmp_path, monkeypatch):
+    monkeypatch.setattr(lastfm_main, "CACHE_DB_FILE", str(tmp_path / "lastfm.db"))
+    client = LastFM()
+    client.network = Mock()
+    yield client
+    client.cache.close()
+
+
+def fake_similar(lastfm, delay=0.0):
+    """Make network lookups return one similar track, recording concurrency."""
+    state = {"active": 0, "peak": 0, "calls": []}
+    lock = threading.Lock()
+
+    def get_track(artist, title):
+        with lock:
+            state["calls"].append((artist, title))
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        similar = Mock()
+        similar.item = Mock(spec=lastfm_main.pylast.Track)
+        similar.item.artist.name = "Other"
+        similar.item.title = f"Like {title}"
+        track = Mock()
+        track.get_similar.return_value = [similar]
+        return track
+
+    lastfm.network.get_track.side_effect = get_track
+    return state
+
+
+class TestPrefetchSimilarTracks:
+    def test_fetches_uncached_seeds_concurrently(self, lastfm):
+        lastfm.rate_limit = 0
+        state = fake_similar(lastfm, delay=0.05)
+        lastfm.cache.set("Cached", "Song", [{"artist": "A", "title": "B"}])
+        seeds = [("Artist", f"Song {i}") for i in range(8)] + [("Cached", "Song")]
+
+        assert lastfm.prefetch_similar_tracks(seeds + seeds[:2], max_workers=4) == 8
+
+        assert len(state["calls"]) == 8
+        assert state["peak"] > 1
+        assert lastfm.cache.get("Artist", "Song 3") == [{"artist": "Other", "title": "Like Song 3"}]
+
+    def test_worker_connections_closed_after_prefetch(self, lastfm):
+        lastfm.rate_limit = 0
+        fake_similar(lastfm)
+        for run in range(3):
+            seeds = [("Artist", f"Song {run}-{i}") for i in range(8)]
+            lastfm.prefetch_similar_tracks(seeds, max_workers=4)
+
+        assert list(lastfm.cache._connections.values()) == [lastfm.cache.connection]
+
+    def test_requests_are_rate_limited(self, lastfm):
+        lastfm.rate_limit = 5
+        fake_similar(lastfm)
+        seeds = [("Artist", f"Song {i}") for i in range(7)]
+
+        started = time.monotonic()
+        lastfm.prefetch_similar_tracks(seeds, max_workers=7)
+
+        # Requests 6 and 7 wait for the first second's window to pass
+        assert time.monotonic() - started >= 0.9
+
+    def test_no_network(self, lastfm):
+        lastfm.network = None
+        assert lastfm.prefetch_similar_tracks([("Artist", "Song")]) == 0
+
+
+class TestRadioPlaylistPrefetch:
+    @pytest.fixture
+    def generator(self, make_generator, fake_lastfm):
+        fake_lastfm.prefetch_similar_tracks.side_effect = lambda seeds: len(list(seeds))
+        tracks = {
+            "rock": [
+                {"Id": f"r{i}", "Name": f"Rock {i}", "AlbumArtist": "Band", "Album": "A"}
+                for i in range(5)
+            ]
+            + [{"Id": "rx", "Name": "Nope", "AlbumArtist": "Banned Band", "Album": "A"}],
+            "pop": [{"Id": "p1", "Name": "Pop", "AlbumArtist": "Singer", "Album": "B"}],
+        }
+        return make_generator(
+            tracks, RADIO_PLAYLIST_MORNING_DRIVE="Rock,Pop", RADIO_REJECT_ARTIST="banned"
+        )
+
+    def test_prefetches_seeds_for_every_genre(self, generator):
+        assert generator.prefetch_similar_tracks() == 6
+
+        seeds = generator.lastfm.prefetch_similar_tracks.call_args.args[0]
+        assert ("Singer", "Pop") in seeds
+        assert ("Banned Band", "Nope") not in seeds
+
+    def test_generation_draws_prefetched_seeds(self, generator):
+        generator.prefetch_similar_tracks(["Morning Drive"])
+
+        drawn = {
+            generator._get_random_track_by_genre("Rock", "Morning Drive")["Id"] for _ in range(5)
+        }
+
+        assert drawn == {f"r{i}" for i in range(5)}
+        # Prefetching again does not resample genres
+        assert generator.prefetch_similar_tracks() == 0
@@ -0,0 +1,166 @@
+"""Unit tests for candidate-pool based radio playlist generation."""
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+
+TICKS_PER_SECOND = 10_000_000
+
+
+def make_tracks(genre, count, artist="Band"):
+    return [
+        {
+            "Id": f"{genre}-{i}",
+            "Name": f"{genre} song {i}",
+            "AlbumArtist": f"{artist} {i % 7}",
+            "Album": "Album",
+            "RunTimeTicks": 200 * TICKS_PER_SECOND,
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def generator(make_generator, fake_lastfm):
+    fake_lastfm.get_similar_tracks.side_effect = lambda artist, title: [
+        {"artist": "Band 1", "title": "rock song 1"},
+        {"artist": "Band 2", "title": "pop song 2"},
+    ]
+    return make_generator(
+        {"rock": make_tracks("rock", 500), "pop": make_tracks("pop", 50)},
+        RADIO_REJECT_ARTIST="band 3",
+    )
+
+
+class TestGeneratePlaylist:
+    def test_no_duplicates_or_rejects(self, generator):
+        playlist = generator.generate_playlist(["Rock", "Pop"], 24 * 3600, "Day")
+
+        ids = [track["Id"] for track in playlist]
+        assert len(ids) == len(set(ids))
+        assert not any(track["AlbumArtist"] == "Band 3" for track in playlist)
+        assert sum(t["RunTimeTicks"] for t in playlist) // TICKS_PER_SECOND >= 24 * 3600
+
+    def test_genre_rejects_are_checked_once(self, generator, monkeypatch):
+        checks = []
+        original = generator._is_rejected
+        monkeypatch.setattr(
+            generator,
+            "_is_rejected",
+            lambda track, name: checks.append(track) or original(track, name),
+        )
+
+        playlist = generator.generate_playlist(["Rock"], 400 * 200, "Day")
+
+        # One check per pool track, plus one per similar-track candidate
+        similar_checks = len(checks) - 500
+        assert 0 <= similar_checks <= 2 * len(playlist)
+
+    def test_pool_exhaustion_ends_generation(self, generator):
+        playlist = generator.generate_playlist(["Pop"], 10**9, "Day")
+
+        # Every non-rejected pop track plus similar rock tracks, each once
+        assert len({t["Id"] for t in playlist}) == len(playlist)
+        assert {t["Id"] for t in playlist} >= {
+            t["Id"] for t in make_tracks("pop", 50) if t["AlbumArtist"] != "Band 3"
+        }
+
+
+def test_title_artist_lookup_is_indexed():
+    pytest.importorskip("markdown")
+    from playlist.main import PlaylistManager
+
+    manager = PlaylistManager(Mock())
+    track = {"Id": "1", "Name": "Song", "AlbumArtist": "Artist"}
+    manager.add_track(track)
+    assert manager.get_track_by_title_and_artist("song", "ARTIST") is track
+
+    manager.add_track({"Id": "2", "Name": "Other", "AlbumArtist": "Artist"})
+    assert manager.get_track_by_title_and_artist("other", "artist")["Id"] == "2"
+
+
+@pytest.fixture
+def multi_generator(make_generator):
+    tracks = {
+        "rock": make_tracks("rock", 300),
+        "pop": make_tracks("pop", 300),
+        "jazz": make_tracks("jazz", 300),
+    }
+
+    def build(seed="station"):
+        return make_generator(
+            tracks,
+            seed=seed,
+            RADIO_PLAYLIST_MORNING="Rock,Pop",
+            RADIO_PLAYLIST_EVENING="Pop",
+            RADIO_PLAYLIST_NIGHT="Jazz,Rock",
+        )
+
+    return build
+
+
+def playlist_ids(playlists):
+    return {name: [track["Id"] for track in tracks] for name, tracks in playlists.items()}
+
+
+class TestGeneratePlaylists:
+    def test_generates_every_playlist(self, multi_generator):
+        playlists = multi_generator().generate_playlists(3600, max_workers=3)
+
+        assert list(playlists) == ["Morning", "Evening", "Night"]
+        for tracks in playlists.values():
+            assert sum(t["RunTimeTicks"] for t in tracks) // TICKS_PER_SECOND >= 3600
+
+    def test_seeded_results_independent_of_workers_and_order(self, multi_generator):
+        serial = multi_generator().generate_playlists(3600, max_workers=1)
+        parallel = multi_generator().generate_playlists(
+            3600, ["Night", "Evening", "Morning"], max_workers=3
+        )
+        single = multi_generator().generate_playlists(3600, ["Evening"])
+
+        assert playlist_ids(serial) == playlist_ids(parallel)
+        assert playlist_ids(single)["Evening"] == playlist_ids(serial)["Evening"]
+
+    def test_different_seeds_differ(self, multi_generator):
+        first = multi_generator("a").generate_playlists(3600)
+        second = multi_generator("b").generate_playlists(3600)
+
+        assert playlist_ids(first) != playlist_ids(second)
+
+    def test_failed_playlist_is_skipped(self, multi_generator, monkeypatch):
+        generator = multi_generator()
+        original = generator.generate_playlist
+
+        def generate(genres, min_duration, playlist_name):
+            if playlist_name == "Evening":
+                raise RuntimeError("boom")
+            return original(genres, min_duration, playlist_name)
+
+        monkeypatch.setattr(generator, "generate_playlist", generate)
+
+        assert list(generator.generate_playlists(3600)) == ["Morning", "Night"]
+
+    def test_unknown_playlists_are_ignored(self, multi_generator):
+        assert multi_generator().generate_playlists(3600, ["Unknown"]) == {}
+
+
+def test_report_accepts_concurrent_events():
+    pytest.importorskip("markdown")
+    from reporting import PlaylistReport
+
+    report = PlaylistReport()
+
+    def add_events(name):
+        for i in range(500):
+            report.add_event(name, "TRACK_ADDED", str(i))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(add_events, ["A", "B", "C", "D"]))
+
+    assert {name: len(events) for name, events in report.playlists.items()} == {
+        "A": 500,
+        "B": 500,
+        "C": 500,
+        "D": 500,
+    }
+    assert [event.notes for event in report.playlists["A"]] == [str(i) for i in range(500)]
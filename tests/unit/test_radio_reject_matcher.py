@@ -0,0 +1,86 @@
+"""Unit tests for the compiled radio playlist reject rules."""
+import random
+
+import pytest
+
+from radioplaylist.matcher import RejectMatcher
+
+
+class TestRejectMatcher:
+    def test_matches_substrings(self):
+        matcher = RejectMatcher(["christmas", "live", "he", "she", "hers"])
+
+        assert matcher.search("a christmas carol")
+        assert matcher.search("alive")
+        assert matcher.search("ushers")
+        assert not matcher.search("summer")
+
+    def test_empty_patterns_never_match(self):
+        matcher = RejectMatcher(["", ""])
+
+        assert not matcher
+        assert not matcher.search("anything")
+
+    def test_agrees_with_naive_search(self):
+        rng = random.Random(7)
+        patterns = ["".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(30)]
+        matcher = RejectMatcher(patterns)
+
+        for _ in range(500):
+            text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 12)))
+            assert matcher.search(text) == any(p in text for p in patterns), text
+
+
+@pytest.fixture
+def generator(make_generator):
+    generator = make_generator(
+        RADIO_REJECT_PLAYLIST="Christmas, karaoke", RADIO_REJECT_ARTIST="Tribute Band"
+    )
+    generator.specific_rejects = {"Rock_playlist": ["acoustic"], "Rock_artist": ["pop star"]}
+    return generator
+
+
+def track(track_id="1", name="Song", album="Album", artist="Artist"):
+    return {"Id": track_id, "Name": name, "Album": album, "AlbumArtist": artist}
+
+
+class TestIsRejected:
+    @pytest.mark.parametrize(
+        "candidate",
+        [
+            track(name="Christmas Song"),
+            track(album="Karaoke Hits"),
+            track(artist="The Tribute Band"),
+        ],
+    )
+    def test_general_rules(self, generator, candidate):
+        assert generator._is_rejected(candidate, "Rock")
+        assert generator._is_rejected(candidate, "Jazz")
+
+    def test_playlist_specific_rules(self, generator):
+        acoustic = track(name="Acoustic Session")
+        pop = track(artist="Pop Star")
+
+        assert generator._is_rejected(acoustic, "Rock")
+        assert generator._is_rejected(pop, "Rock")
+        assert not generator._is_rejected(acoustic, "Jazz")
+        assert not generator._is_rejected(pop, "Jazz")
+        # Title keywords do not apply to the artist field
+        assert not generator._is_rejected(track(track_id="2", artist="Acoustic Trio"), "Rock")
+
+    def test_verdict_cached_per_playlist_and_track(self, generator):
+        candidate = track(track_id="42", name="Acoustic")
+
+        assert generator._is_rejected(candidate, "Rock")
+        assert not generator._is_rejected(candidate, "Jazz")
+        candidate["Name"] = "Renamed"
+        assert generator._is_rejected(candidate, "Rock")
+        assert generator.reject_verdicts == {("Rock", "42"): True, ("Jazz", "42"): False}
+
+    def test_missing_track_is_rejected(self, generator):
+        assert generator._is_rejected({}, "Rock")
+
+    def test_no_rules(self, make_generator):
+        generator = make_generator()
+
+        assert not generator._is_rejected(track(), "Rock")
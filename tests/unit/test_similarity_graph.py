@@ -0,0 +1,120 @@
+"""Unit tests for the library similarity graph built from the Last.fm cache."""
+import pytest
+
+from lastfm.main import LastFMCache
+from radioplaylist.graph import SimilarityGraph
+
+LIBRARY = {
+    ("song a", "artist a"): "a",
+    ("song b", "artist b"): "b",
+    ("song c", "artist c"): "c",
+    ("song d", "artist d"): "d",
+    ("other a", "artist a"): "a2",
+}
+
+
+def resolve(title, artist):
+    return LIBRARY.get((title.lower(), artist.lower()))
+
+
+def similar(*pairs):
+    return [{"artist": artist, "title": title} for artist, title in pairs]
+
+
+class TestSimilarityGraph:
+    def test_from_entries_resolves_library_tracks(self):
+        graph = SimilarityGraph.from_entries(
+            [
+                (
+                    "Artist A",
+                    "Song A",
+                    similar(
+                        ("Artist B", "Song B"),
+                        ("Unknown", "Missing"),
+                        ("ARTIST A", "Other A"),
+                        ("Artist C", "Song C"),
+                    ),
+                ),
+                ("Unknown", "Missing", similar(("Artist B", "Song B"))),
+                ("Artist D", "Song D", []),
+            ],
+            resolve,
+        )
+
+        assert graph.neighbors("a") == ["b", "c"]
+        assert "d" in graph and graph.neighbors("d") == []
+        assert len(graph) == 2
+        assert graph.edge_count == 2
+
+    def test_expand_breadth_first(self):
+        graph = SimilarityGraph()
+        graph.add_edges("a", ["b", "c", "b", "a"])
+        graph.add_edges("b", ["d", "a"])
+        graph.add_edges("d", ["e"])
+
+        assert graph.neighbors("a") == ["b", "c"]
+        assert graph.expand("a") == ["b", "c"]
+        assert graph.expand("a", depth=2) == ["b", "c", "d"]
+        assert graph.expand("a", depth=3) == ["b", "c", "d", "e"]
+        assert graph.expand("a", depth=3, limit=2) == ["b", "c"]
+        assert graph.expand("missing", depth=3) == []
+        assert graph.expand("missing", depth=2, first_hop=["d", "missing"]) == ["d", "e"]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LastFMCache(str(tmp_path / "lastfm.db"), ttl=3600)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def generator(make_generator, fake_lastfm, cache):
+    fake_lastfm.cache = cache
+    library = [
+        {"Id": track_id, "Name": title.title(), "AlbumArtist": artist.title()}
+        for (title, artist), track_id in LIBRARY.items()
+    ]
+    return make_generator({"library": library})
+
+
+class TestGeneratorGraph:
+    def test_expansion_uses_cached_graph(self, generator, cache):
+        cache.set("Artist A", "Song A", similar(("Artist B", "Song B")))
+        cache.set("artist b", "song b", similar(("Artist C", "Song C")))
+
+        tracks = generator._get_similar_library_tracks(generator.playlist_manager.track_map["a"])
+
+        assert [track["Id"] for track in tracks] == ["b", "c"]
+        generator.lastfm.get_similar_tracks.assert_not_called()
+
+    def test_missing_tracks_expand_without_changing_graph(self, generator, cache):
+        cache.set("Artist D", "Song D", similar(("Artist B", "Song B")))
+        generator.lastfm.get_similar_tracks.return_value = similar(("Artist D", "Song D"))
+        track = generator.playlist_manager.track_map["c"]
+
+        tracks = generator._get_similar_library_tracks(track)
+
+        assert [t["Id"] for t in tracks] == ["d", "b"]
+        generator.lastfm.get_similar_tracks.assert_called_once_with("Artist C", "Song C")
+        # Concurrent playlists keep expanding over the same snapshot
+        assert "c" not in generator.similarity_graph
+
+    def test_missing_tracks_drop_same_artist(self, generator):
+        manager = generator.playlist_manager
+        manager.get_track_by_title_and_artist = lambda title, artist: manager.track_map.get(
+            resolve(title, " ".join(artist.split()))
+        )
+        generator.lastfm.get_similar_tracks.return_value = similar(
+            ("ARTIST  A", "Other A"), ("Artist B", "Song B")
+        )
+
+        tracks = generator._get_similar_library_tracks(generator.playlist_manager.track_map["a"])
+
+        assert [t["Id"] for t in tracks] == ["b"]
+
+    def test_failed_lookup_not_recorded(self, generator):
+        track = generator.playlist_manager.track_map["c"]
+
+        assert generator._get_similar_library_tracks(track) == []
+        assert "c" not in generator.similarity_graph